@@ -2,6 +2,8 @@ from pathlib import Path
 from datetime import timedelta
 import os
 
+from corsheaders.defaults import default_headers
+
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 SECRET_KEY = 'django-insecure-od700-od&1mr7(89^22xy6#g)7^!h^^_eg4n#nee$(8q99c!oc'
@@ -15,6 +17,9 @@ ALLOWED_HOSTS = ["localhost", "127.0.0.1"]  # + ['seu.ip.aqui', 'seu-dominio.com
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:5173",
 ]
+# Headers extras usados pelas estações (retry idempotente de POST /pesagens/)
+CORS_ALLOW_HEADERS = (*default_headers, "idempotency-key")
+CORS_EXPOSE_HEADERS = ["Idempotent-Replayed"]
 # Se preferir liberar geral em dev:
 # CORS_ALLOW_ALL_ORIGINS = True
 
@@ -42,6 +47,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # gzip/brotli negociado; antes dos demais para comprimir o corpo já final (ver registro/middleware.py)
+    'registro.middleware.CompressaoMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
 
     # ✅ CORS deve vir o mais alto possível, logo após SessionMiddleware
@@ -57,7 +64,8 @@ MIDDLEWARE = [
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        # JWT com cache de usuário/perfil (evita 1 query por requisição)
+        "usuarios.authentication.CachedJWTAuthentication",
     ),
     # Se quiser exigir login por padrão em todas as views DRF:
     "DEFAULT_PERMISSION_CLASSES": (
@@ -66,15 +74,56 @@ REST_FRAMEWORK = {
     # ✅ Paginação opcional (bom pro frontend)
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 50,
+    # JSON com orjson (mesma saída do JSONRenderer padrão; ver registro/renderers.py)
+    "DEFAULT_RENDERER_CLASSES": (
+        "registro.renderers.OrjsonRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
+    "DEFAULT_PARSER_CLASSES": (
+        "registro.renderers.OrjsonParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ),
 }
 
+# Respostas a partir deste tamanho (bytes) são comprimidas (gzip/brotli) quando o cliente aceita
+REGISTRO_COMPRESSAO_MINIMO = 1024
+
 # (Opcional) tempo dos tokens
 from datetime import timedelta
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
+    # login devolve também os dados do usuário (papel, nome de exibição)
+    'TOKEN_OBTAIN_SERIALIZER': 'usuarios.serializers.TokenComPerfilSerializer',
 }
 
+# Cache padrão. LocMemCache é por processo: com vários workers use um cache
+# compartilhado (ex.: django.core.cache.backends.redis.RedisCache), senão a
+# invalidação do cache de autenticação só vale no processo que gravou
+# (checagem usuarios.W001 fora do DEBUG).
+CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+}
+
+# Cache de usuário/perfil usado na autenticação JWT (segundos). Com cache por
+# processo é também a defasagem máxima, nos outros workers, de uma desativação
+# ou troca de papel.
+USUARIOS_AUTH_CACHE_TIMEOUT = 60
+
+# Arquivamento: OPs concluídas/canceladas há mais de N dias (manage.py arquivar_ops)
+REGISTRO_ARQUIVO_DIAS = 365
+
+# Validade das chaves Idempotency-Key (manage.py limpar_idempotencia remove as expiradas)
+REGISTRO_IDEMPOTENCIA_TTL = timedelta(hours=24)
+
+# Plano de pesagem (/ops/{id}/plano-pesagem/) em cache; invalidado por sinais, TTL como teto (segundos)
+REGISTRO_PLANO_CACHE_TIMEOUT = 300
+
+# Outbox de eventos para ERP/MES (manage.py relay_outbox). Ver registro/outbox.py.
+# Ex.: {"erp": {"sink": "registro.outbox.SinkWebhook", "opcoes": {"url": "http://erp.local/eventos"}}}
+REGISTRO_OUTBOX_CONSUMIDORES = {}
+
 ROOT_URLCONF = 'conf.urls'
 
 TEMPLATES = [
@@ -98,6 +147,12 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # estações concorrentes: transações de escrita pegam o lock logo no BEGIN
+            # (evita "database is locked" na promoção de leitura -> escrita)
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
     }
 }
 
@@ -117,4 +172,8 @@ STATIC_URL = 'static/'
 # ✅ Facilita o collectstatic no deploy
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
+# Arquivos gerados/recebidos pelas tarefas em segundo plano (PDFs, planilhas de importação)
+MEDIA_URL = 'media/'
+MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
@@ -1,9 +1,15 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.core.exceptions import ValidationError
 from .models import (
     Produto, MateriaPrima, Balanca,
     EstruturaProduto, ItemEstrutura,
-    OrdemProducao, ItemOP, Pesagem
+    OrdemProducao, ItemOP, Pesagem, TipoLancamento,
+    RegraTolerancia,
+    OrdemProducaoArquivada, ItemOPArquivado, PesagemArquivada,
+    EventoOutbox, OffsetConsumidor, LoteMP, RegistroAuditoria, RegistroExclusao,
+    ImpressoraEtiqueta, TrabalhoImpressao, Tarefa
 )
+from .impressao import reenviar
 
 @admin.register(Produto)
 class ProdutoAdmin(admin.ModelAdmin):
@@ -28,10 +34,19 @@ class EstruturaProdutoAdmin(admin.ModelAdmin):
     search_fields = ("produto__nome", "descricao")
     inlines = [ItemEstruturaInline]
 
+@admin.register(RegraTolerancia)
+class RegraToleranciaAdmin(admin.ModelAdmin):
+    list_display = ("escopo", "produto", "materia_prima", "item_estrutura", "tipo", "inferior", "superior", "ativo")
+    list_filter = ("escopo", "tipo", "ativo")
+    search_fields = ("produto__nome", "materia_prima__nome", "materia_prima__codigo_interno")
+    autocomplete_fields = ("produto", "materia_prima")
+    raw_id_fields = ("item_estrutura",)
+
 class ItemOPInline(admin.TabularInline):
     model = ItemOP
     extra = 0
     autocomplete_fields = ("materia_prima",)
+    readonly_fields = ("quantidade_minima", "quantidade_maxima")
 
 @admin.register(OrdemProducao)
 class OrdemProducaoAdmin(admin.ModelAdmin):
@@ -41,6 +56,21 @@ class OrdemProducaoAdmin(admin.ModelAdmin):
     date_hierarchy = "criada_em"
     inlines = [ItemOPInline]
 
+    def save_formset(self, request, form, formset, change):
+        # item existente com MP/quantidade alterada: recongela os limites de tolerância
+        for f in formset.forms:
+            if (isinstance(f.instance, ItemOP) and f.instance.pk and f not in formset.deleted_forms
+                    and {"materia_prima", "quantidade_necessaria"} & set(f.changed_data)):
+                f.instance.congelar_tolerancia()
+        super().save_formset(request, form, formset, change)
+
+@admin.register(LoteMP)
+class LoteMPAdmin(admin.ModelAdmin):
+    list_display = ("codigo", "materia_prima", "validade", "quantidade_disponivel", "quantidade_inicial", "ativo")
+    list_filter = ("ativo",)
+    search_fields = ("codigo", "materia_prima__nome", "materia_prima__codigo_interno", "fornecedor")
+    list_select_related = ("materia_prima",)
+
 @admin.register(Balanca)
 class BalancaAdmin(admin.ModelAdmin):
     list_display = ("nome", "identificador", "tipo_conexao", "ativo", "localizacao")
@@ -110,6 +140,7 @@ class PesagemAdmin(admin.ModelAdmin):
         "pesador",
         "balanca",
         "codigo_interno",
+        "tipo",
     )
 
     ordering = ("-data_hora",)
@@ -129,9 +160,33 @@ class PesagemAdmin(admin.ModelAdmin):
         MateriaPrimaFilter,
         LoteMPFilter,   # novo
         "balanca",
+        "tipo",
         "data_hora",
     )
 
+    # pesagens não são editadas nem apagadas (o acumulado do ItemOP ficaria errado):
+    # correções só por estorno/substituta, ver Pesagem.corrigir()/anular()
+    actions = ["anular_pesagens"]
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    @admin.action(description="Anular (estornar) pesagens selecionadas")
+    def anular_pesagens(self, request, queryset):
+        anuladas, erros = 0, []
+        for pesagem in queryset.filter(tipo=TipoLancamento.PESAGEM, estorno__isnull=True):
+            try:
+                pesagem.anular(request.user.get_username(), "anulada pelo admin")
+                anuladas += 1
+            except ValidationError as e:
+                erros.append(f"#{pesagem.pk}: {'; '.join(e.messages)}")
+        self.message_user(request, f"Pesagens anuladas: {anuladas}")
+        if erros:
+            self.message_user(request, " | ".join(erros), level=messages.ERROR)
+
     list_select_related = (
         "op",
         "item_op",
@@ -155,3 +210,95 @@ class PesagemAdmin(admin.ModelAdmin):
         return obj.op.lote
     lote.admin_order_field = "op__lote"
     lote.short_description = "Lote (OP)"
+
+
+# -------- Arquivo (somente leitura) --------
+
+class SomenteLeituraAdmin(admin.ModelAdmin):
+    def has_add_permission(self, request, obj=None):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+class ItemOPArquivadoInline(admin.TabularInline):
+    model = ItemOPArquivado
+    extra = 0
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+@admin.register(OrdemProducaoArquivada)
+class OrdemProducaoArquivadaAdmin(SomenteLeituraAdmin):
+    list_display = ("numero", "produto", "lote", "status", "criada_em", "concluida_em", "arquivada_em")
+    list_filter = ("status",)
+    search_fields = ("numero", "lote", "produto__nome")
+    inlines = [ItemOPArquivadoInline]
+
+@admin.register(PesagemArquivada)
+class PesagemArquivadaAdmin(SomenteLeituraAdmin):
+    list_display = ("data_hora", "op", "item_op", "lote_mp", "liquido", "bruto", "tara", "pesador", "balanca")
+    search_fields = ("pesador", "codigo_interno", "lote_mp", "op__numero", "op__lote")
+    list_select_related = ("op", "op__produto", "item_op", "item_op__materia_prima", "item_op__op", "balanca")
+
+# -------- Outbox --------
+
+@admin.register(EventoOutbox)
+class EventoOutboxAdmin(SomenteLeituraAdmin):
+    list_display = ("id", "tipo", "agregado", "agregado_id", "criado_em")
+    list_filter = ("tipo",)
+    search_fields = ("agregado_id",)
+
+@admin.register(OffsetConsumidor)
+class OffsetConsumidorAdmin(admin.ModelAdmin):
+    list_display = ("consumidor", "ultimo_id", "tentativas", "ultimo_erro", "atualizado_em")
+    readonly_fields = ("tentativas", "ultimo_erro", "atualizado_em")
+
+# -------- Etiquetas --------
+
+@admin.register(ImpressoraEtiqueta)
+class ImpressoraEtiquetaAdmin(admin.ModelAdmin):
+    list_display = ("nome", "estacao", "endereco_ip", "porta", "linguagem", "ativo")
+    list_filter = ("ativo", "linguagem", "estacao")
+    search_fields = ("nome", "estacao", "endereco_ip")
+
+@admin.register(TrabalhoImpressao)
+class TrabalhoImpressaoAdmin(SomenteLeituraAdmin):
+    list_display = ("id", "pesagem_id", "impressora", "status", "tentativas", "criado_em", "enviado_em", "ultimo_erro")
+    list_filter = ("status", "impressora")
+    search_fields = ("pesagem_id", "solicitado_por")
+    list_select_related = ("impressora",)
+    actions = ["reenviar_trabalhos"]
+
+    @admin.action(description="Reenviar trabalhos selecionados")
+    def reenviar_trabalhos(self, request, queryset):
+        self.message_user(request, f"Trabalhos devolvidos à fila: {reenviar(queryset)}")
+
+# -------- Tarefas --------
+
+@admin.register(Tarefa)
+class TarefaAdmin(SomenteLeituraAdmin):
+    list_display = ("id", "tipo", "status", "prioridade", "tentativas", "solicitado_por", "criada_em", "concluida_em")
+    list_filter = ("status", "tipo")
+    search_fields = ("solicitado_por",)
+
+# -------- Auditoria --------
+
+@admin.register(RegistroAuditoria)
+class RegistroAuditoriaAdmin(SomenteLeituraAdmin):
+    list_display = ("seq", "criado_em", "entidade", "entidade_id", "acao", "usuario")
+    list_filter = ("entidade", "acao")
+    search_fields = ("entidade_id", "usuario")
+
+@admin.register(RegistroExclusao)
+class RegistroExclusaoAdmin(SomenteLeituraAdmin):
+    list_display = ("excluido_em", "entidade", "objeto_id")
+    list_filter = ("entidade",)
+    search_fields = ("objeto_id",)
@@ -0,0 +1,64 @@
+"""
+Sincronização incremental dos catálogos (?updated_since=).
+
+Produto, MateriaPrima, Balanca, EstruturaProduto e ItemEstrutura têm
+`atualizado_em` (auto_now, indexado) e cada exclusão grava um tombstone em
+RegistroExclusao (signals.py). Com isso o cliente guarda uma réplica e pede
+só o que mudou:
+
+    GET /api/registro/produtos/?updated_since=<ate da resposta anterior>
+    -> {"desde", "ate", "alterados": [...], "excluidos": [ids]}
+
+`ate` é o cursor da próxima chamada. O servidor volta MARGEM no tempo antes
+de comparar: `atualizado_em` é preenchido no save(), antes do commit, e uma
+transação lenta pode gravar um valor anterior ao `ate` já entregue. O preço é
+reenviar registros dos últimos segundos — o cliente aplica por id (upsert),
+então repetir é inofensivo. O resto da query string (?search=, ?fields=...)
+vale normalmente; a resposta do delta não é paginada.
+"""
+from datetime import timedelta
+from functools import reduce
+from operator import or_
+
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import RegistroExclusao
+
+MARGEM = timedelta(seconds=30)
+
+
+def ler_desde(texto):
+    """datetime (aware) de `updated_since`; ValueError se não for ISO 8601."""
+    desde = parse_datetime(texto.strip().replace(" ", "+"))  # "+" da URL chega como espaço
+    if desde is None:
+        raise ValueError(texto)
+    if timezone.is_naive(desde):
+        desde = timezone.make_aware(desde)
+    return desde
+
+
+def alterados(queryset, campos, desde):
+    """Registros do queryset com qualquer um dos `campos` (datas) >= desde - MARGEM."""
+    limite = desde - MARGEM
+    condicao = reduce(or_, (Q(**{f"{campo}__gte": limite}) for campo in campos))
+    ids = queryset.model._default_manager.filter(condicao).values("pk")
+    return queryset.filter(pk__in=ids)
+
+
+def excluidos(entidade, desde):
+    return sorted(set(
+        RegistroExclusao.objects
+        .filter(entidade=entidade, excluido_em__gte=desde - MARGEM)
+        .values_list("objeto_id", flat=True)
+    ))
+
+
+def resposta(desde, ate, dados, entidade):
+    return {
+        "desde": desde,
+        "ate": ate,
+        "alterados": dados,
+        "excluidos": excluidos(entidade, desde),
+    }
@@ -0,0 +1,207 @@
+"""
+Arquivamento de OPs encerradas.
+
+Move OPs concluídas/canceladas há mais de N dias (com ItemOPs e Pesagens) para as
+tabelas *Arquivada*, em blocos. Cada bloco é uma transação com INSERT ... SELECT
+seguido de DELETE nas tabelas quentes, de modo que as listagens/buscas do dia a
+dia só varrem dados ativos.
+
+O SQL direto não dispara sinais: cada OP arquivada grava à mão um "op.arquivada"
+na trilha de auditoria (mesma transação, com o nº de itens/pesagens movidos).
+Itens e pesagens não ganham registro próprio — continuam íntegros, só mudam de
+tabela. Tombstones (RegistroExclusao) são só dos catálogos; OPs não entram no
+?updated_since=.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, Q
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .massa import formatar
+from .models import (
+    OrdemProducao, ItemOP, Pesagem, StatusOP,
+    OrdemProducaoArquivada, ItemOPArquivado, PesagemArquivada,
+    RegistroAuditoria, em_lote_auditoria,
+)
+
+DIAS_PADRAO = 365
+
+# (modelo quente, modelo de arquivo, campos copiados, coluna de vínculo com a OP)
+_TABELAS = (
+    (
+        OrdemProducao, OrdemProducaoArquivada,
+        ("id", "numero", "produto", "estrutura", "lote", "status", "observacoes", "criada_em", "concluida_em"),
+        "id",
+    ),
+    (
+        ItemOP, ItemOPArquivado,
+        ("id", "op", "materia_prima", "quantidade_necessaria", "quantidade_pesada",
+         "quantidade_minima", "quantidade_maxima", "unidade"),
+        "op",
+    ),
+    (
+        Pesagem, PesagemArquivada,
+        ("id", "op", "item_op", "pesador", "data_hora", "bruto", "tara", "liquido",
+         "balanca", "codigo_interno", "lote_mp", "parcial", "uuid_cliente", "capturada_em",
+         "tipo", "estorno_de", "corrige", "motivo"),
+        "op",
+    ),
+)
+
+
+def dias_retencao():
+    return getattr(settings, "REGISTRO_ARQUIVO_DIAS", DIAS_PADRAO)
+
+
+def ops_arquivaveis(dias=None, agora=None):
+    """OPs encerradas (concluídas/canceladas) há mais de `dias` dias."""
+    dias = dias_retencao() if dias is None else dias
+    limite = (agora or timezone.now()) - timedelta(days=dias)
+    return (
+        OrdemProducao.objects
+        .filter(status__in=[StatusOP.CONCLUIDA, StatusOP.CANCELADA])
+        .annotate(encerrada_em=Coalesce("concluida_em", "criada_em"))
+        .filter(encerrada_em__lt=limite)
+        .order_by("id")
+    )
+
+
+def _coluna(model, campo):
+    return model._meta.get_field(campo).column
+
+
+def _copiar(cursor, origem, destino, campos, vinculo, op_ids, extras=None):
+    qn = connection.ops.quote_name
+    extras = extras or {}
+    cols_destino = [qn(_coluna(destino, c)) for c in campos] + [qn(_coluna(destino, c)) for c in extras]
+    cols_origem = [qn(_coluna(origem, c)) for c in campos] + ["%s"] * len(extras)
+    marcadores = ", ".join(["%s"] * len(op_ids))
+    sql = (
+        f"INSERT INTO {qn(destino._meta.db_table)} ({', '.join(cols_destino)}) "
+        f"SELECT {', '.join(cols_origem)} FROM {qn(origem._meta.db_table)} "
+        f"WHERE {qn(_coluna(origem, vinculo))} IN ({marcadores})"
+    )
+    cursor.execute(sql, list(extras.values()) + list(op_ids))
+
+
+def _apagar(cursor, model, vinculo, op_ids):
+    qn = connection.ops.quote_name
+    marcadores = ", ".join(["%s"] * len(op_ids))
+    cursor.execute(
+        f"DELETE FROM {qn(model._meta.db_table)} WHERE {qn(_coluna(model, vinculo))} IN ({marcadores})",
+        list(op_ids),
+    )
+
+
+def _contagem(model, op_ids):
+    return dict(
+        model.objects.filter(op_id__in=op_ids).order_by().values("op_id")
+        .annotate(n=Count("id")).values_list("op_id", "n")
+    )
+
+
+def _auditar(op_ids, agora):
+    itens, pesagens = _contagem(ItemOP, op_ids), _contagem(Pesagem, op_ids)
+    ops = OrdemProducao.objects.filter(pk__in=op_ids).order_by("id").values("id", "numero", "lote", "status")
+    with em_lote_auditoria:
+        for op in ops:
+            op_id = op.pop("id")
+            dados = {**op, "itens": itens.get(op_id, 0), "pesagens": pesagens.get(op_id, 0), "arquivada_em": agora}
+            RegistroAuditoria.registrar("op", op_id, "op.arquivada", dados)
+
+
+@transaction.atomic
+def arquivar_bloco(op_ids, agora=None):
+    """Copia OP/itens/pesagens do bloco para o arquivo e remove das tabelas quentes."""
+    agora = agora or timezone.now()
+    arquivada_em = connection.ops.adapt_datetimefield_value(agora)
+    _auditar(op_ids, agora)
+    with connection.cursor() as cursor:
+        for origem, destino, campos, vinculo in _TABELAS:
+            extras = {"arquivada_em": arquivada_em} if destino is OrdemProducaoArquivada else None
+            _copiar(cursor, origem, destino, campos, vinculo, op_ids, extras)
+        # apaga na ordem inversa das FKs (pesagens -> itens -> OPs)
+        for origem, _, _, vinculo in reversed(_TABELAS):
+            _apagar(cursor, origem, vinculo, op_ids)
+    return len(op_ids)
+
+
+def arquivar(dias=None, lote=500, limite=None, progresso=None):
+    """
+    Arquiva em blocos de `lote` OPs. `limite` restringe o total de OPs nesta execução.
+    Retorna o número de OPs arquivadas.
+    """
+    agora = timezone.now()
+    total = 0
+    while limite is None or total < limite:
+        tamanho = lote if limite is None else min(lote, limite - total)
+        op_ids = list(ops_arquivaveis(dias, agora).values_list("id", flat=True)[:tamanho])
+        if not op_ids:
+            break
+        total += arquivar_bloco(op_ids, agora)
+        if progresso:
+            progresso(total)
+    return total
+
+
+# ---------- Rastreabilidade (tabelas quentes + arquivo) ----------
+
+_CAMPOS_RASTREIO = (
+    "id", "data_hora", "pesador", "liquido", "bruto", "tara", "lote_mp", "codigo_interno",
+    "op_id", "op__numero", "op__lote", "op__produto__nome",
+    "item_op__materia_prima_id", "item_op__materia_prima__nome", "balanca__nome",
+)
+
+
+class PesagensRastreadas:
+    """
+    Pesagens quentes + arquivadas como uma sequência só, mais recentes primeiro,
+    para o paginador: count() soma dois COUNT e fatiar [a:b] busca, já ordenadas
+    no banco, só as b primeiras de cada tabela e intercala as duas.
+    """
+
+    def __init__(self, filtro):
+        self.consultas = [
+            (model.objects.filter(filtro).order_by("-data_hora", "-id"), arquivada)
+            for model, arquivada in ((Pesagem, False), (PesagemArquivada, True))
+        ]
+
+    def count(self):
+        return sum(qs.count() for qs, _ in self.consultas)
+
+    __len__ = count
+
+    def __getitem__(self, fatia):
+        if not isinstance(fatia, slice) or fatia.stop is None:
+            raise TypeError("Use fatias com fim definido.")
+        linhas = []
+        for qs, arquivada in self.consultas:
+            for row in qs.values(*_CAMPOS_RASTREIO)[:fatia.stop]:
+                row["arquivada"] = arquivada
+                row["liquido"] = formatar(row["liquido"], "g")
+                row["bruto"] = formatar(row["bruto"], "kg")
+                row["tara"] = formatar(row["tara"], "kg")
+                linhas.append(row)
+        linhas.sort(key=lambda r: (r["data_hora"], r["id"]), reverse=True)
+        return linhas[fatia]
+
+
+def rastrear_pesagens(lote_mp=None, lote_op=None, materia_prima_id=None):
+    """
+    Busca pesagens por lote de MP (exato, como gravado), lote da OP e/ou id da MP
+    nas tabelas quentes e no arquivo. Retorna PesagensRastreadas (fatiar para ler)
+    com dicts homogêneos e a flag `arquivada`; None sem nenhum filtro.
+    """
+    filtro = Q()
+    if lote_mp:
+        filtro &= Q(lote_mp=lote_mp.strip())
+    if lote_op:
+        filtro &= Q(op__lote=lote_op.strip())
+    if materia_prima_id:
+        filtro &= Q(item_op__materia_prima_id=materia_prima_id)
+    if not filtro:
+        return None
+    return PesagensRastreadas(filtro)
@@ -0,0 +1,113 @@
+"""
+Verificação da trilha de auditoria (RegistroAuditoria).
+
+A cadeia é dividida em segmentos contíguos de seq; cada segmento é lido em
+streaming (iterator, em blocos) e re-hasheado de forma independente — em
+processos paralelos quando o banco é um arquivo. Depois as emendas entre
+segmentos são conferidas (último hash de um = hash_anterior do seguinte) e o
+fim da cadeia é comparado com a cabeça (CadeiaAuditoria), o que pega registros
+apagados do final.
+
+Falhas detectadas (a primeira, pela ordem de seq, é a reportada):
+- conteúdo alterado (hash recalculado ≠ gravado);
+- elo quebrado (hash_anterior ≠ hash do registro anterior);
+- lacuna de seq (registro apagado ou inserido fora da cadeia);
+- cadeia truncada (fim ≠ cabeça).
+"""
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+from django.db import connection, connections
+from django.db.models import Max
+
+from .models import HASH_INICIAL, CadeiaAuditoria, RegistroAuditoria, hash_auditoria
+
+BLOCO_LEITURA = 5000
+_CAMPOS = ("seq", "criado_em", "entidade", "entidade_id", "acao", "usuario", "dados", "hash_anterior", "hash")
+
+
+def _verificar_segmento(inicio, fim, bloco=BLOCO_LEITURA):
+    """Re-hasheia seq em [inicio, fim]; devolve as pontas do segmento e a 1ª falha interna."""
+    linhas = (
+        RegistroAuditoria.objects
+        .filter(seq__gte=inicio, seq__lte=fim)
+        .order_by("seq")
+        .values_list(*_CAMPOS)
+        .iterator(chunk_size=bloco)
+    )
+    resultado = {"inicio": inicio, "fim": fim, "primeiro": None, "ultimo": None, "total": 0, "falha": None}
+    esperado_seq, esperado_hash = inicio, None
+    for seq, criado_em, entidade, entidade_id, acao, usuario, dados, anterior, gravado in linhas:
+        resultado["total"] += 1
+        if resultado["primeiro"] is None:
+            resultado["primeiro"] = (seq, anterior)
+        if resultado["falha"] is None:
+            if seq != esperado_seq:
+                resultado["falha"] = (esperado_seq, f"lacuna na sequência: esperado #{esperado_seq}, lido #{seq}")
+            elif esperado_hash is not None and anterior != esperado_hash:
+                resultado["falha"] = (seq, "elo quebrado: hash_anterior não confere com o registro anterior")
+            elif hash_auditoria(anterior, seq, criado_em, entidade, entidade_id, acao, usuario, dados) != gravado:
+                resultado["falha"] = (seq, "conteúdo alterado: hash não confere")
+        esperado_seq, esperado_hash = seq + 1, gravado
+        resultado["ultimo"] = (seq, gravado)
+    if resultado["falha"] is None and resultado["ultimo"] and resultado["ultimo"][0] != fim:
+        resultado["falha"] = (resultado["ultimo"][0] + 1, f"lacuna na sequência: faltam #{resultado['ultimo'][0] + 1}..#{fim}")
+    elif resultado["falha"] is None and resultado["total"] == 0:
+        resultado["falha"] = (inicio, f"lacuna na sequência: faltam #{inicio}..#{fim}")
+    return resultado
+
+
+def _segmentos(primeiro, ultimo, n):
+    tamanho = max(1, -(-(ultimo - primeiro + 1) // n))
+    return [(a, min(a + tamanho - 1, ultimo)) for a in range(primeiro, ultimo + 1, tamanho)]
+
+
+def _pode_paralelizar():
+    return connection.vendor != "sqlite" or not connection.is_in_memory_db()
+
+
+def verificar(processos=None, segmentos=None, bloco=BLOCO_LEITURA):
+    """
+    Valida a cadeia inteira. Retorna {"total", "segundos", "falha": None | {"seq", "motivo"}}.
+    processos=1 (ou banco em memória) verifica no próprio processo.
+    """
+    inicio_relogio = time.perf_counter()
+    processos = processos or os.cpu_count() or 1
+    cabeca = CadeiaAuditoria.objects.filter(pk=1).values_list("ultimo_seq", "ultimo_hash").first() or (0, HASH_INICIAL)
+    maior_seq = RegistroAuditoria.objects.aggregate(m=Max("seq"))["m"]
+    falhas = []
+
+    if maior_seq is None:
+        resultados = []
+    else:
+        # começa sempre no #1: registros apagados do início aparecem como lacuna
+        partes = _segmentos(1, maior_seq, segmentos or processos * 4)
+        if processos > 1 and len(partes) > 1 and _pode_paralelizar():
+            connections.close_all()  # cada processo abre a sua conexão
+            with ProcessPoolExecutor(max_workers=processos, mp_context=get_context("fork")) as pool:
+                resultados = list(pool.map(_verificar_segmento, *zip(*partes), [bloco] * len(partes)))
+        else:
+            resultados = [_verificar_segmento(a, b, bloco) for a, b in partes]
+
+    # emendas: o 1º registro de cada segmento encadeia no último do anterior (ou no hash inicial)
+    hash_anterior = HASH_INICIAL
+    for r in resultados:
+        if r["falha"]:
+            falhas.append(r["falha"])
+        if r["primeiro"] and r["primeiro"][0] == r["inicio"] and r["primeiro"][1] != hash_anterior:
+            falhas.append((r["inicio"], "elo quebrado: hash_anterior não confere com o registro anterior"))
+        hash_anterior = r["ultimo"][1] if r["ultimo"] else None
+
+    ultimo = resultados[-1]["ultimo"] if resultados and resultados[-1]["ultimo"] else (0, HASH_INICIAL)
+    if tuple(ultimo) != tuple(cabeca):
+        falhas.append((min(ultimo[0], cabeca[0]) + 1,
+                       f"cadeia truncada: fim em #{ultimo[0]}, cabeça registra #{cabeca[0]}"))
+
+    falha = min(falhas, key=lambda f: f[0]) if falhas else None
+    return {
+        "total": sum(r["total"] for r in resultados),
+        "segundos": time.perf_counter() - inicio_relogio,
+        "falha": {"seq": falha[0], "motivo": falha[1]} if falha else None,
+    }
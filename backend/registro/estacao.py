@@ -0,0 +1,120 @@
+"""
+Carga da tela de pesagem (estação) numa única resposta: OPs abertas/em
+andamento com os itens, balanças ativas e o usuário logado.
+
+Versão = último `seq` da cadeia de auditoria (CadeiaAuditoria, linha única):
+criação de OP, mudança de status, itens gerados/alterados/reconciliados e
+toda pesagem/estorno gravam auditoria na mesma transação, então o seq só
+avança quando algo que a estação mostra muda.
+
+    GET /api/registro/estacao/bootstrap/              -> tudo, "completo": true
+    GET /api/registro/estacao/bootstrap/?since=<versao>
+
+Com `since`, `ops` traz só as OPs abertas tocadas depois da versão (com
+todos os itens) e `ops_encerradas` os ids que saíram da lista (concluídas,
+canceladas, apagadas). Sem mudança é uma consulta à cabeça da cadeia mais a
+das balanças. `since` muito antigo (mais de LIMITE_DELTA registros) ou
+adiante da versão atual devolve a carga completa.
+Edições de cadastro da OP que não mudam status (número, observações) não
+geram auditoria e só aparecem na próxima carga completa.
+"""
+from django.db.models import F
+
+from .massa import formatar
+from .models import Balanca, CadeiaAuditoria, ItemOP, OrdemProducao, RegistroAuditoria, StatusOP
+
+STATUS_ABERTOS = (StatusOP.ABERTA, StatusOP.EM_ANDAMENTO)
+ENTIDADES = ("op", "item_op", "pesagem")
+LIMITE_DELTA = 5000
+
+
+def versao_atual():
+    return CadeiaAuditoria.objects.filter(pk=1).values_list("ultimo_seq", flat=True).first() or 0
+
+
+def ops_alteradas(desde, ate):
+    """Ids de OP com auditoria em (desde, ate]; None se forem registros demais para um delta."""
+    registros = (
+        RegistroAuditoria.objects
+        .filter(seq__gt=desde, seq__lte=ate, entidade__in=ENTIDADES)
+        .values_list("entidade", "entidade_id", "dados__op_id")
+    )
+    ids = set()
+    for n, (entidade, entidade_id, op_id) in enumerate(registros.iterator()):
+        if n >= LIMITE_DELTA:
+            return None
+        ids.add(entidade_id if entidade == "op" else op_id)
+    ids.discard(None)
+    return ids
+
+
+def _item(i):
+    restante = i["quantidade_necessaria"] - i["quantidade_pesada"]
+    return {
+        "id": i["id"],
+        "materia_prima": {
+            "id": i["materia_prima_id"],
+            "nome": i["materia_prima__nome"],
+            "codigo_interno": i["materia_prima__codigo_interno"],
+        },
+        "quantidade_necessaria": formatar(i["quantidade_necessaria"]),
+        "quantidade_pesada": formatar(i["quantidade_pesada"]),
+        "quantidade_restante": formatar(restante),
+        "quantidade_minima": formatar(i["quantidade_minima"]),
+        "quantidade_maxima": formatar(i["quantidade_maxima"]),
+        "unidade": i["unidade"],
+        "pendente": restante > 0,
+    }
+
+
+def _ops(ids=None):
+    qs = OrdemProducao.objects.filter(status__in=STATUS_ABERTOS).order_by("-criada_em")
+    if ids is not None:
+        qs = qs.filter(pk__in=ids)
+    ops = {
+        o["id"]: {**o, "itens": [], "itens_pendentes": 0}
+        for o in qs.values("id", "numero", "lote", "status", "criada_em", produto_nome=F("produto__nome"))
+    }
+    if not ops:
+        return []
+    itens = (
+        ItemOP.objects.filter(op_id__in=list(ops))
+        .order_by("materia_prima__nome")
+        .values(
+            "id", "op_id", "materia_prima_id", "materia_prima__nome", "materia_prima__codigo_interno",
+            "quantidade_necessaria", "quantidade_pesada", "quantidade_minima", "quantidade_maxima", "unidade",
+        )
+    )
+    for i in itens:
+        op = ops[i["op_id"]]
+        op["itens"].append(_item(i))
+        op["itens_pendentes"] += op["itens"][-1]["pendente"]
+    return list(ops.values())
+
+
+def _balancas():
+    return list(
+        Balanca.objects.filter(ativo=True).order_by("nome")
+        .values("id", "nome", "identificador", "localizacao", "capacidade_maxima", "divisao")
+    )
+
+
+def carregar(desde=None):
+    """Dados da estação; `desde` = versão já vista pela estação (delta) ou None (completo)."""
+    versao = versao_atual()
+    alteradas = None
+    if desde is not None and desde <= versao:
+        alteradas = ops_alteradas(desde, versao) if desde < versao else set()
+
+    if alteradas is None:
+        return {"versao": versao, "completo": True, "ops": _ops(), "balancas": _balancas()}
+
+    ops = _ops(alteradas) if alteradas else []
+    return {
+        "versao": versao,
+        "completo": False,
+        "ops": ops,
+        "ops_encerradas": sorted(alteradas - {o["id"] for o in ops}),
+        "balancas": _balancas(),
+    }
+
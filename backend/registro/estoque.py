@@ -0,0 +1,65 @@
+"""
+Alocação FEFO (first-expired, first-out) de lotes de MP para itens de OP.
+
+Cada sugestão é uma leitura pelo índice parcial lotemp_fefo_idx
+(materia_prima, validade, id | saldo > 0, ativo): o custo depende só de
+quantos lotes são necessários para cobrir a quantidade, não do histórico de
+lotes já consumidos.
+"""
+from django.db.models import F
+from django.utils import timezone
+
+from .massa import formatar
+from .models import ItemOP, LoteMP
+
+LOTES_POR_ITEM = 10  # teto de lotes combinados numa sugestão
+
+
+def alocar_fefo(materia_prima_id, quantidade_mg, hoje=None):
+    """
+    Lotes (validade mais próxima primeiro) que cobrem `quantidade_mg`.
+    Retorna (alocacao, faltante_mg); alocacao = [{lote_id, codigo, validade, disponivel_g, usar_g}].
+    """
+    alocacao, faltante = [], quantidade_mg
+    lotes = LoteMP.fefo(materia_prima_id, hoje).values("id", "codigo", "validade", "quantidade_disponivel")
+    for lote in lotes[:LOTES_POR_ITEM]:
+        if faltante <= 0:
+            break
+        usar = min(faltante, lote["quantidade_disponivel"])
+        alocacao.append({
+            "lote_id": lote["id"],
+            "codigo": lote["codigo"],
+            "validade": lote["validade"],
+            "disponivel_g": formatar(lote["quantidade_disponivel"]),
+            "usar_g": formatar(usar),
+        })
+        faltante -= usar
+    return alocacao, max(faltante, 0)
+
+
+def sugestoes_para_op(op):
+    """Sugestão FEFO para cada item pendente da OP."""
+    hoje = timezone.localdate()
+    itens = (
+        ItemOP.objects
+        .filter(op=op, quantidade_pesada__lt=F("quantidade_necessaria"))
+        .select_related("materia_prima")
+        .order_by("id")
+    )
+    resultado = []
+    for item in itens:
+        restante = item.quantidade_necessaria - item.quantidade_pesada
+        alocacao, faltante = alocar_fefo(item.materia_prima_id, restante, hoje)
+        resultado.append({
+            "item_op_id": item.pk,
+            "materia_prima": {
+                "id": item.materia_prima_id,
+                "nome": item.materia_prima.nome,
+                "codigo_interno": item.materia_prima.codigo_interno,
+            },
+            "restante_g": formatar(restante),
+            "lote_sugerido": alocacao[0]["codigo"] if alocacao else None,
+            "lotes": alocacao,
+            "faltante_g": formatar(faltante),
+        })
+    return resultado
@@ -0,0 +1,216 @@
+"""
+Etiqueta de pesagem (4x3 polegadas) em três formatos com os mesmos campos:
+
+- ZPL (Zebra) e EPL (Eltron/Zebra antigas, Argox em emulação): texto curto
+  enviado direto à impressora térmica (RAW, TCP 9100 — ver registro/impressao.py);
+- PDF (reportlab, importado só ao gerar): alternativa para impressão pelo
+  navegador/sistema.
+
+`campos(pesagem)` monta os valores uma vez; os renderizadores só diagramam.
+"""
+import os
+
+from django.conf import settings
+from django.utils import timezone
+from .massa import formatar_ptbr
+
+TITULO = "THEODORO F. SOBRAL"
+
+ZPL = "zpl"
+EPL = "epl"
+PDF = "pdf"
+FORMATOS = (PDF, ZPL, EPL)
+TIPO_CONTEUDO = {
+    PDF: "application/pdf",
+    ZPL: "text/plain; charset=utf-8",
+    EPL: "text/plain; charset=windows-1252",
+}
+# ZPL usa ^CI28 (UTF-8); EPL usa a página de código 1252 (comando I8,A)
+CODIFICACAO = {ZPL: "utf-8", EPL: "cp1252"}
+
+# 4x3 pol a 203 dpi (8 pontos/mm)
+LARGURA_PONTOS = 812
+ALTURA_PONTOS = 609
+MARGEM_PONTOS = 40
+
+
+def _data_local(dt):
+    if not dt:
+        return ""
+    if timezone.is_naive(dt):
+        dt = timezone.make_aware(dt, timezone.get_current_timezone())
+    return timezone.localtime(dt).strftime("%d/%m/%Y %H:%M")
+
+
+def campos(pesagem):
+    """Valores impressos na etiqueta (espera op/produto/item/MP/balança em select_related)."""
+    op = pesagem.op
+    item = pesagem.item_op
+    return {
+        "produto": op.produto.nome if op and op.produto else "",
+        "materia_prima": item.materia_prima.nome if item and item.materia_prima else "",
+        "codigo_interno": pesagem.codigo_interno or "",
+        "op": op.numero if op else "",
+        "lote": op.lote if op else "",
+        "lote_mp": pesagem.lote_mp or "",
+        # massas em mg no banco; etiqueta em g (1.234,567 g)
+        "bruto": formatar_ptbr(pesagem.bruto),
+        "tara": formatar_ptbr(pesagem.tara),
+        "liquido": formatar_ptbr(pesagem.liquido),
+        "balanca": pesagem.balanca.nome if pesagem.balanca else "",
+        "pesador": pesagem.pesador or "",
+        "data": _data_local(pesagem.data_hora),
+    }
+
+
+def linhas(c):
+    """
+    Linhas do corpo, na ordem da etiqueta: (texto, ajustar). `ajustar` marca os
+    campos de tamanho livre (nomes), que reduzem a fonte em vez de estourar a largura.
+    """
+    rotulados = [("Produto", c["produto"]), ("Matéria-prima", c["materia_prima"])]
+    saida = [(f"{rotulo}: {valor}" if valor else f"{rotulo}:", True) for rotulo, valor in rotulados]
+    saida.append((f"Cód. Interno: {c['codigo_interno']}", False))
+    saida.append((f"OP: {c['op']}   Lote: {c['lote']}", False))
+    if c["lote_mp"]:
+        saida.append((f"Lote MP: {c['lote_mp']}", False))
+    saida += [
+        (f"Peso Bruto: {c['bruto']}", False),
+        (f"Tara: {c['tara']}", False),
+        (f"Peso Líquido: {c['liquido']}", False),
+        (f"Balança: {c['balanca']}", False),
+        (f"Pesador: {c['pesador']}", False),
+        (f"Data: {c['data']}", False),
+    ]
+    return saida
+
+
+# ---------- ZPL ----------
+
+def _zpl_texto(txt):
+    # ^FH: caracteres de controle do ZPL (^ ~ \) vão em hexadecimal
+    return txt.replace("\\", "\\5C").replace("^", "\\5E").replace("~", "\\7E")
+
+
+def renderizar_zpl(c, copias=1):
+    largura_util = LARGURA_PONTOS - 2 * MARGEM_PONTOS
+    cmds = [
+        "^XA", "^CI28", f"^PW{LARGURA_PONTOS}", f"^LL{ALTURA_PONTOS}", "^LH0,0",
+        f"^FO0,24^A0N,40,40^FB{LARGURA_PONTOS},1,0,C^FH\\^FD{_zpl_texto(TITULO)}^FS",
+    ]
+    y = 90
+    for txt, ajustar in linhas(c):
+        altura, largura = 32, 30
+        if ajustar:
+            # fonte 0 é proporcional: ~0,55 da largura nominal por caractere (estimativa)
+            largura = max(18, min(largura, int(largura_util / (max(len(txt), 1) * 0.55))))
+            altura = max(22, min(altura, largura + 2))
+        cmds.append(
+            f"^FO{MARGEM_PONTOS},{y}^A0N,{altura},{largura}^FB{largura_util},1,0,L^FH\\^FD{_zpl_texto(txt)}^FS"
+        )
+        y += 44
+    cmds += [f"^PQ{int(copias)}", "^XZ"]
+    return "\n".join(cmds) + "\n"
+
+
+# ---------- EPL ----------
+
+# fontes residentes do EPL2: nº -> largura do caractere em pontos (203 dpi)
+_EPL_FONTES = ((3, 12), (2, 10), (1, 8))
+
+
+def _epl_texto(txt):
+    return txt.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def renderizar_epl(c, copias=1):
+    largura_util = LARGURA_PONTOS - 2 * MARGEM_PONTOS
+    cmds = ["", "N", f"q{LARGURA_PONTOS}", f"Q{ALTURA_PONTOS},24", "I8,A,055"]
+    titulo_x = max(0, (LARGURA_PONTOS - len(TITULO) * 14) // 2)
+    cmds.append(f'A{titulo_x},24,0,4,1,1,N,"{_epl_texto(TITULO)}"')
+    y = 90
+    for txt, ajustar in linhas(c):
+        fonte, largura = _EPL_FONTES[0]
+        if ajustar:
+            for fonte, largura in _EPL_FONTES:
+                if len(txt) * largura <= largura_util:
+                    break
+        txt = txt[: largura_util // largura]
+        cmds.append(f'A{MARGEM_PONTOS},{y},0,{fonte},1,1,N,"{_epl_texto(txt)}"')
+        y += 44
+    cmds.append(f"P{int(copias)}")
+    return "\n".join(cmds) + "\n"
+
+
+def codificar(linguagem, texto):
+    """Bytes a enviar à impressora (caracteres fora da página de código viram '?')."""
+    return texto.encode(CODIFICACAO[linguagem], errors="replace")
+
+
+RENDERIZADORES = {ZPL: renderizar_zpl, EPL: renderizar_epl}
+
+
+# ---------- PDF ----------
+
+def gerar_pdf(c, saida):
+    """Desenha a etiqueta em PDF (4x3 pol) no arquivo/stream `saida`."""
+    return gerar_pdf_lote([c], saida)
+
+
+def gerar_pdf_lote(lista, saida):
+    """Uma página de etiqueta por item de `lista` (campos) num único PDF."""
+    from reportlab.lib.units import inch
+    from reportlab.lib.utils import ImageReader
+    from reportlab.pdfgen import canvas
+
+    etiqueta_size = (4 * inch, 3 * inch)  # 4x3 polegadas
+    p = canvas.Canvas(saida, pagesize=etiqueta_size)
+    logo_path = os.path.join(settings.BASE_DIR, 'registro', 'static', 'logo.png')
+    logo = ImageReader(logo_path) if os.path.exists(logo_path) else None
+    for c in lista:
+        _desenhar_pdf(p, c, etiqueta_size, logo)
+        p.showPage()
+    p.save()
+    return saida
+
+
+def _desenhar_pdf(p, c, etiqueta_size, logo):
+    width, height = etiqueta_size
+
+    # Cabeçalho com logo
+    p.setFont("Helvetica-Bold", 12)
+
+    if logo is not None:
+        logo_width = 30
+        logo_height = 30
+        text_width = p.stringWidth(TITULO, "Helvetica-Bold", 12)
+        total_width = logo_width + 1 + text_width
+        start_x = (width - total_width) / 2
+        y_pos = height - 15
+
+        p.drawImage(logo, x=start_x, y=y_pos - logo_height + 5,
+                    width=logo_width, height=logo_height, mask='auto')
+        text_y = y_pos - (logo_height / 2) + 4
+        p.drawString(start_x + logo_width + 8, text_y, TITULO)
+    else:
+        text_width = p.stringWidth(TITULO, "Helvetica-Bold", 12)
+        p.drawString((width - text_width) / 2, height - 20, TITULO)
+
+    # Conteúdo
+    linha = height - 50
+    base_font = "Helvetica"
+    base_size = 9
+    min_size = 6
+    margem_esq = 30
+    margem_dir = 10
+    max_text_width = width - margem_esq - margem_dir
+
+    for txt, ajustar in linhas(c):
+        # campos de nome reduzem a fonte gradualmente (até min_size) se excederem a largura
+        font_size = base_size
+        if ajustar:
+            while p.stringWidth(txt, base_font, font_size) > max_text_width and font_size > min_size:
+                font_size -= 0.5
+        p.setFont(base_font, font_size)
+        p.drawString(margem_esq, linha, txt)
+        linha -= 14
@@ -0,0 +1,135 @@
+"""
+Filtros do histórico de pesagens (GET /pesagens/) e contagens por faceta.
+
+Filtros (combináveis, valores múltiplos separados por vírgula):
+    de, ate         datas locais inclusivas (AAAA-MM-DD) sobre data_hora
+    produto         id(s) do produto da OP
+    materia_prima   id(s) da MP do item
+    balanca         id(s) da balança ("nenhuma" = sem balança)
+    pesador         nome(s) exato(s)
+    status_op       status da OP
+    op, lote        trecho do número / lote da OP
+    lote_mp         lote da MP (exato, como gravado: usa o índice de lote_mp)
+
+Datas viram intervalo [início do dia, início do dia seguinte) para usar o
+índice de data_hora (um __date aplicaria função à coluna).
+
+Com ?facetas=1 a resposta paginada ganha "facetas": por dimensão, as
+contagens (GROUP BY, uma query por dimensão) com todos os filtros aplicados
+menos o da própria dimensão — assim a lista mostra quantas linhas cada opção
+traria no lugar da escolhida. Cada dimensão traz no máximo LIMITE_FACETA
+valores, os mais frequentes.
+"""
+from datetime import datetime, time, timedelta
+
+from django.db.models import Count, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .models import StatusOP
+
+LIMITE_FACETA = 50
+SEM_BALANCA = "nenhuma"
+
+# dimensão -> (campo agrupado/filtrado, campo do rótulo ou None)
+DIMENSOES = {
+    "produto": ("op__produto_id", "op__produto__nome"),
+    "materia_prima": ("item_op__materia_prima_id", "item_op__materia_prima__nome"),
+    "balanca": ("balanca_id", "balanca__nome"),
+    "pesador": ("pesador", None),
+    "status_op": ("op__status", None),
+}
+
+
+class FiltroInvalido(ValueError):
+    def __init__(self, erros):
+        super().__init__(erros)
+        self.erros = erros
+
+
+def _inicio_do_dia(data):
+    return timezone.make_aware(datetime.combine(data, time.min), timezone.get_current_timezone())
+
+
+def _valores(texto):
+    return [v.strip() for v in texto.split(",") if v.strip()]
+
+
+def _condicao(dimensao, texto, erros):
+    campo, _ = DIMENSOES[dimensao]
+    valores = _valores(texto)
+    if dimensao == "pesador":
+        return Q(pesador__in=valores)
+    if dimensao == "status_op":
+        invalidos = set(valores) - set(StatusOP.values)
+        if invalidos:
+            erros[dimensao] = f"Status inválido: {', '.join(sorted(invalidos))}."
+        return Q(op__status__in=valores)
+    condicao = Q()
+    if dimensao == "balanca" and SEM_BALANCA in valores:
+        valores.remove(SEM_BALANCA)
+        condicao = Q(balanca__isnull=True)
+    if not all(v.isdigit() for v in valores):
+        erros[dimensao] = "Informe id(s) numérico(s) separados por vírgula."
+        return condicao
+    return condicao | Q(**{f"{campo}__in": [int(v) for v in valores]}) if valores else condicao
+
+
+def ler_filtros(params):
+    """{nome: Q} dos filtros presentes em `params`; FiltroInvalido com {param: mensagem}."""
+    condicoes, erros = {}, {}
+    for dimensao in DIMENSOES:
+        texto = params.get(dimensao)
+        if texto:
+            condicoes[dimensao] = _condicao(dimensao, texto, erros)
+
+    for campo in ("de", "ate"):
+        texto = params.get(campo)
+        if texto:
+            data = parse_date(texto)
+            if data is None:
+                erros[campo] = "Data inválida (AAAA-MM-DD)."
+            elif campo == "de":
+                condicoes[campo] = Q(data_hora__gte=_inicio_do_dia(data))
+            else:
+                condicoes[campo] = Q(data_hora__lt=_inicio_do_dia(data + timedelta(days=1)))
+
+    for campo, lookup in (("op", "op__numero__icontains"), ("lote", "op__lote__icontains"),
+                          ("lote_mp", "lote_mp")):
+        texto = (params.get(campo) or "").strip()
+        if texto:
+            condicoes[campo] = Q(**{lookup: texto})
+
+    if erros:
+        raise FiltroInvalido(erros)
+    return condicoes
+
+
+def filtrar(queryset, condicoes, exceto=None):
+    for nome, condicao in condicoes.items():
+        if nome != exceto:
+            queryset = queryset.filter(condicao)
+    return queryset
+
+
+def _faceta(queryset, dimensao):
+    campo, rotulo = DIMENSOES[dimensao]
+    colunas = (campo, rotulo) if rotulo else (campo,)
+    linhas = (
+        queryset.order_by()
+        .values(*colunas)
+        .annotate(total=Count("pk"))
+        .order_by("-total", campo)[:LIMITE_FACETA]
+    )
+    if dimensao == "status_op":
+        nomes = dict(StatusOP.choices)
+        return [{"valor": l[campo], "nome": nomes.get(l[campo], l[campo]), "total": l["total"]} for l in linhas]
+    return [
+        {"valor": l[campo], "nome": l[rotulo] if rotulo else l[campo], "total": l["total"]}
+        for l in linhas
+    ]
+
+
+def facetas(queryset, condicoes):
+    """Contagens por dimensão; `queryset` = pesagens antes destes filtros (com ?search= etc.)."""
+    return {d: _faceta(filtrar(queryset, condicoes, exceto=d), d) for d in DIMENSOES}
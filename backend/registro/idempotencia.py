@@ -0,0 +1,116 @@
+"""
+Suporte ao header Idempotency-Key em POSTs (hoje: criação de Pesagem).
+
+A chave é gravada na MESMA transação do recurso criado: ou ambos persistem ou
+nenhum. Um replay devolve a resposta original sem executar a view de novo
+(o acumulado do ItemOP não é tocado). Só respostas 2xx são memorizadas; erros
+liberam a chave para nova tentativa.
+"""
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+from .models import ChaveIdempotencia
+
+HEADER = "Idempotency-Key"
+HEADER_REPLAY = "Idempotent-Replayed"
+TAMANHO_MAXIMO = 255
+
+
+def ttl():
+    return getattr(settings, "REGISTRO_IDEMPOTENCIA_TTL", timedelta(hours=24))
+
+
+def _sha256(texto):
+    return hashlib.sha256(texto.encode("utf-8")).hexdigest()
+
+
+def _json(dados):
+    return json.dumps(dados, cls=JSONEncoder, sort_keys=True, ensure_ascii=False)
+
+
+class _NaoMemorizar(Exception):
+    def __init__(self, response):
+        self.response = response
+
+
+def _replay(registro, impressao):
+    if registro.impressao != impressao:
+        return Response(
+            {"detail": f"{HEADER} já utilizada com outro conteúdo."},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        )
+    if not registro.status_code:
+        return Response(
+            {"detail": "Requisição com esta chave ainda em processamento. Tente novamente."},
+            status=status.HTTP_409_CONFLICT,
+        )
+    return Response(registro.resposta, status=registro.status_code, headers={HEADER_REPLAY: "true"})
+
+
+def executar_idempotente(request, escopo, executar):
+    """
+    Executa `executar()` (que devolve um Response) no máximo uma vez por
+    (usuário, escopo, Idempotency-Key). Sem o header, apenas executa.
+    """
+    chave_cliente = (request.headers.get(HEADER) or "").strip()
+    if not chave_cliente:
+        return executar()
+    if len(chave_cliente) > TAMANHO_MAXIMO:
+        return Response(
+            {"detail": f"{HEADER} deve ter no máximo {TAMANHO_MAXIMO} caracteres."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    chave = _sha256(f"{request.user.pk}:{escopo}:{chave_cliente}")
+    impressao = _sha256(_json(request.data))
+    agora = timezone.now()
+
+    existente = ChaveIdempotencia.objects.filter(chave=chave, expira_em__gt=agora).first()
+    if existente:
+        return _replay(existente, impressao)
+
+    try:
+        with transaction.atomic():
+            try:
+                with transaction.atomic():
+                    ChaveIdempotencia.objects.filter(chave=chave, expira_em__lte=agora).delete()
+                    registro = ChaveIdempotencia.objects.create(
+                        chave=chave, impressao=impressao, expira_em=agora + ttl()
+                    )
+            except IntegrityError:
+                # outra requisição com a mesma chave gravou primeiro
+                registro = None
+
+            if registro is None:
+                concorrente = ChaveIdempotencia.objects.filter(chave=chave).first()
+                if concorrente is None:
+                    return Response(
+                        {"detail": "Requisição com esta chave ainda em processamento. Tente novamente."},
+                        status=status.HTTP_409_CONFLICT,
+                    )
+                return _replay(concorrente, impressao)
+
+            response = executar()
+            if not 200 <= response.status_code < 300:
+                raise _NaoMemorizar(response)
+
+            registro.status_code = response.status_code
+            registro.resposta = json.loads(_json(response.data))
+            registro.save(update_fields=["status_code", "resposta"])
+            return response
+    except _NaoMemorizar as e:
+        return e.response
+
+
+def limpar_expiradas(agora=None):
+    """Remove chaves expiradas. Retorna a quantidade apagada."""
+    apagadas, _ = ChaveIdempotencia.objects.filter(expira_em__lte=agora or timezone.now()).delete()
+    return apagadas
@@ -0,0 +1,143 @@
+"""
+Spooler de etiquetas para impressoras térmicas em rede (RAW/JetDirect, TCP 9100).
+
+O pedido de impressão só grava TrabalhoImpressao (conteúdo ZPL/EPL já
+renderizado); `manage.py spooler_etiquetas --loop` esvazia a fila:
+
+- os trabalhos prontos são agrupados por impressora e cada grupo vai numa
+  única conexão (um sendall com todas as etiquetas do lote);
+- falha de conexão/envio => o grupo volta para a fila com espera exponencial
+  (ESPERA_BASE * 2^(tentativas-1), até ESPERA_MAX) e, após `tentativas_max`,
+  fica como "falhou" (reenvio manual pelo admin);
+- uma queda no meio do envio pode repetir etiquetas já impressas (entrega
+  pelo menos uma vez), nunca perder.
+
+Um único spooler por fila: dois processos simultâneos imprimiriam em dobro.
+"""
+import socket
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import etiquetas
+from .models import ImpressoraEtiqueta, StatusImpressao, TrabalhoImpressao
+
+LOTE_PADRAO = 50
+LIMITE_IMPRESSAO = 200  # etiquetas por pedido (POST /etiquetas/imprimir/)
+TIMEOUT_PADRAO = 5.0
+TENTATIVAS_MAX = 5
+ESPERA_BASE = 5  # s
+ESPERA_MAX = 300  # s
+
+
+class ErroImpressora(Exception):
+    pass
+
+
+def impressoras_para(pesagens, impressora=None, estacao=None):
+    """
+    Impressora de cada pesagem: a indicada; senão a da `estacao`; senão a da
+    estação da balança da pesagem (Balanca.localizacao).
+    Retorna ({pesagem: impressora}, [pesagens sem impressora]).
+    """
+    if impressora is None and estacao:
+        impressora = ImpressoraEtiqueta.da_estacao(estacao)
+        if impressora is None:
+            return {}, list(pesagens)
+    destino, sem_impressora, por_estacao = {}, [], {}
+    for pesagem in pesagens:
+        alvo = impressora
+        if alvo is None:
+            local = pesagem.balanca.localizacao if pesagem.balanca else ""
+            if local not in por_estacao:
+                por_estacao[local] = ImpressoraEtiqueta.da_estacao(local)
+            alvo = por_estacao[local]
+        if alvo is None:
+            sem_impressora.append(pesagem)
+        else:
+            destino[pesagem] = alvo
+    return destino, sem_impressora
+
+
+def enfileirar(destino, copias=1, solicitado_por=""):
+    """Cria os trabalhos de {pesagem: impressora} (na ordem recebida)."""
+    trabalhos = []
+    for pesagem, impressora in destino.items():
+        render = etiquetas.RENDERIZADORES[impressora.linguagem]
+        trabalhos.append(TrabalhoImpressao(
+            impressora=impressora,
+            pesagem_id=pesagem.pk,
+            linguagem=impressora.linguagem,
+            conteudo=render(etiquetas.campos(pesagem), copias=copias),
+            solicitado_por=solicitado_por,
+        ))
+    return TrabalhoImpressao.objects.bulk_create(trabalhos)
+
+
+def enviar_raw(endereco, porta, dados, timeout=TIMEOUT_PADRAO):
+    """Abre a conexão RAW, envia `dados` e fecha (a impressora imprime ao receber)."""
+    try:
+        with socket.create_connection((endereco, porta), timeout=timeout) as conexao:
+            conexao.sendall(dados)
+            conexao.shutdown(socket.SHUT_WR)
+    except OSError as e:
+        raise ErroImpressora(f"{endereco}:{porta}: {e}") from e
+
+
+def _reagendar(grupo, erro, agora, tentativas_max):
+    for trabalho in grupo:
+        trabalho.tentativas += 1
+        trabalho.ultimo_erro = str(erro)[:1000]
+        if trabalho.tentativas >= tentativas_max:
+            trabalho.status = StatusImpressao.FALHOU
+        else:
+            espera = min(ESPERA_MAX, ESPERA_BASE * 2 ** (trabalho.tentativas - 1))
+            trabalho.proxima_tentativa = agora + timedelta(seconds=espera)
+    TrabalhoImpressao.objects.bulk_update(grupo, ["tentativas", "ultimo_erro", "status", "proxima_tentativa"])
+
+
+def processar_fila(lote=LOTE_PADRAO, timeout=TIMEOUT_PADRAO, tentativas_max=TENTATIVAS_MAX, agora=None):
+    """
+    Envia até `lote` trabalhos prontos, um envio por impressora.
+    Retorna {"enviados": n, "falhas": n, "erros": {impressora: mensagem}}.
+    """
+    agora = agora or timezone.now()
+    prontos = (
+        TrabalhoImpressao.objects
+        .filter(status=StatusImpressao.PENDENTE, proxima_tentativa__lte=agora, impressora__ativo=True)
+        .select_related("impressora")
+        .order_by("id")[:lote]
+    )
+    grupos = defaultdict(list)
+    for trabalho in prontos:
+        grupos[trabalho.impressora].append(trabalho)
+
+    resumo = {"enviados": 0, "falhas": 0, "erros": {}}
+    for impressora, grupo in grupos.items():
+        dados = b"".join(etiquetas.codificar(t.linguagem, t.conteudo) for t in grupo)
+        try:
+            enviar_raw(impressora.endereco_ip, impressora.porta, dados, timeout=timeout)
+        except ErroImpressora as e:
+            with transaction.atomic():
+                _reagendar(grupo, e, agora, tentativas_max)
+            resumo["falhas"] += len(grupo)
+            resumo["erros"][impressora.nome] = str(e)
+            continue
+        TrabalhoImpressao.objects.filter(pk__in=[t.pk for t in grupo]).update(
+            status=StatusImpressao.ENVIADO, enviado_em=timezone.now(), ultimo_erro="",
+        )
+        resumo["enviados"] += len(grupo)
+    return resumo
+
+
+def pendentes():
+    return TrabalhoImpressao.objects.filter(status=StatusImpressao.PENDENTE).count()
+
+
+def reenviar(trabalhos):
+    """Devolve trabalhos (ex.: que falharam) à fila, zerando as tentativas."""
+    return trabalhos.update(
+        status=StatusImpressao.PENDENTE, tentativas=0, proxima_tentativa=timezone.now(), ultimo_erro="",
+    )
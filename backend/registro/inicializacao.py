@@ -0,0 +1,94 @@
+"""
+Tempo de inicialização do processo Django (boot do worker web e de cada manage.py).
+
+A medição roda num subprocesso limpo com `python -X importtime`: carrega o
+Django (django.setup) e importa os módulos de entrada — por padrão a
+aplicação WSGI, o URLconf (views, serializers) e todos os comandos de
+gestão do projeto. A saída do importtime (stderr) é lida linha a linha:
+
+    import time: self [us] | cumulative | imported package
+    import time:       712 |      74688 | django.conf
+
+Bibliotecas pesadas (reportlab, pandas, openpyxl, numpy) só devem ser
+importadas dentro das funções que as usam (PDF, importação de planilhas);
+`PESADOS` carregados no boot ou total acima de ORCAMENTO_MS estouram o
+orçamento (manage.py perfil_inicializacao --orcamento, e o teste).
+"""
+import json
+import os
+import pkgutil
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+
+PESADOS = ("reportlab", "pandas", "numpy", "openpyxl")
+ORCAMENTO_MS = 1500  # soma do importtime dos módulos de topo (máquina de CI modesta)
+
+
+def modulos_padrao():
+    """Entradas de um processo típico: WSGI, URLconf e os comandos de gestão do projeto."""
+    modulos = [settings.WSGI_APPLICATION.rsplit(".", 1)[0], settings.ROOT_URLCONF]
+    for app in ("registro", "usuarios"):
+        caminho = os.path.join(settings.BASE_DIR, app, "management", "commands")
+        modulos += [f"{app}.management.commands.{m.name}" for m in pkgutil.iter_modules([caminho])]
+    return modulos
+
+
+def _script(modulos):
+    return "\n".join([
+        "import json, os, sys",
+        f"os.environ.setdefault('DJANGO_SETTINGS_MODULE', {os.environ.get('DJANGO_SETTINGS_MODULE', 'conf.settings')!r})",
+        "import django",
+        "django.setup()",
+        *(f"import {m}" for m in modulos),
+        f"print(json.dumps([m for m in {list(PESADOS)!r} if m in sys.modules]))",
+    ])
+
+
+def ler_importtime(texto):
+    """Linhas do -X importtime -> [(modulo, self_us, cumulativo_us, nivel)]; nivel 0 = importado no topo."""
+    linhas = []
+    for linha in texto.splitlines():
+        if not linha.startswith("import time:"):
+            continue
+        partes = linha[len("import time:"):].split("|")
+        if len(partes) != 3 or not partes[0].strip().isdigit():
+            continue  # cabeçalho
+        nome = partes[2].rstrip()
+        nivel = (len(nome) - len(nome.lstrip()) - 1) // 2
+        linhas.append((nome.strip(), int(partes[0]), int(partes[1]), nivel))
+    return linhas
+
+
+def medir(modulos=None):
+    """
+    Importa `modulos` num processo novo e devolve
+    {"total_ms", "parede_ms", "pesados": [...], "modulos": [(nome, self_us, cumulativo_us, nivel)]}.
+    """
+    modulos = modulos or modulos_padrao()
+    inicio = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _script(modulos)],
+        cwd=settings.BASE_DIR, capture_output=True, text=True, check=False,
+    )
+    parede_ms = (time.perf_counter() - inicio) * 1000
+    if proc.returncode != 0:
+        erro = [l for l in proc.stderr.splitlines() if not l.startswith("import time:")]
+        raise RuntimeError("Falha ao importar os módulos de entrada:\n" + "\n".join(erro[-20:]))
+    linhas = ler_importtime(proc.stderr)
+    return {
+        "total_ms": sum(cum for _, _, cum, nivel in linhas if nivel == 0) / 1000,
+        "parede_ms": parede_ms,
+        "pesados": json.loads(proc.stdout.strip().splitlines()[-1]),
+        "modulos": linhas,
+    }
+
+
+def dentro_do_orcamento(medicao, orcamento_ms=ORCAMENTO_MS):
+    """Lista de violações (vazia = ok)."""
+    problemas = [f"'{m}' importado na inicialização" for m in medicao["pesados"]]
+    if medicao["total_ms"] > orcamento_ms:
+        problemas.append(f"importação levou {medicao['total_ms']:.0f} ms (orçamento {orcamento_ms} ms)")
+    return problemas
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from registro.arquivo import arquivar, dias_retencao, ops_arquivaveis
+
+
+class Command(BaseCommand):
+    help = (
+        "Move OPs concluídas/canceladas há mais de N dias (com itens e pesagens) para as tabelas de arquivo. "
+        "Padrão de N: settings.REGISTRO_ARQUIVO_DIAS."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dias", type=int, default=None, help="Idade mínima (dias) desde o encerramento.")
+        parser.add_argument("--lote", type=int, default=500, help="OPs por transação.")
+        parser.add_argument("--limite", type=int, default=None, help="Máximo de OPs nesta execução.")
+        parser.add_argument("--dry-run", action="store_true", help="Apenas conta as OPs elegíveis.")
+
+    def handle(self, *args, **opts):
+        dias = dias_retencao() if opts["dias"] is None else opts["dias"]
+
+        if opts["dry_run"]:
+            n = ops_arquivaveis(dias).count()
+            self.stdout.write(self.style.NOTICE(f"DRY-RUN: {n} OP(s) encerradas há mais de {dias} dias."))
+            return
+
+        total = arquivar(
+            dias=dias, lote=opts["lote"], limite=opts["limite"],
+            progresso=lambda n: self.stdout.write(f"OPs arquivadas: {n}"),
+        )
+        self.stdout.write(self.style.SUCCESS(f"Arquivamento concluído -> OPs: {total} (encerradas há > {dias} dias)"))
@@ -0,0 +1,242 @@
+import json
+import statistics
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, close_old_connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from registro.massa import formatar
+from registro.models import ItemOP, OrdemProducao, Pesagem, StatusOP
+from registro.sinteticos import gerar_dataset
+
+
+def percentil(valores, p):
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    k = (len(ordenados) - 1) * p / 100
+    f = int(k)
+    c = min(f + 1, len(ordenados) - 1)
+    return ordenados[f] + (ordenados[c] - ordenados[f]) * (k - f)
+
+
+def violacoes(relatorio, limites):
+    """Mensagens dos endpoints medidos acima de `limites` ({endpoint: {"p95_ms", "queries_max"}})."""
+    mensagens = []
+    for nome, limite in limites.items():
+        dados = relatorio["endpoints"].get(nome)
+        if dados is None:
+            continue
+        if "erro" in dados:
+            mensagens.append(f"{nome}: {dados['erro']}")
+            continue
+        falhas = sorted(s for s in dados["status"] if not s.startswith("2"))
+        if falhas:
+            mensagens.append(f"{nome}: respostas {', '.join(falhas)}")
+        p95 = dados["latencia_ms"]["p95"]
+        if limite.get("p95_ms") is not None and p95 > limite["p95_ms"]:
+            mensagens.append(f"{nome}: p95 {p95} ms > {limite['p95_ms']} ms")
+        queries = dados["queries"]["max"]
+        if limite.get("queries_max") is not None and queries > limite["queries_max"]:
+            mensagens.append(f"{nome}: {queries} queries > {limite['queries_max']}")
+    return mensagens
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark do fluxo de pesagem: dispara clientes concorrentes contra os endpoints reais "
+        "(POST/GET /pesagens/, /ops/{id}/itens/, /etiqueta/{pk}/) e emite p50/p95/p99, "
+        "throughput e nº de queries em JSON. Com --limites/--baseline termina com erro (código 1) se "
+        "algum endpoint passar do p95 ou do nº de queries permitido, para barrar regressões no CI. "
+        "ATENÇÃO: grava pesagens no banco configurado."
+    )
+
+    ENDPOINTS = ("criar_pesagem", "listar_pesagens", "itens_op", "etiqueta")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seed-dados", action="store_true",
+                            help="Gera um dataset sintético antes de medir (ver registro.sinteticos).")
+        parser.add_argument("--mps", type=int, default=2000)
+        parser.add_argument("--produtos", type=int, default=300)
+        parser.add_argument("--ops", type=int, default=20000)
+        parser.add_argument("--seed", type=int, default=42, help="Semente do gerador (determinismo).")
+        parser.add_argument("--clientes", type=int, default=8, help="Clientes concorrentes (threads).")
+        parser.add_argument("--requisicoes", type=int, default=200, help="Requisições por endpoint.")
+        parser.add_argument("--endpoints", default=",".join(self.ENDPOINTS),
+                            help=f"Lista separada por vírgula. Opções: {', '.join(self.ENDPOINTS)}")
+        parser.add_argument("--usuario", default="benchmark", help="Usuário usado nas requisições (criado se não existir).")
+        parser.add_argument("--saida", default=None, help="Arquivo para gravar o JSON (padrão: stdout).")
+        parser.add_argument("--limites", default=None,
+                            help='JSON com limites por endpoint: {"itens_op": {"p95_ms": 50, "queries_max": 3}, ...}.')
+        parser.add_argument("--baseline", default=None,
+                            help="Relatório JSON de uma execução anterior: p95 até +--tolerancia e "
+                                 "nº máximo de queries igual ao dela.")
+        parser.add_argument("--tolerancia", type=float, default=0.2,
+                            help="Folga relativa sobre o p95 da baseline (0.2 = 20%%).")
+
+    def handle(self, *args, **opts):
+        endpoints = [e.strip() for e in opts["endpoints"].split(",") if e.strip()]
+        invalidos = set(endpoints) - set(self.ENDPOINTS)
+        if invalidos:
+            raise CommandError(f"Endpoints inválidos: {sorted(invalidos)}")
+        limites = self._limites(opts)
+
+        if opts["seed_dados"]:
+            gerar_dataset(
+                n_mps=opts["mps"], n_produtos=opts["produtos"], n_ops=opts["ops"], seed=opts["seed"],
+                prefixo=f"BENCH{opts['seed']}-{int(time.time())}",
+                progresso=lambda msg: self.stderr.write(msg),
+            )
+
+        user, _ = User.objects.get_or_create(username=opts["usuario"], defaults={"first_name": "Benchmark"})
+        token = str(RefreshToken.for_user(user).access_token)
+        self.auth = f"Bearer {token}"
+
+        n = opts["requisicoes"]
+        alvos = self._alvos(endpoints, n)
+        relatorio = {
+            "clientes": opts["clientes"],
+            "requisicoes_por_endpoint": n,
+            "volume": {
+                "ops": OrdemProducao.objects.count(),
+                "itens_op": ItemOP.objects.count(),
+                "pesagens": Pesagem.objects.count(),
+            },
+            "endpoints": {},
+        }
+        for nome in endpoints:
+            if not alvos.get(nome):
+                relatorio["endpoints"][nome] = {"erro": "sem dados para este endpoint"}
+                continue
+            relatorio["endpoints"][nome] = self._medir(nome, alvos[nome], opts["clientes"])
+        if limites:
+            relatorio["violacoes"] = violacoes(relatorio, limites)
+
+        saida = json.dumps(relatorio, indent=2, ensure_ascii=False)
+        if opts["saida"]:
+            with open(opts["saida"], "w", encoding="utf-8") as f:
+                f.write(saida)
+        self.stdout.write(saida)
+        if relatorio.get("violacoes"):
+            raise CommandError("Regressão de desempenho: " + "; ".join(relatorio["violacoes"]))
+
+    # ---------- limites (regressão) ----------
+
+    def _limites(self, opts):
+        """{endpoint: {"p95_ms", "queries_max"}} da baseline (com folga) sobrescrita por --limites."""
+        limites = {}
+        try:
+            if opts["baseline"]:
+                with open(opts["baseline"], encoding="utf-8") as f:
+                    base = json.load(f)
+                for nome, dados in base.get("endpoints", {}).items():
+                    if "latencia_ms" in dados:
+                        limites[nome] = {
+                            "p95_ms": round(dados["latencia_ms"]["p95"] * (1 + opts["tolerancia"]), 2),
+                            "queries_max": dados["queries"]["max"],
+                        }
+            if opts["limites"]:
+                with open(opts["limites"], encoding="utf-8") as f:
+                    for nome, valores in json.load(f).items():
+                        limites.setdefault(nome, {}).update(valores)
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+            raise CommandError(f"Limites/baseline inválidos: {e}")
+        return limites
+
+    # ---------- montagem das requisições ----------
+
+    def _alvos(self, endpoints, n):
+        alvos = {}
+        if "criar_pesagem" in endpoints:
+            # cada POST fecha um item pendente (o total precisa cair dentro da tolerância)
+            pendentes = (
+                ItemOP.objects
+                .filter(quantidade_pesada=0, op__status__in=[StatusOP.ABERTA, StatusOP.EM_ANDAMENTO])
+                .values("id", "op_id", "quantidade_necessaria")[:n]
+            )
+            alvos["criar_pesagem"] = [
+                ("post", "/api/registro/pesagens/", {
+                    "op_id": i["op_id"], "item_op_id": i["id"], "tara": "0.500",
+                    "liquido": formatar(i["quantidade_necessaria"], "kg"),
+                })
+                for i in pendentes
+            ]
+        if "listar_pesagens" in endpoints:
+            alvos["listar_pesagens"] = [
+                ("get", "/api/registro/pesagens/", {"page": 1 + (k % 5)}) for k in range(n)
+            ]
+        if "itens_op" in endpoints:
+            op_ids = list(OrdemProducao.objects.order_by("?").values_list("id", flat=True)[:n])
+            alvos["itens_op"] = [("get", f"/api/registro/ops/{pk}/itens/", None) for pk in op_ids]
+        if "etiqueta" in endpoints:
+            pks = list(Pesagem.objects.order_by("-id").values_list("id", flat=True)[:n])
+            alvos["etiqueta"] = [("get", f"/api/registro/etiqueta/{pk}/", None) for pk in pks]
+        return alvos
+
+    # ---------- execução ----------
+
+    def _medir(self, nome, requisicoes, n_clientes):
+        resultados = []
+        lock = threading.Lock()
+        local = threading.local()
+
+        def executar(req):
+            metodo, url, dados = req
+            if not hasattr(local, "client"):
+                # erros viram 500 no relatório em vez de derrubar o benchmark
+                local.client = Client(
+                    raise_request_exception=False, SERVER_NAME="localhost", HTTP_AUTHORIZATION=self.auth
+                )
+            inicio = time.perf_counter()
+            with CaptureQueriesContext(connection) as ctx:
+                if metodo == "post":
+                    resp = local.client.post(url, dados, content_type="application/json")
+                else:
+                    resp = local.client.get(url, dados or {})
+            duracao_ms = (time.perf_counter() - inicio) * 1000
+            with lock:
+                resultados.append((duracao_ms, len(ctx.captured_queries), resp.status_code, len(resp.content)))
+
+        def trabalhador(lote):
+            try:
+                for req in lote:
+                    executar(req)
+            finally:
+                close_old_connections()
+                connection.close()
+
+        lotes = [requisicoes[i::n_clientes] for i in range(n_clientes)]
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=n_clientes) as pool:
+            list(pool.map(trabalhador, lotes))
+        total_s = time.perf_counter() - inicio
+
+        latencias = [r[0] for r in resultados]
+        queries = [r[1] for r in resultados]
+        status = defaultdict(int)
+        for r in resultados:
+            status[str(r[2])] += 1
+        return {
+            "requisicoes": len(resultados),
+            "throughput_rps": round(len(resultados) / total_s, 2) if total_s else None,
+            "latencia_ms": {
+                "p50": round(percentil(latencias, 50), 2),
+                "p95": round(percentil(latencias, 95), 2),
+                "p99": round(percentil(latencias, 99), 2),
+                "media": round(statistics.fmean(latencias), 2),
+                "max": round(max(latencias), 2),
+            },
+            "queries": {
+                "media": round(statistics.fmean(queries), 2),
+                "max": max(queries),
+            },
+            "bytes_medio": round(statistics.fmean(r[3] for r in resultados)),
+            "status": dict(status),
+        }
@@ -0,0 +1,88 @@
+import json
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.utils.text import compress_string
+from rest_framework.renderers import JSONRenderer
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from registro import middleware
+from registro.renderers import OrjsonRenderer
+
+
+def _mediana_ms(funcao, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return round(statistics.median(tempos), 3)
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark do tamanho/tempo das respostas JSON: render com JSONRenderer (json) x orjson e "
+        "bytes sem compressão x gzip x brotli em /pesagens/ e /ops/ (ou --url). Emite JSON."
+    )
+
+    URLS = ("/api/registro/pesagens/", "/api/registro/ops/")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", action="append", default=None,
+                            help="Endpoint GET a medir (repetível). Padrão: /pesagens/ e /ops/.")
+        parser.add_argument("--repeticoes", type=int, default=30, help="Repetições por medição (mediana).")
+        parser.add_argument("--usuario", default="benchmark", help="Usuário usado nas requisições (criado se não existir).")
+        parser.add_argument("--saida", default=None, help="Arquivo para gravar o JSON (padrão: stdout).")
+
+    def handle(self, *args, **opts):
+        user, _ = User.objects.get_or_create(username=opts["usuario"], defaults={"first_name": "Benchmark"})
+        auth = f"Bearer {RefreshToken.for_user(user).access_token}"
+        client = Client(raise_request_exception=False, SERVER_NAME="localhost", HTTP_AUTHORIZATION=auth)
+        n = opts["repeticoes"]
+
+        relatorio = {"repeticoes": n, "brotli_disponivel": middleware.brotli is not None, "endpoints": {}}
+        for url in opts["url"] or self.URLS:
+            resp = client.get(url)
+            if resp.status_code != 200:
+                relatorio["endpoints"][url] = {"erro": f"HTTP {resp.status_code}"}
+                continue
+            relatorio["endpoints"][url] = self._medir(client, url, resp.data, n)
+
+        saida = json.dumps(relatorio, indent=2, ensure_ascii=False)
+        if opts["saida"]:
+            with open(opts["saida"], "w", encoding="utf-8") as f:
+                f.write(saida)
+        self.stdout.write(saida)
+
+    def _medir(self, client, url, dados, n):
+        padrao, rapido = JSONRenderer(), OrjsonRenderer()
+        corpo = rapido.render(dados)
+        render_json = _mediana_ms(lambda: padrao.render(dados), n)
+        render_orjson = _mediana_ms(lambda: rapido.render(dados), n)
+
+        tamanhos = {"identidade": len(corpo), "gzip": len(compress_string(corpo))}
+        compressao_ms = {"gzip": _mediana_ms(lambda: compress_string(corpo), n)}
+        if middleware.brotli is not None:
+            tamanhos["br"] = len(middleware.brotli.compress(corpo, quality=5))
+            compressao_ms["br"] = _mediana_ms(lambda: middleware.brotli.compress(corpo, quality=5), n)
+
+        # requisição completa (view + render + middleware), sem e com Accept-Encoding
+        completo = {"identidade": _mediana_ms(lambda: client.get(url), n)}
+        for codificacao in ("gzip", "br") if middleware.brotli is not None else ("gzip",):
+            completo[codificacao] = _mediana_ms(lambda: client.get(url, HTTP_ACCEPT_ENCODING=codificacao), n)
+
+        menor = min(v for k, v in tamanhos.items() if k != "identidade")
+        return {
+            "render_ms": {
+                "json": render_json,
+                "orjson": render_orjson,
+                "economia_ms": round(render_json - render_orjson, 3),
+            },
+            "bytes": {**tamanhos, "economia": tamanhos["identidade"] - menor,
+                      "razao": round(tamanhos["identidade"] / menor, 2)},
+            "compressao_ms": compressao_ms,
+            "requisicao_ms": completo,
+        }
@@ -0,0 +1,62 @@
+import time
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from registro.sinteticos import GeradorSintetico
+
+
+class Command(BaseCommand):
+    help = (
+        "Gera dados sintéticos consistentes (Produto/MP/Estrutura/OP/ItemOP/Pesagem) com inserts em massa. "
+        "Acumulados e status das OPs são calculados por conjunto. Use --seed + --ate para resultados determinísticos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--mps", type=int, default=2000, help="Quantidade de matérias-primas.")
+        parser.add_argument("--produtos", type=int, default=300, help="Quantidade de produtos (1 estrutura cada).")
+        parser.add_argument("--balancas", type=int, default=10)
+        parser.add_argument("--itens-min", type=int, default=5, help="Mínimo de itens por estrutura.")
+        parser.add_argument("--itens-max", type=int, default=15, help="Máximo de itens por estrutura.")
+        parser.add_argument("--ops", type=int, default=20000)
+        parser.add_argument("--pesagens-min", type=int, default=1, help="Mínimo de pesagens por item pesado.")
+        parser.add_argument("--pesagens-max", type=int, default=5, help="Máximo de pesagens por item pesado.")
+        parser.add_argument("--fracao-concluida", type=float, default=0.7, help="Fração de OPs totalmente pesadas.")
+        parser.add_argument("--dias", type=int, default=365, help="Janela (dias) para espalhar as datas.")
+        parser.add_argument("--ate", default=None, help="Data de referência AAAA-MM-DD (padrão: agora).")
+        parser.add_argument("--seed", type=int, default=None, help="Semente do gerador aleatório.")
+        parser.add_argument("--prefixo", default="SINT", help="Prefixo dos códigos (deve ser único por execução).")
+        parser.add_argument("--lote", type=int, default=5000, help="Tamanho dos blocos de insert/transação.")
+
+    def handle(self, *args, **opts):
+        if opts["itens_min"] > opts["itens_max"] or opts["pesagens_min"] > opts["pesagens_max"]:
+            raise CommandError("Faixas inválidas: mínimo maior que máximo.")
+        if not 0 <= opts["fracao_concluida"] <= 1:
+            raise CommandError("--fracao-concluida deve estar entre 0 e 1.")
+
+        agora = None
+        if opts["ate"]:
+            try:
+                agora = timezone.make_aware(datetime.strptime(opts["ate"], "%Y-%m-%d"))
+            except ValueError:
+                raise CommandError("Use --ate no formato AAAA-MM-DD.")
+
+        inicio = time.perf_counter()
+        gerador = GeradorSintetico(
+            seed=opts["seed"], prefixo=opts["prefixo"], lote=opts["lote"], dias=opts["dias"], agora=agora,
+            progresso=lambda msg: self.stdout.write(f"[{time.perf_counter() - inicio:7.1f}s] {msg}"),
+        )
+        estruturas = gerador.criar_catalogos(
+            opts["mps"], opts["produtos"], n_balancas=opts["balancas"],
+            itens_por_estrutura=(opts["itens_min"], opts["itens_max"]),
+        )
+        total = gerador.criar_ops(
+            estruturas, opts["ops"], fracao_concluida=opts["fracao_concluida"],
+            pesagens_por_item=(opts["pesagens_min"], opts["pesagens_max"]),
+        )
+        duracao = time.perf_counter() - inicio
+        self.stdout.write(self.style.SUCCESS(
+            f"Concluído em {duracao:.1f}s -> OPs: {opts['ops']} | pesagens: {total} "
+            f"({total / duracao:,.0f} pesagens/s)"
+        ))
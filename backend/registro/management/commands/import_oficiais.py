@@ -1,13 +1,16 @@
+from __future__ import annotations
+
 from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
+from registro.massa import Massa
 from registro.models import Produto, MateriaPrima, EstruturaProduto, ItemEstrutura, UnidadeMedida
 from pathlib import Path
+from typing import TYPE_CHECKING
 
-# Vamos usar pandas pela praticidade.
-try:
+# Vamos usar pandas pela praticidade — importado só quando o comando roda
+# (importar este módulo não pode custar o pandas a cada manage.py).
+if TYPE_CHECKING:
     import pandas as pd
-except ImportError as e:
-    raise CommandError("Instale pandas: pip install pandas openpyxl") from e
 
 # ------------- Unidades -------------
 VALID_UNIDADES = {u[0] for u in UnidadeMedida.choices}  # {"g","kg","mL","L","un"}
@@ -32,6 +35,8 @@ def normalize_unidade(u: str) -> str:
     return mapa.get(s, u)
 
 def parse_decimal(v, decimal_comma: bool = False):
+    import pandas as pd  # já carregado por handle()
+
     if pd.isna(v):
         return None
     s = str(v).strip()
@@ -177,6 +182,8 @@ class Command(BaseCommand):
         return p
 
     def _coerce_bool(self, v, default=True):
+        import pandas as pd  # já carregado por handle()
+
         if pd.isna(v):
             return default
         s = str(v).strip().lower()
@@ -184,6 +191,11 @@ class Command(BaseCommand):
 
     @transaction.atomic
     def handle(self, *args, **opts):
+        try:
+            import pandas as pd
+        except ImportError as e:
+            raise CommandError("Instale pandas: pip install pandas openpyxl") from e
+
         produtos_path = self._check_path(opts["produtos"])
         mps_path = self._check_path(opts["mps"])
         bom_path = self._check_path(opts["bom"])
@@ -298,6 +310,14 @@ class Command(BaseCommand):
                     raise CommandError(f"quantidade_por_lote vazia (linha {idx + 1}).")
                 if qtd <= 0:
                     raise CommandError(f"quantidade_por_lote deve ser > 0 (linha {idx + 1}).")
+                # gravado em mg inteiros; kg vira g (demais unidades: milésimos da própria unidade)
+                try:
+                    if und == "kg":
+                        qtd, und = Massa.de(qtd, "kg"), "g"
+                    else:
+                        qtd = Massa.de(qtd, "g")
+                except ValueError as e:
+                    raise CommandError(f"quantidade_por_lote inválida (linha {idx + 1}): {e}")
 
                 _, i_created = ItemEstrutura.objects.update_or_create(
                     estrutura=estrutura, materia_prima=mp,
@@ -1,6 +1,5 @@
 from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
-from openpyxl import load_workbook
 
 from registro.models import MateriaPrima
 
@@ -86,6 +85,8 @@ class Command(BaseCommand):
         verbose = bool(opts.get("verbose"))
         dry_run = bool(opts.get("dry_run"))
 
+        from openpyxl import load_workbook  # só quando o comando roda (não no boot do manage.py)
+
         try:
             wb = load_workbook(filename=arquivo, data_only=True)
         except Exception as e:
@@ -138,7 +139,7 @@ class Command(BaseCommand):
                         obj.ativo = ativo
                         changed = True
                     if changed:
-                        obj.save(update_fields=["nome", "ativo"])
+                        obj.save(update_fields=["nome", "ativo", "atualizado_em"])
                         atualizados += 1
                         if verbose:
                             self.stdout.write(f"[L{i}] atualizado -> {codigo}")
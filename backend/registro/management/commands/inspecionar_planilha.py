@@ -1,5 +1,4 @@
 from django.core.management.base import BaseCommand, CommandError
-from openpyxl import load_workbook
 
 NORMALIZADORES = {
     "nome": {"nome", "produto", "nome do produto", "descrição", "descricao"},
@@ -63,6 +62,8 @@ class Command(BaseCommand):
         sheet = opts.get("sheet")
         header_row_cli = opts.get("header_row")  # <-- underscore
 
+        from openpyxl import load_workbook  # só quando o comando roda (não no boot do manage.py)
+
         try:
             wb = load_workbook(filename=arquivo, data_only=True)
         except Exception as e:
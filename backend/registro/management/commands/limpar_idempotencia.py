@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from registro.idempotencia import limpar_expiradas
+
+
+class Command(BaseCommand):
+    help = "Remove chaves de idempotência expiradas (settings.REGISTRO_IDEMPOTENCIA_TTL)."
+
+    def handle(self, *args, **opts):
+        apagadas = limpar_expiradas()
+        self.stdout.write(self.style.SUCCESS(f"Chaves de idempotência removidas: {apagadas}"))
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from registro.inicializacao import ORCAMENTO_MS, dentro_do_orcamento, medir
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede o tempo de importação na inicialização (python -X importtime num processo novo) "
+        "e lista os módulos mais caros. Com --orcamento, falha se o total passar do limite "
+        "ou se uma biblioteca pesada (reportlab, pandas...) for carregada no boot."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--modulo", action="append", default=None,
+                            help="Módulo de entrada a importar (repetível). Padrão: WSGI, URLconf e comandos.")
+        parser.add_argument("--top", type=int, default=25, help="Quantos módulos listar.")
+        parser.add_argument("--ordenar", choices=("proprio", "cumulativo"), default="cumulativo",
+                            help="proprio = só o corpo do módulo; cumulativo = com as dependências.")
+        parser.add_argument("--orcamento", type=int, nargs="?", const=ORCAMENTO_MS, default=None,
+                            help=f"Limite em ms para o total (padrão do orçamento: {ORCAMENTO_MS}).")
+
+    def handle(self, *args, **opts):
+        try:
+            medicao = medir(opts["modulo"])
+        except RuntimeError as e:
+            raise CommandError(str(e))
+
+        coluna = 1 if opts["ordenar"] == "proprio" else 2
+        self.stdout.write(f"{'próprio ms':>11} {'cumul. ms':>10}  módulo")
+        for nome, proprio, cumulativo, nivel in sorted(medicao["modulos"], key=lambda l: -l[coluna])[: opts["top"]]:
+            self.stdout.write(f"{proprio / 1000:11.1f} {cumulativo / 1000:10.1f}  {'  ' * nivel}{nome}")
+
+        self.stdout.write(
+            f"\nMódulos importados: {len(medicao['modulos'])} | importação: {medicao['total_ms']:.0f} ms | "
+            f"processo (com o interpretador): {medicao['parede_ms']:.0f} ms"
+        )
+        if medicao["pesados"]:
+            self.stdout.write(self.style.WARNING("Bibliotecas pesadas no boot: " + ", ".join(medicao["pesados"])))
+
+        if opts["orcamento"] is not None:
+            problemas = dentro_do_orcamento(medicao, opts["orcamento"])
+            if problemas:
+                raise CommandError("Orçamento de inicialização estourado: " + "; ".join(problemas))
+            self.stdout.write(self.style.SUCCESS(f"Dentro do orçamento ({opts['orcamento']} ms)."))
@@ -0,0 +1,48 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from registro.massa import formatar
+from registro.reconciliacao import LOTE_PADRAO, descrever, reconciliar
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula ItemOP.quantidade_pesada a partir da soma das pesagens (uma query agrupada por bloco de OPs), "
+        "corrige só os itens divergentes e reavalia o status das OPs afetadas."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--lote", type=int, default=LOTE_PADRAO, help="OPs por bloco.")
+        parser.add_argument("--op", type=int, action="append", default=None, help="Restringe a OP(s) (repetível).")
+        parser.add_argument("--dry-run", action="store_true", help="Apenas mede o desvio, sem gravar.")
+        parser.add_argument("--loop", action="store_true", help="Execução agendada: repete a cada --intervalo.")
+        parser.add_argument("--intervalo", type=float, default=3600.0, help="Pausa (s) entre execuções no modo --loop.")
+
+    def handle(self, *args, **opts):
+        while True:
+            self._executar(opts)
+            if not opts["loop"]:
+                break
+            time.sleep(opts["intervalo"])
+
+    def _executar(self, opts):
+        inicio = time.perf_counter()
+        resumo = reconciliar(lote=opts["lote"], op_ids=opts["op"], corrigir=not opts["dry_run"])
+        duracao = time.perf_counter() - inicio
+
+        if opts["verbosity"] >= 2:
+            for divergencia in resumo["divergentes"]:
+                self.stdout.write(descrever(divergencia))
+        n = len(resumo["divergentes"])
+        texto = (
+            f"OPs: {resumo['ops']} | itens: {resumo['itens']} | divergentes: {n} | "
+            f"desvio total: {formatar(resumo['desvio_total_mg'])} g | "
+            f"status alterados: {resumo['status_alterados']} | {duracao:.2f}s"
+        )
+        if opts["dry_run"]:
+            self.stdout.write(self.style.NOTICE(f"DRY-RUN: {texto}"))
+        elif n:
+            self.stdout.write(self.style.WARNING(f"Acumulados corrigidos -> {texto}"))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Acumulados conferidos -> {texto}"))
@@ -0,0 +1,66 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from registro.outbox import (
+    LOTE_PADRAO, ErroEntrega, consumidores, criar_sink, entregar_lote, limpar_entregues, pendentes,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Entrega os eventos do outbox (pesagens, status de OP) aos consumidores de "
+        "settings.REGISTRO_OUTBOX_CONSUMIDORES, em ordem e em lotes, avançando o offset de cada um."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--consumidor", action="append", default=None,
+                            help="Consumidor a atender (repetível). Padrão: todos os configurados.")
+        parser.add_argument("--lote", type=int, default=LOTE_PADRAO, help="Eventos por entrega.")
+        parser.add_argument("--loop", action="store_true", help="Fica em execução contínua (worker).")
+        parser.add_argument("--intervalo", type=float, default=2.0, help="Pausa (s) quando não há eventos.")
+        parser.add_argument("--max-espera", type=float, default=300.0, help="Teto do backoff (s) após falhas.")
+        parser.add_argument("--limpar", action="store_true",
+                            help="Ao final, apaga eventos já entregues a todos os consumidores.")
+
+    def handle(self, *args, **opts):
+        nomes = opts["consumidor"] or list(consumidores())
+        if not nomes:
+            raise CommandError("Nenhum consumidor configurado em REGISTRO_OUTBOX_CONSUMIDORES.")
+        try:
+            sinks = {nome: criar_sink(nome) for nome in nomes}
+        except KeyError as e:
+            raise CommandError(str(e))
+
+        falhas = dict.fromkeys(nomes, 0)
+        proxima = dict.fromkeys(nomes, 0.0)
+        while True:
+            entregues = 0
+            for nome, sink in sinks.items():
+                if time.monotonic() < proxima[nome]:
+                    continue
+                try:
+                    n = entregar_lote(nome, sink, lote=opts["lote"])
+                except ErroEntrega as e:
+                    falhas[nome] += 1
+                    espera = min(opts["max_espera"], opts["intervalo"] * 2 ** falhas[nome])
+                    proxima[nome] = time.monotonic() + espera
+                    self.stderr.write(f"[{nome}] falha na entrega ({e}); nova tentativa em {espera:.0f}s")
+                    continue
+                falhas[nome] = 0
+                if n:
+                    entregues += n
+                    self.stdout.write(f"[{nome}] {n} evento(s) entregues | pendentes: {pendentes(nome)}")
+
+            if not opts["loop"]:
+                if entregues:
+                    continue  # drena tudo antes de sair
+                break
+            if not entregues:
+                time.sleep(opts["intervalo"])
+
+        if opts["limpar"]:
+            self.stdout.write(f"Eventos removidos: {limpar_entregues()}")
+        self.stdout.write(self.style.SUCCESS(
+            "Relay concluído -> " + ", ".join(f"{n}: {pendentes(n)} pendente(s)" for n in nomes)
+        ))
@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from registro.impressao import LOTE_PADRAO, TENTATIVAS_MAX, TIMEOUT_PADRAO, pendentes, processar_fila
+
+
+class Command(BaseCommand):
+    help = (
+        "Envia as etiquetas ZPL/EPL da fila (TrabalhoImpressao) às impressoras de rede "
+        "(RAW, TCP 9100), agrupando por impressora, com novas tentativas e espera exponencial."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--lote", type=int, default=LOTE_PADRAO, help="Trabalhos por rodada.")
+        parser.add_argument("--loop", action="store_true", help="Fica em execução contínua (worker).")
+        parser.add_argument("--intervalo", type=float, default=1.0, help="Pausa (s) quando a fila está vazia.")
+        parser.add_argument("--timeout", type=float, default=TIMEOUT_PADRAO, help="Timeout (s) de conexão/envio.")
+        parser.add_argument("--tentativas", type=int, default=TENTATIVAS_MAX,
+                            help="Tentativas antes de marcar o trabalho como falhou.")
+
+    def handle(self, *args, **opts):
+        total = {"enviados": 0, "falhas": 0}
+        while True:
+            resumo = processar_fila(lote=opts["lote"], timeout=opts["timeout"], tentativas_max=opts["tentativas"])
+            for impressora, erro in resumo["erros"].items():
+                self.stderr.write(f"[{impressora}] falha no envio ({erro})")
+            if resumo["enviados"]:
+                self.stdout.write(f"{resumo['enviados']} etiqueta(s) enviadas | pendentes: {pendentes()}")
+            total["enviados"] += resumo["enviados"]
+            total["falhas"] += resumo["falhas"]
+
+            processados = resumo["enviados"] + resumo["falhas"]
+            if not opts["loop"]:
+                if processados:
+                    continue  # drena o que está pronto antes de sair (reagendados ficam para depois)
+                break
+            if not processados:
+                time.sleep(opts["intervalo"])
+
+        estilo = self.style.SUCCESS if not total["falhas"] else self.style.WARNING
+        self.stdout.write(estilo(
+            f"Spooler concluído -> enviadas: {total['enviados']}, falhas: {total['falhas']}, "
+            f"pendentes: {pendentes()}"
+        ))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from registro.auditoria import BLOCO_LEITURA, verificar
+
+
+class Command(BaseCommand):
+    help = (
+        "Valida a trilha de auditoria encadeada (SHA-256): re-hasheia todos os registros em segmentos "
+        "paralelos, confere os elos e a cabeça da cadeia e reporta o primeiro elo quebrado."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--processos", type=int, default=None, help="Processos paralelos (padrão: nº de CPUs).")
+        parser.add_argument("--segmentos", type=int, default=None, help="Nº de segmentos (padrão: 4 por processo).")
+        parser.add_argument("--bloco", type=int, default=BLOCO_LEITURA, help="Registros por leitura (streaming).")
+
+    def handle(self, *args, **opts):
+        resultado = verificar(processos=opts["processos"], segmentos=opts["segmentos"], bloco=opts["bloco"])
+        taxa = resultado["total"] / resultado["segundos"] if resultado["segundos"] else 0
+        resumo = f"registros: {resultado['total']} | {resultado['segundos']:.2f}s ({taxa:,.0f} registros/s)"
+        falha = resultado["falha"]
+        if falha:
+            raise CommandError(f"Cadeia de auditoria INVÁLIDA no registro #{falha['seq']}: {falha['motivo']} | {resumo}")
+        self.stdout.write(self.style.SUCCESS(f"Cadeia de auditoria íntegra -> {resumo}"))
@@ -0,0 +1,90 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from multiprocessing import get_context
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from registro.models import StatusTarefa
+from registro.tarefas import (
+    EXPIRAR_PADRAO, TIPOS, executar, executar_no_pool, recuperar_travadas, reservar,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Executa as tarefas em segundo plano da fila (Tarefa): PDFs em lote, importações, relatórios. "
+        "Pool de threads ou de processos; maior prioridade primeiro; novas tentativas com espera."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--modo", choices=("threads", "processos"), default="threads",
+                            help="threads (E/S, PDFs) ou processos (CPU, isola a memória de cada tarefa).")
+        parser.add_argument("--concorrencia", type=int, default=2,
+                            help="Tarefas simultâneas. 1 executa no próprio processo, sem pool.")
+        parser.add_argument("--tipo", action="append", default=None,
+                            help=f"Só estes tipos (repetível). Disponíveis: {', '.join(sorted(TIPOS))}.")
+        parser.add_argument("--loop", action="store_true", help="Fica em execução contínua (worker).")
+        parser.add_argument("--intervalo", type=float, default=2.0, help="Pausa (s) quando a fila está vazia.")
+        parser.add_argument("--expirar", type=int, default=EXPIRAR_PADRAO,
+                            help="Segundos sem sinal de vida após os quais a tarefa volta à fila (worker morto).")
+
+    def handle(self, *args, **opts):
+        desconhecidos = set(opts["tipo"] or ()) - set(TIPOS)
+        if desconhecidos:
+            raise CommandError(f"Tipos desconhecidos: {', '.join(sorted(desconhecidos))}.")
+        concorrencia = max(1, opts["concorrencia"])
+        self.contagem = {}
+
+        pool = None
+        if concorrencia > 1 and opts["modo"] == "processos":
+            # spawn: cada processo carrega o Django uma vez e abre a própria conexão
+            connections.close_all()
+            pool = ProcessPoolExecutor(concorrencia, mp_context=get_context("spawn"), initializer=django.setup)
+        elif concorrencia > 1:
+            pool = ThreadPoolExecutor(concorrencia, thread_name_prefix="tarefa")
+
+        try:
+            self._laco(pool, concorrencia, opts)
+        finally:
+            if pool:
+                pool.shutdown(wait=True)
+
+        resumo = ", ".join(f"{s}: {n}" for s, n in sorted(self.contagem.items())) or "nenhuma tarefa"
+        estilo = self.style.WARNING if self.contagem.get(StatusTarefa.FALHOU) else self.style.SUCCESS
+        self.stdout.write(estilo(f"Worker concluído -> {resumo}"))
+
+    def _registrar(self, tarefa_id, status):
+        self.contagem[status] = self.contagem.get(status, 0) + 1
+        self.stdout.write(f"Tarefa #{tarefa_id}: {status}")
+
+    def _laco(self, pool, concorrencia, opts):
+        em_execucao = {}
+        while True:
+            recuperadas = recuperar_travadas(opts["expirar"])
+            if recuperadas:
+                self.stderr.write(f"{recuperadas} tarefa(s) travada(s) devolvida(s) à fila")
+
+            livres = concorrencia - len(em_execucao)
+            ids = reservar(livres, tipos=opts["tipo"]) if livres else []
+            for tarefa_id in ids:
+                if pool is None:
+                    self._registrar(tarefa_id, executar(tarefa_id))
+                else:
+                    em_execucao[pool.submit(executar_no_pool, tarefa_id)] = tarefa_id
+
+            if em_execucao:
+                prontas, _ = wait(em_execucao, timeout=opts["intervalo"], return_when=FIRST_COMPLETED)
+                for futuro in prontas:
+                    tarefa_id = em_execucao.pop(futuro)
+                    try:
+                        self._registrar(tarefa_id, futuro.result())
+                    except Exception as e:  # falha do próprio pool (processo morto); recuperar_travadas resolve
+                        self.stderr.write(f"Tarefa #{tarefa_id}: erro no worker ({e})")
+                continue
+            if ids:
+                continue
+            if not opts["loop"]:
+                break  # fila vazia (reagendadas ficam para depois)
+            time.sleep(opts["intervalo"])
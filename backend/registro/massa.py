@@ -0,0 +1,106 @@
+"""
+Massas em miligramas inteiros (mg).
+
+Todas as colunas de massa são BigIntegerField em mg: somas e comparações são
+aritmética inteira no banco e no Python. A conversão de/para g e kg acontece
+só nas bordas (API, PDFs, importação), com aritmética de inteiros e texto —
+sem Decimal por linha.
+"""
+from decimal import Decimal
+
+MG_POR_G = 1000
+MG_POR_KG = 1_000_000
+
+FATORES = {"mg": 1, "g": MG_POR_G, "kg": MG_POR_KG}
+
+
+def _fator(unidade):
+    try:
+        return FATORES[unidade]
+    except KeyError:
+        raise ValueError(f"Unidade de massa desconhecida: {unidade}")
+
+
+def _texto_para_mg(texto, fator):
+    texto = texto.strip().replace(",", ".")
+    negativo = texto.startswith("-")
+    if texto[:1] in "+-":
+        texto = texto[1:]
+    inteiro, _, frac = texto.partition(".")
+    casas = len(str(fator)) - 1
+    if not (inteiro or frac) or not (inteiro or "0").isdigit() or (frac and not frac.isdigit()):
+        raise ValueError("Número inválido.")
+    if len(frac.rstrip("0")) > casas:
+        raise ValueError(f"No máximo {casas} casas decimais.")
+    frac = (frac + "0" * casas)[:casas]
+    mg = int(inteiro or 0) * fator + int(frac or 0)
+    return -mg if negativo else mg
+
+
+class Massa(int):
+    """
+    Valor de massa em mg (é um int) com conversão por unidade.
+
+        Massa.de("1,5", "kg")    -> 1500000
+        Massa(1500000).em("g")   -> "1500.000"
+        Massa(1500000).em("kg")  -> "1.500"
+    """
+    __slots__ = ()
+
+    @classmethod
+    def de(cls, valor, unidade="g"):
+        """Converte `valor` expresso em `unidade` para mg (str, int, float ou Decimal)."""
+        fator = _fator(unidade)
+        if isinstance(valor, bool) or valor is None:
+            raise ValueError("Número inválido.")
+        if isinstance(valor, int):
+            return cls(valor * fator)
+        if isinstance(valor, float):
+            # JSON numérico: arredonda ao mg mais próximo (ex.: 1.005 kg * 1e6 = 1004999.99…)
+            return cls(round(valor * fator))
+        if isinstance(valor, Decimal):
+            valor = format(valor, "f")
+        return cls(_texto_para_mg(str(valor), fator))
+
+    def em(self, unidade="g", casas=3):
+        return formatar(self, unidade, casas)
+
+    def __repr__(self):
+        return f"Massa({int(self)} mg)"
+
+
+def formatar(mg, unidade="g", casas=3):
+    """
+    Texto exato de `mg` na unidade pedida, com pelo menos `casas` decimais
+    (ex.: 1500 mg -> "1.500" g; 1500 mg -> "0.0015" kg). None -> None.
+    """
+    if mg is None:
+        return None
+    fator = _fator(unidade)
+    sinal = "-" if mg < 0 else ""
+    inteiro, resto = divmod(abs(int(mg)), fator)
+    digitos = len(str(fator)) - 1
+    if not digitos:
+        return f"{sinal}{inteiro}"
+    frac = f"{resto:0{digitos}d}"
+    frac = frac[:casas] + frac[casas:].rstrip("0")
+    return f"{sinal}{inteiro}.{frac}" if frac else f"{sinal}{inteiro}"
+
+
+def formatar_ptbr(mg, unidade="g", casas=3):
+    """Ex.: 282000000 mg -> "282.000,000 g" (etiquetas e PDFs)."""
+    if mg is None:
+        return f"- {unidade}"
+    texto = formatar(mg, unidade, casas)
+    inteiro, _, frac = texto.partition(".")
+    inteiro = f"{int(inteiro):,}".replace(",", ".")
+    return f"{inteiro},{frac} {unidade}" if frac else f"{inteiro} {unidade}"
+
+
+def aplicar_fracao(mg, fracao, arredondar="baixo"):
+    """mg × fração (Decimal, ex.: 0.95) arredondado para mg inteiro ('baixo' ou 'cima')."""
+    produto = Decimal(int(mg)) * fracao
+    inteiro = int(produto)
+    if arredondar == "cima" and produto > inteiro:
+        inteiro += 1
+    return inteiro
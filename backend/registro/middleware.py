@@ -0,0 +1,105 @@
+"""
+Compressão das respostas (gzip/brotli) negociada por Accept-Encoding.
+
+Só comprime tipos textuais (JSON, texto, ZPL/EPL...) a partir de
+REGISTRO_COMPRESSAO_MINIMO bytes — abaixo disso o cabeçalho e a CPU custam
+mais do que economizam; PDFs e imagens já vêm comprimidos. Brotli é usado
+quando o pacote `brotli` está instalado e o cliente aceita "br" com peso
+maior ou igual ao de gzip; senão, gzip (mesma mitigação de BREACH do
+GZipMiddleware do Django). Respostas em streaming são comprimidas em pedaços.
+"""
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.text import compress_sequence, compress_string
+
+try:
+    import brotli
+except ImportError:  # opcional: sem ele, só gzip
+    brotli = None
+
+MINIMO_PADRAO = 1024
+MAX_BYTES_ALEATORIOS = 100  # como o GZipMiddleware (BREACH)
+TIPOS_COMPRIMIVEIS = ("application/json", "text/", "application/javascript", "application/xml")
+
+
+def _pesos(accept_encoding):
+    pesos = {}
+    for parte in accept_encoding.split(","):
+        nome, _, params = parte.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if nome:
+            pesos[nome.strip().lower()] = q
+    return pesos
+
+
+def negociar(accept_encoding):
+    """'br', 'gzip' ou None conforme Accept-Encoding (e o brotli instalado)."""
+    pesos = _pesos(accept_encoding or "")
+    coringa = pesos.get("*", 0.0)
+    gzip_q = pesos.get("gzip", coringa)
+    br_q = pesos.get("br", coringa) if brotli is not None else 0.0
+    if br_q > 0 and br_q >= gzip_q:
+        return "br"
+    if gzip_q > 0:
+        return "gzip"
+    return None
+
+
+def _brotli_sequencia(sequencia):
+    compressor = brotli.Compressor(quality=4)
+    for pedaco in sequencia:
+        saida = compressor.process(pedaco)
+        if saida:
+            yield saida
+    yield compressor.finish()
+
+
+class CompressaoMiddleware(MiddlewareMixin):
+    def process_response(self, request, response):
+        if response.has_header("Content-Encoding") or response.status_code == 304:
+            return response
+        tipo = response.get("Content-Type", "").lower()
+        if not tipo.startswith(TIPOS_COMPRIMIVEIS):
+            return response
+        minimo = getattr(settings, "REGISTRO_COMPRESSAO_MINIMO", MINIMO_PADRAO)
+        if not response.streaming and len(response.content) < minimo:
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        codificacao = negociar(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        if codificacao is None:
+            return response
+
+        if response.streaming:
+            if response.is_async:
+                return response  # streaming assíncrono segue sem compressão
+            if codificacao == "br":
+                response.streaming_content = _brotli_sequencia(response.streaming_content)
+            else:
+                response.streaming_content = compress_sequence(
+                    response.streaming_content, max_random_bytes=MAX_BYTES_ALEATORIOS,
+                )
+            del response["Content-Length"]
+        else:
+            if codificacao == "br":
+                comprimido = brotli.compress(response.content, quality=5)
+            else:
+                comprimido = compress_string(response.content, max_random_bytes=MAX_BYTES_ALEATORIOS)
+            if len(comprimido) >= len(response.content):
+                return response
+            response.content = comprimido
+            response.headers["Content-Length"] = str(len(comprimido))
+
+        # ETag forte identifica os bytes exatos; depois de comprimir passa a ser fraca
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        response.headers["Content-Encoding"] = codificacao
+        return response
@@ -1,59 +1,45 @@
-from decimal import Decimal
 from django.db import migrations
+from django.db.models import Q
+
+from ._em_lotes import escalar
+
+KG_TO_G = 1000
 
-KG_TO_G = Decimal('1000')
 
 def forwards(apps, schema_editor):
-    UnidadeMedida = apps.get_model('registro', 'ItemEstrutura')._meta.get_field('unidade').choices
     ItemEstrutura = apps.get_model('registro', 'ItemEstrutura')
     ItemOP = apps.get_model('registro', 'ItemOP')
     Pesagem = apps.get_model('registro', 'Pesagem')
+    db = schema_editor.connection.alias
 
-    # ItemEstrutura: kg -> g
-    for ie in ItemEstrutura.objects.all().iterator():
-        if ie.unidade == 'kg':
-            ie.quantidade_por_lote = (ie.quantidade_por_lote or 0) * KG_TO_G
-            ie.unidade = 'g'
-            ie.save(update_fields=['quantidade_por_lote', 'unidade'])
-
-    # ItemOP: kg -> g
-    for io in ItemOP.objects.all().iterator():
-        if io.unidade == 'kg':
-            io.quantidade_necessaria = (io.quantidade_necessaria or 0) * KG_TO_G
-            io.quantidade_pesada = (io.quantidade_pesada or 0) * KG_TO_G
-            io.unidade = 'g'
-            io.save(update_fields=['quantidade_necessaria', 'quantidade_pesada', 'unidade'])
+    # ItemEstrutura / ItemOP: kg -> g (a unidade muda no mesmo UPDATE, então o filtro
+    # já exclui lotes convertidos numa execução anterior)
+    escalar(ItemEstrutura, ['quantidade_por_lote'], KG_TO_G, using=db,
+            filtro=Q(unidade='kg'), extra={'unidade': 'g'}, tarefa='0003:itemestrutura:kg-g')
+    escalar(ItemOP, ['quantidade_necessaria', 'quantidade_pesada'], KG_TO_G, using=db,
+            filtro=Q(unidade='kg'), extra={'unidade': 'g'}, tarefa='0003:itemop:kg-g')
 
     # Pesagem: liquido (antigo) kg -> g
-    for p in Pesagem.objects.all().iterator():
-        # Se você já tinha dados com liquido em kg, converta:
-        p.liquido = (p.liquido or 0) * KG_TO_G
-        p.save(update_fields=['liquido'])
+    escalar(Pesagem, ['liquido'], KG_TO_G, using=db, tarefa='0003:pesagem:kg-g')
+
 
 def backwards(apps, schema_editor):
     # Reverte g -> kg (apenas se desejar)
     ItemEstrutura = apps.get_model('registro', 'ItemEstrutura')
     ItemOP = apps.get_model('registro', 'ItemOP')
     Pesagem = apps.get_model('registro', 'Pesagem')
+    db = schema_editor.connection.alias
 
-    for ie in ItemEstrutura.objects.all().iterator():
-        if ie.unidade == 'g':
-            ie.quantidade_por_lote = (ie.quantidade_por_lote or 0) / KG_TO_G
-            ie.unidade = 'kg'
-            ie.save(update_fields=['quantidade_por_lote', 'unidade'])
-
-    for io in ItemOP.objects.all().iterator():
-        if io.unidade == 'g':
-            io.quantidade_necessaria = (io.quantidade_necessaria or 0) / KG_TO_G
-            io.quantidade_pesada = (io.quantidade_pesada or 0) / KG_TO_G
-            io.unidade = 'kg'
-            io.save(update_fields=['quantidade_necessaria', 'quantidade_pesada', 'unidade'])
+    escalar(ItemEstrutura, ['quantidade_por_lote'], KG_TO_G, dividir=True, casas=3, using=db,
+            filtro=Q(unidade='g'), extra={'unidade': 'kg'}, tarefa='0003:itemestrutura:g-kg')
+    escalar(ItemOP, ['quantidade_necessaria', 'quantidade_pesada'], KG_TO_G, dividir=True, casas=3, using=db,
+            filtro=Q(unidade='g'), extra={'unidade': 'kg'}, tarefa='0003:itemop:g-kg')
+    escalar(Pesagem, ['liquido'], KG_TO_G, dividir=True, casas=3, using=db, tarefa='0003:pesagem:g-kg')
 
-    for p in Pesagem.objects.all().iterator():
-        p.liquido = (p.liquido or 0) / KG_TO_G
-        p.save(update_fields=['liquido'])
 
 class Migration(migrations.Migration):
+    # cada lote é efetivado com seu checkpoint: uma execução interrompida retoma de onde parou
+    atomic = False
 
     dependencies = [
         ('registro', '0002_pesagem_lote_mp_and_more'),  # ajuste
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.5 on 2026-10-19 05:33
+
+from decimal import Decimal
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import F, Value
+
+TOLERANCIA_PERCENTUAL = Decimal('0.05')
+
+
+def congelar_limites_existentes(apps, schema_editor):
+    # Itens já existentes recebem a tolerância padrão (+/- 5%) num único UPDATE
+    ItemOP = apps.get_model('registro', 'ItemOP')
+    ItemOP.objects.filter(quantidade_minima__isnull=True).update(
+        quantidade_minima=F('quantidade_necessaria') * Value(Decimal('1') - TOLERANCIA_PERCENTUAL),
+        quantidade_maxima=F('quantidade_necessaria') * Value(Decimal('1') + TOLERANCIA_PERCENTUAL),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registro', '0008_remove_pesagem_volume'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='itemop',
+            name='quantidade_maxima',
+            field=models.DecimalField(blank=True, decimal_places=3, max_digits=14, null=True),
+        ),
+        migrations.AddField(
+            model_name='itemop',
+            name='quantidade_minima',
+            field=models.DecimalField(blank=True, decimal_places=3, max_digits=14, null=True),
+        ),
+        migrations.CreateModel(
+            name='RegraTolerancia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('escopo', models.CharField(choices=[('global', 'Global'), ('produto', 'Produto'), ('materia_prima', 'Matéria-prima'), ('item_estrutura', 'Item da estrutura')], default='global', max_length=20)),
+                ('tipo', models.CharField(choices=[('percentual', 'Percentual'), ('absoluta', 'Absoluta (g)')], default='percentual', max_length=20)),
+                ('inferior', models.DecimalField(decimal_places=4, help_text='Desvio abaixo do necessário: fração (0.05 = 5%) ou g, conforme o tipo.', max_digits=14)),
+                ('superior', models.DecimalField(decimal_places=4, help_text='Desvio acima do necessário: fração (0.05 = 5%) ou g, conforme o tipo.', max_digits=14)),
+                ('ativo', models.BooleanField(default=True)),
+                ('item_estrutura', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='regras_tolerancia', to='registro.itemestrutura')),
+                ('materia_prima', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='regras_tolerancia', to='registro.materiaprima')),
+                ('produto', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='regras_tolerancia', to='registro.produto')),
+            ],
+            options={
+                'verbose_name': 'Regra de tolerância',
+                'verbose_name_plural': 'Regras de tolerância',
+                'indexes': [models.Index(fields=['escopo', 'ativo'], name='registro_re_escopo_a2507d_idx')],
+            },
+        ),
+        migrations.RunPython(congelar_limites_existentes, migrations.RunPython.noop),
+    ]
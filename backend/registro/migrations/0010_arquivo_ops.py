@@ -0,0 +1,72 @@
+# Generated by Django 5.2.5 on 2026-10-19 05:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registro', '0009_regras_tolerancia'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrdemProducaoArquivada',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('numero', models.CharField(max_length=50, unique=True)),
+                ('lote', models.CharField(max_length=50, unique=True)),
+                ('status', models.CharField(choices=[('aberta', 'Aberta'), ('em_andamento', 'Em andamento'), ('concluida', 'Concluída'), ('cancelada', 'Cancelada')], max_length=20)),
+                ('observacoes', models.TextField(blank=True, default='')),
+                ('criada_em', models.DateTimeField()),
+                ('concluida_em', models.DateTimeField(blank=True, null=True)),
+                ('arquivada_em', models.DateTimeField(db_index=True)),
+                ('estrutura', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='ops_arquivadas', to='registro.estruturaproduto')),
+                ('produto', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='ops_arquivadas', to='registro.produto')),
+            ],
+            options={
+                'verbose_name': 'OP arquivada',
+                'verbose_name_plural': 'OPs arquivadas',
+                'ordering': ['-criada_em'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ItemOPArquivado',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('quantidade_necessaria', models.DecimalField(decimal_places=3, max_digits=14)),
+                ('quantidade_pesada', models.DecimalField(decimal_places=3, max_digits=14)),
+                ('quantidade_minima', models.DecimalField(blank=True, decimal_places=3, max_digits=14, null=True)),
+                ('quantidade_maxima', models.DecimalField(blank=True, decimal_places=3, max_digits=14, null=True)),
+                ('unidade', models.CharField(choices=[('g', 'g'), ('kg', 'kg'), ('mL', 'mL'), ('L', 'L'), ('un', 'un')], default='g', max_length=10)),
+                ('materia_prima', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='itens_op_arquivados', to='registro.materiaprima')),
+                ('op', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='itens', to='registro.ordemproducaoarquivada')),
+            ],
+            options={
+                'verbose_name': 'Item de OP arquivado',
+                'verbose_name_plural': 'Itens de OP arquivados',
+            },
+        ),
+        migrations.CreateModel(
+            name='PesagemArquivada',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('pesador', models.CharField(max_length=100)),
+                ('data_hora', models.DateTimeField(db_index=True)),
+                ('bruto', models.DecimalField(decimal_places=3, max_digits=14)),
+                ('tara', models.DecimalField(decimal_places=3, max_digits=14)),
+                ('liquido', models.DecimalField(decimal_places=3, max_digits=14)),
+                ('codigo_interno', models.CharField(default='TEMP', max_length=50)),
+                ('lote_mp', models.CharField(blank=True, db_index=True, default='', max_length=60, verbose_name='lote_MP')),
+                ('balanca', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='pesagens_arquivadas', to='registro.balanca')),
+                ('item_op', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='pesagens', to='registro.itemoparquivado')),
+                ('op', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pesagens', to='registro.ordemproducaoarquivada')),
+            ],
+            options={
+                'verbose_name': 'Pesagem arquivada',
+                'verbose_name_plural': 'Pesagens arquivadas',
+                'ordering': ['-data_hora'],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.5 on 2026-10-19 05:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registro', '0011_chave_idempotencia'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pesagem',
+            name='capturada_em',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='pesagem',
+            name='uuid_cliente',
+            field=models.UUIDField(blank=True, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='pesagemarquivada',
+            name='capturada_em',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='pesagemarquivada',
+            name='uuid_cliente',
+            field=models.UUIDField(blank=True, null=True, unique=True),
+        ),
+    ]
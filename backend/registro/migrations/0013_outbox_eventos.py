@@ -0,0 +1,44 @@
+# Generated by Django 5.2.5 on 2026-10-19 05:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registro', '0012_pesagem_captura_offline'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventoOutbox',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(db_index=True, max_length=50)),
+                ('agregado', models.CharField(max_length=30)),
+                ('agregado_id', models.BigIntegerField()),
+                ('payload', models.JSONField()),
+                ('criado_em', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'verbose_name': 'Evento (outbox)',
+                'verbose_name_plural': 'Eventos (outbox)',
+                'ordering': ['id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='OffsetConsumidor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('consumidor', models.CharField(max_length=50, unique=True)),
+                ('ultimo_id', models.BigIntegerField(default=0)),
+                ('tentativas', models.PositiveIntegerField(default=0)),
+                ('ultimo_erro', models.TextField(blank=True, default='')),
+                ('atualizado_em', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Offset de consumidor',
+                'verbose_name_plural': 'Offsets de consumidores',
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.5 on 2026-10-19 05:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registro', '0013_outbox_eventos'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pesagem',
+            name='parcial',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='pesagemarquivada',
+            name='parcial',
+            field=models.BooleanField(default=False),
+        ),
+    ]
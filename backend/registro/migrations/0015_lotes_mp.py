@@ -0,0 +1,35 @@
+# Generated by Django 5.2.5 on 2026-10-19 05:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registro', '0014_pesagem_parcial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LoteMP',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('codigo', models.CharField(max_length=60)),
+                ('validade', models.DateField()),
+                ('quantidade_inicial', models.DecimalField(decimal_places=3, max_digits=14)),
+                ('quantidade_disponivel', models.DecimalField(decimal_places=3, max_digits=14)),
+                ('fornecedor', models.CharField(blank=True, default='', max_length=120)),
+                ('recebido_em', models.DateTimeField(auto_now_add=True)),
+                ('ativo', models.BooleanField(default=True)),
+                ('materia_prima', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='lotes', to='registro.materiaprima')),
+            ],
+            options={
+                'verbose_name': 'Lote de MP',
+                'verbose_name_plural': 'Lotes de MP',
+                'ordering': ['materia_prima', 'validade', 'id'],
+                'indexes': [models.Index(condition=models.Q(('ativo', True), ('quantidade_disponivel__gt', 0)), fields=['materia_prima', 'validade', 'id'], name='lotemp_fefo_idx')],
+                'constraints': [models.UniqueConstraint(fields=('materia_prima', 'codigo'), name='lotemp_mp_codigo_unico'), models.CheckConstraint(condition=models.Q(('quantidade_disponivel__gte', 0)), name='lotemp_saldo_nao_negativo')],
+            },
+        ),
+    ]
@@ -0,0 +1,129 @@
+# Generated by Django 5.2.5 on 2026-10-19 05:57
+
+from django.db import migrations, models
+
+from ._em_lotes import escalar
+
+# (modelo, fator para mg, campos) — g -> mg (x1000); kg -> mg (x1.000.000)
+ESCALAS = (
+    ("ItemEstrutura", 1000, ("quantidade_por_lote",)),
+    ("ItemOP", 1000, ("quantidade_necessaria", "quantidade_pesada", "quantidade_minima", "quantidade_maxima")),
+    ("ItemOPArquivado", 1000, ("quantidade_necessaria", "quantidade_pesada", "quantidade_minima", "quantidade_maxima")),
+    ("LoteMP", 1000, ("quantidade_inicial", "quantidade_disponivel")),
+    ("Pesagem", 1000, ("liquido",)),
+    ("Pesagem", 1_000_000, ("bruto", "tara")),
+    ("PesagemArquivada", 1000, ("liquido",)),
+    ("PesagemArquivada", 1_000_000, ("bruto", "tara")),
+)
+
+
+def _escalar(apps, schema_editor, multiplicar):
+    # UPDATEs em lote por faixa de pk, sem carregar linhas no Python (migração atômica: sem checkpoint)
+    for modelo, fator, campos in ESCALAS:
+        escalar(apps.get_model("registro", modelo), campos, fator, using=schema_editor.connection.alias,
+                dividir=not multiplicar, casas=0 if multiplicar else 3)
+
+
+def para_mg(apps, schema_editor):
+    _escalar(apps, schema_editor, multiplicar=True)
+
+
+def de_mg(apps, schema_editor):
+    _escalar(apps, schema_editor, multiplicar=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registro', '0015_lotes_mp'),
+    ]
+
+    operations = [
+        # valores escalados ainda nas colunas decimais; o AlterField só troca o tipo
+        migrations.RunPython(para_mg, de_mg),
+        migrations.AlterField(
+            model_name='itemestrutura',
+            name='quantidade_por_lote',
+            field=models.BigIntegerField(verbose_name='quantidade por lote (mg)'),
+        ),
+        migrations.AlterField(
+            model_name='itemop',
+            name='quantidade_maxima',
+            field=models.BigIntegerField(blank=True, null=True, verbose_name='quantidade máxima (mg)'),
+        ),
+        migrations.AlterField(
+            model_name='itemop',
+            name='quantidade_minima',
+            field=models.BigIntegerField(blank=True, null=True, verbose_name='quantidade mínima (mg)'),
+        ),
+        migrations.AlterField(
+            model_name='itemop',
+            name='quantidade_necessaria',
+            field=models.BigIntegerField(verbose_name='quantidade necessária (mg)'),
+        ),
+        migrations.AlterField(
+            model_name='itemop',
+            name='quantidade_pesada',
+            field=models.BigIntegerField(default=0, verbose_name='quantidade pesada (mg)'),
+        ),
+        migrations.AlterField(
+            model_name='itemoparquivado',
+            name='quantidade_maxima',
+            field=models.BigIntegerField(blank=True, null=True, verbose_name='quantidade máxima (mg)'),
+        ),
+        migrations.AlterField(
+            model_name='itemoparquivado',
+            name='quantidade_minima',
+            field=models.BigIntegerField(blank=True, null=True, verbose_name='quantidade mínima (mg)'),
+        ),
+        migrations.AlterField(
+            model_name='itemoparquivado',
+            name='quantidade_necessaria',
+            field=models.BigIntegerField(verbose_name='quantidade necessária (mg)'),
+        ),
+        migrations.AlterField(
+            model_name='itemoparquivado',
+            name='quantidade_pesada',
+            field=models.BigIntegerField(verbose_name='quantidade pesada (mg)'),
+        ),
+        migrations.AlterField(
+            model_name='lotemp',
+            name='quantidade_disponivel',
+            field=models.BigIntegerField(verbose_name='quantidade disponível (mg)'),
+        ),
+        migrations.AlterField(
+            model_name='lotemp',
+            name='quantidade_inicial',
+            field=models.BigIntegerField(verbose_name='quantidade inicial (mg)'),
+        ),
+        migrations.AlterField(
+            model_name='pesagem',
+            name='bruto',
+            field=models.BigIntegerField(help_text='Calculado automaticamente no backend: tara + líquido.', verbose_name='bruto (mg)'),
+        ),
+        migrations.AlterField(
+            model_name='pesagem',
+            name='liquido',
+            field=models.BigIntegerField(default=0, help_text='Entrada do operador (kg na API).', verbose_name='líquido (mg)'),
+        ),
+        migrations.AlterField(
+            model_name='pesagem',
+            name='tara',
+            field=models.BigIntegerField(help_text='Entrada do operador (kg na API).', verbose_name='tara (mg)'),
+        ),
+        migrations.AlterField(
+            model_name='pesagemarquivada',
+            name='bruto',
+            field=models.BigIntegerField(verbose_name='bruto (mg)'),
+        ),
+        migrations.AlterField(
+            model_name='pesagemarquivada',
+            name='liquido',
+            field=models.BigIntegerField(verbose_name='líquido (mg)'),
+        ),
+        migrations.AlterField(
+            model_name='pesagemarquivada',
+            name='tara',
+            field=models.BigIntegerField(verbose_name='tara (mg)'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.5 on 2026-10-19 06:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registro', '0016_massas_em_mg'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pesagem',
+            name='corrige',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='correcoes', to='registro.pesagem'),
+        ),
+        migrations.AddField(
+            model_name='pesagem',
+            name='estorno_de',
+            field=models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='estorno', to='registro.pesagem'),
+        ),
+        migrations.AddField(
+            model_name='pesagem',
+            name='motivo',
+            field=models.CharField(blank=True, default='', max_length=200),
+        ),
+        migrations.AddField(
+            model_name='pesagem',
+            name='tipo',
+            field=models.CharField(choices=[('pesagem', 'Pesagem'), ('estorno', 'Estorno')], default='pesagem', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='pesagemarquivada',
+            name='corrige',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='correcoes', to='registro.pesagemarquivada'),
+        ),
+        migrations.AddField(
+            model_name='pesagemarquivada',
+            name='estorno_de',
+            field=models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='estorno', to='registro.pesagemarquivada'),
+        ),
+        migrations.AddField(
+            model_name='pesagemarquivada',
+            name='motivo',
+            field=models.CharField(blank=True, default='', max_length=200),
+        ),
+        migrations.AddField(
+            model_name='pesagemarquivada',
+            name='tipo',
+            field=models.CharField(choices=[('pesagem', 'Pesagem'), ('estorno', 'Estorno')], default='pesagem', max_length=10),
+        ),
+    ]
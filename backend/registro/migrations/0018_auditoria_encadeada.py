@@ -0,0 +1,51 @@
+# Generated by Django 5.2.5 on 2026-10-19 06:13
+
+from django.db import migrations, models
+
+
+def semear_cabeca(apps, schema_editor):
+    # linha única da cabeça: a primeira inclusão já encontra o que travar
+    CadeiaAuditoria = apps.get_model('registro', 'CadeiaAuditoria')
+    CadeiaAuditoria.objects.get_or_create(pk=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registro', '0017_pesagem_estornos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CadeiaAuditoria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ultimo_seq', models.BigIntegerField(default=0)),
+                ('ultimo_hash', models.CharField(default='0000000000000000000000000000000000000000000000000000000000000000', max_length=64)),
+            ],
+            options={
+                'verbose_name': 'Cabeça da cadeia de auditoria',
+            },
+        ),
+        migrations.CreateModel(
+            name='RegistroAuditoria',
+            fields=[
+                ('seq', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('criado_em', models.DateTimeField()),
+                ('entidade', models.CharField(max_length=30)),
+                ('entidade_id', models.BigIntegerField()),
+                ('acao', models.CharField(max_length=50)),
+                ('usuario', models.CharField(blank=True, default='', max_length=150)),
+                ('dados', models.JSONField()),
+                ('hash_anterior', models.CharField(max_length=64)),
+                ('hash', models.CharField(max_length=64)),
+            ],
+            options={
+                'verbose_name': 'Registro de auditoria',
+                'verbose_name_plural': 'Registros de auditoria',
+                'ordering': ['seq'],
+                'indexes': [models.Index(fields=['entidade', 'entidade_id'], name='registro_re_entidad_509ec3_idx')],
+            },
+        ),
+        migrations.RunPython(semear_cabeca, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.5 on 2026-10-19 06:22
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registro', '0018_auditoria_encadeada'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImpressoraEtiqueta',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nome', models.CharField(max_length=100, unique=True)),
+                ('estacao', models.CharField(db_index=True, max_length=100)),
+                ('endereco_ip', models.GenericIPAddressField()),
+                ('porta', models.PositiveIntegerField(default=9100)),
+                ('linguagem', models.CharField(choices=[('zpl', 'ZPL'), ('epl', 'EPL')], default='zpl', max_length=3)),
+                ('ativo', models.BooleanField(default=True)),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+                ('atualizado_em', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Impressora de etiquetas',
+                'verbose_name_plural': 'Impressoras de etiquetas',
+                'ordering': ['estacao', 'nome'],
+            },
+        ),
+        migrations.CreateModel(
+            name='TrabalhoImpressao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pesagem_id', models.BigIntegerField(db_index=True)),
+                ('linguagem', models.CharField(choices=[('zpl', 'ZPL'), ('epl', 'EPL')], max_length=3)),
+                ('conteudo', models.TextField()),
+                ('status', models.CharField(choices=[('pendente', 'Pendente'), ('enviado', 'Enviado'), ('falhou', 'Falhou')], default='pendente', max_length=10)),
+                ('tentativas', models.PositiveIntegerField(default=0)),
+                ('proxima_tentativa', models.DateTimeField(default=django.utils.timezone.now)),
+                ('ultimo_erro', models.TextField(blank=True, default='')),
+                ('solicitado_por', models.CharField(blank=True, default='', max_length=150)),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+                ('enviado_em', models.DateTimeField(blank=True, null=True)),
+                ('impressora', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trabalhos', to='registro.impressoraetiqueta')),
+            ],
+            options={
+                'verbose_name': 'Trabalho de impressão',
+                'verbose_name_plural': 'Trabalhos de impressão',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['status', 'proxima_tentativa'], name='trabalho_fila_idx')],
+            },
+        ),
+    ]
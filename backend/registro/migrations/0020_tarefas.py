@@ -0,0 +1,41 @@
+# Generated by Django 5.2.5 on 2026-10-19 06:25
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registro', '0019_impressao_etiquetas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tarefa',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(db_index=True, max_length=50)),
+                ('parametros', models.JSONField(blank=True, default=dict)),
+                ('prioridade', models.SmallIntegerField(default=0)),
+                ('status', models.CharField(choices=[('pendente', 'Pendente'), ('executando', 'Executando'), ('concluida', 'Concluída'), ('falhou', 'Falhou'), ('cancelada', 'Cancelada')], default='pendente', max_length=10)),
+                ('tentativas', models.PositiveIntegerField(default=0)),
+                ('max_tentativas', models.PositiveIntegerField(default=3)),
+                ('proxima_tentativa', models.DateTimeField(default=django.utils.timezone.now)),
+                ('resultado', models.JSONField(blank=True, null=True)),
+                ('arquivo', models.FileField(blank=True, default='', upload_to='tarefas/%Y/%m/')),
+                ('erro', models.TextField(blank=True, default='')),
+                ('solicitado_por', models.CharField(blank=True, default='', max_length=150)),
+                ('executor', models.CharField(blank=True, default='', max_length=100)),
+                ('criada_em', models.DateTimeField(auto_now_add=True)),
+                ('iniciada_em', models.DateTimeField(blank=True, null=True)),
+                ('concluida_em', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Tarefa',
+                'verbose_name_plural': 'Tarefas',
+                'ordering': ['-id'],
+                'indexes': [models.Index(fields=['status', '-prioridade', 'id'], name='tarefa_fila_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.5 on 2026-10-19 06:43
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registro', '0020_tarefas'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='estruturaproduto',
+            name='atualizado_em',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AddField(
+            model_name='itemestrutura',
+            name='atualizado_em',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AddField(
+            model_name='materiaprima',
+            name='atualizado_em',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AddField(
+            model_name='produto',
+            name='atualizado_em',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='balanca',
+            name='atualizado_em',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.CreateModel(
+            name='RegistroExclusao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entidade', models.CharField(max_length=30)),
+                ('objeto_id', models.BigIntegerField()),
+                ('excluido_em', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Exclusão de catálogo',
+                'verbose_name_plural': 'Exclusões de catálogo',
+                'indexes': [models.Index(fields=['entidade', 'excluido_em'], name='registro_re_entidad_6d3f5a_idx')],
+            },
+        ),
+    ]
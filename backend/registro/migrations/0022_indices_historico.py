@@ -0,0 +1,25 @@
+# Generated by Django 5.2.5 on 2026-10-19 06:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registro', '0021_sincronizacao_catalogos'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ordemproducao',
+            index=models.Index(fields=['status'], name='registro_or_status_5eab31_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pesagem',
+            index=models.Index(fields=['data_hora'], name='registro_pe_data_ho_604fc9_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pesagem',
+            index=models.Index(fields=['pesador', 'data_hora'], name='registro_pe_pesador_fb8b9f_idx'),
+        ),
+    ]
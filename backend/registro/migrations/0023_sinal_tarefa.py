@@ -0,0 +1,26 @@
+# Generated by Django 5.2.5 on 2026-10-19 07:10
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def sinal_das_em_execucao(apps, schema_editor):
+    # Tarefas já em execução: o último sinal conhecido é o início (expiram como antes)
+    Tarefa = apps.get_model('registro', 'Tarefa')
+    Tarefa.objects.filter(status='executando').update(ultimo_sinal=F('iniciada_em'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registro', '0022_indices_historico'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tarefa',
+            name='ultimo_sinal',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(sinal_das_em_execucao, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,131 @@
+"""
+Utilitários para migrações de dados em conjunto (o prefixo "_" faz o Django
+não tratar este módulo como migração).
+
+Em vez de iterar linhas e chamar save() (um UPDATE por linha), cada conversão
+vira UPDATEs em lote por faixa de pk:
+
+    UPDATE tabela SET col = col * k WHERE <filtro> AND id >= a AND id < b
+
+Cada lote roda na sua transação junto com o checkpoint da tarefa. Numa
+migração com `atomic = False` os lotes são efetivados um a um e, se o processo
+cair, a próxima execução retoma depois do último lote concluído (sem aplicar
+o fator duas vezes). Numa migração atômica o checkpoint volta junto com o
+rollback e não atrapalha.
+
+Uso em RunPython:
+
+    def forwards(apps, schema_editor):
+        ItemOP = apps.get_model("registro", "ItemOP")
+        escalar(ItemOP, ["quantidade_necessaria"], 1000, using=schema_editor.connection.alias,
+                filtro=Q(unidade="kg"), extra={"unidade": "g"}, tarefa="0003:itemop")
+"""
+import sys
+
+from django.db import connections, transaction
+from django.db.models import Count, F, Max, Min, Value
+from django.db.models.functions import Round
+
+LOTE_PADRAO = 10_000
+TABELA_CHECKPOINT = "registro_migracao_checkpoint"
+
+
+# ---------- checkpoints ----------
+
+def _sql(connection, sql):
+    return sql.format(tabela=connection.ops.quote_name(TABELA_CHECKPOINT))
+
+
+def _ler_checkpoint(connection, tarefa):
+    with connection.cursor() as cursor:
+        cursor.execute(_sql(connection,
+            "CREATE TABLE IF NOT EXISTS {tabela} (tarefa varchar(200) PRIMARY KEY, ultimo_pk bigint NOT NULL)"))
+        cursor.execute(_sql(connection, "SELECT ultimo_pk FROM {tabela} WHERE tarefa = %s"), [tarefa])
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def _gravar_checkpoint(connection, tarefa, ultimo_pk):
+    with connection.cursor() as cursor:
+        cursor.execute(_sql(connection, "UPDATE {tabela} SET ultimo_pk = %s WHERE tarefa = %s"), [ultimo_pk, tarefa])
+        if cursor.rowcount == 0:
+            cursor.execute(_sql(connection, "INSERT INTO {tabela} (tarefa, ultimo_pk) VALUES (%s, %s)"),
+                           [tarefa, ultimo_pk])
+
+
+def _concluir_checkpoint(connection, tarefa):
+    """Apaga o checkpoint da tarefa; a tabela some quando não há mais tarefas em andamento."""
+    with connection.cursor() as cursor:
+        cursor.execute(_sql(connection, "DELETE FROM {tabela} WHERE tarefa = %s"), [tarefa])
+        cursor.execute(_sql(connection, "SELECT COUNT(*) FROM {tabela}"))
+        if cursor.fetchone()[0] == 0:
+            cursor.execute(_sql(connection, "DROP TABLE {tabela}"))
+
+
+# ---------- progresso ----------
+
+def progresso_stdout(nome, feitas, total):
+    sys.stdout.write(f"\n  {nome}: {feitas}/{total} linha(s)")
+    sys.stdout.flush()
+
+
+# ---------- atualização em lote ----------
+
+def atualizar_em_lotes(model, valores, using="default", filtro=None, tarefa=None,
+                       lote=LOTE_PADRAO, progresso=progresso_stdout):
+    """
+    Aplica `valores` (dict campo -> expressão, como em QuerySet.update) às
+    linhas de `model` que atendem `filtro` (Q), em lotes de `lote` pks.
+
+    `tarefa`: nome único do checkpoint (ex.: "0003:itemop"); sem ele não há
+    retomada. `progresso(nome, feitas, total)` é chamado após cada lote
+    (None desliga). Retorna o nº de linhas atualizadas nesta execução.
+    """
+    connection = connections[using]
+    qs = model._base_manager.using(using)
+    if filtro is not None:
+        qs = qs.filter(filtro)
+
+    inicio = None
+    if tarefa:
+        ultimo = _ler_checkpoint(connection, tarefa)
+        if ultimo is not None:
+            inicio = ultimo + 1
+            qs_faixa = qs.filter(pk__gte=inicio)
+        else:
+            qs_faixa = qs
+    else:
+        qs_faixa = qs
+
+    faixa = qs_faixa.aggregate(menor=Min("pk"), maior=Max("pk"), total=Count("pk"))
+    total, feitas = faixa["total"], 0
+    if total:
+        a = faixa["menor"]
+        while a <= faixa["maior"]:
+            b = a + lote
+            with transaction.atomic(using=using):
+                feitas += qs.filter(pk__gte=a, pk__lt=b).update(**valores)
+                if tarefa:
+                    _gravar_checkpoint(connection, tarefa, b - 1)
+            if progresso:
+                progresso(tarefa or model._meta.label, feitas, total)
+            a = b
+    if tarefa:
+        _concluir_checkpoint(connection, tarefa)
+    return feitas
+
+
+def escalar(model, campos, fator, using="default", filtro=None, extra=None, dividir=False, casas=None, **kwargs):
+    """
+    Multiplica (ou divide, com dividir=True) `campos` por `fator` em lotes.
+
+    `extra`: outros campos a gravar no mesmo UPDATE (ex.: {"unidade": "g"}).
+    `casas`: arredonda o resultado (ROUND(expr, casas)); a divisão é sempre
+    em ponto flutuante, para não cair em divisão inteira no banco.
+    """
+    valores = {}
+    for campo in campos:
+        expr = F(campo) / Value(float(fator)) if dividir else F(campo) * fator
+        valores[campo] = Round(expr, casas) if casas is not None else expr
+    valores.update(extra or {})
+    return atualizar_em_lotes(model, valores, using=using, filtro=filtro, **kwargs)
@@ -1,24 +1,85 @@
 # models.py
 
+import hashlib
+import json
+import threading
+from contextlib import ContextDecorator
 from decimal import Decimal
 from django.db import models, transaction
 from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db.models import F, Sum, Q
 from django.utils import timezone
 
-KG_TO_G = Decimal('1000')
+from .massa import MG_POR_G, aplicar_fracao, formatar
 
-# >>> Tolerância (fixa em +/- 5%)
+# Massas: todas as colunas em mg inteiros (BigIntegerField). Ver registro/massa.py.
+
+# >>> Tolerância padrão (+/- 5%) quando nenhuma RegraTolerancia se aplica
 TOLERANCIA_PERCENTUAL = Decimal('0.05')  # 5%
 
+# Lote de registros de auditoria por thread (ver LoteAuditoria / RegistroAuditoria)
+_auditoria_local = threading.local()
+
+
+class LoteAuditoria(ContextDecorator):
+    """
+    Acumula os registros de auditoria do bloco e grava todos num único
+    bulk_create ao sair (usar DENTRO da transação da operação). Aninhável:
+    só o bloco mais externo grava; um bloco interno que falha descarta os seus.
+    """
+
+    def __enter__(self):
+        pilha = getattr(_auditoria_local, "pilha", None)
+        if pilha is None:
+            pilha = _auditoria_local.pilha = []
+            _auditoria_local.pendentes = []
+        pilha.append(len(_auditoria_local.pendentes))
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        pilha = _auditoria_local.pilha
+        inicio = pilha.pop()
+        if exc_type is not None:
+            del _auditoria_local.pendentes[inicio:]
+        if not pilha:
+            pendentes = _auditoria_local.pendentes
+            _auditoria_local.pilha = _auditoria_local.pendentes = None
+            if pendentes:
+                RegistroAuditoria._gravar(pendentes)
+        return False
+
+
+em_lote_auditoria = LoteAuditoria()
+
+
 # =========================
 # Catálogos básicos
 # =========================
+# `atualizado_em` (indexado) + RegistroExclusao (tombstones) permitem que os
+# clientes mantenham réplicas e peçam só o que mudou (?updated_since=).
+# UPDATE em conjunto não passa por save(): inclua atualizado_em à mão.
+
+class RegistroExclusao(models.Model):
+    """Tombstone de um registro de catálogo apagado (gravado pelo sinal post_delete)."""
+    entidade = models.CharField(max_length=30)
+    objeto_id = models.BigIntegerField()
+    excluido_em = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [models.Index(fields=["entidade", "excluido_em"])]
+        verbose_name = "Exclusão de catálogo"
+        verbose_name_plural = "Exclusões de catálogo"
+
+    def __str__(self):
+        return f"{self.entidade}:{self.objeto_id} excluído em {self.excluido_em:%Y-%m-%d %H:%M}"
+
 
 class Produto(models.Model):
     nome = models.CharField(max_length=100)
     codigo_interno = models.CharField(max_length=50, unique=True)
     ativo = models.BooleanField(default=True)
+    atualizado_em = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return self.nome
@@ -28,6 +89,7 @@ class MateriaPrima(models.Model):
     nome = models.CharField(max_length=100)
     codigo_interno = models.CharField(max_length=50, unique=True, db_index=True)
     ativo = models.BooleanField(default=True)
+    atualizado_em = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return f"{self.nome} ({self.codigo_interno})"
@@ -50,6 +112,7 @@ class EstruturaProduto(models.Model):
     produto = models.ForeignKey(Produto, on_delete=models.PROTECT, related_name="estruturas")
     descricao = models.CharField(max_length=200, blank=True, default="")
     ativo = models.BooleanField(default=True)
+    atualizado_em = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         unique_together = [("produto", "descricao")]
@@ -61,23 +124,179 @@ class EstruturaProduto(models.Model):
 class ItemEstrutura(models.Model):
     """
     Itens da estrutura para UM LOTE.
-    Regra do projeto: MPs em GRAMAS (g).
+    Regra do projeto: MPs em GRAMAS (g) na interface; gravado em mg.
     """
     estrutura = models.ForeignKey(EstruturaProduto, on_delete=models.CASCADE, related_name="itens")
     materia_prima = models.ForeignKey(MateriaPrima, on_delete=models.PROTECT, related_name="itens_estrutura")
-    quantidade_por_lote = models.DecimalField(max_digits=14, decimal_places=3)  # sempre em g
+    quantidade_por_lote = models.BigIntegerField("quantidade por lote (mg)")
     unidade = models.CharField(
         max_length=10,
         choices=UnidadeMedida.choices,
         default=UnidadeMedida.G,  # força g
         help_text="Regra do projeto: utilizar 'g' para MPs."
     )
+    atualizado_em = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         unique_together = [("estrutura", "materia_prima")]
 
     def __str__(self):
-        return f"{self.materia_prima} - {self.quantidade_por_lote} g"
+        return f"{self.materia_prima} - {formatar(self.quantidade_por_lote)} g"
+
+
+# =========================
+# Tolerância de pesagem
+# =========================
+
+class RegraTolerancia(models.Model):
+    """
+    Regra de tolerância aplicada às pesagens.
+    Escopos (do mais específico para o mais geral): item da estrutura > MP > produto > global.
+    • Percentual: inferior/superior como fração (0.05 = 5%) da quantidade necessária
+    • Absoluta: inferior/superior em g
+    A regra é resolvida uma única vez na geração dos itens da OP e congelada no ItemOP.
+    """
+    ESCOPO_GLOBAL = "global"
+    ESCOPO_PRODUTO = "produto"
+    ESCOPO_MP = "materia_prima"
+    ESCOPO_ITEM_ESTRUTURA = "item_estrutura"
+    ESCOPO_CHOICES = (
+        (ESCOPO_GLOBAL, "Global"),
+        (ESCOPO_PRODUTO, "Produto"),
+        (ESCOPO_MP, "Matéria-prima"),
+        (ESCOPO_ITEM_ESTRUTURA, "Item da estrutura"),
+    )
+
+    TIPO_PERCENTUAL = "percentual"
+    TIPO_ABSOLUTA = "absoluta"
+    TIPO_CHOICES = (
+        (TIPO_PERCENTUAL, "Percentual"),
+        (TIPO_ABSOLUTA, "Absoluta (g)"),
+    )
+
+    escopo = models.CharField(max_length=20, choices=ESCOPO_CHOICES, default=ESCOPO_GLOBAL)
+    produto = models.ForeignKey(
+        Produto, on_delete=models.CASCADE, null=True, blank=True, related_name="regras_tolerancia"
+    )
+    materia_prima = models.ForeignKey(
+        MateriaPrima, on_delete=models.CASCADE, null=True, blank=True, related_name="regras_tolerancia"
+    )
+    item_estrutura = models.ForeignKey(
+        ItemEstrutura, on_delete=models.CASCADE, null=True, blank=True, related_name="regras_tolerancia"
+    )
+    tipo = models.CharField(max_length=20, choices=TIPO_CHOICES, default=TIPO_PERCENTUAL)
+    inferior = models.DecimalField(
+        max_digits=14, decimal_places=4,
+        help_text="Desvio abaixo do necessário: fração (0.05 = 5%) ou g, conforme o tipo."
+    )
+    superior = models.DecimalField(
+        max_digits=14, decimal_places=4,
+        help_text="Desvio acima do necessário: fração (0.05 = 5%) ou g, conforme o tipo."
+    )
+    ativo = models.BooleanField(default=True)
+
+    class Meta:
+        verbose_name = "Regra de tolerância"
+        verbose_name_plural = "Regras de tolerância"
+        indexes = [
+            models.Index(fields=["escopo", "ativo"]),
+        ]
+
+    def clean(self):
+        alvo = {
+            self.ESCOPO_PRODUTO: self.produto_id,
+            self.ESCOPO_MP: self.materia_prima_id,
+            self.ESCOPO_ITEM_ESTRUTURA: self.item_estrutura_id,
+        }
+        if self.escopo != self.ESCOPO_GLOBAL and not alvo.get(self.escopo):
+            raise ValidationError(f"Informe o alvo da regra para o escopo '{self.escopo}'.")
+        if (self.inferior or 0) < 0 or (self.superior or 0) < 0:
+            raise ValidationError("Os desvios inferior/superior não podem ser negativos.")
+
+    def limites(self, quantidade_necessaria):
+        """Devolve (mínimo, máximo) em mg para a quantidade necessária (mg) informada."""
+        if self.tipo == self.TIPO_ABSOLUTA:
+            return (
+                quantidade_necessaria - aplicar_fracao(MG_POR_G, self.inferior),
+                quantidade_necessaria + aplicar_fracao(MG_POR_G, self.superior),
+            )
+        return (
+            aplicar_fracao(quantidade_necessaria, Decimal('1') - self.inferior, "cima"),
+            aplicar_fracao(quantidade_necessaria, Decimal('1') + self.superior),
+        )
+
+    def chave(self):
+        if self.escopo == self.ESCOPO_PRODUTO:
+            return (self.escopo, self.produto_id)
+        if self.escopo == self.ESCOPO_MP:
+            return (self.escopo, self.materia_prima_id)
+        if self.escopo == self.ESCOPO_ITEM_ESTRUTURA:
+            return (self.escopo, self.item_estrutura_id)
+        return (self.ESCOPO_GLOBAL, None)
+
+    def __str__(self):
+        unidade = "g" if self.tipo == self.TIPO_ABSOLUTA else "fração"
+        return f"{self.get_escopo_display()}: -{self.inferior}/+{self.superior} ({unidade})"
+
+
+class TabelaTolerancia:
+    """
+    Tabela de consulta pré-computada: carrega com UMA query as regras ativas que podem
+    afetar uma estrutura e resolve cada item por dicionário (sem novas queries).
+    """
+    PRECEDENCIA = (
+        RegraTolerancia.ESCOPO_ITEM_ESTRUTURA,
+        RegraTolerancia.ESCOPO_MP,
+        RegraTolerancia.ESCOPO_PRODUTO,
+        RegraTolerancia.ESCOPO_GLOBAL,
+    )
+
+    def __init__(self, regras):
+        self._regras = {}
+        # em caso de regras duplicadas no mesmo alvo, vale a mais recente (maior id)
+        for regra in sorted(regras, key=lambda r: r.pk or 0):
+            self._regras[regra.chave()] = regra
+
+    @classmethod
+    def carregar(cls, produto_id, materia_prima_ids=(), item_estrutura_ids=()):
+        regras = RegraTolerancia.objects.filter(ativo=True).filter(
+            Q(escopo=RegraTolerancia.ESCOPO_GLOBAL)
+            | Q(escopo=RegraTolerancia.ESCOPO_PRODUTO, produto_id=produto_id)
+            | Q(escopo=RegraTolerancia.ESCOPO_MP, materia_prima_id__in=list(materia_prima_ids))
+            | Q(escopo=RegraTolerancia.ESCOPO_ITEM_ESTRUTURA, item_estrutura_id__in=list(item_estrutura_ids))
+        )
+        return cls(regras)
+
+    def regra_para(self, produto_id, materia_prima_id, item_estrutura_id=None):
+        alvos = {
+            RegraTolerancia.ESCOPO_ITEM_ESTRUTURA: item_estrutura_id,
+            RegraTolerancia.ESCOPO_MP: materia_prima_id,
+            RegraTolerancia.ESCOPO_PRODUTO: produto_id,
+            RegraTolerancia.ESCOPO_GLOBAL: None,
+        }
+        for escopo in self.PRECEDENCIA:
+            alvo = alvos[escopo]
+            if escopo != RegraTolerancia.ESCOPO_GLOBAL and alvo is None:
+                continue
+            regra = self._regras.get((escopo, alvo))
+            if regra is not None:
+                return regra
+        return None
+
+    def limites(self, quantidade_necessaria, produto_id, materia_prima_id, item_estrutura_id=None):
+        regra = self.regra_para(produto_id, materia_prima_id, item_estrutura_id)
+        if regra is None:
+            return limites_padrao(quantidade_necessaria)
+        minimo, maximo = regra.limites(quantidade_necessaria)
+        return max(minimo, 0), maximo
+
+
+def limites_padrao(quantidade_necessaria):
+    """(mínimo, máximo) em mg; arredonda para dentro da faixa."""
+    return (
+        aplicar_fracao(quantidade_necessaria, Decimal('1') - TOLERANCIA_PERCENTUAL, "cima"),
+        aplicar_fracao(quantidade_necessaria, Decimal('1') + TOLERANCIA_PERCENTUAL),
+    )
 
 
 # =========================
@@ -113,7 +332,7 @@ class Balanca(models.Model):
 
     ativo = models.BooleanField(default=True)
     criado_em = models.DateTimeField(auto_now_add=True)
-    atualizado_em = models.DateTimeField(auto_now=True)
+    atualizado_em = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         verbose_name = 'Balança'
@@ -123,6 +342,89 @@ class Balanca(models.Model):
         return f'{self.nome} ({self.identificador})'
 
 
+# =========================
+# Lotes de MP (estoque)
+# =========================
+
+class LoteMP(models.Model):
+    """
+    Lote de matéria-prima em estoque (quantidades em mg).
+    Pesagem.save baixa `quantidade_disponivel` do lote informado em `lote_mp`
+    (mesmo código, mesma MP). A sugestão FEFO (validade mais próxima primeiro)
+    usa o índice parcial (materia_prima, validade, id) só com saldo > 0.
+    """
+    materia_prima = models.ForeignKey(MateriaPrima, on_delete=models.PROTECT, related_name="lotes")
+    codigo = models.CharField(max_length=60)
+    validade = models.DateField()
+    quantidade_inicial = models.BigIntegerField("quantidade inicial (mg)")
+    quantidade_disponivel = models.BigIntegerField("quantidade disponível (mg)")
+    fornecedor = models.CharField(max_length=120, blank=True, default="")
+    recebido_em = models.DateTimeField(auto_now_add=True)
+    ativo = models.BooleanField(default=True)
+
+    class Meta:
+        ordering = ["materia_prima", "validade", "id"]
+        verbose_name = "Lote de MP"
+        verbose_name_plural = "Lotes de MP"
+        constraints = [
+            models.UniqueConstraint(fields=["materia_prima", "codigo"], name="lotemp_mp_codigo_unico"),
+            models.CheckConstraint(condition=Q(quantidade_disponivel__gte=0), name="lotemp_saldo_nao_negativo"),
+        ]
+        indexes = [
+            models.Index(
+                fields=["materia_prima", "validade", "id"],
+                condition=Q(quantidade_disponivel__gt=0, ativo=True),
+                name="lotemp_fefo_idx",
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.codigo = (self.codigo or "").strip()
+        if self.quantidade_disponivel is None:
+            self.quantidade_disponivel = self.quantidade_inicial
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.materia_prima} | lote {self.codigo} (val. {self.validade:%d/%m/%Y})"
+
+    @classmethod
+    def fefo(cls, materia_prima_id, hoje=None):
+        """Lotes utilizáveis da MP, validade mais próxima primeiro (vencidos fora)."""
+        return cls.objects.filter(
+            materia_prima_id=materia_prima_id,
+            quantidade_disponivel__gt=0,
+            ativo=True,
+            validade__gte=hoje or timezone.localdate(),
+        ).order_by("validade", "id")
+
+    @classmethod
+    def devolver(cls, materia_prima_id, codigo, quantidade_mg):
+        """Devolve ao saldo do lote (estorno de pesagem). Lote não cadastrado => nada a fazer."""
+        return cls.objects.filter(materia_prima_id=materia_prima_id, codigo=codigo).update(
+            quantidade_disponivel=F("quantidade_disponivel") + quantidade_mg
+        )
+
+    @classmethod
+    def baixar(cls, materia_prima_id, codigo, quantidade_mg):
+        """
+        Baixa atômica (UPDATE condicional) do saldo do lote `codigo` da MP.
+        Lote não cadastrado => None (lote_mp continua texto livre). Lote inativo / saldo insuficiente =>
+        ValidationError com code "lote_inativo" / "lote_sem_saldo".
+        """
+        lote = cls.objects.filter(materia_prima_id=materia_prima_id, codigo=codigo).only("id", "validade", "ativo").first()
+        if lote is None:
+            return None
+        if not lote.ativo:
+            raise ValidationError(f"Lote {codigo} está inativo.", code="lote_inativo")
+        atualizados = cls.objects.filter(pk=lote.pk, quantidade_disponivel__gte=quantidade_mg).update(
+            quantidade_disponivel=F("quantidade_disponivel") - quantidade_mg
+        )
+        if not atualizados:
+            raise ValidationError(f"Saldo insuficiente no lote {codigo} para {formatar(quantidade_mg)} g.",
+                                  code="lote_sem_saldo")
+        return lote
+
+
 # =========================
 # Ordem de Produção
 # =========================
@@ -146,27 +448,63 @@ class OrdemProducao(models.Model):
 
     class Meta:
         ordering = ["-criada_em"]
+        indexes = [models.Index(fields=["status"])]
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # status como lido do banco (sem disparar carga de campo adiado)
+        self._status_gravado = self.__dict__.get("status")
 
     def __str__(self):
         return f"OP {self.numero} - {self.produto} (lote {self.lote})"
 
     @transaction.atomic
+    @em_lote_auditoria
+    def save(self, *args, **kwargs):
+        criando = self._state.adding
+        super().save(*args, **kwargs)
+        if criando:
+            RegistroAuditoria.registrar("op", self.pk, "op.criada", {
+                "numero": self.numero, "lote": self.lote, "status": self.status,
+            })
+        elif self._status_gravado is not None and self.status != self._status_gravado:
+            self.registrar_mudanca_status(self._status_gravado)
+        self._status_gravado = self.status
+
+    @transaction.atomic
+    @em_lote_auditoria
     def gerar_itens_a_partir_da_estrutura(self, forcar=False):
         if self.itemop_set.exists() and not forcar:
             raise ValidationError("Esta OP já possui itens. Use forcar=True para recriar.")
 
         self.itemop_set.all().delete()
 
+        itens_estrutura = list(self.estrutura.itens.select_related("materia_prima"))
+        # Resolve as tolerâncias uma única vez e congela os limites no ItemOP
+        tabela = TabelaTolerancia.carregar(
+            self.produto_id,
+            materia_prima_ids={i.materia_prima_id for i in itens_estrutura},
+            item_estrutura_ids={i.pk for i in itens_estrutura},
+        )
+
         itens = []
-        for item in self.estrutura.itens.select_related("materia_prima"):
+        for item in itens_estrutura:
+            minima, maxima = tabela.limites(
+                item.quantidade_por_lote, self.produto_id, item.materia_prima_id, item.pk
+            )
             itens.append(ItemOP(
                 op=self,
                 materia_prima=item.materia_prima,
-                quantidade_necessaria=item.quantidade_por_lote,  # já em g
+                quantidade_necessaria=item.quantidade_por_lote,  # mg, como na estrutura
+                quantidade_minima=minima,
+                quantidade_maxima=maxima,
                 unidade=UnidadeMedida.G
             ))
         ItemOP.objects.bulk_create(itens)
+        for item in itens:
+            RegistroAuditoria.registrar("item_op", item.pk, "item_op.criado", item.dados_auditoria())
 
+        # mudança de status => outbox + auditoria (ver save)
         self.status = StatusOP.ABERTA if itens else StatusOP.CANCELADA
         self.save(update_fields=["status"])
 
@@ -189,18 +527,41 @@ class OrdemProducao(models.Model):
         if novo_status == StatusOP.CONCLUIDA and not self.concluida_em:
             self.concluida_em = timezone.now()
             campos.append("concluida_em")
+        elif novo_status == StatusOP.EM_ANDAMENTO and self.concluida_em:
+            # estorno/correção reabriu um item de OP já concluída
+            self.concluida_em = None
+            campos.append("concluida_em")
 
-        self.save(update_fields=campos)
+        self.save(update_fields=campos)  # status mudou => outbox + auditoria
+
+    def registrar_mudanca_status(self, anterior):
+        """
+        Evento de outbox op.status_alterado + registro de auditoria (dentro da transação
+        da mudança). save() chama sozinho; chamar à mão só após UPDATEs em conjunto.
+        """
+        payload = {
+            "op_id": self.pk,
+            "numero": self.numero,
+            "lote": self.lote,
+            "status_anterior": anterior,
+            "status": self.status,
+            "concluida_em": self.concluida_em.isoformat() if self.concluida_em else None,
+        }
+        EventoOutbox.registrar("op.status_alterado", "op", self.pk, payload)
+        RegistroAuditoria.registrar("op", self.pk, "op.status_alterado", payload)
 
 
 class ItemOP(models.Model):
     """
-    Regra do projeto: todas as quantidades aqui em g.
+    Regra do projeto: quantidades em g na interface; todas gravadas em mg.
     """
     op = models.ForeignKey(OrdemProducao, on_delete=models.CASCADE)
     materia_prima = models.ForeignKey(MateriaPrima, on_delete=models.PROTECT)
-    quantidade_necessaria = models.DecimalField(max_digits=14, decimal_places=3)  # g
-    quantidade_pesada = models.DecimalField(max_digits=14, decimal_places=3, default=0)  # g
+    quantidade_necessaria = models.BigIntegerField("quantidade necessária (mg)")
+    quantidade_pesada = models.BigIntegerField("quantidade pesada (mg)", default=0)
+    # Limites de tolerância congelados na geração do item (mg)
+    quantidade_minima = models.BigIntegerField("quantidade mínima (mg)", null=True, blank=True)
+    quantidade_maxima = models.BigIntegerField("quantidade máxima (mg)", null=True, blank=True)
     unidade = models.CharField(
         max_length=10,
         choices=UnidadeMedida.choices,
@@ -215,31 +576,84 @@ class ItemOP(models.Model):
     def quantidade_restante(self):
         return self.quantidade_necessaria - self.quantidade_pesada
 
-    # Adicionado: Limite inferior permitido (g) com tolerância de 5%
+    # Limite inferior permitido (mg): coluna congelada; fallback para a tolerância padrão
     @property
     def quantidade_minima_permitida(self):
-        return self.quantidade_necessaria * (Decimal('1') - TOLERANCIA_PERCENTUAL)
+        if self.quantidade_minima is not None:
+            return self.quantidade_minima
+        return limites_padrao(self.quantidade_necessaria)[0]
 
-    # Tolerância: limite superior permitido (g)
+    # Limite superior permitido (mg)
     @property
     def quantidade_maxima_permitida(self):
-        return self.quantidade_necessaria * (Decimal('1') + TOLERANCIA_PERCENTUAL)
+        if self.quantidade_maxima is not None:
+            return self.quantidade_maxima
+        return limites_padrao(self.quantidade_necessaria)[1]
+
+    def congelar_tolerancia(self):
+        """
+        Resolve a regra de tolerância deste item e preenche os limites (sem gravar).
+        Chamado na criação e, explicitamente, quando a MP ou a quantidade do item mudam.
+        """
+        op = self.op
+        item_estrutura_id = (
+            ItemEstrutura.objects
+            .filter(estrutura_id=op.estrutura_id, materia_prima_id=self.materia_prima_id)
+            .values_list("id", flat=True)
+            .first()
+        )
+        tabela = TabelaTolerancia.carregar(
+            op.produto_id,
+            materia_prima_ids=[self.materia_prima_id],
+            item_estrutura_ids=[item_estrutura_id] if item_estrutura_id else [],
+        )
+        self.quantidade_minima, self.quantidade_maxima = tabela.limites(
+            self.quantidade_necessaria, op.produto_id, self.materia_prima_id, item_estrutura_id
+        )
+
+    def save(self, *args, **kwargs):
+        # Limites congelados só na criação (se não vierem prontos): editar uma regra
+        # depois não muda itens existentes; recongelar é chamada explícita.
+        if self._state.adding and self.quantidade_minima is None and self.quantidade_maxima is None:
+            self.congelar_tolerancia()
+        super().save(*args, **kwargs)
+
+    def dados_auditoria(self):
+        return {
+            "op_id": self.op_id,
+            "materia_prima_id": self.materia_prima_id,
+            "quantidade_necessaria_mg": self.quantidade_necessaria,
+            "quantidade_pesada_mg": self.quantidade_pesada,
+            "quantidade_minima_mg": self.quantidade_minima,
+            "quantidade_maxima_mg": self.quantidade_maxima,
+        }
 
     def __str__(self):
-        return f"OP {self.op.numero} - {self.materia_prima} ({self.quantidade_pesada}/{self.quantidade_necessaria} g)"
+        return (
+            f"OP {self.op.numero} - {self.materia_prima} "
+            f"({formatar(self.quantidade_pesada)}/{formatar(self.quantidade_necessaria)} g)"
+        )
 
 
 # =========================
 # Pesagem
 # =========================
 
+class TipoLancamento(models.TextChoices):
+    PESAGEM = "pesagem", "Pesagem"
+    ESTORNO = "estorno", "Estorno"
+
+
 class Pesagem(models.Model):
     """
     Pesagem vinculada à OP/ItemOP.
     • Entrada do operador no formulário: líquido (kg) + tara (kg)
     • Backend calcula bruto (kg) e converte líquido para g para armazenar/validar
     • Todo o controle de saldo/operação interna é feito em g
-    • >>> Respeita tolerância de +/- 5% sobre a quantidade necessária do ItemOP
+    • >>> Respeita a faixa de tolerância congelada no ItemOP (padrão +/- 5%)
+    • Gravada uma vez e nunca alterada: edição/anulação são lançamentos novos
+      (estorno com valores negativos + pesagem substituta), ver corrigir()/anular().
+      Assim SUM(liquido) das pesagens do item = ItemOP.quantidade_pesada.
     """
     op = models.ForeignKey(
         OrdemProducao,
@@ -256,23 +670,13 @@ class Pesagem(models.Model):
     pesador = models.CharField(max_length=100)
     data_hora = models.DateTimeField(auto_now_add=True)
 
-    # Entradas e cálculos de massa
-    bruto = models.DecimalField(
-        max_digits=14,
-        decimal_places=3,
-        help_text="Calculado automaticamente no backend (kg): tara_kg + liquido_kg."
-    )
-    tara = models.DecimalField(
-        max_digits=14,
-        decimal_places=3,
-        help_text="Entrada do operador em kg."
-    )
-    liquido = models.DecimalField(
-        max_digits=14,
-        decimal_places=3,
-        default=0.0,
-        help_text="Armazenado em g (entrada do operador é em kg; o backend converte)."
+    # Entradas e cálculos de massa (mg; a API recebe tara/líquido em kg e converte)
+    bruto = models.BigIntegerField(
+        "bruto (mg)",
+        help_text="Calculado automaticamente no backend: tara + líquido."
     )
+    tara = models.BigIntegerField("tara (mg)", help_text="Entrada do operador (kg na API).")
+    liquido = models.BigIntegerField("líquido (mg)", default=0, help_text="Entrada do operador (kg na API).")
 
     # Metadados adicionais
     
@@ -295,73 +699,585 @@ class Pesagem(models.Model):
         help_text="Identificador do lote da matéria-prima usado nesta pesagem (ex.: 24A0321)."
     )
 
+    # Fração de um item dividido em várias pesagens (ver registro/planejamento.py)
+    parcial = models.BooleanField(default=False)
+
+    # Captura offline: UUID gerado pela estação (dedupe na sincronização) e hora real da pesagem
+    uuid_cliente = models.UUIDField(null=True, blank=True, unique=True)
+    capturada_em = models.DateTimeField(null=True, blank=True)
+
+    # Lançamentos de correção: o estorno aponta para a pesagem estornada (no máx. um
+    # por pesagem); a substituta de uma edição aponta para a pesagem que corrige
+    tipo = models.CharField(max_length=10, choices=TipoLancamento.choices, default=TipoLancamento.PESAGEM)
+    estorno_de = models.OneToOneField(
+        "self", null=True, blank=True, on_delete=models.PROTECT, related_name="estorno"
+    )
+    corrige = models.ForeignKey(
+        "self", null=True, blank=True, on_delete=models.PROTECT, related_name="correcoes"
+    )
+    motivo = models.CharField(max_length=200, blank=True, default="")
+
     class Meta:
         ordering = ["-data_hora"]
         indexes = [
             models.Index(fields=["item_op", "lote_mp"]),
+            # histórico: intervalo de datas/ordenação e filtro por pesador (registro/historico.py)
+            models.Index(fields=["data_hora"]),
+            models.Index(fields=["pesador", "data_hora"]),
         ]
 
+    # campos que uma correção pode alterar (o resto é copiado da pesagem original)
+    CAMPOS_CORRIGIVEIS = ("liquido", "tara", "lote_mp", "balanca_id", "codigo_interno", "parcial")
+
     def clean(self):
         # Coerência entre OP e ItemOP
         if self.item_op and self.op_id and self.item_op.op_id != self.op_id:
             raise ValidationError("item_op não pertence à OP informada.")
 
         # Entradas devem permitir cálculo positivo
-        tara_kg = self.tara or 0
-        liquido_kg_informado = self.liquido or 0  # aqui o front manda em kg
-        if tara_kg < 0 or liquido_kg_informado <= 0:
-            raise ValidationError("Informe tara (kg) ≥ 0 e líquido (kg) > 0.")
+        if (self.tara or 0) < 0 or (self.liquido or 0) <= 0:
+            raise ValidationError("Informe tara ≥ 0 e líquido > 0.")
 
     @transaction.atomic
-    def save(self, *args, **kwargs):
+    @em_lote_auditoria
+    def save(self, *args, item=None, **kwargs):
+        """`item`: o ItemOP desta pesagem já travado (select_for_update) nesta transação; sem ele, é lido aqui."""
+        if not self._state.adding:
+            # regravar somaria o líquido de novo no acumulado
+            raise ValidationError("Pesagem gravada não é alterada: use corrigir() ou anular().")
+
         # Normaliza o lote
         if self.lote_mp:
             self.lote_mp = self.lote_mp.strip()
 
-        # Lê entradas em kg
-        tara_kg = self.tara or 0
-        liquido_kg_informado = self.liquido or 0  # **frontend manda em kg**
-        # Converte para g para regra interna
-        liquido_g = liquido_kg_informado * KG_TO_G
-
-        if liquido_g <= 0:
-            raise ValidationError("O líquido calculado deve ser positivo após a conversão para g.")
-
-        # Calcula o bruto (kg) no backend — não confiar no valor vindo do front
-        self.bruto = tara_kg + liquido_kg_informado
-
-        # Trava o item e checa SALDO com TOLERÂNCIA (em g)
-        item = ItemOP.objects.select_for_update().get(pk=self.item_op_id)
-        
-        # Obtém os limites inferior e superior
-        limite_superior_g = item.quantidade_maxima_permitida
-        limite_inferior_g = item.quantidade_minima_permitida
-        
-        novo_total_g = (item.quantidade_pesada or 0) + liquido_g
-
-        # Verifica se o novo total está fora da faixa de tolerância
-        if not (limite_inferior_g <= novo_total_g <= limite_superior_g):
-            raise ValidationError(
-                f"Quantidade excede a faixa de tolerância de +/- 5% para {item.materia_prima}. "
-                f"Faixa permitida: {limite_inferior_g:.3f} g a {limite_superior_g:.3f} g | "
-                f"Já pesado: {item.quantidade_pesada:.3f} g | "
-                f"Tentativa: +{liquido_g:.3f} g (total {novo_total_g:.3f} g)."
-            )
+        # Entradas já em mg (a API converte de kg)
+        liquido_mg = self.liquido or 0
+        if liquido_mg <= 0:
+            raise ValidationError("O líquido deve ser positivo.")
+
+        # Calcula o bruto no backend — não confiar no valor vindo do front
+        self.bruto = (self.tara or 0) + liquido_mg
+
+        # Trava o item e checa SALDO com TOLERÂNCIA (mg)
+        if item is None or item.pk != self.item_op_id:
+            item = ItemOP.objects.select_for_update().select_related("materia_prima").get(pk=self.item_op_id)
+
+        novo_total = (item.quantidade_pesada or 0) + liquido_mg
+        self._checar_tolerancia(item, novo_total, f"+{formatar(liquido_mg)} g")
+
+        # Baixa o estoque do lote informado (se cadastrado) na mesma transação
+        if self.lote_mp:
+            LoteMP.baixar(item.materia_prima_id, self.lote_mp, liquido_mg)
 
-        # Persiste a pesagem guardando **líquido em g**
-        self.liquido = liquido_g
         super().save(*args, **kwargs)
 
-        # Atualiza acumulado (g)
+        # Atualiza acumulado (mg)
         ItemOP.objects.filter(pk=item.pk).update(
             quantidade_pesada=F("quantidade_pesada") + self.liquido
         )
+        item.quantidade_pesada = novo_total  # item travado: o valor em memória segue o banco
+
+        # Evento para ERP/MES na mesma transação (outbox)
+        self._registrar_evento("pesagem.criada", item)
 
         # Atualiza status da OP (continua igual: conclui quando pesada >= necessaria)
-        self.op.refresh_from_db(fields=[])
         if self.op.status in [StatusOP.ABERTA, StatusOP.EM_ANDAMENTO]:
             self.op.verificar_e_concluir()
 
+    def _checar_tolerancia(self, item, novo_total, tentativa):
+        """
+        Limites já congelados no ItemOP (comparação pura de colunas).
+        Pesagem parcial (item fracionado pelo plano de pesagem): só o teto vale;
+        a última fração é uma pesagem normal e fecha o item dentro da faixa.
+        """
+        limite_inferior = item.quantidade_minima_permitida
+        limite_superior = item.quantidade_maxima_permitida
+        abaixo = novo_total < limite_inferior and not self.parcial
+        if abaixo or novo_total > limite_superior:
+            raise ValidationError(
+                f"Quantidade fora da faixa de tolerância para {item.materia_prima}. "
+                f"Faixa permitida: {formatar(limite_inferior)} g a {formatar(limite_superior)} g | "
+                f"Já pesado: {formatar(item.quantidade_pesada)} g | "
+                f"Tentativa: {tentativa} (total {formatar(novo_total)} g).",
+                code="fora_tolerancia",
+            )
+
+    def _registrar_evento(self, tipo, item):
+        """Evento de outbox + registro de auditoria com o mesmo conteúdo."""
+        payload = {
+            "pesagem_id": self.pk,
+            "tipo": self.tipo,
+            "estorno_de_id": self.estorno_de_id,
+            "corrige_id": self.corrige_id,
+            "uuid_cliente": str(self.uuid_cliente) if self.uuid_cliente else None,
+            "op_id": self.op_id,
+            "item_op_id": item.pk,
+            "materia_prima_id": item.materia_prima_id,
+            "materia_prima_codigo": item.materia_prima.codigo_interno,
+            "liquido_g": formatar(self.liquido, "g"),
+            "tara_kg": formatar(self.tara, "kg"),
+            "bruto_kg": formatar(self.bruto, "kg"),
+            "lote_mp": self.lote_mp,
+            "parcial": self.parcial,
+            "balanca_id": self.balanca_id,
+            "pesador": self.pesador,
+            "motivo": self.motivo,
+            "data_hora": self.data_hora.isoformat(),
+            "capturada_em": self.capturada_em.isoformat() if self.capturada_em else None,
+        }
+        EventoOutbox.registrar(tipo, "pesagem", self.pk, payload)
+        RegistroAuditoria.registrar("pesagem", self.pk, tipo, payload, usuario=self.pesador)
+
+    # ---------- edição / anulação por delta ----------
+
+    def anular(self, pesador, motivo=""):
+        """Anula a pesagem: só o estorno (líquido negativo). Retorna o estorno."""
+        estorno, _ = self._estornar(pesador, motivo, None)
+        return estorno
+
+    def corrigir(self, pesador, motivo="", **alteracoes):
+        """
+        Edição: estorna esta pesagem e lança a substituta com `alteracoes`
+        (ver CAMPOS_CORRIGIVEIS). Retorna (estorno, substituta). Sem nenhum
+        valor diferente do gravado => ValidationError (nada é lançado).
+        """
+        invalidos = set(alteracoes) - set(self.CAMPOS_CORRIGIVEIS)
+        if invalidos:
+            raise ValidationError(f"Campos não corrigíveis: {', '.join(sorted(invalidos))}.")
+        return self._estornar(pesador, motivo, alteracoes)
+
+    @transaction.atomic
+    @em_lote_auditoria
+    def _estornar(self, pesador, motivo, alteracoes):
+        """
+        Sob a trava do ItemOP: relê a pesagem gravada, calcula o delta
+        (substituta − original), aplica-o ao acumulado num único UPDATE, acerta o
+        saldo dos lotes de MP e reavalia o status da OP. A pesagem original
+        não é tocada; o estorno é o registro imutável do valor anterior.
+        """
+        item = ItemOP.objects.select_for_update().select_related("materia_prima").get(pk=self.item_op_id)
+        original = Pesagem.objects.select_related("op").get(pk=self.pk)
+        if original.tipo == TipoLancamento.ESTORNO:
+            raise ValidationError("Estornos não podem ser corrigidos nem anulados.")
+        if Pesagem.objects.filter(estorno_de=original).exists():
+            raise ValidationError("Esta pesagem já foi estornada.")
+        if original.op.status == StatusOP.CANCELADA:
+            raise ValidationError("OP cancelada: pesagens não podem ser alteradas.")
+
+        if alteracoes is not None:
+            if "lote_mp" in alteracoes:
+                alteracoes["lote_mp"] = (alteracoes["lote_mp"] or "").strip()
+            if all(valor == getattr(original, campo) for campo, valor in alteracoes.items()):
+                raise ValidationError("Nenhuma alteração em relação à pesagem gravada.", code="sem_alteracao")
+
+        comuns = {"op_id": original.op_id, "item_op_id": item.pk, "pesador": pesador, "motivo": motivo}
+        substituta = None
+        delta = -original.liquido
+        if alteracoes is not None:
+            valores = {c: getattr(original, c) for c in self.CAMPOS_CORRIGIVEIS}
+            valores.update(alteracoes)
+            substituta = Pesagem(corrige=original, **comuns, **valores)
+            substituta.clean()
+            substituta.bruto = substituta.tara + substituta.liquido
+            delta += substituta.liquido
+            substituta._checar_tolerancia(
+                item, item.quantidade_pesada + delta,
+                f"{formatar(original.liquido)} g -> {formatar(substituta.liquido)} g",
+            )
+
+        # Estoque: devolve ao lote da original e baixa no da substituta
+        if original.lote_mp:
+            LoteMP.devolver(item.materia_prima_id, original.lote_mp, original.liquido)
+        if substituta and substituta.lote_mp:
+            LoteMP.baixar(item.materia_prima_id, substituta.lote_mp, substituta.liquido)
+
+        estorno = Pesagem(
+            tipo=TipoLancamento.ESTORNO, estorno_de=original, **comuns,
+            liquido=-original.liquido, tara=-original.tara, bruto=-original.bruto,
+            lote_mp=original.lote_mp, balanca_id=original.balanca_id,
+            codigo_interno=original.codigo_interno, parcial=original.parcial,
+        )
+        # lançamentos gravados direto: o acumulado recebe só o delta, abaixo
+        super(Pesagem, estorno).save()
+        estorno._registrar_evento("pesagem.estornada", item)
+        if substituta:
+            super(Pesagem, substituta).save()
+            substituta._registrar_evento("pesagem.criada", item)
+
+        ItemOP.objects.filter(pk=item.pk).update(quantidade_pesada=F("quantidade_pesada") + delta)
+        original.op.verificar_e_concluir()
+        return estorno, substituta
+
     def __str__(self):
         base = f"{self.item_op.materia_prima.nome} - OP {self.op.numero} (lote {self.op.lote})"
-        return f"{base} | MP {self.lote_mp}" if self.lote_mp else base
\ No newline at end of file
+        return f"{base} | MP {self.lote_mp}" if self.lote_mp else base
+
+# =========================
+# Arquivo (OPs encerradas)
+# =========================
+# Cópias somente-leitura de OPs concluídas/canceladas antigas, com seus itens e
+# pesagens. Os ids originais são preservados para manter a rastreabilidade.
+
+class OrdemProducaoArquivada(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    numero = models.CharField(max_length=50, unique=True)
+    produto = models.ForeignKey(Produto, on_delete=models.PROTECT, related_name="ops_arquivadas")
+    estrutura = models.ForeignKey(EstruturaProduto, on_delete=models.PROTECT, related_name="ops_arquivadas")
+    lote = models.CharField(max_length=50, unique=True)
+    status = models.CharField(max_length=20, choices=StatusOP.choices)
+    observacoes = models.TextField(blank=True, default="")
+    criada_em = models.DateTimeField()
+    concluida_em = models.DateTimeField(null=True, blank=True)
+    arquivada_em = models.DateTimeField(db_index=True)
+
+    class Meta:
+        ordering = ["-criada_em"]
+        verbose_name = "OP arquivada"
+        verbose_name_plural = "OPs arquivadas"
+
+    def __str__(self):
+        return f"OP {self.numero} (arquivada) - {self.produto} (lote {self.lote})"
+
+
+class ItemOPArquivado(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    op = models.ForeignKey(OrdemProducaoArquivada, on_delete=models.CASCADE, related_name="itens")
+    materia_prima = models.ForeignKey(MateriaPrima, on_delete=models.PROTECT, related_name="itens_op_arquivados")
+    quantidade_necessaria = models.BigIntegerField("quantidade necessária (mg)")
+    quantidade_pesada = models.BigIntegerField("quantidade pesada (mg)")
+    quantidade_minima = models.BigIntegerField("quantidade mínima (mg)", null=True, blank=True)
+    quantidade_maxima = models.BigIntegerField("quantidade máxima (mg)", null=True, blank=True)
+    unidade = models.CharField(max_length=10, choices=UnidadeMedida.choices, default=UnidadeMedida.G)
+
+    class Meta:
+        verbose_name = "Item de OP arquivado"
+        verbose_name_plural = "Itens de OP arquivados"
+
+    def __str__(self):
+        return (
+            f"OP {self.op.numero} - {self.materia_prima} "
+            f"({formatar(self.quantidade_pesada)}/{formatar(self.quantidade_necessaria)} g)"
+        )
+
+
+class PesagemArquivada(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    op = models.ForeignKey(OrdemProducaoArquivada, on_delete=models.CASCADE, related_name="pesagens")
+    item_op = models.ForeignKey(
+        ItemOPArquivado, on_delete=models.CASCADE, related_name="pesagens", null=True, blank=True
+    )
+    pesador = models.CharField(max_length=100)
+    data_hora = models.DateTimeField(db_index=True)
+    bruto = models.BigIntegerField("bruto (mg)")
+    tara = models.BigIntegerField("tara (mg)")
+    liquido = models.BigIntegerField("líquido (mg)")
+    balanca = models.ForeignKey(
+        Balanca, null=True, blank=True, on_delete=models.SET_NULL, related_name="pesagens_arquivadas"
+    )
+    codigo_interno = models.CharField(max_length=50, default='TEMP')
+    lote_mp = models.CharField("lote_MP", max_length=60, blank=True, default="", db_index=True)
+    parcial = models.BooleanField(default=False)
+    uuid_cliente = models.UUIDField(null=True, blank=True, unique=True)
+    capturada_em = models.DateTimeField(null=True, blank=True)
+    tipo = models.CharField(max_length=10, choices=TipoLancamento.choices, default=TipoLancamento.PESAGEM)
+    estorno_de = models.OneToOneField(
+        "self", null=True, blank=True, on_delete=models.SET_NULL, related_name="estorno"
+    )
+    corrige = models.ForeignKey(
+        "self", null=True, blank=True, on_delete=models.SET_NULL, related_name="correcoes"
+    )
+    motivo = models.CharField(max_length=200, blank=True, default="")
+
+    class Meta:
+        ordering = ["-data_hora"]
+        verbose_name = "Pesagem arquivada"
+        verbose_name_plural = "Pesagens arquivadas"
+
+    def __str__(self):
+        return f"Pesagem {self.pk} (arquivada) - OP {self.op_id}"
+
+
+# =========================
+# Idempotência (POST /pesagens/)
+# =========================
+
+class ChaveIdempotencia(models.Model):
+    """
+    Resposta original de um POST identificado pelo header Idempotency-Key.
+    `chave` = SHA-256 de "<usuário>:<endpoint>:<Idempotency-Key>" (64 hex, índice único).
+    Linhas expiradas são ignoradas e removidas por `manage.py limpar_idempotencia`.
+    """
+    chave = models.CharField(max_length=64, unique=True)
+    impressao = models.CharField(max_length=64, help_text="SHA-256 do corpo da requisição original.")
+    status_code = models.PositiveSmallIntegerField(default=0)  # 0 = em processamento
+    resposta = models.JSONField(null=True, blank=True)
+    criado_em = models.DateTimeField(auto_now_add=True)
+    expira_em = models.DateTimeField(db_index=True)
+
+    class Meta:
+        verbose_name = "Chave de idempotência"
+        verbose_name_plural = "Chaves de idempotência"
+
+    def __str__(self):
+        return f"{self.chave[:12]}… ({self.status_code})"
+
+
+# =========================
+# Outbox (eventos para ERP/MES)
+# =========================
+
+class EventoOutbox(models.Model):
+    """
+    Evento gravado na MESMA transação da mudança que o originou (Pesagem criada,
+    status da OP alterado). O id crescente define a ordem de entrega; cada
+    consumidor guarda em OffsetConsumidor o último id já entregue.
+    Sem FK para Pesagem/OP: eventos sobrevivem ao arquivamento.
+    """
+    tipo = models.CharField(max_length=50, db_index=True)
+    agregado = models.CharField(max_length=30)
+    agregado_id = models.BigIntegerField()
+    payload = models.JSONField()
+    criado_em = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        ordering = ["id"]
+        verbose_name = "Evento (outbox)"
+        verbose_name_plural = "Eventos (outbox)"
+
+    def __str__(self):
+        return f"#{self.pk} {self.tipo} {self.agregado}:{self.agregado_id}"
+
+    @classmethod
+    def registrar(cls, tipo, agregado, agregado_id, payload):
+        return cls.objects.create(tipo=tipo, agregado=agregado, agregado_id=agregado_id, payload=payload)
+
+
+class OffsetConsumidor(models.Model):
+    """Posição de cada consumidor do outbox (último evento entregue com sucesso)."""
+    consumidor = models.CharField(max_length=50, unique=True)
+    ultimo_id = models.BigIntegerField(default=0)
+    tentativas = models.PositiveIntegerField(default=0)  # falhas seguidas no lote atual
+    ultimo_erro = models.TextField(blank=True, default="")
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Offset de consumidor"
+        verbose_name_plural = "Offsets de consumidores"
+
+    def __str__(self):
+        return f"{self.consumidor} @ {self.ultimo_id}"
+
+
+# =========================
+# Impressão de etiquetas (ZPL/EPL direto, TCP 9100)
+# =========================
+
+class LinguagemImpressora(models.TextChoices):
+    ZPL = "zpl", "ZPL"
+    EPL = "epl", "EPL"
+
+
+class ImpressoraEtiqueta(models.Model):
+    """
+    Impressora térmica em rede (RAW/JetDirect). `estacao` é o posto de pesagem
+    que a usa — o mesmo nome de Balanca.localizacao, usado quando o pedido de
+    impressão não indica impressora nem estação.
+    """
+    nome = models.CharField(max_length=100, unique=True)
+    estacao = models.CharField(max_length=100, db_index=True)
+    endereco_ip = models.GenericIPAddressField()
+    porta = models.PositiveIntegerField(default=9100)
+    linguagem = models.CharField(max_length=3, choices=LinguagemImpressora.choices, default=LinguagemImpressora.ZPL)
+    ativo = models.BooleanField(default=True)
+    criado_em = models.DateTimeField(auto_now_add=True)
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["estacao", "nome"]
+        verbose_name = "Impressora de etiquetas"
+        verbose_name_plural = "Impressoras de etiquetas"
+
+    def __str__(self):
+        return f"{self.nome} ({self.estacao} - {self.endereco_ip}:{self.porta})"
+
+    @classmethod
+    def da_estacao(cls, estacao):
+        if not estacao:
+            return None
+        return cls.objects.filter(ativo=True, estacao__iexact=estacao.strip()).order_by("nome").first()
+
+
+class StatusImpressao(models.TextChoices):
+    PENDENTE = "pendente", "Pendente"
+    ENVIADO = "enviado", "Enviado"
+    FALHOU = "falhou", "Falhou"
+
+
+class TrabalhoImpressao(models.Model):
+    """
+    Etiqueta na fila do spooler (manage.py spooler_etiquetas). O conteúdo já vai
+    renderizado na linguagem da impressora no momento do pedido.
+    Sem FK para Pesagem: a fila sobrevive ao arquivamento.
+    """
+    impressora = models.ForeignKey(ImpressoraEtiqueta, on_delete=models.CASCADE, related_name="trabalhos")
+    pesagem_id = models.BigIntegerField(db_index=True)
+    linguagem = models.CharField(max_length=3, choices=LinguagemImpressora.choices)
+    conteudo = models.TextField()
+    status = models.CharField(max_length=10, choices=StatusImpressao.choices, default=StatusImpressao.PENDENTE)
+    tentativas = models.PositiveIntegerField(default=0)
+    proxima_tentativa = models.DateTimeField(default=timezone.now)
+    ultimo_erro = models.TextField(blank=True, default="")
+    solicitado_por = models.CharField(max_length=150, blank=True, default="")
+    criado_em = models.DateTimeField(auto_now_add=True)
+    enviado_em = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["id"]
+        indexes = [models.Index(fields=["status", "proxima_tentativa"], name="trabalho_fila_idx")]
+        verbose_name = "Trabalho de impressão"
+        verbose_name_plural = "Trabalhos de impressão"
+
+    def __str__(self):
+        return f"#{self.pk} pesagem {self.pesagem_id} -> {self.impressora_id} ({self.status})"
+
+
+# =========================
+# Tarefas em segundo plano (fila no banco)
+# =========================
+
+class StatusTarefa(models.TextChoices):
+    PENDENTE = "pendente", "Pendente"
+    EXECUTANDO = "executando", "Executando"
+    CONCLUIDA = "concluida", "Concluída"
+    FALHOU = "falhou", "Falhou"
+    CANCELADA = "cancelada", "Cancelada"
+
+
+class Tarefa(models.Model):
+    """
+    Operação longa (PDF em lote, importação, relatório) executada fora da
+    requisição por `manage.py worker_tarefas`. `tipo` é a chave no registro de
+    registro/tarefas.py; maior `prioridade` sai primeiro. O resultado fica em
+    `resultado` (JSON) e, quando há arquivo gerado, em `arquivo`.
+    """
+    tipo = models.CharField(max_length=50, db_index=True)
+    parametros = models.JSONField(default=dict, blank=True)
+    prioridade = models.SmallIntegerField(default=0)
+    status = models.CharField(max_length=10, choices=StatusTarefa.choices, default=StatusTarefa.PENDENTE)
+    tentativas = models.PositiveIntegerField(default=0)
+    max_tentativas = models.PositiveIntegerField(default=3)
+    proxima_tentativa = models.DateTimeField(default=timezone.now)
+    resultado = models.JSONField(null=True, blank=True)
+    arquivo = models.FileField(upload_to="tarefas/%Y/%m/", blank=True, default="")
+    erro = models.TextField(blank=True, default="")
+    solicitado_por = models.CharField(max_length=150, blank=True, default="")
+    executor = models.CharField(max_length=100, blank=True, default="")  # host:pid do worker
+    criada_em = models.DateTimeField(auto_now_add=True)
+    iniciada_em = models.DateTimeField(null=True, blank=True)
+    # heartbeat: renovado pelo worker durante a execução (registro/tarefas.py)
+    ultimo_sinal = models.DateTimeField(null=True, blank=True)
+    concluida_em = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-id"]
+        indexes = [models.Index(fields=["status", "-prioridade", "id"], name="tarefa_fila_idx")]
+        verbose_name = "Tarefa"
+        verbose_name_plural = "Tarefas"
+
+    def __str__(self):
+        return f"#{self.pk} {self.tipo} ({self.status})"
+
+
+# =========================
+# Auditoria (trilha encadeada, somente inclusão)
+# =========================
+# Cada criação/correção/anulação de Pesagem, criação/alteração de ItemOP e mudança de
+# status de OP gera um RegistroAuditoria na MESMA transação. O hash de cada registro
+# cobre o conteúdo e o hash do anterior (SHA-256): alterar, apagar ou reordenar
+# qualquer registro quebra a cadeia a partir dali (ver registro/auditoria.py).
+# Sem FK para Pesagem/ItemOP/OP: a trilha sobrevive ao arquivamento.
+
+HASH_INICIAL = "0" * 64
+
+
+def hash_auditoria(hash_anterior, seq, criado_em, entidade, entidade_id, acao, usuario, dados):
+    """SHA-256 de hash_anterior + serialização canônica do registro."""
+    conteudo = json.dumps(
+        [seq, criado_em.isoformat(), entidade, entidade_id, acao, usuario, dados],
+        sort_keys=True, separators=(",", ":"), ensure_ascii=False,
+    )
+    return hashlib.sha256((hash_anterior + conteudo).encode()).hexdigest()
+
+
+class CadeiaAuditoria(models.Model):
+    """Cabeça da cadeia (linha única): travada a cada inclusão, serializa os elos."""
+    ultimo_seq = models.BigIntegerField(default=0)
+    ultimo_hash = models.CharField(max_length=64, default=HASH_INICIAL)
+
+    class Meta:
+        verbose_name = "Cabeça da cadeia de auditoria"
+
+
+class RegistroAuditoria(models.Model):
+    seq = models.BigIntegerField(primary_key=True)
+    criado_em = models.DateTimeField()
+    entidade = models.CharField(max_length=30)
+    entidade_id = models.BigIntegerField()
+    acao = models.CharField(max_length=50)
+    usuario = models.CharField(max_length=150, blank=True, default="")
+    dados = models.JSONField()
+    hash_anterior = models.CharField(max_length=64)
+    hash = models.CharField(max_length=64)
+
+    class Meta:
+        ordering = ["seq"]
+        indexes = [models.Index(fields=["entidade", "entidade_id"])]
+        verbose_name = "Registro de auditoria"
+        verbose_name_plural = "Registros de auditoria"
+
+    def __str__(self):
+        return f"#{self.seq} {self.entidade}:{self.entidade_id} {self.acao}"
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValidationError("Registros de auditoria não podem ser alterados.")
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValidationError("Registros de auditoria não podem ser apagados.")
+
+    @classmethod
+    def registrar(cls, entidade, entidade_id, acao, dados, usuario=""):
+        """Inclui na cadeia (ou no lote aberto por `em_lote_auditoria`)."""
+        # JSON canônico: o que é gravado é exatamente o que será relido e re-hasheado
+        dados = json.loads(json.dumps(dados, cls=DjangoJSONEncoder))
+        registro = (entidade, entidade_id, acao, usuario or "", dados)
+        pendentes = getattr(_auditoria_local, "pendentes", None)
+        if pendentes is not None:
+            pendentes.append(registro)
+        else:
+            cls._gravar([registro])
+
+    @classmethod
+    @transaction.atomic(savepoint=False)
+    def _gravar(cls, registros):
+        # a cabeça travada serializa quem inclui: cada elo vê o hash do anterior
+        cabeca = CadeiaAuditoria.objects.select_for_update().filter(pk=1).first()
+        if cabeca is None:
+            # semeada na migração 0018; só falta após um flush. get_or_create absorve
+            # o IntegrityError de quem a criar ao mesmo tempo, e então trava a linha.
+            CadeiaAuditoria.objects.get_or_create(pk=1)
+            cabeca = CadeiaAuditoria.objects.select_for_update().get(pk=1)
+        agora = timezone.now()
+        novos = []
+        seq, anterior = cabeca.ultimo_seq, cabeca.ultimo_hash
+        for entidade, entidade_id, acao, usuario, dados in registros:
+            seq += 1
+            atual = hash_auditoria(anterior, seq, agora, entidade, entidade_id, acao, usuario, dados)
+            novos.append(cls(
+                seq=seq, criado_em=agora, entidade=entidade, entidade_id=entidade_id, acao=acao,
+                usuario=usuario, dados=dados, hash_anterior=anterior, hash=atual,
+            ))
+            anterior = atual
+        cls.objects.bulk_create(novos)
+        CadeiaAuditoria.objects.filter(pk=1).update(ultimo_seq=seq, ultimo_hash=anterior)
@@ -0,0 +1,139 @@
+"""
+Relay do outbox de eventos (EventoOutbox) para sistemas externos (ERP/MES).
+
+Cada consumidor configurado em settings.REGISTRO_OUTBOX_CONSUMIDORES tem um sink
+e um offset próprio (OffsetConsumidor). O relay lê os eventos com id > offset
+em ordem, entrega em lotes e só avança o offset depois que o sink confirma.
+Falha no lote => offset parado e o mesmo lote é reenviado depois (entrega
+pelo menos uma vez, em ordem; o destino deduplica pelo `id` do evento).
+
+    REGISTRO_OUTBOX_CONSUMIDORES = {
+        "erp": {"sink": "registro.outbox.SinkWebhook", "opcoes": {"url": "http://erp/eventos"}},
+        "arquivo": {"sink": "registro.outbox.SinkArquivo", "opcoes": {"caminho": "/var/log/pesagens.ndjson"}},
+    }
+
+Para fila de mensagens, basta um sink próprio (qualquer classe com
+`enviar(eventos)`) apontado pelo caminho em "sink".
+"""
+import json
+import urllib.error
+import urllib.request
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+from rest_framework.utils.encoders import JSONEncoder
+
+from .models import EventoOutbox, OffsetConsumidor
+
+LOTE_PADRAO = 100
+
+
+def serializar_evento(evento):
+    return {
+        "id": evento.pk,
+        "tipo": evento.tipo,
+        "agregado": evento.agregado,
+        "agregado_id": evento.agregado_id,
+        "criado_em": evento.criado_em.isoformat(),
+        "payload": evento.payload,
+    }
+
+
+class ErroEntrega(Exception):
+    pass
+
+
+# ---------- Sinks ----------
+
+class SinkArquivo:
+    """Acrescenta uma linha JSON por evento (NDJSON) em `caminho`."""
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+
+    def enviar(self, eventos):
+        linhas = "".join(json.dumps(e, cls=JSONEncoder, ensure_ascii=False) + "\n" for e in eventos)
+        with open(self.caminho, "a", encoding="utf-8") as f:
+            f.write(linhas)
+            f.flush()
+
+
+class SinkWebhook:
+    """POST {"eventos": [...]} em `url`. Qualquer resposta fora de 2xx é falha do lote."""
+
+    def __init__(self, url, timeout=10, headers=None):
+        self.url = url
+        self.timeout = timeout
+        self.headers = {"Content-Type": "application/json", **(headers or {})}
+
+    def enviar(self, eventos):
+        corpo = json.dumps({"eventos": eventos}, cls=JSONEncoder, ensure_ascii=False).encode("utf-8")
+        req = urllib.request.Request(self.url, data=corpo, headers=self.headers, method="POST")
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+                if not 200 <= resp.status < 300:
+                    raise ErroEntrega(f"HTTP {resp.status}")
+        except urllib.error.HTTPError as e:
+            raise ErroEntrega(f"HTTP {e.code}") from e
+        except (urllib.error.URLError, OSError) as e:
+            raise ErroEntrega(str(e)) from e
+
+
+# ---------- Relay ----------
+
+def consumidores():
+    return getattr(settings, "REGISTRO_OUTBOX_CONSUMIDORES", {})
+
+
+def criar_sink(nome):
+    conf = consumidores().get(nome)
+    if conf is None:
+        raise KeyError(f"Consumidor de outbox não configurado: {nome}")
+    return import_string(conf["sink"])(**conf.get("opcoes", {}))
+
+
+def entregar_lote(consumidor, sink, lote=LOTE_PADRAO):
+    """
+    Entrega o próximo lote de eventos ao sink. Retorna quantos eventos foram
+    confirmados (0 = nada pendente). Em falha registra o erro e relança ErroEntrega.
+    """
+    offset, _ = OffsetConsumidor.objects.get_or_create(consumidor=consumidor)
+    eventos = list(EventoOutbox.objects.filter(pk__gt=offset.ultimo_id).order_by("id")[:lote])
+    if not eventos:
+        return 0
+
+    try:
+        sink.enviar([serializar_evento(e) for e in eventos])
+    except Exception as e:
+        OffsetConsumidor.objects.filter(pk=offset.pk).update(
+            tentativas=offset.tentativas + 1, ultimo_erro=str(e)[:2000]
+        )
+        if isinstance(e, ErroEntrega):
+            raise
+        raise ErroEntrega(str(e)) from e
+
+    with transaction.atomic():
+        # só avança (nunca recua) — dois relays do mesmo consumidor não retrocedem o offset
+        OffsetConsumidor.objects.filter(pk=offset.pk, ultimo_id__lt=eventos[-1].pk).update(
+            ultimo_id=eventos[-1].pk, tentativas=0, ultimo_erro=""
+        )
+    return len(eventos)
+
+
+def pendentes(consumidor):
+    ultimo = (
+        OffsetConsumidor.objects.filter(consumidor=consumidor).values_list("ultimo_id", flat=True).first() or 0
+    )
+    return EventoOutbox.objects.filter(pk__gt=ultimo).count()
+
+
+def limpar_entregues():
+    """Remove eventos já entregues a TODOS os consumidores configurados."""
+    nomes = list(consumidores())
+    if not nomes:
+        return 0
+    offsets = dict(OffsetConsumidor.objects.filter(consumidor__in=nomes).values_list("consumidor", "ultimo_id"))
+    minimo = min(offsets.get(n, 0) for n in nomes)
+    apagados, _ = EventoOutbox.objects.filter(pk__lte=minimo).delete()
+    return apagados
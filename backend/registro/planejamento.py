@@ -0,0 +1,170 @@
+"""
+Plano de pesagem de uma OP: escolhe a balança de cada item pendente e divide
+quantidades maiores que a capacidade em N pesagens.
+
+Regras (quantidades em mg, expostas em g; Balanca.capacidade_maxima/divisao em kg):
+- só balanças ativas com capacidade e divisão cadastradas;
+- N = menor nº de pesagens em que cada fração cabe na capacidade;
+- resolução: o erro acumulado de arredondamento (N × divisão) não pode passar
+  de 1/FATOR_RESOLUCAO da janela de tolerância do item (máx − mín);
+- carga mínima: cada fração ≥ CARGA_MINIMA_DIVISOES × divisão (abaixo disso a
+  leitura é pouco confiável);
+- entre as candidatas: menos pesagens, depois menor carga (pesagens na última
+  hora + itens já atribuídos neste plano), depois menor capacidade (deixa as
+  grandes livres e tem melhor resolução).
+
+O plano fica em cache por OP e é invalidado por sinais quando itens/pesagens
+da OP ou o cadastro de balanças mudam (ver registro/signals.py).
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, F
+from django.utils import timezone
+
+from .massa import MG_POR_KG, aplicar_fracao, formatar
+from .models import Balanca, ItemOP, Pesagem
+
+FATOR_RESOLUCAO = 3
+CARGA_MINIMA_DIVISOES = 20
+JANELA_CARGA = timedelta(hours=1)
+
+CACHE_PREFIXO = "registro:plano:"
+CACHE_VERSAO_BALANCAS = "registro:plano:balancas"
+
+
+def _timeout():
+    return getattr(settings, "REGISTRO_PLANO_CACHE_TIMEOUT", 300)
+
+
+def _versao_balancas():
+    versao = cache.get(CACHE_VERSAO_BALANCAS)
+    if versao is None:
+        versao = 1
+        cache.set(CACHE_VERSAO_BALANCAS, versao, None)
+    return versao
+
+
+def _chave(op_id):
+    return f"{CACHE_PREFIXO}{op_id}:{_versao_balancas()}"
+
+
+def invalidar_plano(op_id):
+    cache.delete(_chave(op_id))
+
+
+def invalidar_planos():
+    """Cadastro de balanças mudou: todos os planos ficam obsoletos."""
+    try:
+        cache.incr(CACHE_VERSAO_BALANCAS)
+    except ValueError:
+        cache.set(CACHE_VERSAO_BALANCAS, 2, None)
+
+
+# ---------- cálculo ----------
+
+def _fracoes(total, capacidade, divisao):
+    """Divide `total` (mg) em N frações ≤ capacidade, múltiplas da divisão (a última leva o resto)."""
+    n = max(1, -(-total // capacidade))
+    while True:
+        base = total // n // divisao * divisao
+        fracoes = [base] * (n - 1) + [total - base * (n - 1)]
+        if fracoes[-1] <= capacidade:
+            return fracoes
+        n += 1
+
+
+def _avaliar(restante, janela, balanca):
+    capacidade = aplicar_fracao(MG_POR_KG, balanca["capacidade_maxima"])
+    divisao = max(aplicar_fracao(MG_POR_KG, balanca["divisao"]), 1)
+    fracoes = _fracoes(restante, capacidade, divisao)
+    n = len(fracoes)
+    if n * divisao * FATOR_RESOLUCAO > janela:
+        return None, "resolução insuficiente para a tolerância"
+    if min(fracoes) < CARGA_MINIMA_DIVISOES * divisao:
+        return None, "quantidade abaixo da carga mínima"
+    return fracoes, None
+
+
+def _carga_atual(balanca_ids, agora):
+    return dict(
+        Pesagem.objects
+        .filter(balanca_id__in=balanca_ids, data_hora__gte=agora - JANELA_CARGA)
+        .values("balanca_id")
+        .annotate(n=Count("id"))
+        .values_list("balanca_id", "n")
+    )
+
+
+def calcular_plano(op):
+    agora = timezone.now()
+    itens = list(
+        ItemOP.objects
+        .filter(op=op, quantidade_pesada__lt=F("quantidade_necessaria"))
+        .select_related("materia_prima")
+        .order_by("-quantidade_necessaria", "id")  # itens grandes escolhem primeiro
+    )
+    balancas = list(
+        Balanca.objects
+        .filter(ativo=True, capacidade_maxima__gt=0, divisao__gt=0)
+        .values("id", "nome", "identificador", "capacidade_maxima", "divisao")
+    )
+    carga = _carga_atual([b["id"] for b in balancas], agora)
+    carga = {b["id"]: carga.get(b["id"], 0) for b in balancas}
+
+    plano_itens = []
+    for item in itens:
+        restante = item.quantidade_necessaria - item.quantidade_pesada
+        janela = item.quantidade_maxima_permitida - item.quantidade_minima_permitida
+        candidatas, motivos = [], set()
+        for b in balancas:
+            fracoes, motivo = _avaliar(restante, janela, b)
+            if fracoes is None:
+                motivos.add(motivo)
+                continue
+            candidatas.append((len(fracoes), carga[b["id"]], b["capacidade_maxima"], b["id"], b, fracoes))
+
+        entrada = {
+            "item_op_id": item.pk,
+            "materia_prima": {
+                "id": item.materia_prima_id,
+                "nome": item.materia_prima.nome,
+                "codigo_interno": item.materia_prima.codigo_interno,
+            },
+            "restante_g": formatar(restante),
+            "faixa_g": [formatar(item.quantidade_minima_permitida), formatar(item.quantidade_maxima_permitida)],
+            "balanca": None,
+            "pesagens": 0,
+            "fracoes_g": [],
+            "motivo": None,
+        }
+        if candidatas:
+            n, _, _, _, b, fracoes = min(candidatas, key=lambda c: c[:4])
+            carga[b["id"]] += n
+            entrada.update(
+                balanca={k: b[k] for k in ("id", "nome", "identificador", "capacidade_maxima", "divisao")},
+                pesagens=n,
+                fracoes_g=[formatar(f) for f in fracoes],
+            )
+        else:
+            entrada["motivo"] = "; ".join(sorted(motivos)) if motivos else "nenhuma balança ativa com capacidade/divisão cadastradas"
+        plano_itens.append(entrada)
+
+    return {
+        "op_id": op.pk,
+        "gerado_em": agora,
+        "itens": plano_itens,
+        "carga_balancas": carga,
+    }
+
+
+def obter_plano(op, recalcular=False):
+    chave = _chave(op.pk)
+    if not recalcular:
+        plano = cache.get(chave)
+        if plano is not None:
+            return plano
+    plano = calcular_plano(op)
+    cache.set(chave, plano, _timeout())
+    return plano
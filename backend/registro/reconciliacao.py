@@ -0,0 +1,104 @@
+"""
+Reconciliação de acumulados.
+
+ItemOP.quantidade_pesada é um total corrente mantido por F() em Pesagem.save;
+edições, exclusões e ajustes manuais no admin podem fazê-lo divergir da soma
+das pesagens. Aqui o total é recalculado por blocos de OPs (uma query agrupada
+SUM(liquido) por bloco), só os itens divergentes são gravados (bulk_update) e
+o status dessas OPs é reavaliado.
+"""
+from django.db import transaction
+from django.db.models import Sum
+
+from .massa import formatar
+from .models import ItemOP, OrdemProducao, Pesagem, RegistroAuditoria, em_lote_auditoria
+from .planejamento import invalidar_plano
+from .sinteticos import reavaliar_status
+
+LOTE_PADRAO = 2000
+
+
+def _blocos_de_ops(lote, op_ids=None):
+    qs = OrdemProducao.objects.order_by("pk").values_list("pk", flat=True)
+    if op_ids:
+        qs = qs.filter(pk__in=op_ids)
+    ultimo = 0
+    while True:
+        bloco = list(qs.filter(pk__gt=ultimo)[:lote])
+        if not bloco:
+            return
+        yield bloco
+        if len(bloco) < lote:
+            return
+        ultimo = bloco[-1]
+
+
+def _corrigir(divergentes):
+    """Grava os itens divergentes, reavalia o status das OPs e registra as mudanças (outbox/auditoria)."""
+    op_ids = sorted({item.op_id for item, _ in divergentes})
+    antes = dict(OrdemProducao.objects.filter(pk__in=op_ids).order_by().values_list("pk", "status"))
+    with transaction.atomic(), em_lote_auditoria:
+        ItemOP.objects.bulk_update([item for item, _ in divergentes], ["quantidade_pesada"], batch_size=500)
+        for item, gravado in divergentes:
+            RegistroAuditoria.registrar("item_op", item.pk, "item_op.reconciliado", {
+                "op_id": item.op_id, "gravado_mg": gravado, "calculado_mg": item.quantidade_pesada,
+            })
+        reavaliar_status(op_ids)
+        alteradas = [
+            op for op in OrdemProducao.objects.filter(pk__in=op_ids).order_by()
+            if op.status != antes[op.pk]
+        ]
+        for op in alteradas:
+            op.registrar_mudanca_status(antes[op.pk])
+    for op_id in op_ids:
+        invalidar_plano(op_id)
+    return len(alteradas)
+
+
+def reconciliar(lote=LOTE_PADRAO, op_ids=None, corrigir=True, progresso=None):
+    """
+    Recalcula ItemOP.quantidade_pesada = SUM(pesagens.liquido) em blocos de `lote` OPs.
+
+    corrigir=False só mede. Retorna um resumo com os itens divergentes
+    (item, OP, gravado, calculado, desvio em mg).
+    """
+    resumo = {"ops": 0, "itens": 0, "divergentes": [], "desvio_total_mg": 0, "status_alterados": 0}
+    for bloco in _blocos_de_ops(lote, op_ids):
+        somas = dict(
+            Pesagem.objects
+            .filter(op_id__in=bloco)
+            .values("item_op")
+            .annotate(total=Sum("liquido"))
+            .values_list("item_op", "total")
+        )
+        itens = ItemOP.objects.filter(op_id__in=bloco).values_list("pk", "op_id", "quantidade_pesada")
+        divergentes = []
+        for pk, op_id, gravado in itens:
+            resumo["itens"] += 1
+            calculado = somas.get(pk) or 0
+            if gravado == calculado:
+                continue
+            resumo["divergentes"].append({
+                "item_op_id": pk,
+                "op_id": op_id,
+                "gravado_mg": gravado,
+                "calculado_mg": calculado,
+                "desvio_mg": gravado - calculado,
+            })
+            resumo["desvio_total_mg"] += abs(gravado - calculado)
+            divergentes.append((ItemOP(pk=pk, op_id=op_id, quantidade_pesada=calculado), gravado))
+
+        resumo["ops"] += len(bloco)
+        if divergentes and corrigir:
+            resumo["status_alterados"] += _corrigir(divergentes)
+        if progresso:
+            progresso(resumo)
+    return resumo
+
+
+def descrever(divergencia):
+    return (
+        f"ItemOP {divergencia['item_op_id']} (OP {divergencia['op_id']}): "
+        f"gravado {formatar(divergencia['gravado_mg'])} g, soma das pesagens "
+        f"{formatar(divergencia['calculado_mg'])} g (desvio {formatar(divergencia['desvio_mg'])} g)"
+    )
@@ -0,0 +1,50 @@
+"""
+Renderer/parser JSON da API com orjson (registrados em REST_FRAMEWORK).
+
+Saída idêntica à do JSONRenderer do DRF (compacta, UTF-8, \\u2028/\\u2029
+escapados): datetime em ISO 8601 com "Z" para UTC, Decimal como número,
+chaves não-texto convertidas; o resto (lazy strings, timedelta, querysets,
+geradores...) passa pelo JSONEncoder do DRF. Pedidos com indentação
+(`Accept: application/json; indent=4`, API navegável) usam o renderer padrão.
+"""
+import orjson
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+OPCOES = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+_encoder = JSONEncoder()
+
+
+def _padrao(obj):
+    return _encoder.default(obj)
+
+
+class OrjsonRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+        ret = orjson.dumps(data, default=_padrao, option=OPCOES)
+        # JSON como subconjunto estrito de JavaScript (mesmo escape do DRF)
+        if b"\xe2\x80\xa8" in ret or b"\xe2\x80\xa9" in ret:
+            ret = ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
+        return ret
+
+
+class OrjsonParser(JSONParser):
+    renderer_class = OrjsonRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get("encoding", settings.DEFAULT_CHARSET)
+        corpo = stream.read() if stream is not None else b""
+        try:
+            if encoding.lower().replace("-", "") != "utf8":
+                corpo = corpo.decode(encoding)
+            return orjson.loads(corpo)
+        except (orjson.JSONDecodeError, UnicodeDecodeError) as exc:
+            raise ParseError("JSON parse error - %s" % str(exc))
@@ -0,0 +1,119 @@
+"""
+Lista de separação consolidada: total restante (g) de cada MP para um conjunto
+de OPs, numa única query agrupada por matéria-prima.
+
+Seleção das OPs (combináveis): ids explícitos, status (padrão: aberta e em
+andamento) e intervalo de criação (de/ate, datas locais inclusivas).
+"""
+import io
+import json
+from datetime import datetime, time, timedelta
+
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+
+from .massa import formatar, formatar_ptbr
+from .models import ItemOP, OrdemProducao, StatusOP
+
+STATUS_PADRAO = (StatusOP.ABERTA, StatusOP.EM_ANDAMENTO)
+
+
+def _inicio_do_dia(data):
+    return timezone.make_aware(datetime.combine(data, time.min), timezone.get_current_timezone())
+
+
+def selecionar_ops(ids=None, status=None, de=None, ate=None):
+    qs = OrdemProducao.objects.filter(status__in=status or STATUS_PADRAO)
+    if ids:
+        qs = qs.filter(pk__in=ids)
+    if de:
+        qs = qs.filter(criada_em__gte=_inicio_do_dia(de))
+    if ate:
+        qs = qs.filter(criada_em__lt=_inicio_do_dia(ate + timedelta(days=1)))
+    return qs
+
+
+def consolidar(ops):
+    """Uma linha por MP: restante (mg, SUM inteiro), nº de itens e de OPs que a pedem."""
+    return (
+        ItemOP.objects
+        .filter(op__in=ops.values("pk"), quantidade_pesada__lt=F("quantidade_necessaria"))
+        .values("materia_prima_id", "materia_prima__codigo_interno", "materia_prima__nome")
+        .annotate(
+            restante_mg=Sum(F("quantidade_necessaria") - F("quantidade_pesada")),
+            itens=Count("id"),
+            ops=Count("op", distinct=True),
+        )
+        .order_by("materia_prima__codigo_interno")
+    )
+
+
+def _linha(row):
+    return {
+        "materia_prima_id": row["materia_prima_id"],
+        "codigo_interno": row["materia_prima__codigo_interno"],
+        "nome": row["materia_prima__nome"],
+        "restante_g": formatar(row["restante_mg"]),
+        "itens": row["itens"],
+        "ops": row["ops"],
+    }
+
+
+def gerar_json(linhas, filtros):
+    """Gera o JSON em pedaços (uma MP por vez) para StreamingHttpResponse."""
+    yield '{"filtros": ' + json.dumps(filtros, ensure_ascii=False) + ', "itens": ['
+    for i, row in enumerate(linhas.iterator()):
+        yield ("," if i else "") + json.dumps(_linha(row), ensure_ascii=False)
+    yield "]}"
+
+
+def gerar_pdf(linhas, titulo):
+    """Lista de separação para impressão (A4, colunas: código, MP, OPs, restante, conferência)."""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+
+    buffer = io.BytesIO()
+    p = canvas.Canvas(buffer, pagesize=A4)
+    largura, altura = A4
+    margem = 40
+    colunas = (margem, margem + 90, margem + 330, margem + 380)  # código, MP, OPs, restante
+    y = altura - margem
+
+    def cabecalho():
+        nonlocal y
+        p.setFont("Helvetica-Bold", 13)
+        p.drawString(margem, y, titulo)
+        y -= 16
+        p.setFont("Helvetica", 8)
+        p.drawString(margem, y, f"Gerado em {timezone.localtime().strftime('%d/%m/%Y %H:%M')}")
+        y -= 20
+        p.setFont("Helvetica-Bold", 9)
+        for x, txt in zip(colunas, ("Código", "Matéria-prima", "OPs", "Restante")):
+            p.drawString(x, y, txt)
+        p.drawString(largura - margem - 40, y, "Conf.")
+        y -= 6
+        p.line(margem, y, largura - margem, y)
+        y -= 12
+
+    cabecalho()
+    total_mps = 0
+    for row in linhas.iterator():
+        if y < margem + 20:
+            p.showPage()
+            y = altura - margem
+            cabecalho()
+        p.setFont("Helvetica", 9)
+        p.drawString(colunas[0], y, str(row["materia_prima__codigo_interno"])[:16])
+        p.drawString(colunas[1], y, str(row["materia_prima__nome"])[:45])
+        p.drawRightString(colunas[2] + 25, y, str(row["ops"]))
+        p.drawString(colunas[3], y, formatar_ptbr(row["restante_mg"]))
+        p.rect(largura - margem - 35, y - 2, 10, 10)
+        y -= 16
+        total_mps += 1
+
+    p.setFont("Helvetica-Bold", 9)
+    p.drawString(margem, max(y - 6, margem), f"Total de matérias-primas: {total_mps}")
+    p.showPage()
+    p.save()
+    buffer.seek(0)
+    return buffer
@@ -1,32 +1,288 @@
 # serializers.py
 
+from django.core.exceptions import FieldDoesNotExist, ValidationError as DjangoValidationError
+from django.db import transaction
+from django.db.models import Exists, Prefetch
+from django.urls import reverse
 from rest_framework import serializers
 from .models import (
     Produto, MateriaPrima, Balanca,
     EstruturaProduto, ItemEstrutura,
-    OrdemProducao, ItemOP, Pesagem
+    OrdemProducao, ItemOP, Pesagem,
+    RegraTolerancia,
+    OrdemProducaoArquivada, ItemOPArquivado, PesagemArquivada,
+    LoteMP, ImpressoraEtiqueta, TrabalhoImpressao, Tarefa
 )
+from .massa import Massa, formatar
+
+# ============== Massa (mg <-> g/kg) ==============
+
+class MassaField(serializers.Field):
+    """
+    Coluna inteira em mg exposta como texto decimal em `unidade` ("1234.567" g).
+    `unidade_entrada` permite receber em outra unidade (ex.: líquido digitado em kg,
+    devolvido em g). Conversão só com inteiros/texto, sem Decimal.
+    """
+    default_error_messages = {"invalid": "Informe um número válido ({detalhe})."}
+
+    def __init__(self, unidade="g", unidade_entrada=None, **kwargs):
+        self.unidade = unidade
+        self.unidade_entrada = unidade_entrada or unidade
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        return formatar(value, self.unidade)
+
+    def to_internal_value(self, data):
+        try:
+            return Massa.de(data, self.unidade_entrada)
+        except (TypeError, ValueError) as e:
+            self.fail("invalid", detalhe=str(e))
+
+# ============== Campos esparsos / expansão (?fields= / ?expand=) ==============
+#
+#   GET /api/registro/pesagens/?fields=id,liquido,op.numero&expand=op
+#   GET /api/registro/ops/?expand=produto        (estrutura volta só como id)
+#
+# `fields` escolhe os campos devolvidos; com ponto, dentro de uma relação
+# expandida ("op.numero"). `expand` lista as relações aninhadas a embutir
+# ("op", "op.produto"); as demais viram o id (ou a lista de ids). Sem os
+# parâmetros, cada serializer devolve o aninhamento de sempre (ou o padrão
+# que a view puser em context["expand"]).
+# otimizar_consulta() usa o mesmo recorte para montar select_related,
+# Prefetch e only(). Campos que não são colunas (properties, métodos)
+# declaram o que leem em Meta.dependencias; sem declaração, a tabela
+# inteira daquele nível é carregada.
+
+def arvore_campos(texto):
+    """'id,op.numero,op.produto' -> {"id": {}, "op": {"numero": {}, "produto": {}}}."""
+    raiz = {}
+    for caminho in (texto or "").split(","):
+        no = raiz
+        for nome in filter(None, (p.strip() for p in caminho.split("."))):
+            no = no.setdefault(nome, {})
+    return raiz
+
+def _parametros_selecao(contexto):
+    """(fields, expand) da requisição; `expand` no contexto é o padrão da view (ex.: "" = tudo como id)."""
+    request = contexto.get("request")
+    params = request.query_params if request is not None else {}
+    return params.get("fields"), params.get("expand", contexto.get("expand"))
+
+def _no(arvore, caminho):
+    for nome in caminho:
+        arvore = arvore.get(nome, {})
+    return arvore
+
+def _recolhido(campo):
+    kwargs = {"read_only": True}
+    if campo.source and campo.source != campo.field_name:
+        kwargs["source"] = campo.source
+    return serializers.PrimaryKeyRelatedField(many=isinstance(campo, serializers.ListSerializer), **kwargs)
+
+class CamposDinamicosMixin:
+    """Recorta os campos e o aninhamento conforme ?fields= / ?expand= da requisição (ver acima)."""
+
+    def get_fields(self):
+        fields = super().get_fields()
+        texto_campos, texto_expandir = _parametros_selecao(self.context)
+        if texto_campos is None and texto_expandir is None:
+            return fields
+
+        caminho, atual = [], self
+        while atual.parent is not None:
+            if atual.field_name:
+                caminho.append(atual.field_name)
+            atual = atual.parent
+        caminho.reverse()
+        prefixo = "".join(f"{c}." for c in caminho)
+
+        campos = _no(arvore_campos(texto_campos), caminho)
+        if campos:
+            legiveis = {n for n, f in fields.items() if not f.write_only}
+            desconhecidos = sorted(set(campos) - legiveis)
+            if desconhecidos:
+                raise serializers.ValidationError(
+                    {"fields": f"Campo(s) desconhecido(s): {', '.join(prefixo + d for d in desconhecidos)}."}
+                )
+            fields = {n: f for n, f in fields.items() if n in campos or f.write_only}
+
+        if texto_expandir is not None:
+            expandir = _no(arvore_campos(texto_expandir), caminho)
+            aninhados = {n for n, f in fields.items() if isinstance(f, serializers.BaseSerializer)}
+            desconhecidos = sorted(set(expandir) - aninhados)
+            if desconhecidos:
+                raise serializers.ValidationError(
+                    {"expand": f"Relação(ões) não expansível(is): {', '.join(prefixo + d for d in desconhecidos)}."}
+                )
+            for nome in aninhados - set(expandir):
+                fields[nome] = _recolhido(fields[nome])
+        return fields
+
+class _PlanoConsulta:
+    def __init__(self):
+        self.colunas, self.select, self.prefetch = set(), set(), []
+
+    def aplicar(self, queryset):
+        queryset = queryset.select_related(None).prefetch_related(None)
+        if self.select:
+            queryset = queryset.select_related(*sorted(self.select))
+        if self.prefetch:
+            queryset = queryset.prefetch_related(*self.prefetch)
+        return queryset.only(*sorted(self.colunas))
+
+def _todas_colunas(model, prefixo, plano):
+    plano.colunas.update(prefixo + f.name for f in model._meta.concrete_fields)
+
+def _planejar(serializer, model, prefixo, plano):
+    if isinstance(serializer, serializers.ListSerializer):
+        serializer = serializer.child
+    dependencias = getattr(getattr(serializer, "Meta", None), "dependencias", {})
+    plano.colunas.add(prefixo + model._meta.pk.name)
+    for campo in serializer.fields.values():
+        if campo.write_only:
+            continue
+        if campo.field_name in dependencias:
+            for dep in dependencias[campo.field_name]:
+                if not _incluir(model, dep.split("__"), prefixo, plano):
+                    _todas_colunas(model, prefixo, plano)
+        elif campo.source == "*" or not _incluir(model, campo.source_attrs, prefixo, plano, campo):
+            _todas_colunas(model, prefixo, plano)
+
+def _incluir(model, attrs, prefixo, plano, campo=None):
+    """Registra no plano o que ler `attrs` (a partir de `model`) exige; False se não for campo do modelo."""
+    try:
+        f = model._meta.get_field(attrs[0])
+    except FieldDoesNotExist:
+        return False
+    caminho, resto = prefixo + f.name, attrs[1:]
+    aninhado = isinstance(campo, serializers.BaseSerializer)
+    if not f.is_relation:
+        plano.colunas.add(caminho)
+        return True
+    if f.concrete and (f.many_to_one or f.one_to_one):
+        plano.colunas.add(caminho)
+        if not resto and not aninhado and (campo is None or isinstance(campo, serializers.PrimaryKeyRelatedField)):
+            return True  # só o id, já está na coluna da FK
+        plano.select.add(caminho)
+        if aninhado:
+            _planejar(campo, f.related_model, caminho + "__", plano)
+        elif not resto or not _incluir(f.related_model, resto, caminho + "__", plano):
+            _todas_colunas(f.related_model, caminho + "__", plano)
+        return True
+    if (f.one_to_many or f.many_to_many) and not resto:
+        # relação reversa/M2M: consulta própria (Prefetch), com as colunas do filho
+        sub = _PlanoConsulta()
+        if aninhado:
+            _planejar(campo, f.related_model, "", sub)
+        sub.colunas.add(f.related_model._meta.pk.name)
+        if f.one_to_many:
+            sub.colunas.add(f.field.name)
+        plano.prefetch.append(Prefetch(caminho, queryset=sub.aplicar(f.related_model._default_manager.all())))
+        return True
+    return False
+
+def otimizar_consulta(queryset, serializer):
+    """Troca joins/prefetch/colunas de `queryset` pelos que `serializer` (já recortado) vai ler."""
+    plano = _PlanoConsulta()
+    _planejar(serializer, queryset.model, "", plano)
+    return plano.aplicar(queryset)
 
 # ============== Básicos ==============
 
-class ProdutoSerializer(serializers.ModelSerializer):
+class ProdutoSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = Produto
         fields = "__all__"
 
-class MateriaPrimaSerializer(serializers.ModelSerializer):
+class MateriaPrimaSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = MateriaPrima
         fields = "__all__"
 
-class BalancaSerializer(serializers.ModelSerializer):
+class BalancaSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = Balanca
         fields = "__all__"
 
+class ImpressoraEtiquetaSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
+    class Meta:
+        model = ImpressoraEtiqueta
+        fields = "__all__"
+
+class TrabalhoImpressaoSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
+    impressora_nome = serializers.CharField(source="impressora.nome", read_only=True)
+
+    class Meta:
+        model = TrabalhoImpressao
+        exclude = ["conteudo"]
+
+class TarefaSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
+    arquivo = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Tarefa
+        fields = "__all__"
+        read_only_fields = [
+            "status", "tentativas", "proxima_tentativa", "resultado", "erro",
+            "solicitado_por", "executor", "criada_em", "iniciada_em", "ultimo_sinal", "concluida_em",
+        ]
+        dependencias = {"arquivo": ("arquivo",)}
+
+    def get_arquivo(self, obj):
+        if not obj.arquivo:
+            return None
+        request = self.context.get("request")
+        url = reverse("tarefa-arquivo", args=[obj.pk])
+        return request.build_absolute_uri(url) if request else url
+
+    def validate_tipo(self, value):
+        from .tarefas import TIPOS
+        if value not in TIPOS:
+            raise serializers.ValidationError(f"Opções: {', '.join(sorted(TIPOS))}.")
+        return value
+
+    def validate_parametros(self, value):
+        if not isinstance(value, dict):
+            raise serializers.ValidationError("Informe um objeto JSON.")
+        return value
+
+class LoteMPSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
+    materia_prima = MateriaPrimaSerializer(read_only=True)
+    materia_prima_id = serializers.PrimaryKeyRelatedField(
+        queryset=MateriaPrima.objects.all(), write_only=True, source="materia_prima"
+    )
+    quantidade_inicial = MassaField()
+    quantidade_disponivel = MassaField(required=False)
+
+    class Meta:
+        model = LoteMP
+        fields = [
+            "id",
+            "materia_prima", "materia_prima_id",
+            "codigo", "validade",
+            "quantidade_inicial", "quantidade_disponivel",  # g
+            "fornecedor", "recebido_em", "ativo",
+        ]
+        read_only_fields = ["id", "recebido_em"]
+        validators = []  # unicidade (MP, código) checada em validate() com mensagem clara
+
+    def validate(self, attrs):
+        mp = attrs.get("materia_prima", getattr(self.instance, "materia_prima", None))
+        codigo = (attrs.get("codigo", getattr(self.instance, "codigo", "")) or "").strip()
+        qs = LoteMP.objects.filter(materia_prima=mp, codigo=codigo)
+        if self.instance:
+            qs = qs.exclude(pk=self.instance.pk)
+        if qs.exists():
+            raise serializers.ValidationError({"codigo": "Já existe lote com este código para esta MP."})
+        disponivel = attrs.get("quantidade_disponivel")
+        if disponivel is not None and disponivel < 0:
+            raise serializers.ValidationError({"quantidade_disponivel": "Não pode ser negativa."})
+        return attrs
+
 # ============== Estrutura (BOM) ==============
 
-class ItemEstruturaSerializer(serializers.ModelSerializer):
+class ItemEstruturaSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     materia_prima = MateriaPrimaSerializer(read_only=True)
     materia_prima_id = serializers.PrimaryKeyRelatedField(
         queryset=MateriaPrima.objects.all(), write_only=True, source="materia_prima"
@@ -34,6 +290,7 @@ class ItemEstruturaSerializer(serializers.ModelSerializer):
     estrutura_id = serializers.PrimaryKeyRelatedField(
         queryset=EstruturaProduto.objects.all(), write_only=True, source="estrutura"
     )
+    quantidade_por_lote = MassaField()
 
     class Meta:
         model = ItemEstrutura
@@ -43,10 +300,11 @@ class ItemEstruturaSerializer(serializers.ModelSerializer):
             "materia_prima", "materia_prima_id",
             "quantidade_por_lote",
             "unidade",
+            "atualizado_em",
         ]
-        read_only_fields = ["id"]
+        read_only_fields = ["id", "atualizado_em"]
 
-class EstruturaProdutoSerializer(serializers.ModelSerializer):
+class EstruturaProdutoSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     produto = ProdutoSerializer(read_only=True)
     produto_id = serializers.PrimaryKeyRelatedField(
         queryset=Produto.objects.all(), write_only=True, source="produto"
@@ -61,12 +319,34 @@ class EstruturaProdutoSerializer(serializers.ModelSerializer):
             "descricao",
             "ativo",
             "itens",
+            "atualizado_em",
         ]
-        read_only_fields = ["id", "itens"]
+        read_only_fields = ["id", "itens", "atualizado_em"]
+
+# ============== Tolerância ==============
+
+class RegraToleranciaSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
+    class Meta:
+        model = RegraTolerancia
+        fields = "__all__"
+
+    def validate(self, attrs):
+        regra = RegraTolerancia(**{**self._dados_atuais(), **attrs})
+        try:
+            regra.clean()
+        except DjangoValidationError as e:
+            raise serializers.ValidationError(e.messages)
+        return attrs
+
+    def _dados_atuais(self):
+        if not self.instance:
+            return {}
+        campos = ["escopo", "produto", "materia_prima", "item_estrutura", "tipo", "inferior", "superior", "ativo"]
+        return {c: getattr(self.instance, c) for c in campos}
 
 # ============== OP ==============
 
-class ItemOPSerializer(serializers.ModelSerializer):
+class ItemOPSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     op_id = serializers.PrimaryKeyRelatedField(
         queryset=OrdemProducao.objects.all(), write_only=True, source="op"
     )
@@ -74,7 +354,11 @@ class ItemOPSerializer(serializers.ModelSerializer):
     materia_prima_id = serializers.PrimaryKeyRelatedField(
         queryset=MateriaPrima.objects.all(), write_only=True, source="materia_prima"
     )
-    quantidade_restante = serializers.DecimalField(max_digits=14, decimal_places=3, read_only=True)
+    quantidade_necessaria = MassaField()
+    quantidade_pesada = MassaField(read_only=True)
+    quantidade_restante = MassaField(read_only=True)
+    quantidade_minima = MassaField(read_only=True)
+    quantidade_maxima = MassaField(read_only=True)
 
     class Meta:
         model = ItemOP
@@ -85,11 +369,26 @@ class ItemOPSerializer(serializers.ModelSerializer):
             "quantidade_necessaria",
             "quantidade_pesada",
             "quantidade_restante",
+            "quantidade_minima",
+            "quantidade_maxima",
             "unidade",
         ]
-        read_only_fields = ["id", "quantidade_pesada", "quantidade_restante"]
+        read_only_fields = ["id", "quantidade_pesada", "quantidade_restante", "quantidade_minima", "quantidade_maxima"]
+        dependencias = {"quantidade_restante": ("quantidade_necessaria", "quantidade_pesada")}
+
+    def update(self, instance, validated_data):
+        # MP/quantidade alteradas = outro item: recongela os limites de tolerância
+        recongelar = any(
+            campo in validated_data and validated_data[campo] != getattr(instance, campo)
+            for campo in ("materia_prima", "quantidade_necessaria")
+        )
+        instance = super().update(instance, validated_data)
+        if recongelar:
+            instance.congelar_tolerancia()
+            instance.save(update_fields=["quantidade_minima", "quantidade_maxima"])
+        return instance
 
-class OrdemProducaoSerializer(serializers.ModelSerializer):
+class OrdemProducaoSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     produto = ProdutoSerializer(read_only=True)
     produto_id = serializers.PrimaryKeyRelatedField(
         queryset=Produto.objects.all(), write_only=True, source="produto"
@@ -114,24 +413,50 @@ class OrdemProducaoSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ["id", "status", "criada_em", "concluida_em"]
 
+    # número/lote continuam únicos mesmo depois que a OP vai para o arquivo
+    def validate_numero(self, value):
+        if OrdemProducaoArquivada.objects.filter(numero=value).exists():
+            raise serializers.ValidationError("Já existe uma OP arquivada com este número.")
+        return value
+
+    def validate_lote(self, value):
+        if OrdemProducaoArquivada.objects.filter(lote=value).exists():
+            raise serializers.ValidationError("Já existe uma OP arquivada com este lote.")
+        return value
+
 # ============== Pesagem ==============
 
-class PesagemSerializer(serializers.ModelSerializer):
+class ReferenciaField(serializers.IntegerField):
+    """
+    Id de FK recebido na escrita, sem consulta própria: o serializer resolve
+    todas as referências juntas em validate() (PrimaryKeyRelatedField faria
+    um SELECT por campo).
+    """
+    default_error_messages = {
+        "does_not_exist": serializers.PrimaryKeyRelatedField.default_error_messages["does_not_exist"],
+    }
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault("write_only", True)
+        super().__init__(**kwargs)
+
+    def erro_inexistente(self, pk):
+        return serializers.ValidationError({self.field_name: [self.error_messages["does_not_exist"].format(pk_value=pk)]})
+
+class PesagemSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     op = OrdemProducaoSerializer(read_only=True)
-    op_id = serializers.PrimaryKeyRelatedField(
-        queryset=OrdemProducao.objects.all(), write_only=True, source="op"
-    )
+    op_id = ReferenciaField()
 
     item_op = ItemOPSerializer(read_only=True)
-    item_op_id = serializers.PrimaryKeyRelatedField(
-        queryset=ItemOP.objects.all(), write_only=True, source="item_op"
-    )
+    item_op_id = ReferenciaField()
 
     balanca = BalancaSerializer(read_only=True)
-    balanca_id = serializers.PrimaryKeyRelatedField(
-        queryset=Balanca.objects.all(), write_only=True, source="balanca",
-        required=False, allow_null=True
-    )
+    balanca_id = ReferenciaField(required=False, allow_null=True)
+
+    # massas: tara/líquido digitados em kg; líquido devolvido em g, bruto/tara em kg
+    bruto = MassaField("kg", read_only=True)
+    tara = MassaField("kg")
+    liquido = MassaField("g", unidade_entrada="kg")
 
     # derivados
     produto_nome = serializers.SerializerMethodField()
@@ -151,12 +476,24 @@ class PesagemSerializer(serializers.ModelSerializer):
             "bruto", "tara", "liquido",
             "codigo_interno",
             "lote_mp",
+            "parcial",
+            # captura offline
+            "uuid_cliente", "capturada_em",
+            # estorno / correção
+            "tipo", "estorno_de", "corrige", "motivo",
             # extras para leitura
             "produto_nome",
             "materia_prima_nome",
         ]
         # AJUSTADO: 'bruto' continua como read_only (será calculado), mas 'liquido' e 'tara' podem ser escritos.
-        read_only_fields = ["id", "data_hora", "bruto", "pesador", "op", "item_op", "balanca"]
+        read_only_fields = [
+            "id", "data_hora", "bruto", "pesador", "op", "item_op", "balanca", "uuid_cliente",
+            "tipo", "estorno_de", "corrige",
+        ]
+        dependencias = {
+            "produto_nome": ("op__produto__nome",),
+            "materia_prima_nome": ("item_op__materia_prima__nome",),
+        }
 
     def get_produto_nome(self, obj):
         try:
@@ -171,12 +508,111 @@ class PesagemSerializer(serializers.ModelSerializer):
             return None
 
     def validate(self, attrs):
-        op = attrs.get("op") or getattr(self.instance, "op", None)
-        item_op = attrs.get("item_op") or getattr(self.instance, "item_op", None)
-        if op and item_op and item_op.op_id != op.id:
-            raise serializers.ValidationError("O item_op informado não pertence à OP fornecida.")
         # normaliza lote_mp (opcional)
         lote = attrs.get("lote_mp")
         if lote is not None:
             attrs["lote_mp"] = lote.strip()
-        return attrs
\ No newline at end of file
+        if self.instance is None:
+            self._resolver_referencias(attrs)
+        elif attrs.get("balanca_id") is not None and not Balanca.objects.filter(pk=attrs["balanca_id"]).exists():
+            raise self.fields["balanca_id"].erro_inexistente(attrs["balanca_id"])
+        return attrs
+
+    def _resolver_referencias(self, attrs):
+        """
+        Criação: ItemOP + OP + MP (+ existência da balança) numa única consulta,
+        com o ItemOP travado quando já há transação aberta (o POST roda em uma).
+        Pesagem.save reaproveita esse item em vez de relê-lo.
+        """
+        op_id, item_op_id, balanca_id = attrs.pop("op_id"), attrs.pop("item_op_id"), attrs.get("balanca_id")
+        qs = ItemOP.objects.select_related("op", "op__produto", "materia_prima").filter(pk=item_op_id)
+        if balanca_id is not None:
+            qs = qs.annotate(balanca_existe=Exists(Balanca.objects.filter(pk=balanca_id)))
+        travado = transaction.get_connection().in_atomic_block
+        if travado:
+            qs = qs.select_for_update()
+        item = qs.first()
+
+        if item is None:
+            raise self.fields["item_op_id"].erro_inexistente(item_op_id)
+        if item.op_id != op_id:
+            if not OrdemProducao.objects.filter(pk=op_id).exists():
+                raise self.fields["op_id"].erro_inexistente(op_id)
+            raise serializers.ValidationError("O item_op informado não pertence à OP fornecida.")
+        if balanca_id is not None and not item.balanca_existe:
+            raise self.fields["balanca_id"].erro_inexistente(balanca_id)
+
+        attrs["op"], attrs["item_op"] = item.op, item
+        self._item_travado = item if travado else None
+
+    def create(self, validated_data):
+        pesagem = Pesagem(**validated_data)
+        pesagem.save(item=getattr(self, "_item_travado", None))
+        return pesagem
+
+    def update(self, instance, validated_data):
+        """
+        Edição = correção por delta (Pesagem.corrigir): a original fica intacta, é
+        estornada e a substituta devolvida aqui (novo id).
+        """
+        pesador = validated_data.pop("pesador", instance.pesador)
+        motivo = validated_data.pop("motivo", "")
+        for campo in ("op_id", "item_op_id"):
+            if campo in validated_data and validated_data.pop(campo) != getattr(instance, campo):
+                raise serializers.ValidationError(
+                    {campo: "Não é possível mover a pesagem: anule-a e lance uma nova."}
+                )
+        alteracoes = {c: validated_data[c] for c in Pesagem.CAMPOS_CORRIGIVEIS if c in validated_data}
+        try:
+            _, substituta = instance.corrigir(pesador, motivo, **alteracoes)
+        except DjangoValidationError as e:
+            raise serializers.ValidationError(e.messages)
+        return substituta
+
+# ============== Arquivo (somente leitura) ==============
+
+class ItemOPArquivadoSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
+    materia_prima = MateriaPrimaSerializer(read_only=True)
+    quantidade_necessaria = MassaField(read_only=True)
+    quantidade_pesada = MassaField(read_only=True)
+    quantidade_minima = MassaField(read_only=True)
+    quantidade_maxima = MassaField(read_only=True)
+
+    class Meta:
+        model = ItemOPArquivado
+        fields = [
+            "id", "materia_prima",
+            "quantidade_necessaria", "quantidade_pesada",
+            "quantidade_minima", "quantidade_maxima",
+            "unidade",
+        ]
+
+class OrdemProducaoArquivadaSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
+    produto = ProdutoSerializer(read_only=True)
+
+    class Meta:
+        model = OrdemProducaoArquivada
+        fields = [
+            "id", "numero", "produto", "estrutura_id", "lote", "status",
+            "observacoes", "criada_em", "concluida_em", "arquivada_em",
+        ]
+
+class PesagemArquivadaSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
+    op_numero = serializers.CharField(source="op.numero", read_only=True)
+    op_lote = serializers.CharField(source="op.lote", read_only=True)
+    produto_nome = serializers.CharField(source="op.produto.nome", read_only=True)
+    materia_prima_nome = serializers.CharField(source="item_op.materia_prima.nome", read_only=True, default=None)
+    balanca_nome = serializers.CharField(source="balanca.nome", read_only=True, default=None)
+    bruto = MassaField("kg", read_only=True)
+    tara = MassaField("kg", read_only=True)
+    liquido = MassaField(read_only=True)
+
+    class Meta:
+        model = PesagemArquivada
+        fields = [
+            "id", "op_id", "op_numero", "op_lote", "item_op_id",
+            "produto_nome", "materia_prima_nome", "balanca_id", "balanca_nome",
+            "pesador", "data_hora", "bruto", "tara", "liquido",
+            "codigo_interno", "lote_mp",
+            "tipo", "estorno_de_id", "corrige_id", "motivo",
+        ]
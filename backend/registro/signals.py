@@ -0,0 +1,58 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from django.utils import timezone
+
+from .models import (
+    Balanca, EstruturaProduto, ItemEstrutura, ItemOP, MateriaPrima, Pesagem, Produto,
+    RegistroAuditoria, RegistroExclusao,
+)
+from .planejamento import invalidar_plano, invalidar_planos
+
+# plano de pesagem em cache: obsoleto quando itens/pesagens da OP ou balanças mudam
+@receiver(post_save, sender=ItemOP)
+@receiver(post_delete, sender=ItemOP)
+@receiver(post_save, sender=Pesagem)
+@receiver(post_delete, sender=Pesagem)
+def invalidar_plano_da_op(sender, instance, **kwargs):
+    invalidar_plano(instance.op_id)
+
+@receiver(post_save, sender=Balanca)
+@receiver(post_delete, sender=Balanca)
+def invalidar_planos_balanca(sender, instance, **kwargs):
+    invalidar_planos()
+
+# auditoria de itens de OP gravados um a um (admin/API); bulk_create/UPDATEs em
+# conjunto registram à mão (gerar_itens_a_partir_da_estrutura, reconciliação)
+@receiver(post_save, sender=ItemOP)
+def auditar_item_op(sender, instance, created, **kwargs):
+    acao = "item_op.criado" if created else "item_op.alterado"
+    RegistroAuditoria.registrar("item_op", instance.pk, acao, instance.dados_auditoria())
+
+@receiver(post_delete, sender=ItemOP)
+def auditar_item_op_excluido(sender, instance, **kwargs):
+    RegistroAuditoria.registrar("item_op", instance.pk, "item_op.excluido", instance.dados_auditoria())
+
+# sincronização incremental dos catálogos (?updated_since=, registro/alteracoes.py):
+# tombstone por exclusão (cascatas também disparam um post_delete por objeto)
+ENTIDADES_CATALOGO = {
+    Produto: "produto",
+    MateriaPrima: "materia_prima",
+    Balanca: "balanca",
+    EstruturaProduto: "estrutura",
+    ItemEstrutura: "item_estrutura",
+}
+
+@receiver(post_delete, sender=Produto)
+@receiver(post_delete, sender=MateriaPrima)
+@receiver(post_delete, sender=Balanca)
+@receiver(post_delete, sender=EstruturaProduto)
+@receiver(post_delete, sender=ItemEstrutura)
+def registrar_exclusao(sender, instance, **kwargs):
+    RegistroExclusao.objects.create(entidade=ENTIDADES_CATALOGO[sender], objeto_id=instance.pk)
+
+# a estrutura é servida com os itens: incluir/alterar/excluir item muda a estrutura
+@receiver(post_save, sender=ItemEstrutura)
+@receiver(post_delete, sender=ItemEstrutura)
+def tocar_estrutura(sender, instance, **kwargs):
+    EstruturaProduto.objects.filter(pk=instance.estrutura_id).update(atualizado_em=timezone.now())
@@ -0,0 +1,116 @@
+"""
+Sincronização em lote de pesagens capturadas offline pelas estações.
+
+Cada pesagem traz um `uuid` gerado na estação. O lote é aplicado em ordem,
+numa única transação, passando por PesagemSerializer/Pesagem.save (mesma regra
+de tolerância e acumulado do POST /pesagens/). Cada item roda num savepoint
+próprio: um conflito não desfaz os demais. O `uuid` é normalizado (forma
+canônica, minúsculas) antes de deduplicar; valor que não é UUID vira conflito
+`invalida` só daquele item.
+
+O motivo do conflito vem do `code` do ValidationError levantado na gravação
+(lote inativo/sem saldo, tolerância); só o de tolerância olha o estado do
+item para separar item já concluído de quantidade fora da faixa.
+"""
+from uuid import UUID
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import IntegrityError, transaction
+
+from .models import ItemOP, Pesagem, StatusOP
+from .serializers import PesagemSerializer
+
+LIMITE_LOTE = 500
+
+APLICADA = "aplicada"
+DUPLICADA = "duplicada"
+INVALIDA = "invalida"
+ITEM_CONCLUIDO = "item_concluido"
+OP_ENCERRADA = "op_encerrada"
+FORA_TOLERANCIA = "fora_tolerancia"
+LOTE_INATIVO = "lote_inativo"
+LOTE_SEM_SALDO = "lote_sem_saldo"
+
+
+def _motivo_conflito(erro, item_op_id):
+    """Motivo do ValidationError `erro` levantado ao gravar a pesagem do item."""
+    codigos = {e.code for e in getattr(erro, "error_list", [])}
+    for motivo in (LOTE_INATIVO, LOTE_SEM_SALDO):
+        if motivo in codigos:
+            return motivo
+    if FORA_TOLERANCIA not in codigos:
+        return INVALIDA
+    item = ItemOP.objects.select_related("op").filter(pk=item_op_id).first()
+    if item is None:
+        return INVALIDA
+    if item.op.status in (StatusOP.CONCLUIDA, StatusOP.CANCELADA):
+        return OP_ENCERRADA
+    if item.quantidade_pesada >= item.quantidade_minima_permitida:
+        return ITEM_CONCLUIDO
+    return FORA_TOLERANCIA
+
+
+def _normalizar_uuid(valor):
+    """(uuid canônico, erro): erro "Obrigatório."/"UUID inválido." com uuid None."""
+    if not valor:
+        return None, "Obrigatório."
+    try:
+        return str(UUID(str(valor))), None
+    except (ValueError, TypeError, AttributeError):
+        return None, "UUID inválido."
+
+
+@transaction.atomic
+def sincronizar_pesagens(registros, pesador, contexto=None):
+    """
+    Aplica `registros` (dicts no formato do POST /pesagens/ + `uuid` e `capturada_em`).
+    Retorna {"aplicadas": [...], "duplicadas": [...], "conflitos": [...]}.
+    """
+    resultado = {"aplicadas": [], "duplicadas": [], "conflitos": []}
+
+    normalizados = [_normalizar_uuid(r.get("uuid")) for r in registros]
+    validos = [u for u, _ in normalizados if u]
+    existentes = {
+        str(u): pk
+        for u, pk in Pesagem.objects.filter(uuid_cliente__in=validos).values_list("uuid_cliente", "id")
+    } if validos else {}
+
+    for posicao, (registro, (uuid, erro_uuid)) in enumerate(zip(registros, normalizados)):
+        base = {"uuid": uuid or registro.get("uuid") or None, "posicao": posicao}
+        if erro_uuid:
+            resultado["conflitos"].append({**base, "motivo": INVALIDA, "erros": {"uuid": [erro_uuid]}})
+            continue
+        if uuid in existentes:
+            resultado["duplicadas"].append({**base, "id": existentes[uuid]})
+            continue
+
+        dados = {k: v for k, v in registro.items() if k != "uuid"}
+        serializer = PesagemSerializer(data=dados, context=contexto or {})
+        if not serializer.is_valid():
+            resultado["conflitos"].append({**base, "motivo": INVALIDA, "erros": serializer.errors})
+            continue
+
+        item_op = serializer.validated_data["item_op"]
+        if serializer.validated_data["op"].status in (StatusOP.CONCLUIDA, StatusOP.CANCELADA):
+            resultado["conflitos"].append({**base, "motivo": OP_ENCERRADA, "erros": ["OP encerrada."]})
+            continue
+
+        try:
+            with transaction.atomic():
+                pesagem = serializer.save(pesador=pesador, uuid_cliente=uuid)
+        except DjangoValidationError as e:
+            resultado["conflitos"].append({**base, "motivo": _motivo_conflito(e, item_op.pk), "erros": e.messages})
+            continue
+        except IntegrityError:
+            # gravada por outra requisição depois da leitura de `existentes`
+            pk = Pesagem.objects.filter(uuid_cliente=uuid).values_list("pk", flat=True).first()
+            if pk is None:
+                raise
+            existentes[uuid] = pk
+            resultado["duplicadas"].append({**base, "id": pk})
+            continue
+
+        existentes[uuid] = pesagem.pk  # uuid repetido no mesmo lote vira duplicada
+        resultado["aplicadas"].append({**base, "id": pesagem.pk})
+
+    return resultado
@@ -0,0 +1,278 @@
+"""
+Gerador de dados sintéticos em massa (benchmarks / testes de escala).
+
+Tudo é inserido com bulk_create em blocos, sem passar por Pesagem.save():
+não há travas, checagem de tolerância nem atualização de status por linha.
+Os acumulados (ItemOP.quantidade_pesada) e o status das OPs são calculados
+depois, por conjunto, com UPDATEs agregados (recalcular_acumulados /
+reavaliar_status).
+"""
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import BigIntegerField, Case, Exists, F, Max, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .massa import MG_POR_G
+from .models import (
+    Produto, MateriaPrima, Balanca,
+    EstruturaProduto, ItemEstrutura,
+    OrdemProducao, ItemOP, Pesagem, StatusOP, TipoLancamento,
+    UnidadeMedida, limites_padrao,
+)
+
+@contextmanager
+def sem_auto_now(*campos):
+    """Desliga auto_now/auto_now_add temporariamente para gravar datas espalhadas."""
+    originais = [(c, c.auto_now, c.auto_now_add) for c in campos]
+    try:
+        for c, _, _ in originais:
+            c.auto_now = c.auto_now_add = False
+        yield
+    finally:
+        for c, auto_now, auto_now_add in originais:
+            c.auto_now, c.auto_now_add = auto_now, auto_now_add
+
+
+def _campo(model, nome):
+    return model._meta.get_field(nome)
+
+
+class GeradorSintetico:
+    """
+    Monta grafos Produto/MP/Estrutura/OP/ItemOP/Pesagem.
+
+    `prefixo` garante códigos únicos entre execuções (ex.: SINT-<n>).
+    `progresso` é um callable opcional que recebe mensagens de texto.
+    """
+
+    def __init__(self, seed=None, prefixo="SINT", lote=5000, dias=365, agora=None, progresso=None):
+        self.rng = random.Random(seed)
+        self.prefixo = prefixo
+        self.lote = lote
+        self.dias = dias
+        self.progresso = progresso or (lambda msg: None)
+        # data de referência fixa + seed => dataset determinístico
+        self.agora = agora or timezone.now()
+
+    # ---------- catálogos ----------
+
+    def criar_catalogos(self, n_mps, n_produtos, n_balancas=10, itens_por_estrutura=(5, 15)):
+        p = self.prefixo
+        mps = MateriaPrima.objects.bulk_create(
+            [MateriaPrima(nome=f"MP {p} {i}", codigo_interno=f"{p}-MP-{i}") for i in range(n_mps)],
+            batch_size=self.lote,
+        )
+        produtos = Produto.objects.bulk_create(
+            [Produto(nome=f"Produto {p} {i}", codigo_interno=f"{p}-PR-{i}") for i in range(n_produtos)],
+            batch_size=self.lote,
+        )
+        Balanca.objects.bulk_create(
+            [
+                Balanca(
+                    nome=f"Balança {p} {i}", identificador=f"{p}-BAL-{i}",
+                    capacidade_maxima=Decimal(self.rng.choice([3, 6, 15, 30, 60, 150, 300])),
+                    divisao=Decimal(self.rng.choice(["0.001", "0.002", "0.005", "0.01", "0.02", "0.05"])),
+                )
+                for i in range(n_balancas)
+            ],
+            batch_size=self.lote,
+        )
+        estruturas = EstruturaProduto.objects.bulk_create(
+            [EstruturaProduto(produto=prod, descricao=f"{p} padrão") for prod in produtos],
+            batch_size=self.lote,
+        )
+
+        itens = []
+        for estrutura in estruturas:
+            n = self.rng.randint(*itens_por_estrutura)
+            for mp in self.rng.sample(mps, min(n, len(mps))):
+                itens.append(ItemEstrutura(
+                    estrutura=estrutura,
+                    materia_prima=mp,
+                    quantidade_por_lote=self.rng.randint(50, 250_000) * MG_POR_G,  # 50 g a 250 kg, em mg
+                    unidade=UnidadeMedida.G,
+                ))
+        ItemEstrutura.objects.bulk_create(itens, batch_size=self.lote)
+        self.progresso(
+            f"Catálogos: {len(mps)} MPs, {len(produtos)} produtos, {len(estruturas)} estruturas, {len(itens)} itens"
+        )
+        return estruturas
+
+    # ---------- OPs + itens + pesagens ----------
+
+    def criar_ops(self, estruturas, n_ops, fracao_concluida=0.7, pesagens_por_item=(1, 5), balancas=None):
+        """
+        Cria OPs em blocos de `lote`. Para cada item pesado as pesagens somam
+        exatamente a quantidade necessária; OPs não concluídas ficam com parte
+        dos itens pendentes.
+        """
+        if balancas is None:
+            balancas = list(Balanca.objects.filter(ativo=True).values_list("id", flat=True))
+        itens_por_estrutura = {}
+        for ie in ItemEstrutura.objects.filter(estrutura__in=estruturas).values(
+            "estrutura_id", "materia_prima_id", "quantidade_por_lote"
+        ).order_by("id"):
+            itens_por_estrutura.setdefault(ie["estrutura_id"], []).append(ie)
+        estruturas = [e for e in estruturas if e.pk in itens_por_estrutura]
+
+        base = OrdemProducao.objects.count()
+        total_pesagens = 0
+        campos_data = (_campo(OrdemProducao, "criada_em"), _campo(Pesagem, "data_hora"))
+        with sem_auto_now(*campos_data):
+            for inicio in range(0, n_ops, self.lote):
+                fim = min(inicio + self.lote, n_ops)
+                total_pesagens += self._criar_bloco_ops(
+                    estruturas, itens_por_estrutura, base + inicio, base + fim,
+                    fracao_concluida, pesagens_por_item, balancas,
+                )
+                self.progresso(f"OPs: {fim}/{n_ops} | pesagens: {total_pesagens}")
+        return total_pesagens
+
+    @transaction.atomic
+    def _criar_bloco_ops(self, estruturas, itens_por_estrutura, inicio, fim,
+                         fracao_concluida, pesagens_por_item, balancas):
+        rng = self.rng
+        p = self.prefixo
+        ops = []
+        planos = []  # (concluir?, criada_em) por OP
+        for n in range(inicio, fim):
+            estrutura = rng.choice(estruturas)
+            criada_em = self.agora - timedelta(seconds=rng.randint(0, self.dias * 86400))
+            concluir = rng.random() < fracao_concluida
+            ops.append(OrdemProducao(
+                numero=f"{p}-OP-{n}", lote=f"{p}-L-{n}",
+                produto_id=estrutura.produto_id, estrutura=estrutura,
+                criada_em=criada_em,
+            ))
+            planos.append((concluir, criada_em))
+        OrdemProducao.objects.bulk_create(ops, batch_size=self.lote)
+
+        itens = []
+        pesar = []  # itens que receberão pesagens
+        for op, (concluir, _) in zip(ops, planos):
+            for ie in itens_por_estrutura[op.estrutura_id]:
+                necessaria = ie["quantidade_por_lote"]
+                minima, maxima = limites_padrao(necessaria)
+                item = ItemOP(
+                    op=op, materia_prima_id=ie["materia_prima_id"],
+                    quantidade_necessaria=necessaria,
+                    quantidade_minima=minima, quantidade_maxima=maxima,
+                    unidade=UnidadeMedida.G,
+                )
+                itens.append(item)
+                pesar.append(concluir or rng.random() < 0.5)
+        ItemOP.objects.bulk_create(itens, batch_size=self.lote)
+
+        # Pesagem é a tabela grande: INSERT direto com executemany (sem instanciar modelos)
+        ops_db = connection.ops
+        pesagens = []
+        criada_por_op = {op.pk: criada for op, (_, criada) in zip(ops, planos)}
+        for item, pesado in zip(itens, pesar):
+            if not pesado:
+                continue
+            partes = self._dividir(item.quantidade_necessaria, rng.randint(*pesagens_por_item))
+            t = criada_por_op[item.op_id]
+            for k, liquido in enumerate(partes):
+                t = t + timedelta(minutes=rng.randint(1, 90))
+                tara = rng.randint(0, 2000) * MG_POR_G  # até 2 kg
+                pesagens.append((
+                    item.op_id, item.pk,
+                    f"Operador {rng.randint(1, 40)}",
+                    ops_db.adapt_datetimefield_value(t),
+                    tara + liquido,  # bruto (mg)
+                    tara,            # tara (mg)
+                    liquido,         # líquido (mg)
+                    rng.choice(balancas) if balancas else None,
+                    f"{p}-{rng.randint(1000, 9999)}",
+                    f"{rng.randint(20, 26)}A{rng.randint(0, 9999):04d}",
+                    k < len(partes) - 1,  # parcial: todas menos a última fração
+                    TipoLancamento.PESAGEM, "",
+                ))
+        _inserir_pesagens(pesagens, self.lote)
+
+        # acumulados e status calculados no banco, por conjunto (não por linha)
+        op_ids = [op.pk for op in ops]
+        recalcular_acumulados(op_ids)
+        reavaliar_status(op_ids)
+        return len(pesagens)
+
+    def _dividir(self, total, partes):
+        """Divide `total` (mg) em `partes` pesagens inteiras que somam exatamente `total`."""
+        if partes <= 1 or total < partes:
+            return [total]
+        cortes = sorted(self.rng.sample(range(1, total), partes - 1))
+        return [b - a for a, b in zip([0] + cortes, cortes + [total])]
+
+
+_COLUNAS_PESAGEM = (
+    "op", "item_op", "pesador", "data_hora", "bruto", "tara", "liquido",
+    "balanca", "codigo_interno", "lote_mp", "parcial", "tipo", "motivo",
+)
+
+
+def _inserir_pesagens(linhas, lote):
+    meta = Pesagem._meta
+    qn = connection.ops.quote_name
+    colunas = ", ".join(qn(meta.get_field(c).column) for c in _COLUNAS_PESAGEM)
+    marcadores = ", ".join(["%s"] * len(_COLUNAS_PESAGEM))
+    sql = f"INSERT INTO {qn(meta.db_table)} ({colunas}) VALUES ({marcadores})"
+    with connection.cursor() as cursor:
+        for i in range(0, len(linhas), lote):
+            cursor.executemany(sql, linhas[i:i + lote])
+
+
+def recalcular_acumulados(op_ids):
+    """ItemOP.quantidade_pesada = SUM(pesagens.liquido) (mg, inteiro) para as OPs informadas, num único UPDATE."""
+    soma = (
+        Pesagem.objects
+        .filter(item_op=OuterRef("pk"))
+        .values("item_op")
+        .annotate(total=Sum("liquido"))
+        .values("total")
+    )
+    return ItemOP.objects.filter(op_id__in=op_ids).update(
+        quantidade_pesada=Coalesce(
+            Subquery(soma, output_field=BigIntegerField()),
+            Value(0),
+        )
+    )
+
+
+def reavaliar_status(op_ids):
+    """
+    Mesma regra de OrdemProducao.verificar_e_concluir, por conjunto:
+    sem itens pendentes => concluída (concluida_em = última pesagem);
+    com algo pesado => em andamento; senão => aberta. OPs canceladas não mudam.
+    """
+    pendente = Exists(ItemOP.objects.filter(op=OuterRef("pk"), quantidade_pesada__lt=F("quantidade_necessaria")))
+    iniciada = Exists(ItemOP.objects.filter(op=OuterRef("pk"), quantidade_pesada__gt=0))
+    ultima = Pesagem.objects.filter(op=OuterRef("pk")).values("op").annotate(m=Max("data_hora")).values("m")
+    return (
+        OrdemProducao.objects
+        .filter(pk__in=op_ids)
+        .exclude(status=StatusOP.CANCELADA)
+        .update(
+            status=Case(
+                When(~pendente, then=Value(StatusOP.CONCLUIDA)),
+                When(iniciada, then=Value(StatusOP.EM_ANDAMENTO)),
+                default=Value(StatusOP.ABERTA),
+            ),
+            concluida_em=Case(
+                When(~pendente, then=Coalesce(F("concluida_em"), Subquery(ultima))),
+                default=Value(None),
+            ),
+        )
+    )
+
+
+def gerar_dataset(n_mps=2000, n_produtos=300, n_ops=20000, pesagens_por_item=(1, 5),
+                  seed=None, prefixo="SINT", lote=5000, progresso=None):
+    """Atalho: catálogos + OPs/itens/pesagens. Retorna o total de pesagens criadas."""
+    gerador = GeradorSintetico(seed=seed, prefixo=prefixo, lote=lote, progresso=progresso)
+    estruturas = gerador.criar_catalogos(n_mps, n_produtos)
+    return gerador.criar_ops(estruturas, n_ops, pesagens_por_item=pesagens_por_item)
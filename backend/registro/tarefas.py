@@ -0,0 +1,269 @@
+"""
+Tarefas em segundo plano com fila no banco (Tarefa).
+
+A view só grava a Tarefa (`enfileirar`) e responde; `manage.py worker_tarefas`
+reserva as pendentes (maior prioridade primeiro, depois a mais antiga) e as
+executa num pool de threads ou de processos.
+
+- Reserva: UPDATE ... WHERE status='pendente' por tarefa — vários workers
+  podem disputar a mesma fila sem executar nada duas vezes.
+- Falha: nova tentativa com espera exponencial até `max_tentativas`; erros de
+  dados (ErroTarefa, CommandError, ValidationError, ValueError) falham direto.
+- Sinal de vida: enquanto a tarefa executa, uma thread do worker renova
+  `ultimo_sinal` a cada INTERVALO_SINAL segundos. Worker que morre no meio:
+  `recuperar_travadas` devolve à fila (num único UPDATE condicional) as tarefas
+  sem sinal há mais de `expirar` segundos — tarefa longa com worker vivo não
+  é reexecutada.
+- A reserva é identificada por `iniciada_em`: o desfecho (e o sinal) só é
+  gravado se a tarefa ainda está em execução pela mesma reserva; se foi
+  devolvida à fila nesse meio tempo, o resultado atrasado é descartado.
+- Resultado: dict JSON em `resultado` e, para PDFs/exportações, o arquivo em
+  `arquivo` (storage padrão, MEDIA_ROOT).
+
+Cada tipo é uma função registrada com @tarefa("nome"); recebe a Tarefa e os
+parâmetros como kwargs e devolve um dict ou ArquivoGerado.
+"""
+import io
+import os
+import socket
+import threading
+import traceback
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import timedelta
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import close_old_connections, connection
+from django.db.models import Case, F, Value, When
+from django.db.models.functions import Concat
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .models import Pesagem, StatusTarefa, Tarefa
+
+ESPERA_BASE = 30  # s
+ESPERA_MAX = 3600  # s
+INTERVALO_SINAL = 30  # s entre renovações de ultimo_sinal
+EXPIRAR_PADRAO = 300  # s sem sinal antes de considerar o worker morto
+
+TIPOS = {}
+
+
+class ErroTarefa(Exception):
+    """Erro definitivo (parâmetros/dados inválidos): não adianta tentar de novo."""
+
+
+SEM_NOVA_TENTATIVA = (ErroTarefa, CommandError, DjangoValidationError, ValueError, KeyError, TypeError)
+
+
+@dataclass
+class ArquivoGerado:
+    nome: str
+    conteudo: bytes
+    dados: dict = field(default_factory=dict)
+
+
+def tarefa(nome):
+    def registrar(funcao):
+        TIPOS[nome] = funcao
+        return funcao
+    return registrar
+
+
+# ---------- fila ----------
+
+def enfileirar(tipo, parametros=None, prioridade=0, max_tentativas=3, solicitado_por=""):
+    if tipo not in TIPOS:
+        raise ErroTarefa(f"Tipo de tarefa desconhecido: {tipo}. Opções: {', '.join(sorted(TIPOS))}.")
+    return Tarefa.objects.create(
+        tipo=tipo, parametros=parametros or {}, prioridade=prioridade,
+        max_tentativas=max_tentativas, solicitado_por=solicitado_por,
+    )
+
+
+def _identificacao():
+    return f"{socket.gethostname()}:{os.getpid()}"[:100]
+
+
+def reservar(limite=1, tipos=None, agora=None):
+    """Marca até `limite` tarefas prontas como em execução e devolve seus ids."""
+    agora = agora or timezone.now()
+    candidatas = Tarefa.objects.filter(status=StatusTarefa.PENDENTE, proxima_tentativa__lte=agora)
+    if tipos:
+        candidatas = candidatas.filter(tipo__in=tipos)
+    reservadas = []
+    for pk in candidatas.order_by("-prioridade", "id").values_list("pk", flat=True)[: limite * 2]:
+        # outro worker pode ter levado a mesma tarefa entre o SELECT e aqui
+        tomou = Tarefa.objects.filter(pk=pk, status=StatusTarefa.PENDENTE).update(
+            status=StatusTarefa.EXECUTANDO, iniciada_em=agora, ultimo_sinal=agora, executor=_identificacao(),
+        )
+        if tomou:
+            reservadas.append(pk)
+            if len(reservadas) == limite:
+                break
+    return reservadas
+
+
+def _espera(tentativas):
+    return timedelta(seconds=min(ESPERA_MAX, ESPERA_BASE * 2 ** (tentativas - 1)))
+
+
+def recuperar_travadas(expirar=EXPIRAR_PADRAO, agora=None):
+    """
+    Tarefas em execução sem sinal há mais de `expirar` s (worker morto) voltam à
+    fila, ou falham se esgotaram as tentativas. Um único UPDATE: workers
+    recuperando ao mesmo tempo não contam a mesma tentativa duas vezes.
+    """
+    agora = agora or timezone.now()
+    esgotou = When(tentativas__gte=F("max_tentativas") - 1, then=Value(StatusTarefa.FALHOU))
+    return Tarefa.objects.filter(
+        status=StatusTarefa.EXECUTANDO, ultimo_sinal__lt=agora - timedelta(seconds=expirar),
+    ).update(
+        tentativas=F("tentativas") + 1,
+        erro=Concat(Value("Execução interrompida (worker "), F("executor"), Value(" sem resposta).")),
+        status=Case(esgotou, default=Value(StatusTarefa.PENDENTE)),
+        concluida_em=Case(When(tentativas__gte=F("max_tentativas") - 1, then=Value(agora)), default=None),
+        proxima_tentativa=agora,
+        executor="",
+    )
+
+
+def _da_reserva(t):
+    """A tarefa `t` ainda em execução pela mesma reserva (não devolvida à fila)."""
+    return Tarefa.objects.filter(pk=t.pk, status=StatusTarefa.EXECUTANDO, iniciada_em=t.iniciada_em)
+
+
+@contextmanager
+def _sinal_de_vida(t, intervalo=INTERVALO_SINAL):
+    """Renova `ultimo_sinal` de `t` numa thread (com conexão própria) enquanto o bloco executa."""
+    parar = threading.Event()
+
+    def renovar():
+        try:
+            while not parar.wait(intervalo):
+                _da_reserva(t).update(ultimo_sinal=timezone.now())
+        finally:
+            connection.close()
+
+    thread = threading.Thread(target=renovar, name=f"sinal-tarefa-{t.pk}", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        parar.set()
+        thread.join()
+
+
+def _finalizar(t, **campos):
+    """Grava o desfecho se a reserva ainda vale; devolve o status que ficou gravado."""
+    if _da_reserva(t).update(tentativas=t.tentativas + 1, **campos):
+        return campos["status"]
+    if campos.get("arquivo"):
+        t.arquivo.storage.delete(campos["arquivo"])  # resultado atrasado: descartado
+    return Tarefa.objects.values_list("status", flat=True).get(pk=t.pk)
+
+
+def executar(tarefa_id):
+    """Executa uma tarefa já reservada e grava o resultado; devolve o status final."""
+    t = Tarefa.objects.get(pk=tarefa_id)
+    try:
+        with _sinal_de_vida(t):
+            retorno = TIPOS[t.tipo](t, **t.parametros)
+    except Exception as e:
+        erro = "".join(traceback.format_exception_only(type(e), e)).strip()[:4000]
+        if isinstance(e, SEM_NOVA_TENTATIVA) or t.tentativas + 1 >= t.max_tentativas:
+            campos = {"status": StatusTarefa.FALHOU, "concluida_em": timezone.now()}
+        else:
+            campos = {"status": StatusTarefa.PENDENTE, "proxima_tentativa": timezone.now() + _espera(t.tentativas + 1)}
+        return _finalizar(t, erro=erro, executor="", **campos)
+
+    campos = {}
+    if isinstance(retorno, ArquivoGerado):
+        t.arquivo.save(retorno.nome, ContentFile(retorno.conteudo), save=False)
+        campos["arquivo"] = t.arquivo.name
+        retorno = retorno.dados
+    return _finalizar(t, erro="", resultado=retorno or {}, status=StatusTarefa.CONCLUIDA,
+                      concluida_em=timezone.now(), **campos)
+
+
+def executar_no_pool(tarefa_id):
+    """executar() numa thread/processo do pool: cada um usa (e descarta) a sua conexão."""
+    close_old_connections()
+    try:
+        return executar(tarefa_id)
+    finally:
+        close_old_connections()
+
+
+def cancelar(t):
+    return Tarefa.objects.filter(pk=t.pk, status=StatusTarefa.PENDENTE).update(
+        status=StatusTarefa.CANCELADA, concluida_em=timezone.now(),
+    )
+
+
+def guardar_entrada(arquivo):
+    """Salva um upload (planilha de importação) no storage e devolve o caminho."""
+    return default_storage.save(f"tarefas/entrada/{timezone.now():%Y%m%d%H%M%S}_{arquivo.name}", arquivo)
+
+
+# ---------- tipos ----------
+
+@tarefa("etiquetas_pdf")
+def etiquetas_pdf(t, pesagens):
+    """Etiquetas de várias pesagens num único PDF (uma por página, na ordem pedida)."""
+    from . import etiquetas
+
+    encontradas = (
+        Pesagem.objects
+        .select_related("op", "op__produto", "item_op", "item_op__materia_prima", "balanca")
+        .in_bulk(pesagens)
+    )
+    faltando = [pk for pk in pesagens if pk not in encontradas]
+    if faltando:
+        raise ErroTarefa(f"Pesagens não encontradas: {faltando}")
+    saida = io.BytesIO()
+    etiquetas.gerar_pdf_lote([etiquetas.campos(encontradas[pk]) for pk in pesagens], saida)
+    return ArquivoGerado(f"etiquetas_{t.pk}.pdf", saida.getvalue(), {"etiquetas": len(pesagens)})
+
+
+@tarefa("separacao_pdf")
+def separacao_pdf(t, ids=None, status=None, de=None, ate=None):
+    """Lista de separação impressa (mesmos filtros de GET /separacao/)."""
+    from .separacao import consolidar, gerar_pdf, selecionar_ops
+
+    linhas = consolidar(selecionar_ops(
+        ids=ids, status=status, de=parse_date(de) if de else None, ate=parse_date(ate) if ate else None,
+    ))
+    buffer = gerar_pdf(linhas, "Lista de separação de matérias-primas")
+    return ArquivoGerado(f"separacao_{t.pk}.pdf", buffer.getvalue(), {"materias_primas": linhas.count()})
+
+
+@tarefa("importar_oficiais")
+def importar_oficiais(t, produtos, mps, bom, **opcoes):
+    """manage.py import_oficiais com as planilhas enviadas (caminhos no storage)."""
+    saida = io.StringIO()
+    call_command(
+        "import_oficiais",
+        produtos=default_storage.path(produtos), mps=default_storage.path(mps), bom=default_storage.path(bom),
+        stdout=saida, **opcoes,
+    )
+    return {"saida": saida.getvalue()}
+
+
+@tarefa("reconciliar_acumulados")
+def reconciliar_acumulados(t, corrigir=False, op_ids=None):
+    """Relatório (e correção opcional) de ItemOP.quantidade_pesada divergente."""
+    from .reconciliacao import descrever, reconciliar
+
+    resumo = reconciliar(op_ids=op_ids, corrigir=corrigir)
+    return {
+        "ops": resumo["ops"],
+        "itens": resumo["itens"],
+        "desvio_total_mg": resumo["desvio_total_mg"],
+        "status_alterados": resumo["status_alterados"],
+        "divergentes": [descrever(d) for d in resumo["divergentes"]],
+    }
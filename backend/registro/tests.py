@@ -1,3 +1,1034 @@
-from django.test import TestCase
+import gzip
+import json
+import os
+import socket
+import socketserver
+import tempfile
+import threading
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from io import BytesIO, StringIO
+from unittest import mock, skipUnless
+
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from .migrations._em_lotes import TABELA_CHECKPOINT, escalar
+from .massa import Massa, formatar, formatar_ptbr
+from .models import (
+    Produto, MateriaPrima, EstruturaProduto, ItemEstrutura, Balanca, LoteMP,
+    OrdemProducao, ItemOP, Pesagem, EventoOutbox, OffsetConsumidor, StatusOP, RegistroAuditoria, CadeiaAuditoria,
+    ImpressoraEtiqueta, TrabalhoImpressao, StatusImpressao, Tarefa, StatusTarefa,
+    OrdemProducaoArquivada, ItemOPArquivado, PesagemArquivada, RegraTolerancia, TabelaTolerancia,
+    limites_padrao,
+)
+from . import arquivo
+from .auditoria import verificar as verificar_auditoria
+from .inicializacao import ORCAMENTO_MS, dentro_do_orcamento, medir
+from .reconciliacao import reconciliar
+from .impressao import processar_fila
+from .middleware import negociar
+from .renderers import OrjsonParser, OrjsonRenderer
+from . import tarefas
+from .outbox import ErroEntrega, SinkArquivo, SinkWebhook, entregar_lote
+
+
+class OPTestCase(TestCase):
+    """
+    Base dos testes do fluxo de pesagem: Produto "P1" com a estrutura "padrão"
+    (MPS: código -> quantidade por lote em mg; nome da MP = código), a OP "OP1"
+    com os itens gerados (`self.item` = o primeiro), `self.client` autenticado
+    como operador e `self.payload` = corpo de POST /pesagens/ para 1 kg no item.
+    """
+    MPS = {"MP1": 1_000_000}
+
+    def setUp(self):
+        self.produto = Produto.objects.create(nome="Produto", codigo_interno="P1")
+        self.mps = {
+            codigo: MateriaPrima.objects.create(nome=codigo, codigo_interno=codigo) for codigo in self.MPS
+        }
+        self.estrutura = self.criar_estrutura(self.produto, self.MPS)
+        self.op = self.criar_op("OP1")
+        self.item = self.op.itemop_set.order_by("pk").first()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user("op1"))
+        self.payload = {"op_id": self.op.id, "item_op_id": self.item.id, "tara": "0.100", "liquido": "1.000"}
+
+    def criar_estrutura(self, produto, mps):
+        estrutura = EstruturaProduto.objects.create(produto=produto, descricao="padrão")
+        for codigo, quantidade in mps.items():
+            ItemEstrutura.objects.create(estrutura=estrutura, materia_prima=self.mps[codigo],
+                                         quantidade_por_lote=quantidade)
+        return estrutura
+
+    def criar_op(self, numero, estrutura=None):
+        estrutura = estrutura or self.estrutura
+        op = OrdemProducao.objects.create(numero=numero, produto=estrutura.produto, estrutura=estrutura,
+                                          lote=numero.replace("OP", "L"))
+        op.gerar_itens_a_partir_da_estrutura()
+        return op
+
+    def pesar(self, item=None, liquido=1_000_000, tara=0, pesador="x", **extra):
+        item = item or self.item
+        return Pesagem.objects.create(op=item.op, item_op=item, tara=tara, liquido=liquido, pesador=pesador, **extra)
+
+
+class MassaTests(TestCase):
+    def test_conversao_exata(self):
+        self.assertEqual(Massa.de("1,5", "kg"), 1_500_000)
+        self.assertEqual(Massa.de(Decimal("0.001"), "g"), 1)
+        self.assertEqual(Massa.de(1.005, "kg"), 1_005_000)
+        with self.assertRaises(ValueError):
+            Massa.de("0.0001", "g")
+        self.assertEqual(formatar(1_500_000), "1500.000")
+        self.assertEqual(formatar(500_000, "kg"), "0.500")
+        self.assertEqual(formatar_ptbr(282_000_000), "282.000,000 g")
+
+
+class InicializacaoTests(SimpleTestCase):
+    def test_boot_sem_bibliotecas_pesadas(self):
+        # processo novo importando WSGI, URLconf e todos os comandos de gestão
+        medicao = medir()
+        self.assertEqual(medicao["pesados"], [])
+        self.assertIn("registro.views", [nome for nome, *_ in medicao["modulos"]])
+
+    @skipUnless(os.environ.get("REGISTRO_ORCAMENTO_BOOT"), "tempo de parede: só com REGISTRO_ORCAMENTO_BOOT=1 "
+                                                         "(ou manage.py perfil_inicializacao --orcamento)")
+    def test_boot_dentro_do_orcamento(self):
+        self.assertEqual(dentro_do_orcamento(medir()), [], f"orçamento: {ORCAMENTO_MS} ms")
+
+
+class DadosSinteticosTests(TestCase):
+    def test_acumulados_e_status_consistentes(self):
+        call_command("gerar_dados_sinteticos", mps=6, produtos=2, balancas=1, itens_min=2, itens_max=3,
+                     ops=4, pesagens_max=3, fracao_concluida=0.5, seed=7, prefixo="T", stdout=StringIO())
+
+        ops = OrdemProducao.objects.filter(numero__startswith="T-OP-").prefetch_related("itemop_set")
+        self.assertEqual(len(ops), 4)
+        # seed 7: cobre concluída, em andamento e aberta
+        self.assertEqual({op.status for op in ops}, {StatusOP.CONCLUIDA, StatusOP.EM_ANDAMENTO, StatusOP.ABERTA})
+        for op in ops:
+            itens = list(op.itemop_set.all())
+            for item in itens:
+                soma = sum(Pesagem.objects.filter(item_op=item).values_list("liquido", flat=True))
+                self.assertEqual(item.quantidade_pesada, soma, item)
+                self.assertIn(item.quantidade_pesada, (0, item.quantidade_necessaria), item)
+            # mesma regra de OrdemProducao.verificar_e_concluir
+            if all(i.quantidade_restante <= 0 for i in itens):
+                esperado = StatusOP.CONCLUIDA
+            elif any(i.quantidade_pesada > 0 for i in itens):
+                esperado = StatusOP.EM_ANDAMENTO
+            else:
+                esperado = StatusOP.ABERTA
+            self.assertEqual(op.status, esperado, op.numero)
+            self.assertEqual(op.concluida_em is not None, esperado == StatusOP.CONCLUIDA, op.numero)
+
+
+class MigracaoEmLotesTests(TestCase):
+    def test_escalar_em_lotes_retoma_do_checkpoint(self):
+        mps = [MateriaPrima.objects.create(nome=f"MP{i}", codigo_interno=f"MP{i}") for i in range(5)]
+        for mp in mps:
+            LoteMP.objects.create(materia_prima=mp, codigo="L", validade=date.today(), quantidade_inicial=10)
+
+        class Interrompida(Exception):
+            pass
+
+        def cai_no_primeiro_lote(nome, feitas, total):
+            raise Interrompida
+
+        with self.assertRaises(Interrompida):
+            escalar(LoteMP, ["quantidade_inicial"], 3, lote=2, tarefa="teste", progresso=cai_no_primeiro_lote)
+        progresso = []
+        n = escalar(LoteMP, ["quantidade_inicial"], 3, lote=2, tarefa="teste",
+                    progresso=lambda *a: progresso.append(a))
+
+        self.assertEqual(n, 3)
+        self.assertEqual(progresso[-1], ("teste", 3, 3))
+        self.assertEqual([l.quantidade_inicial for l in LoteMP.objects.order_by("pk")], [30] * 5)
+        self.assertNotIn(TABELA_CHECKPOINT, connection.introspection.table_names())
+
+
+class BenchmarkPesagemTests(TransactionTestCase):
+    """
+    Roda o benchmark num dataset mínimo: garante que o harness funciona e vigia o nº de queries.
+    (1 cliente: o SQLite em memória dos testes não suporta escritas concorrentes.)
+    """
+
+    def test_relatorio_json(self):
+        out = StringIO()
+        call_command(
+            "benchmark_pesagem", seed_dados=True, mps=30, produtos=4, ops=12,
+            clientes=1, requisicoes=4, stdout=out, stderr=StringIO(),
+        )
+        relatorio = json.loads(out.getvalue())
+        self.assertGreater(relatorio["volume"]["pesagens"], 0)
+        for nome, dados in relatorio["endpoints"].items():
+            self.assertIn("latencia_ms", dados, nome)
+            self.assertTrue(all(s.startswith("2") for s in dados["status"]), (nome, dados["status"]))
+            for p in ("p50", "p95", "p99"):
+                self.assertIsNotNone(dados["latencia_ms"][p])
+        self.assertLessEqual(relatorio["endpoints"]["itens_op"]["queries"]["max"], 3)
+
+    def test_limites_barram_regressao(self):
+        with tempfile.TemporaryDirectory() as pasta:
+            baseline, limites = os.path.join(pasta, "base.json"), os.path.join(pasta, "limites.json")
+            opcoes = dict(clientes=1, requisicoes=2, endpoints="itens_op", stdout=StringIO(), stderr=StringIO())
+            call_command("benchmark_pesagem", seed_dados=True, mps=30, produtos=4, ops=12, saida=baseline, **opcoes)
+            with open(limites, "w") as f:
+                json.dump({"itens_op": {"p95_ms": None}}, f)  # CI compartilhado: vale só o nº de queries
+
+            saida = StringIO()
+            call_command("benchmark_pesagem", baseline=baseline, limites=limites, **{**opcoes, "stdout": saida})
+            self.assertEqual(json.loads(saida.getvalue())["violacoes"], [])
+
+            with open(limites, "w") as f:
+                json.dump({"itens_op": {"p95_ms": None, "queries_max": 0}}, f)
+            with self.assertRaisesMessage(CommandError, "itens_op:"):
+                call_command("benchmark_pesagem", baseline=baseline, limites=limites, **opcoes)
+
+
+class ArquivamentoTests(OPTestCase):
+    MPS = {"MP1": 1_000_000, "MP2": 1_000_000}
+
+    def setUp(self):
+        super().setUp()
+        for item in self.op.itemop_set.all():  # OP1 concluída há 400 dias
+            self.pesar(item, lote_mp="A1")
+        OrdemProducao.objects.filter(pk=self.op.pk).update(concluida_em=timezone.now() - timedelta(days=400))
+        self.aberta = self.criar_op("OP2")
+        self.pesar(self.aberta.itemop_set.first(), liquido=500_000, parcial=True, lote_mp="A1")
+        self.recente = self.criar_op("OP3")  # concluída agora: dentro da retenção
+        for item in self.recente.itemop_set.all():
+            self.pesar(item)
+
+    def test_move_so_encerradas_antigas_e_mantem_rastreio(self):
+        call_command("arquivar_ops", dias=365, stdout=StringIO())
+
+        self.assertEqual(list(OrdemProducaoArquivada.objects.values_list("id", flat=True)), [self.op.id])
+        self.assertEqual(ItemOPArquivado.objects.filter(op_id=self.op.id).count(), 2)
+        self.assertEqual(str(ItemOPArquivado.objects.get(op_id=self.op.id, materia_prima=self.mps["MP1"])),
+                         "OP OP1 - MP1 (MP1) (1000.000/1000.000 g)")
+        self.assertEqual(PesagemArquivada.objects.filter(op_id=self.op.id).count(), 2)
+        self.assertFalse(OrdemProducao.objects.filter(pk=self.op.pk).exists())
+        self.assertFalse(ItemOP.objects.filter(op_id=self.op.pk).exists())
+        self.assertFalse(Pesagem.objects.filter(op_id=self.op.pk).exists())
+        self.assertEqual(set(OrdemProducao.objects.values_list("numero", flat=True)), {"OP2", "OP3"})
+        self.assertEqual(Pesagem.objects.count(), 3)
+
+        url = "/api/registro/arquivo/pesagens/rastreabilidade/"
+        rastreio = self.client.get(url, {"lote_mp": "A1"}).json()
+        self.assertEqual(rastreio["count"], 3)
+        self.assertEqual([(r["op__lote"], r["arquivada"]) for r in rastreio["results"]],
+                         [("L2", False), ("L1", True), ("L1", True)])
+        self.assertEqual(self.client.get(url, {"lote_mp": "a1"}).json()["count"], 0)  # exato: usa o índice
+        sql, params = Pesagem.objects.filter(lote_mp="A1").values("id").query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+            self.assertIn("USING INDEX", " ".join(str(r) for r in cursor.fetchall()))
+        self.assertEqual(self.client.get(url, {"materia_prima": "abc"}).status_code, 400)
+        por_mp = self.client.get(url, {"materia_prima": self.mps["MP1"].id}).json()["results"]
+        self.assertEqual({r["item_op__materia_prima_id"] for r in por_mp}, {self.mps["MP1"].id})
+        self.assertEqual({r["arquivada"] for r in por_mp}, {True, False})
+
+        # o DELETE direto não passa por sinais: a auditoria é gravada à mão, um registro por OP
+        registro = RegistroAuditoria.objects.get(acao="op.arquivada")
+        self.assertEqual((registro.entidade_id, registro.dados["itens"], registro.dados["pesagens"]), (self.op.id, 2, 2))
+        self.assertIsNone(verificar_auditoria(processos=1)["falha"])
+
+    def test_bloco_e_atomico(self):
+        apagar = arquivo._apagar
+
+        def falha_nos_itens(cursor, model, vinculo, op_ids):
+            if model is ItemOP:
+                raise RuntimeError("queda no meio do bloco")
+            return apagar(cursor, model, vinculo, op_ids)
+
+        with mock.patch.object(arquivo, "_apagar", side_effect=falha_nos_itens), self.assertRaises(RuntimeError):
+            arquivo.arquivar(dias=365)
+        self.assertFalse(OrdemProducaoArquivada.objects.exists())
+        self.assertFalse(PesagemArquivada.objects.exists())
+        self.assertEqual(Pesagem.objects.filter(op=self.op).count(), 2)  # já apagadas no bloco: voltaram
+        self.assertFalse(RegistroAuditoria.objects.filter(acao="op.arquivada").exists())
+
+
+class ToleranciaTests(OPTestCase):
+    MPS = {"MP1": 1_000_000, "MP2": 1_000_000}
+
+    def regra(self, escopo, inferior, superior, tipo=RegraTolerancia.TIPO_PERCENTUAL, **alvo):
+        return RegraTolerancia.objects.create(escopo=escopo, tipo=tipo, inferior=Decimal(inferior),
+                                              superior=Decimal(superior), **alvo)
+
+    def limites(self, op):
+        return {i.materia_prima.codigo_interno: (i.quantidade_minima, i.quantidade_maxima)
+                for i in op.itemop_set.select_related("materia_prima")}
+
+    def test_sem_regras_usa_o_padrao(self):
+        padrao = limites_padrao(1_000_000)
+        self.assertEqual(self.limites(self.op), {"MP1": padrao, "MP2": padrao})
+
+    def test_precedencia_mp_produto_global(self):
+        self.regra(RegraTolerancia.ESCOPO_GLOBAL, "0.10", "0.10")
+        self.regra(RegraTolerancia.ESCOPO_PRODUTO, "0.02", "0.02", produto=self.produto)
+        self.regra(RegraTolerancia.ESCOPO_MP, "5", "5", tipo=RegraTolerancia.TIPO_ABSOLUTA,
+                   materia_prima=self.mps["MP1"])
+        self.assertEqual(self.limites(self.criar_op("OP2")), {
+            "MP1": (995_000, 1_005_000),    # regra da MP
+            "MP2": (980_000, 1_020_000),    # regra do produto
+        })
+
+        outro = Produto.objects.create(nome="Outro", codigo_interno="P2")
+        tabela = TabelaTolerancia.carregar(outro.pk, materia_prima_ids=[self.mps["MP2"].pk])
+        self.assertEqual(tabela.limites(1_000_000, outro.pk, self.mps["MP2"].pk), (900_000, 1_100_000))
+
+    def test_item_da_estrutura_vence_a_mp(self):
+        item_estrutura = self.estrutura.itens.get(materia_prima=self.mps["MP1"])
+        self.regra(RegraTolerancia.ESCOPO_MP, "0.02", "0.02", materia_prima=self.mps["MP1"])
+        self.regra(RegraTolerancia.ESCOPO_ITEM_ESTRUTURA, "0.01", "0.03", item_estrutura=item_estrutura)
+        self.assertEqual(self.limites(self.criar_op("OP2"))["MP1"], (990_000, 1_030_000))
+
+    def test_limites_congelados_no_item(self):
+        regra = self.regra(RegraTolerancia.ESCOPO_PRODUTO, "0.02", "0.02", produto=self.produto)
+        op = self.criar_op("OP2")
+        regra.superior = Decimal("0.50")
+        regra.save()
+        self.regra(RegraTolerancia.ESCOPO_MP, "0.01", "0.01", materia_prima=self.mps["MP1"])
+
+        item = op.itemop_set.get(materia_prima=self.mps["MP1"])
+        item.save()  # save completo não recongela
+        item.refresh_from_db()
+        self.assertEqual((item.quantidade_minima, item.quantidade_maxima), (980_000, 1_020_000))
+
+        item.congelar_tolerancia()  # só a chamada explícita usa as regras atuais
+        self.assertEqual((item.quantidade_minima, item.quantidade_maxima), (990_000, 1_010_000))
+
+    def test_item_criado_avulso_congela_na_criacao(self):
+        self.regra(RegraTolerancia.ESCOPO_MP, "0.01", "0.01", materia_prima=self.mps["MP2"])
+        op = OrdemProducao.objects.create(numero="OP2", produto=self.produto, estrutura=self.estrutura, lote="L2")
+        item = ItemOP.objects.create(op=op, materia_prima=self.mps["MP2"], quantidade_necessaria=1_000_000)
+        self.assertEqual((item.quantidade_minima, item.quantidade_maxima), (990_000, 1_010_000))
+
+    def test_alterar_quantidade_pela_api_recongela(self):
+        self.regra(RegraTolerancia.ESCOPO_PRODUTO, "0.02", "0.02", produto=self.produto)
+        admin = APIClient()
+        admin.force_authenticate(User.objects.create_user("admin", is_staff=True))
+        r = admin.patch(f"/api/registro/itens-op/{self.item.id}/", {"quantidade_necessaria": "2000"}, format="json")
+        self.assertEqual(r.status_code, 200, r.content)
+        self.item.refresh_from_db()
+        self.assertEqual((self.item.quantidade_minima, self.item.quantidade_maxima), (1_960_000, 2_040_000))
+
+
+class PesagemIdempotenciaTests(OPTestCase):
+    def test_replay_nao_soma_novamente(self):
+        r1 = self.client.post("/api/registro/pesagens/", self.payload, format="json", HTTP_IDEMPOTENCY_KEY="abc")
+        r2 = self.client.post("/api/registro/pesagens/", self.payload, format="json", HTTP_IDEMPOTENCY_KEY="abc")
+        self.assertEqual(r1.status_code, 201)
+        self.assertEqual(r2.status_code, 201)
+        self.assertEqual(r2["Idempotent-Replayed"], "true")
+        self.assertEqual(r1.json()["id"], r2.json()["id"])
+        self.assertEqual(Pesagem.objects.count(), 1)
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.quantidade_pesada, 1_000_000)
+
+    def test_chave_reutilizada_com_outro_corpo(self):
+        self.client.post("/api/registro/pesagens/", self.payload, format="json", HTTP_IDEMPOTENCY_KEY="abc")
+        outro = {**self.payload, "tara": "0.200"}
+        r = self.client.post("/api/registro/pesagens/", outro, format="json", HTTP_IDEMPOTENCY_KEY="abc")
+        self.assertEqual(r.status_code, 422)
+
+
+class PesagemReferenciasTests(OPTestCase):
+    """POST /pesagens/: OP, item e balança resolvidos numa consulta travada; erros viram 400."""
+
+    def test_criacao_com_consultas_fixas(self):
+        balanca = Balanca.objects.create(nome="B1", identificador="b1")
+        # savepoints + 1 SELECT (item+OP+MP+balança) + insert/acumulado/outbox + status da OP + auditoria
+        with self.assertNumQueries(16):
+            r = self.client.post("/api/registro/pesagens/", {**self.payload, "balanca_id": balanca.id}, format="json")
+        self.assertEqual(r.status_code, 201, r.content)
+        self.assertEqual((r.json()["op"], r.json()["balanca"], r.json()["produto_nome"]), (self.op.id, balanca.id, "Produto"))
+
+    def test_referencias_e_tolerancia_invalidas_viram_400(self):
+        for extra, campo in (({"balanca_id": 999}, "balanca_id"), ({"item_op_id": 999}, "item_op_id"),
+                             ({"op_id": 999}, "op_id"), ({"liquido": "0.500"}, "tolerância")):
+            r = self.client.post("/api/registro/pesagens/", {**self.payload, **extra}, format="json")
+            self.assertEqual(r.status_code, 400, extra)
+            self.assertIn(campo, r.content.decode())
+        self.assertEqual(Pesagem.objects.count(), 0)
+
+
+class ReconciliacaoAcumuladosTests(OPTestCase):
+    MPS = {"MP1": 1_000_000, "MP2": 1_000_000}
+
+    def setUp(self):
+        super().setUp()
+        self.outro = self.op.itemop_set.exclude(pk=self.item.pk).get()
+        self.pesar()
+
+    def test_corrige_so_divergentes_e_reavalia_status(self):
+        ItemOP.objects.filter(pk=self.outro.pk).update(quantidade_pesada=1_000_000)  # ajuste manual sem pesagem
+        OrdemProducao.objects.filter(pk=self.op.pk).update(status=StatusOP.CONCLUIDA)
+        eventos = EventoOutbox.objects.count()
+
+        # por bloco: OPs, soma agrupada, itens; com divergência: status antes, savepoint,
+        # bulk_update, reavaliação, status depois, evento de outbox, auditoria em lote
+        # (cabeça, 1 INSERT, cabeça), release
+        with self.assertNumQueries(13):
+            resumo = reconciliar()
+
+        self.assertEqual([d["item_op_id"] for d in resumo["divergentes"]], [self.outro.pk])
+        self.assertEqual(resumo["desvio_total_mg"], 1_000_000)
+        self.outro.refresh_from_db()
+        self.op.refresh_from_db()
+        self.assertEqual(self.outro.quantidade_pesada, 0)
+        self.assertEqual(self.op.status, StatusOP.EM_ANDAMENTO)
+        self.assertEqual(EventoOutbox.objects.count(), eventos + 1)
+        self.assertEqual(reconciliar()["divergentes"], [])
+
+
+class EstornoPesagemTests(OPTestCase):
+    def setUp(self):
+        super().setUp()
+        self.lote = LoteMP.objects.create(materia_prima=self.mps["MP1"], codigo="A1", validade=date.today(),
+                                          quantidade_inicial=5_000_000)
+        self.pesagem = self.pesar(tara=100_000, lote_mp="A1")
+
+    def test_correcao_e_anulacao_aplicam_so_o_delta(self):
+        r = self.client.patch(f"/api/registro/pesagens/{self.pesagem.pk}/", {"liquido": "0.980"}, format="json")
+        self.assertEqual(r.status_code, 200, r.content)
+        substituta = Pesagem.objects.get(pk=r.json()["id"])
+        self.assertEqual((substituta.corrige_id, substituta.liquido, substituta.tara), (self.pesagem.pk, 980_000, 100_000))
+        self.assertEqual(Pesagem.objects.get(pk=self.pesagem.pk).liquido, 1_000_000)  # original intacta
+        self.assertEqual(Pesagem.objects.get(estorno_de=self.pesagem).liquido, -1_000_000)
+        self.item.refresh_from_db()
+        self.lote.refresh_from_db()
+        self.assertEqual(self.item.quantidade_pesada, 980_000)
+        self.assertEqual(self.lote.quantidade_disponivel, 5_000_000 - 980_000)
+
+        r = self.client.delete(f"/api/registro/pesagens/{substituta.pk}/?motivo=erro")
+        self.assertEqual(r.status_code, 204)
+        self.item.refresh_from_db()
+        self.op.refresh_from_db()
+        self.assertEqual(self.item.quantidade_pesada, 0)
+        self.assertEqual((self.op.status, self.op.concluida_em), (StatusOP.EM_ANDAMENTO, None))
+        self.assertEqual(LoteMP.objects.get(pk=self.lote.pk).quantidade_disponivel, 5_000_000)
+        self.assertEqual(reconciliar(corrigir=False)["divergentes"], [])
+
+        r = self.client.post(f"/api/registro/pesagens/{substituta.pk}/anular/", {}, format="json")
+        self.assertEqual(r.status_code, 400)
+
+    def test_correcao_sem_alteracao_e_recusada(self):
+        for corpo in ({}, {"liquido": "1.000", "tara": "0.100", "lote_mp": " A1 "}):
+            r = self.client.patch(f"/api/registro/pesagens/{self.pesagem.pk}/", corpo, format="json")
+            self.assertEqual(r.status_code, 400, corpo)
+        self.assertEqual(Pesagem.objects.count(), 1)
+        self.assertFalse(EventoOutbox.objects.filter(tipo="pesagem.estornada").exists())
+
+    def test_regravar_pesagem_e_bloqueado(self):
+        self.pesagem.liquido = 2_000_000
+        with self.assertRaises(ValidationError):
+            self.pesagem.save()
+
+
+class AuditoriaTests(OPTestCase):
+    def setUp(self):
+        super().setUp()
+        self.pesar().corrigir("y", "tara errada", liquido=990_000)
+
+    def test_trilha_encadeada_e_verificacao(self):
+        acoes = list(RegistroAuditoria.objects.values_list("acao", flat=True))
+        self.assertEqual(acoes, [
+            "op.criada", "item_op.criado",
+            "pesagem.criada", "op.status_alterado",      # pesagem fecha a OP
+            "pesagem.estornada", "pesagem.criada",       # correção: estorno + substituta
+            "op.status_alterado",                        # 990 g < necessário: reabre
+        ])
+        self.assertIsNone(verificar_auditoria(processos=1)["falha"])
+
+        with connection.cursor() as cursor:  # adulteração direta no banco
+            cursor.execute("UPDATE registro_registroauditoria SET usuario = 'z' WHERE seq = 3")
+        self.assertEqual(verificar_auditoria(processos=1, segmentos=3)["falha"]["seq"], 3)
+
+    def test_registros_apagados_do_fim_sao_detectados(self):
+        with connection.cursor() as cursor:
+            cursor.execute("DELETE FROM registro_registroauditoria WHERE seq >= 5")
+        falha = verificar_auditoria(processos=1)["falha"]
+        self.assertEqual(falha["seq"], 5)
+        self.assertIn("truncada", falha["motivo"])
+
+    def test_cabeca_semeada_e_recriada_apos_flush(self):
+        self.assertEqual(list(CadeiaAuditoria.objects.values_list("pk", "ultimo_seq")), [(1, 7)])
+        CadeiaAuditoria.objects.all().delete()
+        RegistroAuditoria.objects.all().delete()
+        RegistroAuditoria.registrar("op", self.op.pk, "op.teste", {})
+        self.assertEqual(list(CadeiaAuditoria.objects.values_list("pk", "ultimo_seq")), [(1, 1)])
+        self.assertIsNone(verificar_auditoria(processos=1)["falha"])
+
+
+class SincronizacaoPesagensTests(OPTestCase):
+    MPS = {"MP1": 1_000_000, "MP2": 1_000_000}  # MP2 pendente: a OP segue aberta após pesar MP1
+
+    def test_lote_deduplica_e_reporta_conflito(self):
+        lote = [
+            {**self.payload, "uuid": "11111111-1111-1111-1111-111111111111", "capturada_em": "2026-01-05T10:00:00Z"},
+            {**self.payload, "uuid": "11111111-1111-1111-1111-111111111111"},
+            {**self.payload, "uuid": "22222222-2222-2222-2222-222222222222"},
+        ]
+        r = self.client.post("/api/registro/sync/pesagens/", {"pesagens": lote}, format="json")
+        self.assertEqual(r.status_code, 200)
+        corpo = r.json()
+        self.assertEqual(len(corpo["aplicadas"]), 1)
+        self.assertEqual(len(corpo["duplicadas"]), 1)
+        self.assertEqual(corpo["conflitos"][0]["motivo"], "item_concluido")
+
+        # reenvio do mesmo lote (ex.: resposta perdida) não soma de novo
+        r = self.client.post("/api/registro/sync/pesagens/", {"pesagens": lote[:1]}, format="json")
+        self.assertEqual(len(r.json()["duplicadas"]), 1)
+        self.assertEqual(Pesagem.objects.count(), 1)
+        self.assertIsNotNone(Pesagem.objects.get().capturada_em)
+
+    def test_uuid_normalizado_e_invalido_por_item(self):
+        uuid = "aaaaaaaa-bbbb-cccc-dddd-eeeeeeeeeeee"
+        lote = [{**self.payload, "liquido": "0.500", "parcial": True, "uuid": uuid}]
+        self.assertEqual(len(self.client.post("/api/registro/sync/pesagens/", {"pesagens": lote}, format="json").json()["aplicadas"]), 1)
+
+        # reenvio com outra caixa/formato: duplicada, nada é somado; valor que não é UUID só invalida o próprio item
+        lote = [{**lote[0], "uuid": uuid.upper()}, {**lote[0], "uuid": "{%s}" % uuid.replace("-", "")},
+                {**self.payload, "uuid": "abc"}, {**self.payload, "uuid": ["x"]}]
+        r = self.client.post("/api/registro/sync/pesagens/", {"pesagens": lote}, format="json")
+        self.assertEqual(r.status_code, 200)
+        corpo = r.json()
+        self.assertEqual([(d["posicao"], d["uuid"]) for d in corpo["duplicadas"]], [(0, uuid), (1, uuid)])
+        self.assertEqual([(c["posicao"], c["motivo"], c["erros"]) for c in corpo["conflitos"]],
+                         [(2, "invalida", {"uuid": ["UUID inválido."]}), (3, "invalida", {"uuid": ["UUID inválido."]})])
+        self.assertEqual(Pesagem.objects.count(), 1)
+
+    def test_lote_sem_saldo_e_inativo_tem_motivo_proprio(self):
+        mp = self.item.materia_prima
+        LoteMP.objects.create(materia_prima=mp, codigo="CURTO", validade=date.today(), quantidade_inicial=500_000)
+        LoteMP.objects.create(materia_prima=mp, codigo="PARADO", validade=date.today(), quantidade_inicial=5_000_000,
+                              ativo=False)
+        lote = [
+            {**self.payload, "lote_mp": "CURTO", "uuid": "33333333-3333-3333-3333-333333333333"},
+            {**self.payload, "lote_mp": "PARADO", "uuid": "44444444-4444-4444-4444-444444444444"},
+        ]
+        corpo = self.client.post("/api/registro/sync/pesagens/", {"pesagens": lote}, format="json").json()
+        self.assertEqual([c["motivo"] for c in corpo["conflitos"]], ["lote_sem_saldo", "lote_inativo"])
+        self.assertIn("Saldo insuficiente", corpo["conflitos"][0]["erros"][0])
+        self.assertEqual(Pesagem.objects.count(), 0)
+
+
+class OutboxTests(OPTestCase):
+    def setUp(self):
+        super().setUp()
+        self.pesar(tara=100_000)
+
+    def test_eventos_gravados_na_transacao(self):
+        tipos = list(EventoOutbox.objects.values_list("tipo", flat=True))
+        # pesagem e, em seguida, a conclusão da OP que ela provocou
+        self.assertEqual(tipos, ["pesagem.criada", "op.status_alterado"])
+        self.assertEqual(EventoOutbox.objects.last().payload["status"], "concluida")
+
+    def test_sink_arquivo_avanca_offset_em_lotes(self):
+        with tempfile.TemporaryDirectory() as d:
+            caminho = os.path.join(d, "eventos.ndjson")
+            sink = SinkArquivo(caminho)
+            self.assertEqual(entregar_lote("arq", sink, lote=1), 1)
+            self.assertEqual(entregar_lote("arq", sink, lote=1), 1)
+            self.assertEqual(entregar_lote("arq", sink, lote=1), 0)
+            with open(caminho, encoding="utf-8") as f:
+                ids = [json.loads(linha)["id"] for linha in f]
+        self.assertEqual(ids, list(EventoOutbox.objects.values_list("id", flat=True)))
+        self.assertEqual(OffsetConsumidor.objects.get(consumidor="arq").ultimo_id, ids[-1])
+
+    def test_webhook_falha_nao_avanca_offset(self):
+        recebidos, respostas = [], [500, 200]
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                recebidos.append(json.loads(self.rfile.read(int(self.headers["Content-Length"]))))
+                self.send_response(respostas.pop(0))
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        servidor = HTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=servidor.serve_forever, daemon=True).start()
+        self.addCleanup(servidor.shutdown)
+        sink = SinkWebhook(f"http://127.0.0.1:{servidor.server_port}/eventos", timeout=5)
+
+        with self.assertRaises(ErroEntrega):
+            entregar_lote("erp", sink)
+        offset = OffsetConsumidor.objects.get(consumidor="erp")
+        self.assertEqual((offset.ultimo_id, offset.tentativas), (0, 1))
+
+        self.assertEqual(entregar_lote("erp", sink), 2)
+        # o mesmo lote é reenviado inteiro após a falha
+        self.assertEqual(recebidos[0], recebidos[1])
+        offset.refresh_from_db()
+        self.assertEqual(offset.tentativas, 0)
+
+
+class EtiquetaImpressaoTests(OPTestCase):
+    def setUp(self):
+        super().setUp()
+        MateriaPrima.objects.filter(pk=self.mps["MP1"].pk).update(nome="MP ^especial~")  # escape ZPL
+        balanca = Balanca.objects.create(nome="B1", identificador="B1", localizacao="Linha 1")
+        self.pesagem = self.pesar(tara=100_000, balanca=balanca)
+
+        # impressora de teste: guarda o que chega em cada conexão
+        self.recebido = []
+        recebido = self.recebido
+
+        class Impressora(socketserver.BaseRequestHandler):
+            def handle(self):
+                dados = b""
+                while bloco := self.request.recv(4096):
+                    dados += bloco
+                recebido.append(dados)
+
+        servidor = socketserver.TCPServer(("127.0.0.1", 0), Impressora)
+        threading.Thread(target=servidor.serve_forever, daemon=True).start()
+        self.addCleanup(servidor.server_close)
+        self.addCleanup(servidor.shutdown)
+        self.impressora = ImpressoraEtiqueta.objects.create(
+            nome="Zebra 1", estacao="linha 1", endereco_ip="127.0.0.1", porta=servidor.server_address[1],
+        )
+
+    def _esperar_conexoes(self, n):
+        limite = timezone.now() + timedelta(seconds=5)
+        while len(self.recebido) < n and timezone.now() < limite:
+            threading.Event().wait(0.01)
+        self.assertEqual(len(self.recebido), n)
+
+    def test_formatos_com_os_mesmos_campos(self):
+        url = f"/api/registro/etiqueta/{self.pesagem.pk}/"
+        self.assertTrue(self.client.get(url).content.startswith(b"%PDF"))
+        zpl = self.client.get(url, {"formato": "zpl"}).content.decode()
+        self.assertTrue(zpl.startswith("^XA") and zpl.rstrip().endswith("^XZ"))
+        self.assertIn("^FDMatéria-prima: MP \\5Eespecial\\7E^FS", zpl)
+        self.assertIn("Peso Líquido: 1.000,000 g", zpl)
+        epl = self.client.get(url, {"formato": "epl"}).content.decode("cp1252")
+        self.assertIn('"Peso Líquido: 1.000,000 g"', epl)
+        self.assertEqual(self.client.get(url, {"formato": "png"}).status_code, 400)
+
+    def test_spooler_agrupa_por_impressora_e_reenvia_apos_falha(self):
+        # sem impressora/estação no pedido: vale a estação da balança
+        for copias in (1, 2):
+            r = self.client.post("/api/registro/etiquetas/imprimir/",
+                                 {"pesagens": [self.pesagem.pk], "copias": copias}, format="json")
+            self.assertEqual(r.status_code, 202, r.content)
+        self.assertEqual(processar_fila(), {"enviados": 2, "falhas": 0, "erros": {}})
+        self._esperar_conexoes(1)  # as duas etiquetas na mesma conexão
+        self.assertEqual(self.recebido[0].count(b"^XA"), 2)
+        self.assertIn(b"^PQ2", self.recebido[0])
+
+        # impressora fora do ar: volta para a fila com espera
+        porta_ok = self.impressora.porta
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            porta_fechada = s.getsockname()[1]
+        ImpressoraEtiqueta.objects.filter(pk=self.impressora.pk).update(porta=porta_fechada)
+        r = self.client.post("/api/registro/etiquetas/imprimir/",
+                             {"pesagens": [self.pesagem.pk], "estacao": "Linha 1"}, format="json")
+        self.assertEqual(r.status_code, 202, r.content)
+        resumo = processar_fila(timeout=1)
+        self.assertEqual((resumo["enviados"], resumo["falhas"]), (0, 1))
+        trabalho = TrabalhoImpressao.objects.get(pk=r.json()["trabalhos"][0]["id"])
+        self.assertEqual((trabalho.status, trabalho.tentativas), (StatusImpressao.PENDENTE, 1))
+        self.assertEqual(processar_fila()["enviados"], 0)  # ainda esperando
+
+        ImpressoraEtiqueta.objects.filter(pk=self.impressora.pk).update(porta=porta_ok)
+        self.assertEqual(processar_fila(agora=timezone.now() + timedelta(minutes=5))["enviados"], 1)
+        self._esperar_conexoes(2)
+
+        r = self.client.post("/api/registro/etiquetas/imprimir/",
+                             {"pesagens": [self.pesagem.pk], "estacao": "Linha 9"}, format="json")
+        self.assertEqual(r.status_code, 400)
+
+
+class TarefasTests(OPTestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+        super().setUp()
+        self.pesagem = self.pesar(tara=100_000)
+        self.operador, self.client = self.client, APIClient()
+        self.client.force_authenticate(User.objects.create_user("admin", is_staff=True))
+
+    def test_fila_prioridade_resultado_e_arquivo(self):
+        corpo = {"tipo": "etiquetas_pdf", "parametros": {"pesagens": [self.pesagem.pk, self.pesagem.pk]}}
+        self.assertEqual(self.operador.post("/api/registro/tarefas/", corpo, format="json").status_code, 403)
+
+        r = self.client.post("/api/registro/tarefas/", corpo, format="json")
+        self.assertEqual(r.status_code, 202, r.content)
+        urgente = self.client.post("/api/registro/tarefas/", {"tipo": "reconciliar_acumulados", "prioridade": 5},
+                                   format="json").json()
+        self.assertEqual(tarefas.reservar(limite=1), [urgente["id"]])
+        self.assertEqual(tarefas.reservar(limite=5), [r.json()["id"]])
+        Tarefa.objects.update(status=StatusTarefa.PENDENTE)
+
+        call_command("worker_tarefas", concorrencia=1, stdout=StringIO())
+        tarefa = self.client.get(f"/api/registro/tarefas/{r.json()['id']}/").json()
+        self.assertEqual((tarefa["status"], tarefa["resultado"]), ("concluida", {"etiquetas": 2}))
+        pdf = self.client.get(tarefa["arquivo"])
+        self.assertTrue(b"".join(pdf.streaming_content).startswith(b"%PDF"))
+        self.assertEqual(Tarefa.objects.get(pk=urgente["id"]).resultado["divergentes"], [])
+
+    def test_falhas_definitivas_e_novas_tentativas(self):
+        invalida = tarefas.enfileirar("etiquetas_pdf", {"pesagens": [999]})
+        chamadas = []
+
+        @tarefas.tarefa("instavel")
+        def instavel(t):
+            chamadas.append(t.pk)
+            if len(chamadas) == 1:
+                raise OSError("disco indisponível")
+            return {"ok": True}
+        self.addCleanup(tarefas.TIPOS.pop, "instavel")
+        instavel_t = tarefas.enfileirar("instavel", max_tentativas=2)
+
+        call_command("worker_tarefas", concorrencia=1, stdout=StringIO())
+        invalida.refresh_from_db()
+        instavel_t.refresh_from_db()
+        self.assertEqual((invalida.status, invalida.tentativas), (StatusTarefa.FALHOU, 1))
+        self.assertIn("999", invalida.erro)
+        self.assertEqual((instavel_t.status, instavel_t.tentativas), (StatusTarefa.PENDENTE, 1))
+        self.assertGreater(instavel_t.proxima_tentativa, timezone.now())
+
+        Tarefa.objects.filter(pk=instavel_t.pk).update(proxima_tentativa=timezone.now())
+        call_command("worker_tarefas", concorrencia=1, stdout=StringIO())
+        instavel_t.refresh_from_db()
+        self.assertEqual((instavel_t.status, instavel_t.resultado), (StatusTarefa.CONCLUIDA, {"ok": True}))
+
+    def test_recupera_so_sem_sinal_e_descarta_resultado_atrasado(self):
+        longa = tarefas.enfileirar("reconciliar_acumulados", max_tentativas=2)
+        morta = tarefas.enfileirar("reconciliar_acumulados", max_tentativas=1)
+        tarefas.reservar(limite=2)
+        agora = timezone.now()
+        Tarefa.objects.update(iniciada_em=agora - timedelta(hours=3), ultimo_sinal=agora - timedelta(hours=1))
+        Tarefa.objects.filter(pk=longa.pk).update(ultimo_sinal=agora)  # worker vivo, rodando há 3 h
+
+        self.assertEqual(tarefas.recuperar_travadas(agora=agora), 1)
+        self.assertEqual(tarefas.recuperar_travadas(agora=agora), 0)
+        morta.refresh_from_db()
+        self.assertEqual((morta.status, morta.tentativas, morta.executor), (StatusTarefa.FALHOU, 1, ""))
+        self.assertIn("sem resposta", morta.erro)
+        self.assertEqual(Tarefa.objects.get(pk=longa.pk).status, StatusTarefa.EXECUTANDO)
+
+        @tarefas.tarefa("perde_reserva")
+        def perde_reserva(t):
+            # enquanto executa, outro worker a considera morta e a devolve à fila
+            Tarefa.objects.filter(pk=t.pk).update(ultimo_sinal=timezone.now() - timedelta(hours=1))
+            tarefas.recuperar_travadas()
+            return {"ok": True}
+        self.addCleanup(tarefas.TIPOS.pop, "perde_reserva")
+        atrasada = tarefas.enfileirar("perde_reserva")
+        self.assertEqual(tarefas.reservar(limite=1, tipos=["perde_reserva"]), [atrasada.pk])
+
+        self.assertEqual(tarefas.executar(atrasada.pk), StatusTarefa.PENDENTE)
+        atrasada.refresh_from_db()
+        self.assertEqual((atrasada.tentativas, atrasada.resultado), (1, None))
+
+
+class PlanoPesagemTests(OPTestCase):
+    MPS = {"MP1": 500_000, "MP2": 25_000_000}
+
+    def setUp(self):
+        super().setUp()
+        self.pequena = Balanca.objects.create(nome="B3", identificador="B3", capacidade_maxima=Decimal("3"), divisao=Decimal("0.001"))
+        self.grande = Balanca.objects.create(nome="B15", identificador="B15", capacidade_maxima=Decimal("15"), divisao=Decimal("0.005"))
+
+    def _plano(self):
+        r = self.client.get(f"/api/registro/ops/{self.op.id}/plano-pesagem/")
+        self.assertEqual(r.status_code, 200)
+        return {i["materia_prima"]["codigo_interno"]: i for i in r.json()["itens"]}
+
+    def test_escolhe_balanca_e_divide_item_grande(self):
+        plano = self._plano()
+        self.assertEqual(plano["MP1"]["balanca"]["id"], self.pequena.id)
+        self.assertEqual(plano["MP1"]["pesagens"], 1)
+        # 25 kg não cabem em 15 kg: 2 frações na balança grande
+        self.assertEqual(plano["MP2"]["balanca"]["id"], self.grande.id)
+        self.assertEqual(plano["MP2"]["pesagens"], 2)
+        self.assertEqual(sum(Decimal(f) for f in plano["MP2"]["fracoes_g"]), Decimal("25000"))
+
+    def test_fracao_parcial_aceita_e_invalida_cache(self):
+        self._plano()
+        item = self.op.itemop_set.get(materia_prima__codigo_interno="MP2")
+        base = {"op_id": self.op.id, "item_op_id": item.id, "tara": "0.500", "balanca_id": self.grande.id}
+        r = self.client.post("/api/registro/pesagens/", {**base, "liquido": "12.500", "parcial": True}, format="json")
+        self.assertEqual(r.status_code, 201)
+        self.assertEqual(Decimal(self._plano()["MP2"]["restante_g"]), Decimal("12500"))
+        r = self.client.post("/api/registro/pesagens/", {**base, "liquido": "12.500"}, format="json")
+        self.assertEqual(r.status_code, 201)
+        self.assertNotIn("MP2", self._plano())
+
+
+
+class CamposEsparsosTests(OPTestCase):
+    MPS = {"MP0": 1_000_000, "MP1": 1_000_000, "MP2": 1_000_000}
+
+    def setUp(self):
+        super().setUp()
+        for op in (self.op, self.criar_op("OP2"), self.criar_op("OP3")):
+            for item in op.itemop_set.all():
+                self.pesar(item, tara=100_000)
+
+    def test_padrao_inalterado_e_recorte(self):
+        completo = self.client.get("/api/registro/ops/").json()["results"][0]
+        self.assertEqual(len(completo["estrutura"]["itens"]), 3)
+
+        r = self.client.get("/api/registro/ops/", {"fields": "id,numero,estrutura", "expand": ""})
+        self.assertEqual(r.json()["results"][0], {"id": completo["id"], "numero": completo["numero"],
+                                                  "estrutura": completo["estrutura"]["id"]})
+
+        r = self.client.get("/api/registro/ops/", {"fields": "numero,estrutura.itens.materia_prima.nome",
+                                                   "expand": "estrutura.itens.materia_prima"})
+        self.assertEqual(r.json()["results"][0]["estrutura"]["itens"][0], {"materia_prima": {"nome": "MP0"}})
+
+        r = self.client.get("/api/registro/ops/", {"fields": "numero,xyz", "expand": "lote"})
+        self.assertEqual(r.status_code, 400)
+
+    def test_consulta_segue_o_recorte(self):
+        with self.assertNumQueries(3):  # sem recorte: árvore completa, sem N+1 por linha
+            self.client.get("/api/registro/pesagens/")
+
+        params = {"fields": "id,liquido,produto_nome,op.numero,item_op", "expand": "op"}
+        with self.assertNumQueries(2):  # count + página, tudo num JOIN
+            r = self.client.get("/api/registro/pesagens/", params)
+        linha = r.json()["results"][0]
+        self.assertEqual(set(linha), {"id", "liquido", "produto_nome", "op", "item_op"})
+        self.assertEqual((linha["op"], linha["produto_nome"]), ({"numero": "OP3"}, "Produto"))
+        self.assertIsInstance(linha["item_op"], int)
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get("/api/registro/pesagens/", {"fields": "id,liquido", "expand": ""})
+        self.assertNotIn("JOIN", ctx.captured_queries[-1]["sql"])
+        self.assertNotIn("codigo_interno", ctx.captured_queries[-1]["sql"])
+
+        with self.assertNumQueries(3):  # count + OPs com estrutura + itens com MP
+            r = self.client.get("/api/registro/ops/", {"expand": "estrutura.itens.materia_prima"})
+        self.assertEqual(r.json()["results"][0]["estrutura"]["itens"][0]["materia_prima"]["nome"], "MP0")
+
+
+class EstacaoBootstrapTests(OPTestCase):
+    def setUp(self):
+        super().setUp()
+        self.ops = [self.op, self.criar_op("OP2")]
+        Balanca.objects.create(nome="B1", identificador="b1")
+        Balanca.objects.create(nome="B2", identificador="b2", ativo=False)
+        self.client.force_authenticate(User.objects.create_user("ana", first_name="Ana"))
+
+    def test_carga_completa_e_delta(self):
+        with self.assertNumQueries(4):  # versão + OPs + itens + balanças
+            r = self.client.get("/api/registro/estacao/bootstrap/")
+        corpo = r.json()
+        self.assertTrue(corpo["completo"])
+        self.assertEqual(corpo["usuario"]["nome_exibicao"], "Ana")
+        self.assertEqual([b["nome"] for b in corpo["balancas"]], ["B1"])
+        self.assertEqual({o["numero"]: o["itens_pendentes"] for o in corpo["ops"]}, {"OP1": 1, "OP2": 1})
+        self.assertEqual(corpo["ops"][0]["itens"][0]["quantidade_restante"], "1000.000")
+
+        versao = corpo["versao"]
+        with self.assertNumQueries(2):  # nada mudou: versão + balanças
+            r = self.client.get("/api/registro/estacao/bootstrap/", {"since": versao})
+        self.assertEqual((r.json()["ops"], r.json()["ops_encerradas"]), ([], []))
+
+        self.pesar()
+        r = self.client.get("/api/registro/estacao/bootstrap/", {"since": versao}).json()
+        self.assertFalse(r["completo"])
+        self.assertEqual((r["ops"], r["ops_encerradas"]), ([], [self.ops[0].id]))  # concluída: sai da lista
+
+        Pesagem.objects.filter(op=self.ops[0]).get().anular("x", "erro")
+        r = self.client.get("/api/registro/estacao/bootstrap/", {"since": r["versao"]}).json()
+        self.assertEqual([(o["id"], o["itens"][0]["quantidade_pesada"]) for o in r["ops"]], [(self.ops[0].id, "0.000")])
+
+        self.assertEqual(self.client.get("/api/registro/estacao/bootstrap/", {"since": "x"}).status_code, 400)
+        self.assertTrue(self.client.get("/api/registro/estacao/bootstrap/", {"since": 10**9}).json()["completo"])
+
+
+class AlteracoesDesdeTests(TestCase):
+    def setUp(self):
+        self.produto = Produto.objects.create(nome="Produto", codigo_interno="P1")
+        self.mps = [MateriaPrima.objects.create(nome=f"MP{n}", codigo_interno=f"MP{n}") for n in range(2)]
+        self.estrutura = EstruturaProduto.objects.create(produto=self.produto, descricao="padrão")
+        ItemEstrutura.objects.create(estrutura=self.estrutura, materia_prima=self.mps[0], quantidade_por_lote=1_000)
+        antes = timezone.now() - timedelta(hours=1)
+        for modelo in (Produto, MateriaPrima, EstruturaProduto, ItemEstrutura):
+            modelo.objects.update(atualizado_em=antes)
+        self.desde = (timezone.now() - timedelta(minutes=10)).isoformat()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user("op1"))
+
+    def test_delta_inclui_aninhados_e_exclusoes(self):
+        vazio = self.client.get("/api/registro/estruturas/", {"updated_since": self.desde}).json()
+        self.assertEqual((vazio["alterados"], vazio["excluidos"]), ([], []))
+
+        self.mps[0].nome = "MP renomeada"
+        self.mps[0].save()
+        excluida = self.mps[1].pk
+        self.mps[1].delete()
+        r = self.client.get("/api/registro/materias-primas/", {"updated_since": self.desde, "fields": "id,nome"}).json()
+        self.assertEqual(r["alterados"], [{"id": self.mps[0].id, "nome": "MP renomeada"}])
+        self.assertEqual(r["excluidos"], [excluida])
+        estruturas = self.client.get("/api/registro/estruturas/", {"updated_since": self.desde}).json()["alterados"]
+        self.assertEqual(estruturas[0]["itens"][0]["materia_prima"]["nome"], "MP renomeada")
+
+        self.estrutura.itens.get().delete()  # item some => estrutura reenviada sem ele
+        r = self.client.get("/api/registro/estruturas/", {"updated_since": r["ate"]}).json()
+        self.assertEqual([(e["id"], e["itens"]) for e in r["alterados"]], [(self.estrutura.id, [])])
+        self.assertEqual(len(self.client.get("/api/registro/produtos/", {"updated_since": self.desde}).json()["alterados"]), 0)
+        self.assertEqual(self.client.get("/api/registro/produtos/", {"updated_since": "ontem"}).status_code, 400)
+
+
+class HistoricoFacetasTests(OPTestCase):
+    MPS = {"MP0": 10_000_000, "MP1": 10_000_000}
+
+    def setUp(self):
+        super().setUp()
+        self.balanca = Balanca.objects.create(nome="B1", identificador="b1")
+        outro = Produto.objects.create(nome="Produto 2", codigo_interno="P2")
+        self.produtos = [self.produto, outro]
+        ops = (self.op, self.criar_op("OP2", self.criar_estrutura(outro, self.MPS)))
+        # OP1: Pesador 0, sem balança, há 10 dias; OP2: Pesador 1, balança B1, hoje
+        for n, op in enumerate(ops):
+            for item in op.itemop_set.all():
+                self.pesar(item, pesador=f"Pesador {n}", parcial=True, balanca=self.balanca if n else None)
+        Pesagem.objects.filter(op=self.op).update(data_hora=timezone.now() - timedelta(days=10))
+
+    def test_filtros_e_facetas(self):
+        url = "/api/registro/pesagens/"
+        produto = self.produtos[1].id
+        with self.assertNumQueries(8):  # count + página + itens da estrutura + 5 facetas
+            r = self.client.get(url, {"produto": produto, "facetas": 1}).json()
+        self.assertEqual(r["count"], 2)
+        facetas = r["facetas"]
+        # a dimensão filtrada ignora o próprio filtro; as outras respeitam
+        self.assertEqual([(f["valor"], f["total"]) for f in facetas["produto"]],
+                         [(self.produtos[0].id, 2), (produto, 2)])
+        self.assertEqual(facetas["pesador"], [{"valor": "Pesador 1", "nome": "Pesador 1", "total": 2}])
+        self.assertEqual(facetas["balanca"], [{"valor": self.balanca.id, "nome": "B1", "total": 2}])
+        self.assertEqual(facetas["status_op"][0]["nome"], "Em andamento")
+
+        hoje = timezone.localdate().isoformat()
+        self.assertEqual(self.client.get(url, {"de": hoje, "ate": hoje}).json()["count"], 2)
+        self.assertEqual(self.client.get(url, {"balanca": "nenhuma"}).json()["count"], 2)
+        self.assertEqual(self.client.get(url, {"pesador": "Pesador 0,Pesador 1", "status_op": "em_andamento"}).json()["count"], 4)
+        self.assertNotIn("facetas", self.client.get(url).json())
+        r = self.client.get(url, {"produto": "x", "de": "ontem"})
+        self.assertEqual((r.status_code, sorted(r.json())), (400, ["de", "produto"]))
+
+
+class RespostasJsonTests(TestCase):
+    def test_orjson_igual_ao_renderer_padrao(self):
+        dados = {
+            "decimal": Decimal("1.50"), "utc": datetime(2025, 1, 2, 3, 4, 5, 678, tzinfo=dt_timezone.utc),
+            "local": timezone.localtime(datetime(2025, 1, 2, 3, 4, 5, tzinfo=dt_timezone.utc)),
+            "data": date(2025, 1, 2), "texto": "linha\u2028nova ç", 1: "chave int",
+            "lazy": gettext_lazy("Pendente"), "duracao": timedelta(seconds=90), "lista": [None, True, 1.5],
+        }
+        self.assertEqual(OrjsonRenderer().render(dados), JSONRenderer().render(dados))
+
+    def test_compressao_negociada_acima_do_minimo(self):
+        self.assertEqual(negociar("deflate, gzip;q=0.5"), "gzip")
+        self.assertIsNone(negociar("gzip;q=0, identity"))
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user("op1"))
+        for n in range(30):
+            Produto.objects.create(nome=f"Produto {n}", codigo_interno=f"P{n}")
+
+        normal = client.get("/api/registro/produtos/")
+        r = client.get("/api/registro/produtos/", HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(r["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", r["Vary"])
+        self.assertEqual(gzip.decompress(r.content), normal.content)
+        self.assertLess(len(r.content), len(normal.content))
+
+        pequeno = client.get("/api/registro/produtos/", {"search": "Produto 7"}, HTTP_ACCEPT_ENCODING="gzip")
+        self.assertFalse(pequeno.has_header("Content-Encoding"))
+
+    def test_parser_orjson(self):
+        self.assertEqual(OrjsonParser().parse(BytesIO('{"nome": "Açúcar", "n": 1}'.encode())), {"nome": "Açúcar", "n": 1})
+        with self.assertRaisesMessage(ParseError, "JSON parse error"):
+            OrjsonParser().parse(BytesIO(b'{"nome": '))
+
+    def test_benchmark_respostas(self):
+        for n in range(3):
+            Produto.objects.create(nome=f"Produto {n}", codigo_interno=f"P{n}")
+        out = StringIO()
+        call_command("benchmark_respostas", url=["/api/registro/produtos/"], repeticoes=1, stdout=out)
+        relatorio = json.loads(out.getvalue())
+        self.assertEqual(relatorio["repeticoes"], 1)
+        dados = relatorio["endpoints"]["/api/registro/produtos/"]
+        self.assertEqual(set(dados), {"render_ms", "bytes", "compressao_ms", "requisicao_ms"})
+        self.assertEqual(set(dados["render_ms"]), {"json", "orjson", "economia_ms"})
+        self.assertIn("gzip", dados["bytes"])
+        self.assertIn("gzip", dados["requisicao_ms"])
+
+
+class SeparacaoTests(OPTestCase):
+    MPS = {"MP1": 1_000_000, "MP2": 250_000}
+
+    def setUp(self):
+        super().setUp()
+        self.ops = [self.op, self.criar_op("OP2"), self.criar_op("OP3")]
+        self.pesar()  # MP1 da OP1 completa
+
+    def test_consolida_restante_por_mp(self):
+        with self.assertNumQueries(1):
+            r = self.client.get("/api/registro/separacao/")
+            corpo = json.loads(b"".join(r.streaming_content))
+        itens = {i["codigo_interno"]: i for i in corpo["itens"]}
+        self.assertEqual(Decimal(itens["MP1"]["restante_g"]), Decimal("2000"))
+        self.assertEqual(itens["MP1"]["ops"], 2)
+        self.assertEqual(Decimal(itens["MP2"]["restante_g"]), Decimal("750"))
+
+        r = self.client.get("/api/registro/separacao/", {"ids": str(self.ops[1].id), "formato": "pdf"})
+        self.assertEqual(r["Content-Type"], "application/pdf")
+        self.assertTrue(b"".join(r.streaming_content).startswith(b"%PDF"))
+
+
+class LoteMPTests(OPTestCase):
+    def setUp(self):
+        super().setUp()
+        self.mp = self.mps["MP1"]
+        hoje = date.today()
+        LoteMP.objects.create(materia_prima=self.mp, codigo="VENCIDO", validade=hoje - timedelta(days=1), quantidade_inicial=5_000_000)
+        LoteMP.objects.create(materia_prima=self.mp, codigo="TARDE", validade=hoje + timedelta(days=90), quantidade_inicial=5_000_000)
+        self.cedo = LoteMP.objects.create(materia_prima=self.mp, codigo="CEDO", validade=hoje + timedelta(days=10), quantidade_inicial=600_000)
+
+    def test_fefo_sugere_validade_mais_proxima(self):
+        sugestao = self.client.get(f"/api/registro/ops/{self.op.id}/lotes-fefo/").json()[0]
+        self.assertEqual(sugestao["lote_sugerido"], "CEDO")
+        self.assertEqual([l["codigo"] for l in sugestao["lotes"]], ["CEDO", "TARDE"])
+        self.assertEqual(Decimal(sugestao["faltante_g"]), 0)
+
+        sql, params = LoteMP.fefo(self.mp.id).values("id")[:1].query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+            plano = " ".join(str(r) for r in cursor.fetchall())
+        self.assertIn("lotemp_fefo_idx", plano)
+
+    def test_pesagem_baixa_saldo_do_lote(self):
+        with self.assertRaises(ValidationError):
+            Pesagem.objects.create(op=self.op, item_op=self.item, tara=0, liquido=1_000_000,
+                                   lote_mp="CEDO", pesador="x")
+        Pesagem.objects.create(op=self.op, item_op=self.item, tara=0, liquido=1_000_000,
+                               lote_mp="TARDE", pesador="x")
+        self.assertEqual(LoteMP.objects.get(codigo="TARDE").quantidade_disponivel, 4_000_000)
+        self.cedo.refresh_from_db()
+        self.assertEqual(self.cedo.quantidade_disponivel, 600_000)
 
-# Create your tests here.
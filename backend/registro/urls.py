@@ -5,18 +5,25 @@ from .views import (
     ProdutoViewSet, MateriaPrimaViewSet, BalancaViewSet,
     EstruturaProdutoViewSet, ItemEstruturaViewSet,
     OrdemProducaoViewSet, ItemOPViewSet,
-    PesagemViewSet, gerar_etiqueta_pdf
+    PesagemViewSet, RegraToleranciaViewSet, gerar_etiqueta,
+    OrdemProducaoArquivadaViewSet, PesagemArquivadaViewSet,
+    SincronizacaoPesagensView, EstacaoBootstrapView, SeparacaoView, LoteMPViewSet,
+    ImpressoraEtiquetaViewSet, TrabalhoImpressaoViewSet, ImpressaoEtiquetasView, TarefaViewSet,
 )
 
 router = DefaultRouter()
 router.register(r'produtos', ProdutoViewSet)
 router.register(r'materias-primas', MateriaPrimaViewSet)
 router.register(r'balancas', BalancaViewSet)
+router.register(r'lotes-mp', LoteMPViewSet)
 
 # BOM
 router.register(r'estruturas', EstruturaProdutoViewSet)
 router.register(r'itens-estrutura', ItemEstruturaViewSet)
 
+# Tolerância
+router.register(r'regras-tolerancia', RegraToleranciaViewSet)
+
 # OP
 router.register(r'ops', OrdemProducaoViewSet)
 router.register(r'itens-op', ItemOPViewSet)
@@ -24,7 +31,22 @@ router.register(r'itens-op', ItemOPViewSet)
 # Pesagens
 router.register(r'pesagens', PesagemViewSet)
 
+# Etiquetas: impressoras por estação e fila do spooler
+router.register(r'impressoras-etiqueta', ImpressoraEtiquetaViewSet)
+router.register(r'impressao/trabalhos', TrabalhoImpressaoViewSet)
+
+# Tarefas em segundo plano (admin)
+router.register(r'tarefas', TarefaViewSet)
+
+# Arquivo (somente leitura)
+router.register(r'arquivo/ops', OrdemProducaoArquivadaViewSet)
+router.register(r'arquivo/pesagens', PesagemArquivadaViewSet)
+
 urlpatterns = [
     path('', include(router.urls)),
-    path('etiqueta/<int:pk>/', gerar_etiqueta_pdf, name='gerar_etiqueta'),
+    path('etiqueta/<int:pk>/', gerar_etiqueta, name='gerar_etiqueta'),
+    path('etiquetas/imprimir/', ImpressaoEtiquetasView.as_view(), name='imprimir_etiquetas'),
+    path('sync/pesagens/', SincronizacaoPesagensView.as_view(), name='sync_pesagens'),
+    path('estacao/bootstrap/', EstacaoBootstrapView.as_view(), name='estacao_bootstrap'),
+    path('separacao/', SeparacaoView.as_view(), name='separacao'),
 ]
@@ -1,40 +1,90 @@
-from rest_framework import viewsets, filters, status
-from rest_framework import viewsets, filters, status
+from rest_framework import viewsets, filters, mixins, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.views import APIView
 from rest_framework.response import Response
+from django.core.exceptions import ValidationError as DjangoValidationError
 from django.db.models.deletion import ProtectedError
-from django.db.models import F
-from django.http import HttpResponse
-from django.conf import settings
-from reportlab.lib.pagesizes import A7
-from reportlab.pdfgen import canvas
-from reportlab.lib.units import inch
-from reportlab.lib.utils import ImageReader
-from decimal import Decimal, ROUND_HALF_UP
+from django.db import transaction
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
 import os
 
 from .models import (
     Produto, MateriaPrima, Balanca,
     EstruturaProduto, ItemEstrutura,
-    OrdemProducao, ItemOP, Pesagem, StatusOP
+    OrdemProducao, ItemOP, Pesagem, StatusOP,
+    RegraTolerancia,
+    OrdemProducaoArquivada, PesagemArquivada,
+    LoteMP, ImpressoraEtiqueta, TrabalhoImpressao, Tarefa
 )
 from .serializers import (
     ProdutoSerializer, MateriaPrimaSerializer, BalancaSerializer,
     EstruturaProdutoSerializer, ItemEstruturaSerializer,
     OrdemProducaoSerializer, ItemOPSerializer,
-    PesagemSerializer
+    PesagemSerializer, RegraToleranciaSerializer,
+    OrdemProducaoArquivadaSerializer, ItemOPArquivadoSerializer, PesagemArquivadaSerializer,
+    LoteMPSerializer, ImpressoraEtiquetaSerializer, TrabalhoImpressaoSerializer, TarefaSerializer,
+    otimizar_consulta,
 )
+from .arquivo import rastrear_pesagens
+from . import etiquetas
+from .impressao import LIMITE_IMPRESSAO, enfileirar, impressoras_para
+from . import alteracoes, estacao, historico, tarefas
+from .idempotencia import executar_idempotente
+from .sincronizacao import sincronizar_pesagens, LIMITE_LOTE
+from .planejamento import obter_plano
+from .estoque import sugestoes_para_op
+from .separacao import STATUS_PADRAO, selecionar_ops, consolidar, gerar_json, gerar_pdf
 from registro.permissions import IsAdminOrReadOnly
-from rest_framework.permissions import IsAuthenticated
+from usuarios.cache import nome_exibicao
+from usuarios.serializers import dados_me
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+
+
+class CamposDinamicosViewMixin:
+    """list/retrieve consultam só os joins e colunas que a resposta usa (com ou sem ?fields=/?expand=)."""
+
+    def get_queryset(self):
+        qs = super().get_queryset()
+        if self.action in ("list", "retrieve"):
+            qs = otimizar_consulta(qs, self.get_serializer())
+        return qs
+
+
+class AlteracoesDesdeMixin:
+    """
+    list com ?updated_since=<ISO 8601> devolve só o que mudou desde então e os ids
+    excluídos (ver registro/alteracoes.py). `campos_alteracao` inclui as datas dos
+    objetos aninhados na resposta: mudar a MP reenvia os itens de estrutura que a mostram.
+    """
+    entidade_exclusao = None
+    campos_alteracao = ("atualizado_em",)
+
+    def list(self, request, *args, **kwargs):
+        texto = request.query_params.get("updated_since")
+        if texto is None:
+            return super().list(request, *args, **kwargs)
+        try:
+            desde = alteracoes.ler_desde(texto)
+        except ValueError:
+            return Response({"updated_since": "Informe data/hora ISO 8601 (o 'ate' da resposta anterior)."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        ate = timezone.now()
+        qs = alteracoes.alterados(self.filter_queryset(self.get_queryset()), self.campos_alteracao, desde)
+        dados = self.get_serializer(qs, many=True).data
+        return Response(alteracoes.resposta(desde, ate, dados, self.entidade_exclusao))
 
 
 # ======================
 # Catálogos
 # ======================
 
-class ProdutoViewSet(viewsets.ModelViewSet):
+class ProdutoViewSet(AlteracoesDesdeMixin, CamposDinamicosViewMixin, viewsets.ModelViewSet):
     queryset = Produto.objects.all().order_by('nome')
     serializer_class = ProdutoSerializer
+    entidade_exclusao = "produto"
     permission_classes = [IsAdminOrReadOnly]
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['nome', 'codigo_interno']
@@ -52,9 +102,10 @@ class ProdutoViewSet(viewsets.ModelViewSet):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class MateriaPrimaViewSet(viewsets.ModelViewSet):
+class MateriaPrimaViewSet(AlteracoesDesdeMixin, CamposDinamicosViewMixin, viewsets.ModelViewSet):
     queryset = MateriaPrima.objects.all().order_by('nome')
     serializer_class = MateriaPrimaSerializer
+    entidade_exclusao = "materia_prima"
     permission_classes = [IsAdminOrReadOnly]
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['nome', 'codigo_interno']
@@ -72,9 +123,10 @@ class MateriaPrimaViewSet(viewsets.ModelViewSet):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class BalancaViewSet(viewsets.ModelViewSet):
+class BalancaViewSet(AlteracoesDesdeMixin, CamposDinamicosViewMixin, viewsets.ModelViewSet):
     queryset = Balanca.objects.all().order_by('nome')
     serializer_class = BalancaSerializer
+    entidade_exclusao = "balanca"
     permission_classes = [IsAdminOrReadOnly]
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['nome', 'identificador', 'localizacao', 'protocolo']
@@ -96,9 +148,14 @@ class BalancaViewSet(viewsets.ModelViewSet):
 # Estrutura (BOM)
 # ======================
 
-class EstruturaProdutoViewSet(viewsets.ModelViewSet):
+class EstruturaProdutoViewSet(AlteracoesDesdeMixin, CamposDinamicosViewMixin, viewsets.ModelViewSet):
     queryset = EstruturaProduto.objects.select_related("produto").prefetch_related("itens__materia_prima").all()
     serializer_class = EstruturaProdutoSerializer
+    entidade_exclusao = "estrutura"
+    campos_alteracao = (
+        "atualizado_em", "produto__atualizado_em",
+        "itens__atualizado_em", "itens__materia_prima__atualizado_em",
+    )
     permission_classes = [IsAdminOrReadOnly]
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['produto__nome', 'produto__codigo_interno', 'descricao']
@@ -112,20 +169,73 @@ class EstruturaProdutoViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
 
-class ItemEstruturaViewSet(viewsets.ModelViewSet):
+class ItemEstruturaViewSet(AlteracoesDesdeMixin, CamposDinamicosViewMixin, viewsets.ModelViewSet):
     queryset = ItemEstrutura.objects.select_related("estrutura", "estrutura__produto", "materia_prima").all()
     serializer_class = ItemEstruturaSerializer
+    entidade_exclusao = "item_estrutura"
+    campos_alteracao = ("atualizado_em", "materia_prima__atualizado_em")
     permission_classes = [IsAdminOrReadOnly]
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['materia_prima__nome', 'materia_prima__codigo_interno', 'estrutura__produto__nome']
     ordering_fields = ['estrutura__id', 'materia_prima__nome']
 
 
+# ======================
+# Lotes de MP (estoque)
+# ======================
+
+class LoteMPViewSet(CamposDinamicosViewMixin, viewsets.ModelViewSet):
+    """Lotes em estoque. ?materia_prima=<id> filtra; ?disponiveis=1 só com saldo, ativos e na validade (FEFO)."""
+    queryset = LoteMP.objects.select_related("materia_prima").all()
+    serializer_class = LoteMPSerializer
+    permission_classes = [IsAdminOrReadOnly]
+    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    search_fields = ['codigo', 'materia_prima__nome', 'materia_prima__codigo_interno', 'fornecedor']
+    ordering_fields = ['validade', 'codigo', 'recebido_em', 'quantidade_disponivel']
+
+    def get_queryset(self):
+        qs = super().get_queryset()
+        mp = self.request.query_params.get("materia_prima")
+        if self.request.query_params.get("disponiveis") in ("1", "true", "True"):
+            if not mp:
+                return qs.none()
+            return LoteMP.fefo(mp).select_related("materia_prima")
+        if mp:
+            qs = qs.filter(materia_prima_id=mp)
+        return qs
+
+    def destroy(self, request, *args, **kwargs):
+        lote = self.get_object()
+        if Pesagem.objects.filter(item_op__materia_prima_id=lote.materia_prima_id, lote_mp=lote.codigo).exists():
+            return Response(
+                {"detail": "Lote já utilizado em pesagens. Inative-o em vez de excluir."},
+                status=status.HTTP_409_CONFLICT,
+            )
+        return super().destroy(request, *args, **kwargs)
+
+
+# ======================
+# Tolerância
+# ======================
+
+class RegraToleranciaViewSet(CamposDinamicosViewMixin, viewsets.ModelViewSet):
+    """
+    Regras de tolerância (global/produto/MP/item da estrutura).
+    Alterações só valem para OPs cujos itens forem gerados depois (limites congelados no ItemOP).
+    """
+    queryset = RegraTolerancia.objects.select_related("produto", "materia_prima", "item_estrutura").all().order_by("escopo", "id")
+    serializer_class = RegraToleranciaSerializer
+    permission_classes = [IsAdminOrReadOnly]
+    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    search_fields = ['produto__nome', 'materia_prima__nome', 'materia_prima__codigo_interno']
+    ordering_fields = ['escopo', 'id']
+
+
 # ======================
 # OP
 # ======================
 
-class OrdemProducaoViewSet(viewsets.ModelViewSet):
+class OrdemProducaoViewSet(CamposDinamicosViewMixin, viewsets.ModelViewSet):
     queryset = OrdemProducao.objects.select_related("produto", "estrutura", "estrutura__produto").all()
     serializer_class = OrdemProducaoSerializer
     permission_classes = [IsAdminOrReadOnly]
@@ -148,6 +258,18 @@ class OrdemProducaoViewSet(viewsets.ModelViewSet):
         serializer = ItemOPSerializer(qs, many=True)
         return Response(serializer.data)
 
+    @action(detail=True, methods=["get"], url_path="plano-pesagem")
+    def plano_pesagem(self, request, pk=None):
+        """Balança sugerida e frações por item pendente (cache até itens/pesagens mudarem)."""
+        op = self.get_object()
+        recalcular = request.query_params.get("recalcular") in ("1", "true", "True")
+        return Response(obter_plano(op, recalcular=recalcular))
+
+    @action(detail=True, methods=["get"], url_path="lotes-fefo")
+    def lotes_fefo(self, request, pk=None):
+        """Lote(s) sugerido(s) por FEFO para cada item pendente da OP."""
+        return Response(sugestoes_para_op(self.get_object()))
+
     @action(detail=True, methods=["post"], url_path="concluir-se-possivel")
     def concluir_se_possivel(self, request, pk=None):
         op = self.get_object()
@@ -155,7 +277,7 @@ class OrdemProducaoViewSet(viewsets.ModelViewSet):
         return Response({"status": op.status, "concluida_em": op.concluida_em})
 
 
-class ItemOPViewSet(viewsets.ModelViewSet):
+class ItemOPViewSet(CamposDinamicosViewMixin, viewsets.ModelViewSet):
     queryset = ItemOP.objects.select_related("op", "materia_prima", "op__produto").all()
     serializer_class = ItemOPSerializer
     permission_classes = [IsAdminOrReadOnly]
@@ -168,7 +290,11 @@ class ItemOPViewSet(viewsets.ModelViewSet):
 # Pesagem
 # ======================
 
-class PesagemViewSet(viewsets.ModelViewSet):
+class PesagemViewSet(CamposDinamicosViewMixin, viewsets.ModelViewSet):
+    """
+    Histórico: list aceita os filtros de registro/historico.py (de/ate, produto, materia_prima,
+    balanca, pesador, status_op, op, lote, lote_mp) e ?facetas=1 para as contagens por dimensão.
+    """
     queryset = (
         Pesagem.objects
         .select_related("op", "op__produto", "item_op", "item_op__materia_prima", "balanca")
@@ -188,23 +314,246 @@ class PesagemViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         qs = super().get_queryset()
-        # filtro exato opcional por ?lote_mp=XYZ (case-insensitive)
+        if self.action == "list":
+            qs = historico.filtrar(qs, self._filtros())
+        return qs
+
+    def _filtros(self):
+        if not hasattr(self, "_condicoes"):
+            try:
+                self._condicoes = historico.ler_filtros(self.request.query_params)
+            except historico.FiltroInvalido as e:
+                raise ValidationError(e.erros)
+        return self._condicoes
+
+    def list(self, request, *args, **kwargs):
+        resposta = super().list(request, *args, **kwargs)
+        if request.query_params.get("facetas") in ("1", "true"):
+            # mesma busca (?search=), sem select_related/ordenação: só GROUP BY
+            base = self.filter_queryset(Pesagem.objects.all())
+            resposta.data["facetas"] = historico.facetas(base, self._filtros())
+        return resposta
+
+    def get_serializer_context(self):
+        contexto = super().get_serializer_context()
+        if self.action == "create":
+            contexto["expand"] = ""  # resposta enxuta: relações como id (salvo ?expand=)
+        return contexto
+
+    def create(self, request, *args, **kwargs):
+        # Idempotency-Key: retries da estação devolvem a resposta original sem somar de novo.
+        # validate() e save() na mesma transação: o ItemOP travado na validação é o da gravação.
+        criar = transaction.atomic(lambda: super(PesagemViewSet, self).create(request, *args, **kwargs))
+        return executar_idempotente(request, "pesagens:create", criar)
+
+    def perform_create(self, serializer):
+        try:
+            serializer.save(pesador=nome_exibicao(self.request.user))
+        except DjangoValidationError as e:
+            raise ValidationError(e.messages)
+
+    def perform_update(self, serializer):
+        # PUT/PATCH viram correção por delta; a resposta é a substituta (novo id), ver PesagemSerializer.update
+        serializer.save(pesador=nome_exibicao(self.request.user))
+
+    def destroy(self, request, *args, **kwargs):
+        """DELETE anula (estorno); nada é apagado."""
+        self._anular(self.get_object(), request.query_params.get("motivo", ""))
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(detail=True, methods=["post"])
+    def anular(self, request, pk=None):
+        """POST {motivo} — estorna a pesagem e devolve o lançamento de estorno."""
+        estorno = self._anular(self.get_object(), str(request.data.get("motivo", "")))
+        return Response(self.get_serializer(estorno).data, status=status.HTTP_201_CREATED)
+
+    def _anular(self, pesagem, motivo):
+        try:
+            return pesagem.anular(nome_exibicao(self.request.user), motivo[:200])
+        except DjangoValidationError as e:
+            raise ValidationError(e.messages)
+
+
+# ======================
+# Sincronização offline
+# ======================
+
+class SincronizacaoPesagensView(APIView):
+    """
+    POST {"pesagens": [{uuid, op_id, item_op_id, tara, liquido, balanca_id?, codigo_interno?,
+    lote_mp?, capturada_em?}, ...]} — aplica em ordem, deduplica por uuid e devolve
+    aplicadas/duplicadas/conflitos numa única resposta. Motivos de conflito: invalida,
+    op_encerrada, item_concluido, fora_tolerancia, lote_inativo, lote_sem_saldo.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        registros = request.data.get("pesagens") if isinstance(request.data, dict) else None
+        if not isinstance(registros, list) or not registros:
+            return Response({"detail": "Envie 'pesagens' como lista não vazia."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(registros) > LIMITE_LOTE:
+            return Response(
+                {"detail": f"Máximo de {LIMITE_LOTE} pesagens por lote."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if not all(isinstance(r, dict) for r in registros):
+            return Response({"detail": "Cada pesagem deve ser um objeto."}, status=status.HTTP_400_BAD_REQUEST)
+
+        resultado = sincronizar_pesagens(
+            registros, pesador=nome_exibicao(request.user), contexto={"request": request}
+        )
+        return Response(resultado)
+
+
+# ======================
+# Estação (tela de pesagem)
+# ======================
+
+class EstacaoBootstrapView(APIView):
+    """
+    GET — OPs abertas/em andamento com itens, balanças ativas e o usuário numa resposta.
+    ?since=<versao> devolve só as OPs alteradas depois dela (ver registro/estacao.py).
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        desde = request.query_params.get("since")
+        if desde is not None and not desde.isdigit():
+            return Response({"since": "Informe a versão (inteiro) devolvida pela carga anterior."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        dados = estacao.carregar(int(desde) if desde is not None else None)
+        dados["usuario"] = dados_me(request.user)
+        return Response(dados)
+
+
+# ======================
+# Separação (pick list)
+# ======================
+
+class SeparacaoView(APIView):
+    """
+    GET total restante (g) por MP para as OPs selecionadas.
+    ?ids=1,2,3 | ?status=aberta,em_andamento (padrão) | ?de=AAAA-MM-DD&ate=AAAA-MM-DD
+    ?formato=pdf para a lista impressa (padrão: JSON em streaming).
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        params = request.query_params
+        erros = {}
+
+        ids = [i.strip() for i in params.get("ids", "").split(",") if i.strip()]
+        if not all(i.isdigit() for i in ids):
+            erros["ids"] = "Use ids numéricos separados por vírgula."
+
+        status_validos = set(StatusOP.values)
+        status_op = [s.strip() for s in params.get("status", "").split(",") if s.strip()]
+        if set(status_op) - status_validos:
+            erros["status"] = f"Opções: {', '.join(sorted(status_validos))}."
+
+        datas = {}
+        for campo in ("de", "ate"):
+            valor = params.get(campo)
+            if valor:
+                datas[campo] = parse_date(valor)
+                if datas[campo] is None:
+                    erros[campo] = "Data inválida (AAAA-MM-DD)."
+
+        formato = params.get("formato", "json")
+        if formato not in ("json", "pdf"):
+            erros["formato"] = "Use json ou pdf."
+        if erros:
+            return Response(erros, status=status.HTTP_400_BAD_REQUEST)
+
+        linhas = consolidar(selecionar_ops(
+            ids=[int(i) for i in ids], status=status_op, de=datas.get("de"), ate=datas.get("ate"),
+        ))
+        if formato == "pdf":
+            return FileResponse(
+                gerar_pdf(linhas, "Lista de separação de matérias-primas"),
+                content_type="application/pdf", filename="separacao.pdf",
+            )
+        filtros = {
+            "ids": [int(i) for i in ids], "status": status_op or list(STATUS_PADRAO),
+            "de": params.get("de"), "ate": params.get("ate"),
+        }
+        return StreamingHttpResponse(gerar_json(linhas, filtros), content_type="application/json")
+
+
+# ======================
+# Arquivo (somente leitura)
+# ======================
+
+class OrdemProducaoArquivadaViewSet(CamposDinamicosViewMixin, viewsets.ReadOnlyModelViewSet):
+    queryset = OrdemProducaoArquivada.objects.select_related("produto").all()
+    serializer_class = OrdemProducaoArquivadaSerializer
+    permission_classes = [IsAuthenticated]
+    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    search_fields = ['numero', 'lote', 'produto__nome', 'produto__codigo_interno']
+    ordering_fields = ['criada_em', 'concluida_em', 'arquivada_em', 'numero', 'lote']
+
+    @action(detail=True, methods=["get"], url_path="itens")
+    def itens(self, request, pk=None):
+        op = self.get_object()
+        qs = op.itens.select_related("materia_prima").all()
+        return Response(ItemOPArquivadoSerializer(qs, many=True).data)
+
+
+class PesagemArquivadaViewSet(CamposDinamicosViewMixin, viewsets.ReadOnlyModelViewSet):
+    queryset = (
+        PesagemArquivada.objects
+        .select_related("op", "op__produto", "item_op__materia_prima", "balanca")
+        .all()
+        .order_by('-data_hora')
+    )
+    serializer_class = PesagemArquivadaSerializer
+    permission_classes = [IsAuthenticated]
+    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    search_fields = ['op__numero', 'op__lote', 'item_op__materia_prima__nome', 'codigo_interno', 'pesador', 'lote_mp']
+    ordering_fields = ['data_hora', 'op__numero', 'lote_mp']
+
+    def get_queryset(self):
+        qs = super().get_queryset()
         lote_mp = self.request.query_params.get("lote_mp")
         if lote_mp:
-            qs = qs.filter(lote_mp__iexact=lote_mp.strip())
+            qs = qs.filter(lote_mp=lote_mp.strip())
+        op_id = self.request.query_params.get("op")
+        if op_id:
+            qs = qs.filter(op_id=op_id)
         return qs
 
-    def perform_create(self, serializer):
-        user = self.request.user
-        nome = (user.get_full_name() or "").strip() or user.username
-        serializer.save(pesador=nome)
+    @action(detail=False, methods=["get"], url_path="rastreabilidade")
+    def rastreabilidade(self, request):
+        """
+        Rastreabilidade por ?lote_mp= (exato), ?lote_op= e/ou ?materia_prima=<id>
+        cobrindo pesagens ativas e arquivadas; paginada, mais recentes primeiro.
+        """
+        params = request.query_params
+        if not any(params.get(k) for k in ("lote_mp", "lote_op", "materia_prima")):
+            return Response(
+                {"detail": "Informe lote_mp, lote_op ou materia_prima."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        materia_prima = (params.get("materia_prima") or "").strip()
+        if materia_prima and not materia_prima.isdigit():
+            return Response({"materia_prima": "Informe um id numérico."}, status=status.HTTP_400_BAD_REQUEST)
+        pesagens = rastrear_pesagens(
+            lote_mp=params.get("lote_mp"),
+            lote_op=params.get("lote_op"),
+            materia_prima_id=int(materia_prima) if materia_prima else None,
+        )
+        return self.get_paginated_response(self.paginate_queryset(pesagens))
 
 
 # ======================
-# Etiqueta PDF (g)
+# Etiquetas (PDF / ZPL / EPL) e impressão direta
 # ======================
 
-def gerar_etiqueta_pdf(request, pk):
+def gerar_etiqueta(request, pk):
+    """?formato=pdf (padrão) | zpl | epl — mesmos campos nos três formatos."""
+    formato = request.GET.get("formato", etiquetas.PDF)
+    if formato not in etiquetas.FORMATOS:
+        return HttpResponse(f"Formato inválido. Use {', '.join(etiquetas.FORMATOS)}.", status=400)
     try:
         pesagem = (
             Pesagem.objects
@@ -214,130 +563,168 @@ def gerar_etiqueta_pdf(request, pk):
     except Pesagem.DoesNotExist:
         return HttpResponse("Pesagem não encontrada", status=404)
 
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'inline; filename=etiqueta_{pesagem.id}.pdf'
-
-    etiqueta_size = (4 * inch, 3 * inch)  # 4x3 polegadas
-    p = canvas.Canvas(response, pagesize=etiqueta_size)
-    width, height = etiqueta_size
-
-    # Cabeçalho com logo
-    logo_path = os.path.join(settings.BASE_DIR, 'registro', 'static', 'logo.png')
-    p.setFont("Helvetica-Bold", 12)
-    titulo = "THEODORO F. SOBRAL"
-
-    if os.path.exists(logo_path):
-        logo = ImageReader(logo_path)
-        logo_width = 30
-        logo_height = 30
-        text_width = p.stringWidth(titulo, "Helvetica-Bold", 12)
-        total_width = logo_width + 1 + text_width
-        start_x = (width - total_width) / 2
-        y_pos = height - 15
-
-        p.drawImage(logo, x=start_x, y=y_pos - logo_height + 5,
-                    width=logo_width, height=logo_height, mask='auto')
-        text_y = y_pos - (logo_height / 2) + 4
-        p.drawString(start_x + logo_width + 8, text_y, titulo)
+    campos = etiquetas.campos(pesagem)
+    response = HttpResponse(content_type=etiquetas.TIPO_CONTEUDO[formato])
+    response['Content-Disposition'] = f'inline; filename=etiqueta_{pesagem.id}.{formato}'
+    if formato == etiquetas.PDF:
+        etiquetas.gerar_pdf(campos, response)
     else:
-        text_width = p.stringWidth(titulo, "Helvetica-Bold", 12)
-        p.drawString((width - text_width) / 2, height - 20, titulo)
-
-    # ---- formatação: 1.234,567 g (pt-BR), sempre 3 casas ----
-    def fmt_g3_ptbr(value):
-        """
-        Ex.: 282000 -> 282.000,000 g
-            1234.5 -> 1.234,500 g
-            1000   -> 1.000,000 g
-        """
-        if value is None:
-            return "- g"
-        d = Decimal(value).quantize(Decimal("0.001"), rounding=ROUND_HALF_UP)  # garante 3 casas
-        s = f"{d:.3f}"                 # '282000.000'
-        inteiro, frac = s.split(".")   # ('282000', '000')
-        inteiro = f"{int(inteiro):,}".replace(",", ".")  # '282.000'
-        return f"{inteiro},{frac} g"
-    
-    from django.utils import timezone
-
-    def dt_local_fmt(dt):
-        if not dt:
-            return ""
-        # garante consciente e converte para o fuso atual (settings.TIME_ZONE)
-        if timezone.is_naive(dt):
-            dt = timezone.make_aware(dt, timezone.get_current_timezone())
-        dt = timezone.localtime(dt)  # usa settings.TIME_ZONE
-        return dt.strftime('%d/%m/%Y %H:%M')
-
-
-    # Converte kg -> g para exibição
-    KG_TO_G = Decimal('1000')
-    bruto_g = Decimal(pesagem.bruto or 0) * KG_TO_G
-    tara_g  = Decimal(pesagem.tara or 0)  * KG_TO_G
-    liquido_g = Decimal(pesagem.liquido or 0)  # já em g no banco
-
-    # Conteúdo
-    linha = height - 50
-    base_font = "Helvetica"
-    base_size = 9
-    min_size = 6
-    margem_esq = 30
-    margem_dir = 10
-    max_text_width = width - margem_esq - margem_dir
-
-    p.setFont(base_font, base_size)
-
-    def pular_linha():
-        nonlocal linha
-        linha -= 14
-
-    def escrever(txt):
-        nonlocal linha
-        p.setFont(base_font, base_size)
-        p.drawString(margem_esq, linha, txt)
-        pular_linha()
-
-    def escrever_ajustado(label, valor):
-        """
-        Desenha 'Label: Valor' e reduz a fonte gradualmente (até min_size)
-        se o texto exceder a largura máxima disponível.
-        """
-        nonlocal linha
-        txt = f"{label}: {valor}" if valor else f"{label}:"
-        font_size = base_size
-        text_width = p.stringWidth(txt, base_font, font_size)
-
-        while text_width > max_text_width and font_size > min_size:
-            font_size -= 0.5
-            text_width = p.stringWidth(txt, base_font, font_size)
-
-        p.setFont(base_font, font_size)
-        p.drawString(margem_esq, linha, txt)
-        pular_linha()
-        # restaura para os próximos campos
-        p.setFont(base_font, base_size)
-
-    produto_nome = pesagem.op.produto.nome if pesagem.op and pesagem.op.produto else ""
-    mp_nome = pesagem.item_op.materia_prima.nome if pesagem.item_op and pesagem.item_op.materia_prima else ""
-    balanca_txt = pesagem.balanca.nome if pesagem.balanca else ""
-    lote_mp_txt = getattr(pesagem, "lote_mp", "") or ""
-
-    # Campos com ajuste dinâmico
-    escrever_ajustado("Produto", produto_nome)
-    escrever_ajustado("Matéria-prima", mp_nome)
-
-    # Demais campos com fonte padrão
-    escrever(f"Cód. Interno: {pesagem.codigo_interno}")
-    escrever(f"OP: {pesagem.op.numero if pesagem.op else ''}   Lote: {pesagem.op.lote if pesagem.op else ''}")
-    if lote_mp_txt:
-        escrever(f"Lote MP: {lote_mp_txt}")
-    escrever(f"Peso Bruto: {fmt_g3_ptbr(bruto_g)}")
-    escrever(f"Tara: {fmt_g3_ptbr(tara_g)}")
-    escrever(f"Peso Líquido: {fmt_g3_ptbr(liquido_g)}")
-    escrever(f"Balança: {balanca_txt}")
-    escrever(f"Pesador: {pesagem.pesador}")
-    escrever(f"Data: {dt_local_fmt(pesagem.data_hora)}")
-
-    p.showPage()
-    p.save()
+        response.write(etiquetas.codificar(formato, etiquetas.RENDERIZADORES[formato](campos)))
     return response
+
+
+class ImpressoraEtiquetaViewSet(CamposDinamicosViewMixin, viewsets.ModelViewSet):
+    queryset = ImpressoraEtiqueta.objects.all()
+    serializer_class = ImpressoraEtiquetaSerializer
+    permission_classes = [IsAdminOrReadOnly]
+    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    search_fields = ['nome', 'estacao', 'endereco_ip']
+    ordering_fields = ['estacao', 'nome']
+
+    def get_queryset(self):
+        qs = super().get_queryset()
+        estacao = self.request.query_params.get("estacao")
+        if estacao:
+            qs = qs.filter(estacao__iexact=estacao.strip())
+        return qs
+
+
+class TrabalhoImpressaoViewSet(CamposDinamicosViewMixin, viewsets.ReadOnlyModelViewSet):
+    """Fila do spooler: ?status=pendente|enviado|falhou, ?estacao=, ?pesagem=."""
+    queryset = TrabalhoImpressao.objects.select_related("impressora").order_by("-id")
+    serializer_class = TrabalhoImpressaoSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        qs = super().get_queryset()
+        params = self.request.query_params
+        if params.get("status"):
+            qs = qs.filter(status=params["status"])
+        if params.get("estacao"):
+            qs = qs.filter(impressora__estacao__iexact=params["estacao"].strip())
+        if params.get("pesagem"):
+            qs = qs.filter(pesagem_id=params["pesagem"])
+        return qs
+
+
+class ImpressaoEtiquetasView(APIView):
+    """
+    POST {"pesagens": [ids], "impressora"?: id, "estacao"?: nome, "copias"?: n}
+    Enfileira as etiquetas (ZPL/EPL) para o spooler e responde 202 com os trabalhos.
+    Sem impressora informada, usa a da estação da balança de cada pesagem;
+    pesagem sem impressora => 400 (o cliente cai para o PDF).
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        dados = request.data if isinstance(request.data, dict) else {}
+        ids = dados.get("pesagens")
+        if not isinstance(ids, list) or not ids or not all(isinstance(i, int) for i in ids):
+            return Response({"detail": "Envie 'pesagens' como lista de ids."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(ids) > LIMITE_IMPRESSAO:
+            return Response(
+                {"detail": f"Máximo de {LIMITE_IMPRESSAO} etiquetas por pedido."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        copias = dados.get("copias", 1)
+        if not isinstance(copias, int) or not 1 <= copias <= 99:
+            return Response({"copias": "Use um inteiro de 1 a 99."}, status=status.HTTP_400_BAD_REQUEST)
+
+        impressora = None
+        if dados.get("impressora") is not None:
+            impressora = ImpressoraEtiqueta.objects.filter(pk=dados["impressora"], ativo=True).first()
+            if impressora is None:
+                return Response({"impressora": "Impressora inexistente ou inativa."},
+                                status=status.HTTP_400_BAD_REQUEST)
+
+        encontradas = (
+            Pesagem.objects
+            .select_related('op', 'op__produto', 'item_op', 'item_op__materia_prima', 'balanca')
+            .in_bulk(ids)
+        )
+        faltando = [i for i in ids if i not in encontradas]
+        if faltando:
+            return Response({"detail": "Pesagem não encontrada.", "pesagens": faltando},
+                            status=status.HTTP_404_NOT_FOUND)
+
+        destino, sem_impressora = impressoras_para(
+            [encontradas[i] for i in dict.fromkeys(ids)], impressora=impressora, estacao=dados.get("estacao"),
+        )
+        if sem_impressora:
+            return Response(
+                {"detail": "Nenhuma impressora de etiquetas ativa para a estação.",
+                 "pesagens": [p.pk for p in sem_impressora]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        trabalhos = enfileirar(destino, copias=copias, solicitado_por=nome_exibicao(request.user))
+        return Response(
+            {"trabalhos": TrabalhoImpressaoSerializer(trabalhos, many=True).data},
+            status=status.HTTP_202_ACCEPTED,
+        )
+
+
+# ======================
+# Tarefas em segundo plano (somente admin)
+# ======================
+
+class TarefaViewSet(CamposDinamicosViewMixin, mixins.CreateModelMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    POST {"tipo", "parametros", "prioridade"?} enfileira e responde 202; o
+    cliente acompanha por GET /tarefas/{id}/ e baixa o arquivo gerado em
+    /tarefas/{id}/arquivo/. Lista: ?status=, ?tipo=.
+    """
+    queryset = Tarefa.objects.all()
+    serializer_class = TarefaSerializer
+    permission_classes = [IsAdminUser]
+
+    def get_queryset(self):
+        qs = super().get_queryset()
+        for campo in ("status", "tipo"):
+            valor = self.request.query_params.get(campo)
+            if valor:
+                qs = qs.filter(**{campo: valor})
+        return qs
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        dados = serializer.validated_data
+        tarefa = tarefas.enfileirar(
+            dados["tipo"], dados.get("parametros"), prioridade=dados.get("prioridade", 0),
+            max_tentativas=dados.get("max_tentativas", 3), solicitado_por=nome_exibicao(request.user),
+        )
+        return Response(self.get_serializer(tarefa).data, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=False, methods=["post"], url_path="importar-oficiais")
+    def importar_oficiais(self, request):
+        """Multipart: produtos (xlsx), mps (xlsx), bom (csv) + sep/decimal_comma/estrutura_default opcionais."""
+        faltando = [c for c in ("produtos", "mps", "bom") if c not in request.FILES]
+        if faltando:
+            return Response({c: "Arquivo obrigatório." for c in faltando}, status=status.HTTP_400_BAD_REQUEST)
+        parametros = {c: tarefas.guardar_entrada(request.FILES[c]) for c in ("produtos", "mps", "bom")}
+        if request.data.get("sep"):
+            parametros["sep"] = request.data["sep"]
+        if request.data.get("estrutura_default"):
+            parametros["estrutura_default"] = request.data["estrutura_default"]
+        if str(request.data.get("decimal_comma", "")).lower() in ("1", "true", "sim"):
+            parametros["decimal_comma"] = True
+        tarefa = tarefas.enfileirar("importar_oficiais", parametros, prioridade=10,
+                                    max_tentativas=1, solicitado_por=nome_exibicao(request.user))
+        return Response(self.get_serializer(tarefa).data, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=True, methods=["get"])
+    def arquivo(self, request, pk=None):
+        tarefa = self.get_object()
+        if not tarefa.arquivo:
+            return Response({"detail": "Tarefa sem arquivo gerado."}, status=status.HTTP_404_NOT_FOUND)
+        return FileResponse(tarefa.arquivo.open("rb"), as_attachment=True,
+                            filename=os.path.basename(tarefa.arquivo.name))
+
+    @action(detail=True, methods=["post"])
+    def cancelar(self, request, pk=None):
+        tarefa = self.get_object()
+        if not tarefas.cancelar(tarefa):
+            return Response({"detail": "Só tarefas pendentes podem ser canceladas."},
+                            status=status.HTTP_409_CONFLICT)
+        tarefa.refresh_from_db()
+        return Response(self.get_serializer(tarefa).data)
@@ -5,4 +5,4 @@ class UsuariosConfig(AppConfig):
     name = 'usuarios'
 
     def ready(self):
-        from . import signals  # importa sinais
+        from . import checks, signals  # registra checagens e sinais
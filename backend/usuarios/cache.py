@@ -0,0 +1,79 @@
+"""
+Cache curto de resolução de usuário para a autenticação JWT.
+
+Guarda só o que autorização e /auth/me/ usam (id, username, nomes, e-mail,
+is_active, is_staff, is_superuser e o papel do perfil) — nunca o hash da
+senha. O usuário é remontado com `User.from_db`, com os demais campos
+adiados: ler `password`, grupos ou permissões consulta o banco na hora, e um
+save() acidental grava só os campos carregados.
+
+Invalidado pelos sinais de User/PerfilUsuario, mas `cache.delete` só alcança
+o cache configurado em CACHES: com LocMemCache (por processo) os outros
+workers enxergam a mudança (desativação, rebaixamento) só depois de
+USUARIOS_AUTH_CACHE_TIMEOUT segundos. Em produção com vários processos use um
+cache compartilhado (a checagem usuarios.W001 avisa).
+"""
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+from .models import PerfilUsuario
+
+CACHE_PREFIXO = "usuarios:auth:"
+CAMPOS = ("id", "username", "first_name", "last_name", "email", "is_active", "is_staff", "is_superuser")
+
+
+def _timeout():
+    return getattr(settings, "USUARIOS_AUTH_CACHE_TIMEOUT", 60)
+
+
+def _chave(user_id):
+    return f"{CACHE_PREFIXO}{user_id}"
+
+
+def nome_exibicao(user):
+    return (user.get_full_name() or "").strip() or user.username
+
+
+def papel_do_usuario(user):
+    # regra: staff/superuser => admin, senão usa perfil.papel (fallback operador)
+    if user.is_staff or user.is_superuser:
+        return "admin"
+    perfil = getattr(user, "perfil", None)
+    return getattr(perfil, "papel", "operador")
+
+
+def _montar(dados):
+    # from_db espera os valores na ordem dos campos do model
+    campos = [f.attname for f in User._meta.concrete_fields if f.attname in CAMPOS]
+    user = User.from_db(DEFAULT_DB_ALIAS, campos, [dados[c] for c in campos])
+    if dados["perfil_id"] is not None:
+        user.perfil = PerfilUsuario.from_db(
+            DEFAULT_DB_ALIAS, ["id", "user_id", "papel"], [dados["perfil_id"], user.pk, dados["papel"]]
+        )
+    return user
+
+
+def obter_usuario(user_id):
+    """
+    Devolve o User (com perfil) a partir do cache; em cache miss faz UMA query.
+    Retorna None se o usuário não existir.
+    """
+    chave = _chave(user_id)
+    dados = cache.get(chave)
+    if dados is None:
+        dados = (
+            User.objects.filter(pk=user_id)
+            .values(*CAMPOS, "perfil__id", "perfil__papel")
+            .first()
+        )
+        if dados is None:
+            return None
+        dados["perfil_id"], dados["papel"] = dados.pop("perfil__id"), dados.pop("perfil__papel")
+        cache.set(chave, dados, _timeout())
+    return _montar(dados)
+
+
+def invalidar_usuario(user_id):
+    cache.delete(_chave(user_id))
@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.core.checks import Warning, register
+
+CACHES_POR_PROCESSO = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+
+@register()
+def cache_de_autenticacao(app_configs, **kwargs):
+    """Fora do DEBUG, o cache de autenticação (usuarios.cache) deve ser compartilhado entre processos."""
+    backend = settings.CACHES.get("default", {}).get("BACKEND", "")
+    if settings.DEBUG or backend not in CACHES_POR_PROCESSO:
+        return []
+    return [Warning(
+        "O cache padrão é por processo: desativar/rebaixar um usuário só vale nos outros workers "
+        f"depois de USUARIOS_AUTH_CACHE_TIMEOUT ({getattr(settings, 'USUARIOS_AUTH_CACHE_TIMEOUT', 60)} s).",
+        hint="Configure CACHES['default'] com Redis/Memcached, ou reduza USUARIOS_AUTH_CACHE_TIMEOUT.",
+        id="usuarios.W001",
+    )]
@@ -1,6 +1,8 @@
 from rest_framework import serializers
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from django.contrib.auth.models import User
 from .models import PerfilUsuario
+from .cache import nome_exibicao, papel_do_usuario
 
 class UserSerializer(serializers.ModelSerializer):
     papel = serializers.CharField(source='perfil.papel', read_only=True)
@@ -42,3 +44,33 @@ class PerfilUsuarioSerializer(serializers.ModelSerializer):
     class Meta:
         model = PerfilUsuario
         fields = ['id', 'user_id', 'username', 'email', 'papel']
+
+
+class TokenComPerfilSerializer(TokenObtainPairSerializer):
+    """
+    Devolve o usuário (papel, nome de exibição...) junto com os tokens para o login
+    não precisar chamar /auth/me/. O token leva só o id: papel e permissões são
+    sempre resolvidos no servidor.
+    """
+
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        data["usuario"] = dados_me(self.user)
+        return data
+
+
+def dados_me(user):
+    """Payload de /auth/me/ (também devolvido no login)."""
+    return {
+        "id": user.id,
+        "username": user.username,
+        "usuario": user.username,
+        "first_name": user.first_name,
+        "last_name": user.last_name,
+        "email": user.email,
+        "nome_exibicao": nome_exibicao(user),
+        "tipo": papel_do_usuario(user),
+        "papel": papel_do_usuario(user),
+        "is_staff": user.is_staff,
+        "is_superuser": user.is_superuser,
+    }
@@ -1,9 +1,21 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.contrib.auth.models import User
 from .models import PerfilUsuario
+from .cache import invalidar_usuario
 
 @receiver(post_save, sender=User)
 def create_user_profile(sender, instance, created, **kwargs):
     if created and not hasattr(instance, 'perfil'):
         PerfilUsuario.objects.create(user=instance, papel=PerfilUsuario.PAPEL_OPERADOR)
+
+# invalida o cache de autenticação quando usuário/perfil mudam
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidar_cache_usuario(sender, instance, **kwargs):
+    invalidar_usuario(instance.pk)
+
+@receiver(post_save, sender=PerfilUsuario)
+@receiver(post_delete, sender=PerfilUsuario)
+def invalidar_cache_perfil(sender, instance, **kwargs):
+    invalidar_usuario(instance.user_id)
@@ -1,3 +1,55 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.test import TestCase
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
 
-# Create your tests here.
+from .cache import _chave
+from .models import PerfilUsuario
+
+
+class AutenticacaoCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("op1", password="senha-forte-123", first_name="Ana", last_name="Lima")
+        self.client = APIClient()
+        resp = self.client.post("/api/usuarios/auth/login/", {"username": "op1", "password": "senha-forte-123"})
+        self.assertEqual(resp.status_code, 200)
+        self.tokens = resp.json()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.tokens['access']}")
+
+    def test_login_devolve_usuario(self):
+        self.assertEqual(self.tokens["usuario"]["nome_exibicao"], "Ana Lima")
+        self.assertEqual(self.tokens["usuario"]["tipo"], "operador")
+
+    def test_me_sem_queries_com_cache_quente(self):
+        self.client.get("/api/usuarios/auth/me/")
+        with self.assertNumQueries(0):
+            resp = self.client.get("/api/usuarios/auth/me/")
+        self.assertEqual(resp.json()["username"], "op1")
+
+    def test_cache_invalidado_ao_mudar_perfil(self):
+        self.client.get("/api/usuarios/auth/me/")
+        PerfilUsuario.objects.filter(user=self.user).update(papel=PerfilUsuario.PAPEL_ADMIN)
+        perfil = PerfilUsuario.objects.get(user=self.user)
+        perfil.save()
+        resp = self.client.get("/api/usuarios/auth/me/")
+        self.assertEqual(resp.json()["tipo"], "admin")
+
+    def test_cache_sem_hash_da_senha(self):
+        self.client.get("/api/usuarios/auth/me/")
+        dados = cache.get(_chave(self.user.pk))
+        self.assertNotIn("password", dados)
+        self.assertEqual(dados["papel"], PerfilUsuario.PAPEL_OPERADOR)
+
+    def test_usuario_desativado_e_recusado(self):
+        self.client.get("/api/usuarios/auth/me/")
+        self.user.is_active = False
+        self.user.save()
+        resp = self.client.get("/api/usuarios/auth/me/")
+        self.assertEqual(resp.status_code, 401)
+
+    def test_token_sem_claims_de_perfil(self):
+        claims = AccessToken(self.tokens["access"])
+        self.assertNotIn("papel", claims)
+        self.assertNotIn("nome_exibicao", claims)
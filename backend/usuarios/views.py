@@ -4,7 +4,7 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from django.contrib.auth.models import User
 
-from .serializers import UserSerializer, UserCreateSerializer, PerfilUsuarioSerializer
+from .serializers import UserSerializer, UserCreateSerializer, PerfilUsuarioSerializer, dados_me
 from .models import PerfilUsuario
 
 class UserViewSet(viewsets.ModelViewSet):
@@ -42,31 +42,12 @@ class PerfilUsuarioViewSet(viewsets.ModelViewSet):
         return Response(self.get_serializer(perfil).data)
 
 
-# views.py (substitua o MeView atual)
 class MeView(APIView):
+    """
+    Dados do usuário logado. Sem queries: o usuário (com perfil) vem do cache de
+    autenticação (usuarios.cache), que é invalidado quando User/Perfil mudam.
+    """
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
-        u = request.user
-        perfil = getattr(u, 'perfil', None)
-        nome = (u.get_full_name() or '').strip() or u.username
-
-        # 🔧 regra: se é staff/superuser => admin, senão usa perfil.papel (fallback operador)
-        if u.is_staff or u.is_superuser:
-            tipo = 'admin'
-        else:
-            tipo = getattr(perfil, 'papel', 'operador')
-
-        return Response({
-            "id": u.id,
-            "username": u.username,
-            "usuario": u.username,
-            "first_name": u.first_name,
-            "last_name": u.last_name,
-            "email": u.email,
-            "nome_exibicao": nome,
-            "tipo": tipo,                # <- agora consistente
-            "is_staff": u.is_staff,
-            "is_superuser": u.is_superuser,
-        })
-
+        return Response(dados_me(request.user))
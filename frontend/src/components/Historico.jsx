@@ -8,6 +8,7 @@ import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from '@
 import { Badge } from '@/components/ui/badge'
 import { History, Search, Eye, Printer, Edit, Filter, Calendar, Weight, User } from 'lucide-react'
 import api from '@/services/api'
+import * as catalogo from '@/services/catalogo'
 
 // Helpers
 const tz = 'America/Fortaleza'
@@ -30,115 +31,169 @@ const KG_IN_G = 1000
 const toNum = (x) => (x == null ? null : Number(x))
 const kgToG = (kg) => (kg == null ? null : kg * KG_IN_G)
 
+// Filtro da tela -> parâmetro de GET /pesagens/ (filtros e facetas no servidor, registro/historico.py)
+const PARAMETROS = {
+  produto: 'produto',
+  materiaPrima: 'materia_prima',
+  balanca: 'balanca',
+  pesador: 'pesador',
+  statusOP: 'status_op',
+  op: 'op',
+  lote: 'lote',
+  loteMP: 'lote_mp',
+  dataInicio: 'de',
+  dataFim: 'ate'
+}
+const FILTROS_VAZIOS = Object.fromEntries(Object.keys(PARAMETROS).map((k) => [k, '']))
+const PAGE_SIZE = 50 // REST_FRAMEWORK.PAGE_SIZE
+const ATRASO_BUSCA_MS = 400
+
+const normalizarPesagem = (p) => {
+  // backend atual: bruto (kg), tara (kg), liquido (g)
+  // compat: bruto_kg/tara_kg/liquido_g/peso_liquido
+  const brutoKg = toNum(p.bruto ?? p.bruto_kg)
+  const taraKg  = toNum(p.tara ?? p.tara_kg)
+  const liquidoG = toNum(p.liquido ?? p.liquido_g ?? p.peso_liquido)
+
+  const brutoG = kgToG(brutoKg)
+  const taraG  = kgToG(taraKg)
+  const liquidoFinalG = liquidoG != null
+    ? liquidoG
+    : (brutoG != null && taraG != null ? (brutoG - taraG) : null)
+
+  return {
+    id: p.id,
+    dataHora: p.data_hora ?? p.dataHora,
+    produto: toDisplay(p.produto?.nome ?? p.produto_nome ?? p.produto),
+    materiaPrima: toDisplay(p.materia_prima?.nome ?? p.materia_prima_nome ?? p.materia_prima),
+    op: toDisplay(p.op?.numero ?? p.op),
+    lote: toDisplay(p.op?.lote ?? p.lote),
+    loteMP: toDisplay(p.lote_mp ?? p.loteMP ?? ''),
+    pesador: toDisplay(p.pesador),
+    bruto_g: brutoG,
+    tara_g: taraG,
+    liquido_g: liquidoFinalG,
+    codigoInterno: toDisplay(p.codigo_interno ?? p.codigoInterno)
+  }
+}
+
+// Opções de um select: catálogo (se houver) com a contagem da faceta; sem catálogo, só a faceta
+const opcoesComFaceta = (catalogo, faceta = []) => {
+  const totais = new Map(faceta.map((f) => [String(f.valor ?? 'nenhuma'), f.total]))
+  const base = catalogo ?? faceta.map((f) => ({ id: f.valor ?? 'nenhuma', nome: f.nome ?? 'Sem balança' }))
+  return base.map((o) => ({ valor: String(o.id), nome: o.nome, total: totais.get(String(o.id)) ?? 0 }))
+}
+
 const Historico = () => {
   const navigate = useNavigate()
   const [pesagens, setPesagens] = useState([])
-  const [produtos, setProdutos] = useState([])
-  const [materiasPrimas, setMateriasPrimas] = useState([])
+  const [total, setTotal] = useState(0)
+  const [facetas, setFacetas] = useState({})
+  const [produtos, setProdutos] = useState(null)
+  const [materiasPrimas, setMateriasPrimas] = useState(null)
+  const [pagina, setPagina] = useState(1)
   const [loading, setLoading] = useState(false)
   const [error, setError] = useState('')
 
-  const [filtros, setFiltros] = useState({
-    produto: '',
-    materiaPrima: '',
-    op: '',
-    lote: '',
-    loteMP: '',
-    dataInicio: '',
-    dataFim: '',
-    pesador: ''
-  })
+  const [filtros, setFiltros] = useState(FILTROS_VAZIOS)
 
+  // catálogos para os selects (réplica local, só o delta vem da rede)
   useEffect(() => {
     let mounted = true
     ;(async () => {
-      setLoading(true)
-      setError('')
       try {
-        const [pes, prods, mps] = await Promise.all([
-          api.getPesagens({ page_size: 500 }),
-          api.getProdutos({ page_size: 500 }),
-          api.getMateriasPrimas({ page_size: 500 })
-        ])
+        const [prods, mps] = await Promise.all([catalogo.produtos(), catalogo.materiasPrimas()])
         if (!mounted) return
-
-        const pesList = normalizeList(pes).map((p) => {
-          // backend atual: bruto (kg), tara (kg), liquido (g)
-          // compat: bruto_kg/tara_kg/liquido_g/peso_liquido
-          const brutoKg = toNum(p.bruto ?? p.bruto_kg)
-          const taraKg  = toNum(p.tara ?? p.tara_kg)
-          const liquidoG = toNum(p.liquido ?? p.liquido_g ?? p.peso_liquido)
-
-          const brutoG = kgToG(brutoKg)
-          const taraG  = kgToG(taraKg)
-          const liquidoFinalG = liquidoG != null
-            ? liquidoG
-            : (brutoG != null && taraG != null ? (brutoG - taraG) : null)
-
-          return {
-            id: p.id,
-            dataHora: p.data_hora ?? p.dataHora,
-            produto: toDisplay(p.produto?.nome ?? p.produto_nome ?? p.produto),
-            materiaPrima: toDisplay(p.materia_prima?.nome ?? p.materia_prima_nome ?? p.materia_prima),
-            op: toDisplay(p.op?.numero ?? p.op),
-            lote: toDisplay(p.op?.lote ?? p.lote),
-            loteMP: toDisplay(p.lote_mp ?? p.loteMP ?? ''),
-            pesador: toDisplay(p.pesador),
-            bruto_g: brutoG,
-            tara_g: taraG,
-            liquido_g: liquidoFinalG,
-            codigoInterno: toDisplay(p.codigo_interno ?? p.codigoInterno)
-          }
-        })
-
-        setPesagens(pesList)
-        setProdutos(normalizeList(prods).map((x) => ({ id: x.id, nome: toDisplay(x.nome ?? x) })))
-        setMateriasPrimas(normalizeList(mps).map((x) => ({ id: x.id, nome: toDisplay(x.nome ?? x) })))
+        const porNome = (a, b) => a.nome.localeCompare(b.nome, 'pt-BR')
+        setProdutos(prods.map((x) => ({ id: x.id, nome: toDisplay(x.nome) })).sort(porNome))
+        setMateriasPrimas(mps.map((x) => ({ id: x.id, nome: toDisplay(x.nome) })).sort(porNome))
       } catch (e) {
-        console.error(e)
-        setError('Não foi possível carregar os dados. Verifique sua conexão e o token.')
-      } finally {
-        setLoading(false)
+        console.error(e) // sem catálogo os selects usam só as facetas
       }
     })()
     return () => { mounted = false }
   }, [])
 
-  const handleFiltroChange = (name, value) => setFiltros(prev => ({ ...prev, [name]: value }))
-  const limparFiltros = () => setFiltros({ produto: '', materiaPrima: '', op: '', lote: '', loteMP: '', dataInicio: '', dataFim: '', pesador: '' })
-
-  const inDateRange = (isoString) => {
-    if (!isoString) return false
-    if (!filtros.dataInicio && !filtros.dataFim) return true
-    const d = new Date(isoString)
-    if (Number.isNaN(d.getTime())) return false
-    if (filtros.dataInicio) {
-      const start = new Date(`${filtros.dataInicio}T00:00:00`)
-      if (d < start) return false
-    }
-    if (filtros.dataFim) {
-      const end = new Date(`${filtros.dataFim}T23:59:59`)
-      if (d > end) return false
+  const params = useMemo(() => {
+    const p = { page: pagina, facetas: 1 }
+    for (const [filtro, nome] of Object.entries(PARAMETROS)) {
+      const valor = String(filtros[filtro] ?? '').trim()
+      if (valor) p[nome] = valor
     }
-    return true
+    return p
+  }, [filtros, pagina])
+
+  // página + facetas no servidor; espera a digitação parar antes de consultar
+  useEffect(() => {
+    let mounted = true
+    const timer = setTimeout(async () => {
+      setLoading(true)
+      setError('')
+      try {
+        const res = await api.getPesagens(params)
+        if (!mounted) return
+        setPesagens(normalizeList(res).map(normalizarPesagem))
+        setTotal(res?.count ?? normalizeList(res).length)
+        setFacetas(res?.facetas ?? {})
+      } catch (e) {
+        if (!mounted) return
+        console.error(e)
+        if (e?.status === 404 && pagina > 1) setPagina(1) // página sumiu com o filtro novo
+        else setError('Não foi possível carregar os dados. Verifique sua conexão e o token.')
+      } finally {
+        if (mounted) setLoading(false)
+      }
+    }, ATRASO_BUSCA_MS)
+    return () => { mounted = false; clearTimeout(timer) }
+  }, [params])
+
+  const handleFiltroChange = (name, value) => {
+    setFiltros(prev => ({ ...prev, [name]: value }))
+    setPagina(1)
   }
+  const limparFiltros = () => { setFiltros(FILTROS_VAZIOS); setPagina(1) }
 
-  const filteredPesagens = useMemo(() => {
-    let filtered = pesagens
-    if (filtros.produto) filtered = filtered.filter(p => p.produto === filtros.produto)
-    if (filtros.materiaPrima) filtered = filtered.filter(p => p.materiaPrima === filtros.materiaPrima)
-    if (filtros.op) filtered = filtered.filter(p => (p.op || '').toLowerCase().includes(filtros.op.toLowerCase()))
-    if (filtros.lote) filtered = filtered.filter(p => (p.lote || '').toLowerCase().includes(filtros.lote.toLowerCase()))
-    if (filtros.loteMP) filtered = filtered.filter(p => (p.loteMP || '').toLowerCase().includes(filtros.loteMP.toLowerCase()))
-    if (filtros.pesador) filtered = filtered.filter(p => (p.pesador || '').toLowerCase().includes(filtros.pesador.toLowerCase()))
-    filtered = filtered.filter(p => inDateRange(p.dataHora))
-    return filtered
-  }, [pesagens, filtros])
+  const totalPaginas = Math.max(1, Math.ceil(total / PAGE_SIZE))
+  const opcoesProduto = useMemo(() => opcoesComFaceta(produtos, facetas.produto), [produtos, facetas])
+  const opcoesMP = useMemo(() => opcoesComFaceta(materiasPrimas, facetas.materia_prima), [materiasPrimas, facetas])
+  const opcoesBalanca = useMemo(() => opcoesComFaceta(null, facetas.balanca), [facetas])
+  const opcoesPesador = useMemo(
+    () => (facetas.pesador ?? []).map((f) => ({ valor: f.valor, nome: f.nome, total: f.total })),
+    [facetas]
+  )
+  const opcoesStatus = useMemo(
+    () => (facetas.status_op ?? []).map((f) => ({ valor: f.valor, nome: f.nome, total: f.total })),
+    [facetas]
+  )
+
+  const selectFaceta = (id, rotulo, todos, opcoes) => (
+    <div className="space-y-2">
+      <Label htmlFor={id}>{rotulo}</Label>
+      <Select
+        value={filtros[id] || "__all__"}
+        onValueChange={(v) => handleFiltroChange(id, v === "__all__" ? '' : v)}
+      >
+        <SelectTrigger id={id}><SelectValue placeholder={todos} /></SelectTrigger>
+        <SelectContent>
+          <SelectItem value="__all__">{todos}</SelectItem>
+          {opcoes.map(o => (
+            <SelectItem key={o.valor} value={o.valor}>{o.nome} ({nf.format(o.total)})</SelectItem>
+          ))}
+        </SelectContent>
+      </Select>
+    </div>
+  )
 
   const handleVerDetalhes = (id) => navigate(`/pesagens/${id}`)
   const handleEditar = (id) => navigate(`/pesagens/${id}/editar`)
   const handleGerarEtiqueta = async (id) => {
     try {
+      try {
+        await api.imprimirEtiquetas([id])
+        return
+      } catch (e) {
+        if (e?.status !== 400) throw e
+      }
       const blob = await api.gerarEtiquetaPDF(id)
       const url = URL.createObjectURL(blob)
       window.open(url, '_blank', 'noopener')
@@ -171,33 +226,10 @@ const Historico = () => {
         </CardHeader>
         <CardContent>
           <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-4 gap-4">
-            <div className="space-y-2">
-              <Label htmlFor="produto">Produto</Label>
-              <Select
-                value={filtros.produto || "__all__"}
-                onValueChange={(v) => handleFiltroChange('produto', v === "__all__" ? '' : v)}
-              >
-                <SelectTrigger id="produto"><SelectValue placeholder="Todos" /></SelectTrigger>
-                <SelectContent>
-                  <SelectItem value="__all__">Todos</SelectItem>
-                  {produtos.map(p => <SelectItem key={p.id} value={p.nome}>{p.nome}</SelectItem>)}
-                </SelectContent>
-              </Select>
-            </div>
-
-            <div className="space-y-2">
-              <Label htmlFor="materiaPrima">Matéria-Prima</Label>
-              <Select
-                value={filtros.materiaPrima || "__all__"}
-                onValueChange={(v) => handleFiltroChange('materiaPrima', v === "__all__" ? '' : v)}
-              >
-                <SelectTrigger id="materiaPrima"><SelectValue placeholder="Todas" /></SelectTrigger>
-                <SelectContent>
-                  <SelectItem value="__all__">Todas</SelectItem>
-                  {materiasPrimas.map(mp => <SelectItem key={mp.id} value={mp.nome}>{mp.nome}</SelectItem>)}
-                </SelectContent>
-              </Select>
-            </div>
+            {selectFaceta('produto', 'Produto', 'Todos', opcoesProduto)}
+            {selectFaceta('materiaPrima', 'Matéria-Prima', 'Todas', opcoesMP)}
+            {selectFaceta('balanca', 'Balança', 'Todas', opcoesBalanca)}
+            {selectFaceta('statusOP', 'Status da OP', 'Todos', opcoesStatus)}
 
             <div className="space-y-2">
               <Label htmlFor="op">OP</Label>
@@ -214,10 +246,7 @@ const Historico = () => {
               <Input id="loteMP" placeholder="Buscar por lote de MP" value={filtros.loteMP} onChange={(e) => handleFiltroChange('loteMP', e.target.value)} />
             </div>
 
-            <div className="space-y-2">
-              <Label htmlFor="pesador">Pesador</Label>
-              <Input id="pesador" placeholder="Buscar por pesador" value={filtros.pesador} onChange={(e) => handleFiltroChange('pesador', e.target.value)} />
-            </div>
+            {selectFaceta('pesador', 'Pesador', 'Todos', opcoesPesador)}
 
             <div className="space-y-2">
               <Label htmlFor="dataInicio">Data Início</Label>
@@ -243,7 +272,7 @@ const Historico = () => {
           <div className="flex items-center justify-between">
             <CardTitle className="flex items-center gap-2">
               <Search className="h-5 w-5" />
-              {loading ? 'Carregando…' : `Resultados (${filteredPesagens.length})`}
+              {loading ? 'Carregando…' : `Resultados (${nf.format(total)})`}
             </CardTitle>
           </div>
         </CardHeader>
@@ -264,7 +293,7 @@ const Historico = () => {
                 </tr>
               </thead>
               <tbody className="bg-white divide-y divide-gray-200">
-                {!loading && filteredPesagens.length > 0 && filteredPesagens.map((pesagem) => (
+                {!loading && pesagens.length > 0 && pesagens.map((pesagem) => (
                   <tr key={pesagem.id} className="hover:bg-gray-50">
                     <td className="px-6 py-4 whitespace-nowrap text-sm text-gray-900">
                       <div className="flex items-center">
@@ -322,13 +351,27 @@ const Historico = () => {
             </table>
           </div>
 
-          {!loading && filteredPesagens.length === 0 && (
+          {!loading && pesagens.length === 0 && (
             <div className="text-center py-12">
               <History className="h-12 w-12 text-gray-400 mx-auto mb-4" />
               <h3 className="text-lg font-medium text-gray-900 mb-2">Nenhuma pesagem encontrada</h3>
               <p className="text-gray-500">Tente ajustar os filtros ou registre uma nova pesagem.</p>
             </div>
           )}
+
+          {total > PAGE_SIZE && (
+            <div className="flex items-center justify-between px-6 py-3 border-t">
+              <span className="text-sm text-gray-500">Página {pagina} de {totalPaginas}</span>
+              <div className="flex gap-2">
+                <Button variant="outline" size="sm" disabled={loading || pagina <= 1} onClick={() => setPagina(p => p - 1)}>
+                  Anterior
+                </Button>
+                <Button variant="outline" size="sm" disabled={loading || pagina >= totalPaginas} onClick={() => setPagina(p => p + 1)}>
+                  Próxima
+                </Button>
+              </div>
+            </div>
+          )}
         </CardContent>
       </Card>
     </div>
@@ -40,7 +40,8 @@ const Login = ({ onLogin }) => {
       localStorage.setItem('access', tokens.access)
       if (tokens.refresh) localStorage.setItem('refresh', tokens.refresh)
 
-      const me = await api.me()
+      // o login já devolve o usuário; /auth/me/ só como fallback
+      const me = tokens.usuario || await api.me()
       const userData = {
         id: me?.id,
         nome: `${me?.first_name || ''} ${me?.last_name || ''}`.trim() || me?.username,
@@ -1,6 +1,6 @@
 // NovaPesagem.jsx
 
-import { useState, useEffect, useMemo } from 'react'
+import { useState, useEffect, useMemo, useRef } from 'react'
 import { Card, CardContent, CardDescription, CardHeader, CardTitle } from '@/components/ui/card'
 import { Button } from '@/components/ui/button'
 import { Input } from '@/components/ui/input'
@@ -13,13 +13,14 @@ import {
 } from '@/components/ui/command'
 import { Scale, Save, Printer, RotateCcw, Calculator, ChevronsUpDown, Check, Package, Tag } from 'lucide-react'
 import api from '@/services/api'
+import offlineQueue from '@/services/offlineQueue'
 import { cn } from '@/lib/utils'
 
 /**
  * UI: entradas em kg (3 casas), regra interna: gramas (g)
  */
 const KG_IN_G = 1000
-const TOLERANCIA_PERCENTUAL = 0.05 // 5%
+const TOLERANCIA_PERCENTUAL = 0.05 // 5% (fallback quando o item não traz limites)
 
 const kgToG = (kg) => Math.round((Number(kg) || 0) * KG_IN_G)    // => g (inteiro)
 const gToKg = (g) => (Number(g) || 0) / KG_IN_G                  // => kg (decimal)
@@ -37,6 +38,30 @@ const toNumber = (v) => {
   return Number(s.replace(/\./g, '').replace(',', '.')) || 0
 }
 
+// Estação: OP do /estacao/bootstrap/ (com itens, quantidades em g)
+const normalizarItem = (it) => ({
+  id: it.id,
+  mpNome: it.materia_prima?.nome ?? '',
+  mpCodigo: it.materia_prima?.codigo_interno ?? '',
+  quantidade_necessaria: it.quantidade_necessaria, // g
+  quantidade_pesada: it.quantidade_pesada,         // g
+  quantidade_restante: it.quantidade_restante,     // g
+  quantidade_minima: it.quantidade_minima,         // g
+  quantidade_maxima: it.quantidade_maxima,         // g
+  unidade: it.unidade,
+})
+
+const normalizarOP = (o) => ({
+  id: o.id,
+  numero: o.numero,
+  lote: o.lote,
+  status: o.status,
+  produtoNome: o.produto_nome ?? '',
+  itens: (o.itens ?? []).map(normalizarItem),
+})
+
+const INTERVALO_ATUALIZACAO_MS = 5000
+
 const NovaPesagem = () => {
   const [localUser, setLocalUser] = useState(null)
   const [loading, setLoading] = useState(false)
@@ -44,8 +69,8 @@ const NovaPesagem = () => {
   const [error, setError] = useState('')
 
   const [ops, setOps] = useState([])
-  const [itensOP, setItensOP] = useState([])
   const [balancas, setBalancas] = useState([])
+  const versaoRef = useRef(null)  // versão da última carga da estação (?since=)
 
   const [createdId, setCreatedId] = useState(null)
 
@@ -65,6 +90,43 @@ const NovaPesagem = () => {
   })
 
   const [formData, setFormData] = useState(getInitialFormData())
+  const [planoOP, setPlanoOP] = useState({})  // item_op_id -> plano de pesagem
+  const [lotesFefo, setLotesFefo] = useState({})  // item_op_id -> sugestão FEFO
+
+  // Idempotency-Key: a mesma pesagem reenviada (ex.: timeout) reaproveita a chave
+  const idempotenciaRef = useRef({ payload: null, key: null })
+  const chaveIdempotencia = (payload) => {
+    const serial = JSON.stringify(payload)
+    if (idempotenciaRef.current.payload !== serial) {
+      const key = globalThis.crypto?.randomUUID?.() || `${Date.now()}-${Math.random().toString(16).slice(2)}`
+      idempotenciaRef.current = { payload: serial, key }
+    }
+    return idempotenciaRef.current.key
+  }
+
+  // Pesagens guardadas sem conexão; drenadas ao voltar a rede
+  const [pendentesOffline, setPendentesOffline] = useState(offlineQueue.pendentes())
+
+  useEffect(() => {
+    const sincronizar = async () => {
+      if (!offlineQueue.pendentes()) return
+      try {
+        const res = await offlineQueue.drenar()
+        if (res.conflitos.length) {
+          setError(`${res.conflitos.length} pesagem(ns) offline rejeitada(s) na sincronização: ${res.conflitos.map(c => c.motivo).join(', ')}.`)
+        } else if (res.aplicadas.length) {
+          setSuccess(`${res.aplicadas.length} pesagem(ns) offline sincronizada(s).`)
+        }
+      } catch (e) {
+        console.error(e)
+      } finally {
+        setPendentesOffline(offlineQueue.pendentes())
+      }
+    }
+    sincronizar()
+    window.addEventListener('online', sincronizar)
+    return () => window.removeEventListener('online', sincronizar)
+  }, [])
 
   const getDisplayName = (user) => {
     if (!user) return ''
@@ -74,35 +136,20 @@ const NovaPesagem = () => {
       || ''
   }
 
-  const normalizeList = (data) => Array.isArray(data) ? data : (data?.results ?? [])
-
   useEffect(() => {
     let abort = false
     async function loadInitialData() {
       setLoading(true)
       try {
-        const [opsRes, balRes, userRes] = await Promise.all([
-          api.getOPs({ ordering: '-criada_em' }),
-          api.getBalancas(),
-          api.me().catch(() => null)
-        ])
+        // OPs abertas (com itens), balanças ativas e usuário numa única requisição
+        const dados = await api.getEstacaoBootstrap()
         if (abort) return
+        versaoRef.current = dados.versao
 
-        const opsNorm = normalizeList(opsRes)
-          .filter(o => ['aberta', 'em_andamento'].includes(o.status))
-          .map(o => ({
-            id: o.id,
-            numero: o.numero,
-            lote: o.lote,
-            status: o.status,
-            produtoNome: o.produto?.nome ?? '',
-          }))
-
-        const balsNorm = normalizeList(balRes).map(b => ({ id: b.id, nome: b.nome }))
-
-        setOps(opsNorm)
-        setBalancas(balsNorm)
+        setOps(dados.ops.map(normalizarOP))
+        setBalancas(dados.balancas.map(b => ({ id: b.id, nome: b.nome })))
 
+        const userRes = dados.usuario
         const display = getDisplayName(userRes)
         const safeUser = userRes ? userRes : {}
         setLocalUser({ ...safeUser, displayName: display })
@@ -118,6 +165,32 @@ const NovaPesagem = () => {
     return () => { abort = true }
   }, [])
 
+  // Atualização periódica barata: só as OPs alteradas desde a última versão
+  useEffect(() => {
+    const timer = setInterval(async () => {
+      if (versaoRef.current == null || document.hidden) return
+      try {
+        const dados = await api.getEstacaoBootstrap(versaoRef.current)
+        versaoRef.current = dados.versao
+        setBalancas(dados.balancas.map(b => ({ id: b.id, nome: b.nome })))
+        if (dados.completo) {
+          setOps(dados.ops.map(normalizarOP))
+          return
+        }
+        if (!dados.ops.length && !dados.ops_encerradas.length) return
+        const alteradas = new Map(dados.ops.map(o => [o.id, normalizarOP(o)]))
+        const encerradas = new Set(dados.ops_encerradas)
+        setOps(prev => [
+          ...dados.ops.filter(o => !prev.some(p => p.id === o.id)).map(o => alteradas.get(o.id)),
+          ...prev.filter(o => !encerradas.has(o.id)).map(o => alteradas.get(o.id) ?? o),
+        ])
+      } catch (e) {
+        console.error(e)  // offline: tenta de novo no próximo ciclo
+      }
+    }, INTERVALO_ATUALIZACAO_MS)
+    return () => clearInterval(timer)
+  }, [])
+
   // ---- Unidades: UI em kg; comparação/saldo em g ----
   // Entradas do usuário (kg)
   const liquidoKg = useMemo(() => toNumber(formData.liquido), [formData.liquido])
@@ -132,6 +205,12 @@ const NovaPesagem = () => {
   // Líquido em g (para validação)
   const pesoLiquidoG = useMemo(() => kgToG(liquidoKg), [liquidoKg])
 
+  // Itens da OP selecionada (já vieram na carga da estação)
+  const itensOP = useMemo(() => {
+    const sel = ops.find(o => o.id.toString() === formData.op.toString())
+    return sel?.itens ?? []
+  }, [ops, formData.op])
+
   // Item selecionado
   const itemSelecionado = useMemo(() => {
     if (!formData.itemOp) return null
@@ -143,9 +222,13 @@ const NovaPesagem = () => {
   const pesadoG = itemSelecionado ? Number(itemSelecionado.quantidade_pesada || 0) : 0
   const restanteG = Math.max(necessarioG - pesadoG, 0)
 
-  // NOVO: Cálculo dos limites com +/- 5%
-  const limiteMinG = necessarioG * (1 - TOLERANCIA_PERCENTUAL)
-  const limiteMaxG = necessarioG * (1 + TOLERANCIA_PERCENTUAL)
+  // Limites de tolerância congelados no ItemOP (fallback: +/- 5%)
+  const limiteMinG = itemSelecionado?.quantidade_minima != null
+    ? Number(itemSelecionado.quantidade_minima)
+    : necessarioG * (1 - TOLERANCIA_PERCENTUAL)
+  const limiteMaxG = itemSelecionado?.quantidade_maxima != null
+    ? Number(itemSelecionado.quantidade_maxima)
+    : necessarioG * (1 + TOLERANCIA_PERCENTUAL)
 
   const produtoNome = useMemo(() => {
     const sel = ops.find(o => o.id.toString() === formData.op.toString())
@@ -168,31 +251,47 @@ const NovaPesagem = () => {
   const handleOPChange = async (opId) => {
     handleChange('op', opId)
     handleChange('itemOp', '')
-    setItensOP([])
+    setPlanoOP({})
+    setLotesFefo({})
     try {
-      const resp = await api.getOPItems(opId)
-      const itens = normalizeList(resp).map(it => ({
-        id: it.id,
-        mpNome: it.materia_prima?.nome ?? '',
-        mpCodigo: it.materia_prima?.codigo_interno ?? '',
-        quantidade_necessaria: it.quantidade_necessaria, // g
-        quantidade_pesada: it.quantidade_pesada,         // g
-        quantidade_restante: it.quantidade_restante,     // g
-        unidade: it.unidade,
-      }))
-      setItensOP(itens)
+      const [plano, fefo] = await Promise.all([
+        api.getPlanoPesagem(opId).catch(() => null),
+        api.getLotesFefo(opId).catch(() => null),
+      ])
+      setPlanoOP(Object.fromEntries((plano?.itens ?? []).map(p => [p.item_op_id, p])))
+      setLotesFefo(Object.fromEntries((fefo ?? []).map(l => [l.item_op_id, l])))
     } catch (e) {
       console.error(e)
-      setError('Falha ao carregar itens da OP.')
+      setError('Falha ao carregar o plano da OP.')
     }
   }
 
   // Campos obrigatórios: op, itemOp, liquido, tara
   const hasCamposBasicos = formData.op && formData.itemOp && formData.liquido && formData.tara
 
+  // Plano de pesagem: item grande demais para uma balança é pesado em frações
+  const planoItem = itemSelecionado ? planoOP[itemSelecionado.id] : null
+  const fracionado = (planoItem?.pesagens ?? 0) > 1
+
+  useEffect(() => {
+    const sugerida = planoItem?.balanca?.id
+    if (sugerida && !formData.balanca) {
+      setFormData(prev => ({ ...prev, balanca: String(sugerida) }))
+    }
+  }, [planoItem])  // eslint-disable-line react-hooks/exhaustive-deps
+
+  // Lote FEFO sugerido (validade mais próxima com saldo) pré-preenche o Lote MP
+  const fefoItem = itemSelecionado ? lotesFefo[itemSelecionado.id] : null
+  useEffect(() => {
+    if (fefoItem?.lote_sugerido && !formData.loteMP) {
+      setFormData(prev => ({ ...prev, loteMP: fefoItem.lote_sugerido }))
+    }
+  }, [fefoItem])  // eslint-disable-line react-hooks/exhaustive-deps
+
   // Validações client-side
   const novoTotalG = pesadoG + pesoLiquidoG
-  const estaForaDaFaixa = novoTotalG > limiteMaxG || novoTotalG < limiteMinG
+  const parcial = fracionado && novoTotalG < limiteMinG
+  const estaForaDaFaixa = novoTotalG > limiteMaxG || (novoTotalG < limiteMinG && !fracionado)
 
   // Pode salvar se tudo ok, líquido > 0 e não está fora da faixa de tolerância
   const canSave = !loading && hasCamposBasicos && !estaForaDaFaixa && liquidoKg > 0
@@ -223,7 +322,7 @@ const NovaPesagem = () => {
 
       if (estaForaDaFaixa) {
         setError(
-          `O peso total excede a faixa de tolerância (+/- 5%). Limite: ${fmtG(limiteMinG)} a ${fmtG(limiteMaxG)}. O peso total atual será ${fmtG(novoTotalG)}.`
+          `O peso total excede a faixa de tolerância. Limite: ${fmtG(limiteMinG)} a ${fmtG(limiteMaxG)}. O peso total atual será ${fmtG(novoTotalG)}.`
         );
         setLoading(false)
         return
@@ -239,14 +338,24 @@ const NovaPesagem = () => {
         liquido: Number(liquidoKg.toFixed(3)),  // kg
         balanca_id: formData.balanca ? Number(formData.balanca) : null,
         codigo_interno: formData.codigoInterno || '',
-        lote_mp: loteMP
+        lote_mp: loteMP,
+        parcial
       }
 
-      const created = await api.createPesagemOP(payload)
+      const created = await api.createPesagemOP(payload, { idempotencyKey: chaveIdempotencia(payload) })
       setCreatedId(created?.id)
+      idempotenciaRef.current = { payload: null, key: null }  // próxima pesagem = nova chave
       setSuccess('Pesagem registrada com sucesso! A OP será concluída automaticamente ao zerar todos os itens.')
     } catch (err) {
       console.error(err)
+      // sem resposta do servidor: guarda localmente com a mesma chave (vira o uuid da sincronização)
+      if (!err?.status && idempotenciaRef.current.key) {
+        const payloadOffline = JSON.parse(idempotenciaRef.current.payload)
+        setPendentesOffline(offlineQueue.enfileirar(payloadOffline, idempotenciaRef.current.key))
+        idempotenciaRef.current = { payload: null, key: null }
+        setSuccess('Sem conexão: pesagem guardada nesta estação e será sincronizada automaticamente.')
+        return
+      }
       const msg = err?.response?.data?.detail
         || err?.response?.data?.non_field_errors?.[0]
         || err?.response?.data?.lote_mp?.[0]
@@ -265,7 +374,6 @@ const NovaPesagem = () => {
     setError('')
     setSuccess('')
     setCreatedId(null)
-    setItensOP([])
     setOpenItem(false)
     setSearchItem('')
   }
@@ -276,6 +384,13 @@ const NovaPesagem = () => {
         setError('Salve a pesagem primeiro para gerar a etiqueta.')
         return
       }
+      try {
+        // impressora térmica da estação; sem impressora cadastrada, cai para o PDF
+        await api.imprimirEtiquetas([createdId])
+        return
+      } catch (e) {
+        if (e?.status !== 400) throw e
+      }
       const blob = await api.gerarEtiquetaPDF(createdId)
       const pdfUrl = URL.createObjectURL(blob)
       window.open(pdfUrl, '_blank')
@@ -536,22 +651,33 @@ const NovaPesagem = () => {
                   Pesado: <b>{fmtG(pesadoG)}</b><br />
                   Restante: <b>{fmtG(restanteG)}</b><br />
                   {/* Exibindo os novos limites */}
-                  Limite (-/+ 5%): <b>{fmtG(limiteMinG)}</b> a <b>{fmtG(limiteMaxG)}</b>
+                  Limite (tolerância): <b>{fmtG(limiteMinG)}</b> a <b>{fmtG(limiteMaxG)}</b>
                 </div>
                 {/* Nova lógica para as mensagens de aviso/erro */}
                 {estaForaDaFaixa && (
                   <p className="mt-2 text-red-700 text-sm">
-                    Excede a faixa de tolerância de +/- 5%. Ajuste o peso.
+                    Excede a faixa de tolerância. Ajuste o peso.
                   </p>
                 )}
                 {!estaForaDaFaixa && (novoTotalG > necessarioG) && (
                   <p className="mt-2 text-amber-700 text-sm">
-                    Atingiu ou ultrapassou a quantidade necessária, dentro da tolerância de +5%.
+                    Atingiu ou ultrapassou a quantidade necessária, dentro da tolerância.
+                  </p>
+                )}
+                {planoItem?.balanca && (
+                  <p className="mt-2 text-slate-600 text-sm">
+                    Plano: {planoItem.balanca.nome} • {planoItem.pesagens} pesagem(ns)
+                    {fracionado && ` de até ${planoItem.fracoes_g.map(f => fmtG(Number(f))).join(' + ')}`}
                   </p>
                 )}
-                {!estaForaDaFaixa && (novoTotalG < necessarioG) && (
+                {parcial && (
                   <p className="mt-2 text-amber-700 text-sm">
-                    Atingiu a quantidade, mas com tolerância de -5%.
+                    Pesagem parcial: ainda faltarão {fmtG(Math.max(necessarioG - novoTotalG, 0))}.
+                  </p>
+                )}
+                {!estaForaDaFaixa && !parcial && (novoTotalG < necessarioG) && (
+                  <p className="mt-2 text-amber-700 text-sm">
+                    Atingiu a quantidade, dentro da tolerância inferior.
                   </p>
                 )}
               </div>
@@ -567,6 +693,13 @@ const NovaPesagem = () => {
                 <AlertDescription className="text-green-800">{success}</AlertDescription>
               </Alert>
             )}
+            {pendentesOffline > 0 && (
+              <Alert className="border-amber-200 bg-amber-50">
+                <AlertDescription className="text-amber-800">
+                  {pendentesOffline} pesagem(ns) aguardando sincronização com o servidor.
+                </AlertDescription>
+              </Alert>
+            )}
 
             <div className="flex flex-wrap gap-3">
               <Button type="submit" disabled={!canSave} className="flex items-center gap-2">
@@ -580,7 +713,7 @@ const NovaPesagem = () => {
                 onClick={handleGerarEtiqueta}
                 className="flex items-center gap-2"
                 disabled={!createdId}
-                title={!createdId ? 'Salve a pesagem para liberar a etiqueta' : 'Gerar etiqueta em PDF'}
+                title={!createdId ? 'Salve a pesagem para liberar a etiqueta' : 'Imprimir etiqueta (PDF se a estação não tiver impressora)'}
               >
                 <Printer className="h-4 w-4" />
                 Gerar Etiqueta
@@ -49,6 +49,8 @@ export default function PesagemEditar() {
     // DERIVADOS / METADADOS
     balanca_id: null,
     codigo_interno: '',
+    // motivo da correção (vai no lançamento de estorno/substituta)
+    motivo: '',
   })
 
   const isOPLinked = useMemo(() => !!(form.op_id || form.item_op_id), [form.op_id, form.item_op_id])
@@ -107,6 +109,7 @@ export default function PesagemEditar() {
 
             balanca_id: p?.balanca?.id ?? null,
             codigo_interno: p?.codigo_interno ?? '',
+            motivo: '',
           })
         } catch (e) {
           console.error(e)
@@ -142,6 +145,7 @@ export default function PesagemEditar() {
         tara: form.tara === '' ? null : Number(form.tara),           // kg
         balanca_id: form.balanca_id ?? null,
         codigo_interno: form.codigo_interno,
+        motivo: form.motivo,
       }
 
       // se for legado (sem OP/ItemOP), permite ajustar vínculos e OP textual
@@ -151,8 +155,12 @@ export default function PesagemEditar() {
         payload.op = form.op_numero || ''
       }
 
-      await api.updatePesagem(id, payload)
-      setSuccess('Pesagem atualizada com sucesso!')
+      // a pesagem original é estornada e a correção vira um novo lançamento (novo id)
+      const substituta = await api.updatePesagem(id, payload)
+      setSuccess('Pesagem corrigida com sucesso!')
+      if (substituta?.id && String(substituta.id) !== String(id)) {
+        navigate(`/pesagens/${substituta.id}/editar`, { replace: true })
+      }
     } catch (e) {
       console.error(e)
       const msg =
@@ -341,6 +349,11 @@ export default function PesagemEditar() {
             </div>
           </div>
 
+          <div className="space-y-2 md:col-span-2">
+            <Label>Motivo da correção</Label>
+            <Input value={form.motivo} maxLength={200} onChange={(e) => onChange('motivo', e.target.value)} placeholder="Ex.: tara digitada errada" />
+          </div>
+
           {/* Metadados (leitura) */}
           <div className="space-y-2">
             <Label>Pesador</Label>
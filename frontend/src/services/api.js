@@ -147,6 +147,13 @@ class ApiService {
     });
   }
 
+  // ===== Catálogos: delta desde o cursor (produtos, materias-primas, balancas, estruturas) =====
+  async getAlteracoesCatalogo(recurso, updatedSince, params = {}) {
+    // -> { desde, ate, alterados, excluidos }; "ate" é o cursor da próxima chamada
+    const qs = new URLSearchParams({ ...params, updated_since: updatedSince }).toString();
+    return this.request(`${this.baseRegistro}/${recurso}/?${qs}`);
+  }
+
   // ===== Matérias-Primas (/api/registro/materias-primas/) =====
   async getMateriasPrimas(params = {}) {
     const qs = new URLSearchParams(params).toString();
@@ -266,9 +273,21 @@ class ApiService {
       method: "POST",
     });
   }
+  async getEstacaoBootstrap(since = null) {
+    // tela de pesagem: OPs abertas com itens, balanças e usuário; com since, só o que mudou
+    return this.request(`${this.baseRegistro}/estacao/bootstrap/${since != null ? `?since=${since}` : ""}`);
+  }
   async getOPItems(opId) {
     return this.request(`${this.baseRegistro}/ops/${opId}/itens/`);
   }
+  async getLotesFefo(opId) {
+    // lote(s) sugerido(s) por validade (FEFO) para cada item pendente
+    return this.request(`${this.baseRegistro}/ops/${opId}/lotes-fefo/`);
+  }
+  async getPlanoPesagem(opId) {
+    // balança sugerida + frações (g) por item pendente
+    return this.request(`${this.baseRegistro}/ops/${opId}/plano-pesagem/`);
+  }
 
   // ===== Itens-OP (CRUD direto se precisar) (/api/registro/itens-op/) =====
   async getItensOP(params = {}) {
@@ -300,16 +319,36 @@ class ApiService {
       body: JSON.stringify(pesagem),
     });
   }
-  async createPesagemOP(payload) {
+  async createPesagemOP(payload, { idempotencyKey, tentativas = 3 } = {}) {
     // novo fluxo: { op_id, item_op_id, bruto, tara, volume?, balanca_id?, codigo_interno? }
-    return this.request(`${this.baseRegistro}/pesagens/`, {
+    // Com Idempotency-Key, falhas de rede podem ser repetidas sem risco de somar duas vezes.
+    const options = {
       method: "POST",
       body: JSON.stringify(payload),
+      headers: idempotencyKey ? { "Idempotency-Key": idempotencyKey } : {},
+    };
+    for (let tentativa = 1; ; tentativa++) {
+      try {
+        return await this.request(`${this.baseRegistro}/pesagens/`, options);
+      } catch (err) {
+        // só repete erro de rede (sem status HTTP) ou 409 (mesma chave ainda em processamento)
+        const repetivel = !err?.status || err.status === 409;
+        if (!idempotencyKey || !repetivel || tentativa >= tentativas) throw err;
+        await new Promise((r) => setTimeout(r, 500 * tentativa));
+      }
+    }
+  }
+  async syncPesagens(pesagens) {
+    // lote capturado offline: [{ uuid, op_id, item_op_id, tara, liquido, ..., capturada_em }]
+    return this.request(`${this.baseRegistro}/sync/pesagens/`, {
+      method: "POST",
+      body: JSON.stringify({ pesagens }),
     });
   }
+  // correção por estorno + substituta: devolve a nova pesagem (novo id)
   async updatePesagem(id, pesagem) {
     return this.request(`${this.baseRegistro}/pesagens/${id}/`, {
-      method: "PUT",
+      method: "PATCH",
       body: JSON.stringify(pesagem),
     });
   }
@@ -319,6 +358,20 @@ class ApiService {
     });
   }
 
+  // ===== Impressão direta (ZPL/EPL) na impressora da estação =====
+  // 202 => etiquetas na fila do spooler; 400 => sem impressora (use o PDF)
+  async imprimirEtiquetas(ids, { estacao, impressora, copias } = {}) {
+    return this.request(`${this.baseRegistro}/etiquetas/imprimir/`, {
+      method: "POST",
+      body: JSON.stringify({
+        pesagens: ids,
+        ...(estacao ? { estacao } : {}),
+        ...(impressora ? { impressora } : {}),
+        ...(copias ? { copias } : {}),
+      }),
+    });
+  }
+
   // ===== Etiqueta PDF (/api/registro/etiqueta/<id>/) =====
   async gerarEtiquetaPDF(id) {
     const url = `${this.baseRegistro}/etiqueta/${id}/`;
@@ -344,6 +397,21 @@ class ApiService {
     }
   }
 
+  // ===== Separação de MPs (/api/registro/separacao/) =====
+  // params: { ids: "1,2", status: "aberta,em_andamento", de: "AAAA-MM-DD", ate: "AAAA-MM-DD" }
+  async getSeparacao(params = {}) {
+    const qs = new URLSearchParams(params).toString();
+    return this.request(`${this.baseRegistro}/separacao/${qs ? `?${qs}` : ""}`);
+  }
+  async gerarSeparacaoPDF(params = {}) {
+    const qs = new URLSearchParams({ ...params, formato: "pdf" }).toString();
+    const res = await fetch(`${this.baseRegistro}/separacao/?${qs}`, {
+      headers: this.access ? { Authorization: `Bearer ${this.access}` } : {},
+    });
+    if (!res.ok) throw new Error(`HTTP ${res.status}`);
+    return res.blob();
+  }
+
   // ===== Dashboard helper (opcional no front) =====
   async getDashboardStats() {
     const pesagens = await this.getPesagens();
@@ -0,0 +1,54 @@
+// Réplica local dos catálogos (produtos, matérias-primas...) para listas de filtro.
+// Cada recurso guarda { cursor, campos, itens } no localStorage; sincronizar() pede
+// só o que mudou desde o cursor (?updated_since=) e aplica alterados/excluidos por id.
+// A primeira carga usa o início da época como cursor (traz tudo, sem paginação).
+import api from '@/services/api'
+
+const PREFIXO = 'catalogo:'
+const INICIO = '1970-01-01T00:00:00Z'
+const CAMPOS_PADRAO = 'id,nome,codigo_interno,ativo'
+
+const ler = (recurso) => {
+  try {
+    return JSON.parse(localStorage.getItem(PREFIXO + recurso) || 'null')
+  } catch {
+    return null
+  }
+}
+
+const gravar = (recurso, replica) => {
+  try {
+    localStorage.setItem(PREFIXO + recurso, JSON.stringify(replica))
+  } catch {
+    // cota estourada: segue só em memória, a próxima carga começa do zero
+  }
+}
+
+const emAndamento = {}
+
+// Lista completa (array) do recurso, atualizada pelo delta. Se a rede falhar e houver
+// réplica, devolve a réplica; sem réplica, propaga o erro.
+export function sincronizar(recurso, campos = CAMPOS_PADRAO) {
+  const chave = `${recurso}|${campos}`
+  if (emAndamento[chave]) return emAndamento[chave]
+  emAndamento[chave] = (async () => {
+    let replica = ler(recurso)
+    if (!replica || replica.campos !== campos) replica = { cursor: INICIO, campos, itens: [] }
+    try {
+      const delta = await api.getAlteracoesCatalogo(recurso, replica.cursor, { fields: campos })
+      const porId = new Map(replica.itens.map((i) => [i.id, i]))
+      for (const id of delta.excluidos ?? []) porId.delete(id)
+      for (const item of delta.alterados ?? []) porId.set(item.id, item)
+      replica = { cursor: delta.ate, campos, itens: [...porId.values()] }
+      gravar(recurso, replica)
+    } catch (e) {
+      if (replica.cursor === INICIO) throw e
+      console.warn(`Catálogo ${recurso}: usando réplica local`, e)
+    }
+    return replica.itens
+  })().finally(() => { delete emAndamento[chave] })
+  return emAndamento[chave]
+}
+
+export const produtos = () => sincronizar('produtos')
+export const materiasPrimas = () => sincronizar('materias-primas')
@@ -0,0 +1,58 @@
+// Fila local de pesagens capturadas sem conexão.
+// Cada item guarda o payload do POST /pesagens/ + uuid (gerado na estação) e capturada_em.
+// drenar() envia em lotes para /sync/pesagens/; o servidor deduplica por uuid.
+import api from '@/services/api'
+
+const STORAGE_KEY = 'pesagens_offline'
+const LOTE = 100
+
+const ler = () => {
+  try {
+    return JSON.parse(localStorage.getItem(STORAGE_KEY) || '[]')
+  } catch {
+    return []
+  }
+}
+
+const gravar = (fila) => localStorage.setItem(STORAGE_KEY, JSON.stringify(fila))
+
+export const pendentes = () => ler().length
+
+export function enfileirar(payload, uuid) {
+  const fila = ler()
+  if (!fila.some(p => p.uuid === uuid)) {
+    fila.push({ ...payload, uuid, capturada_em: new Date().toISOString() })
+    gravar(fila)
+  }
+  return fila.length
+}
+
+let drenando = null
+
+// Retorna { aplicadas, duplicadas, conflitos } acumulados. Conflitos saem da fila
+// (não adianta reenviar) e são devolvidos para o operador revisar.
+export function drenar() {
+  if (drenando) return drenando
+  drenando = (async () => {
+    const total = { aplicadas: [], duplicadas: [], conflitos: [] }
+    try {
+      let fila = ler()
+      while (fila.length) {
+        const lote = fila.slice(0, LOTE)
+        const res = await api.syncPesagens(lote)
+        total.aplicadas.push(...(res?.aplicadas ?? []))
+        total.duplicadas.push(...(res?.duplicadas ?? []))
+        total.conflitos.push(...(res?.conflitos ?? []))
+        const enviados = new Set(lote.map(p => p.uuid))
+        fila = ler().filter(p => !enviados.has(p.uuid))
+        gravar(fila)
+      }
+    } finally {
+      drenando = null
+    }
+    return total
+  })()
+  return drenando
+}
+
+export default { enfileirar, drenar, pendentes }